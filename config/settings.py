@@ -88,6 +88,33 @@ MIN_EARLY_HIT_RATE = float(os.getenv("MIN_EARLY_HIT_RATE", "0.15"))
 # Early buyer tespiti için geriye bakılacak blok sayısı (~2 saat)
 EARLY_LOOKBACK_BLOCKS = int(os.getenv("EARLY_LOOKBACK_BLOCKS", "3600"))
 
+# Early detection arka plan worker havuzu (alert akışını bloklamaz)
+EARLY_DETECTION_WORKERS = int(os.getenv("EARLY_DETECTION_WORKERS", "2"))
+EARLY_DETECTION_QUEUE_SIZE = int(os.getenv("EARLY_DETECTION_QUEUE_SIZE", "20"))
+# Early buyer swap doğrulamasında paralel receipt sorgusu sayısı
+EARLY_RECEIPT_WORKERS = int(os.getenv("EARLY_RECEIPT_WORKERS", "8"))
+
+# Tarihsel eth_getLogs taramaları (scripts/log_scanner.py): başlangıç / max blok aralığı, paralel istek
+LOG_SCAN_INITIAL_RANGE = int(os.getenv("LOG_SCAN_INITIAL_RANGE", "2000"))
+LOG_SCAN_MAX_RANGE = int(os.getenv("LOG_SCAN_MAX_RANGE", "10000"))
+LOG_SCAN_CONCURRENCY = int(os.getenv("LOG_SCAN_CONCURRENCY", "4"))
+
+# Transfer log segment cache (scripts/log_cache.py) - boş = kapalı
+LOG_CACHE_DIR = os.getenv(
+    "LOG_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "log_cache"),
+)
+LOG_CACHE_MAX_MB = int(os.getenv("LOG_CACHE_MAX_MB", "256"))
+# Head'e bu kadar bloktan yakın aralıklar cache'e yazılmaz (reorg), her istekte canlı çekilir
+LOG_CACHE_CONFIRMATIONS = int(os.getenv("LOG_CACHE_CONFIRMATIONS", "30"))
+
+# Portföy olay günlüğü (scripts/trade_journal.py): append-only jsonl + N olayda bir snapshot
+TRADE_JOURNAL_DIR = os.getenv(
+    "TRADE_JOURNAL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"),
+)
+TRADE_JOURNAL_SNAPSHOT_EVERY = int(os.getenv("TRADE_JOURNAL_SNAPSHOT_EVERY", "500"))
+
 # Puanlama penceresi (gün)
 WALLET_SCORING_WINDOW_DAYS = int(os.getenv("WALLET_SCORING_WINDOW_DAYS", "30"))
 
@@ -99,6 +126,21 @@ SMARTEST_WALLET_TARGET = int(os.getenv("SMARTEST_WALLET_TARGET", "15"))
 # =============================================================================
 DATABASE_URL = os.getenv("DATABASE_URL", "")  # Neon connection string
 
+# DATABASE_URL yoksa kullanılan yerel SQLite dosyası (boş = JSON fallback)
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "smart_money.db"),
+)
+
+# Tam geçmiş okuyucuları (server-side cursor) her round-trip'te kaç satır çeksin
+DB_STREAM_FETCH_SIZE = int(os.getenv("DB_STREAM_FETCH_SIZE", "2000"))
+
+# Bu süreyi (ms) aşan SQL ifadeleri parametre şekilleriyle loglanır (0 = kapalı)
+DB_SLOW_QUERY_MS = int(os.getenv("DB_SLOW_QUERY_MS", "250"))
+
+# Alert snapshot saklama süresi (gün) - 0 = sınırsız (tarihsel analiz için)
+ALERT_SNAPSHOT_RETENTION_DAYS = int(os.getenv("ALERT_SNAPSHOT_RETENTION_DAYS", "0"))
+
 # =============================================================================
 # BASE CHAIN ADRESLERI
 # =============================================================================
@@ -108,6 +150,12 @@ WETH_ADDRESS = "0x4200000000000000000000000000000000000006"
 # Uniswap V3 Router adresleri (Base)
 UNISWAP_V3_ROUTER = "0x2626664c2603336E57B271c5C0b26F421741e481"
 UNISWAP_UNIVERSAL_ROUTER = "0x3fC91A3afd70395Cd496C647d5a6CC9D4B2b7FAD"
+# Uniswap V3 QuoterV2 (Base) - swap öncesi eth_call ile quote
+UNISWAP_V3_QUOTER = "0x3d4e44Eb1374240CE5F1B871ab261CD16335B76a"
+
+# Aerodrome Router + default pool factory (Base)
+AERODROME_ROUTER = "0xcF77a3Ba9A5CA399B7c97c74d54e5b1Beb874E43"
+AERODROME_FACTORY = "0x420DD381b31aEf6683db6B902084cB0FFECe40Da"
 
 # =============================================================================
 # EXCLUDED TOKENS (Alert dışı bırakılacak tokenlar)
@@ -173,6 +221,36 @@ SHORT_LIST_THRESHOLD = float(os.getenv("SHORT_LIST_THRESHOLD", "0.20"))  # %20 a
 CONTRACTS_CHECK_THRESHOLD = float(os.getenv("CONTRACTS_CHECK_THRESHOLD", "0.50"))  # %50 artış
 DEAD_TOKEN_MCAP = int(os.getenv("DEAD_TOKEN_MCAP", "20000"))  # $20K altı = ölü token
 
+# MCap check scheduler: bu pencere (sn) içinde vadesi gelen kontroller tek batch'te işlenir
+MCAP_CHECK_BATCH_WINDOW = float(os.getenv("MCAP_CHECK_BATCH_WINDOW", "1.0"))
+
+# mcap_checks claim zaman aşımı (sn) - bu süreyi aşan claim başka instance'a geçebilir
+MCAP_CHECK_CLAIM_TIMEOUT = int(os.getenv("MCAP_CHECK_CLAIM_TIMEOUT", "300"))
+
+# Claim / MCap çekimi hata verirse kontrol bu kadar sn sonra tekrar denenir (en fazla N deneme)
+MCAP_CHECK_RETRY_DELAY = float(os.getenv("MCAP_CHECK_RETRY_DELAY", "30"))
+MCAP_CHECK_MAX_ATTEMPTS = int(os.getenv("MCAP_CHECK_MAX_ATTEMPTS", "3"))
+
+# Alert sonrası sürekli fiyat takibi (gerçek ATH / dip / zirveye kadar geçen süre)
+PRICE_TRACK_WINDOW = int(os.getenv("PRICE_TRACK_WINDOW", "3600"))           # Alert sonrası kaç sn izlensin
+PRICE_TRACK_INTERVAL = float(os.getenv("PRICE_TRACK_INTERVAL", "10"))       # Batch fiyat sorgusu aralığı (sn)
+PRICE_TRACK_FLUSH_INTERVAL = int(os.getenv("PRICE_TRACK_FLUSH_INTERVAL", "60"))  # token_evaluations'a yazma aralığı (sn)
+
+# Fiyat yolu kaydı (scripts/price_paths.py): günlük binary dosyalar - boş = kapalı
+PRICE_PATH_DIR = os.getenv(
+    "PRICE_PATH_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "price_paths"),
+)
+PRICE_PATH_HOURS = float(os.getenv("PRICE_PATH_HOURS", "6"))                  # Alert sonrası kaç saat kaydedilsin
+PRICE_PATH_SLOW_INTERVAL = float(os.getenv("PRICE_PATH_SLOW_INTERVAL", "60"))  # PRICE_TRACK_WINDOW sonrası örnek aralığı (sn)
+PRICE_PATH_RETENTION_DAYS = int(os.getenv("PRICE_PATH_RETENTION_DAYS", "90"))  # 0 = silme
+
+# Alım adayı arşivi (scripts/transfer_archive.py → alert_replay) - boş = kapalı
+TRANSFER_ARCHIVE_DIR = os.getenv(
+    "TRANSFER_ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "transfer_archive"),
+)
+
 # Cüzdan değerlendirme eşikleri
 TRASH_WARN_THRESHOLD = float(os.getenv("TRASH_WARN_THRESHOLD", "0.60"))  # %60 trash → uyarı
 TRASH_REMOVE_THRESHOLD = float(os.getenv("TRASH_REMOVE_THRESHOLD", "0.80"))  # %80 trash → çıkarma
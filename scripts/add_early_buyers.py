@@ -12,7 +12,6 @@ Kullanım:
 import os
 import sys
 import json
-import time
 import requests
 from datetime import datetime, timezone, timedelta
 from web3 import Web3
@@ -20,6 +19,8 @@ from web3 import Web3
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.settings import ALCHEMY_API_KEYS
+from scripts.log_scanner import LogRangeError
+from scripts.log_cache import get_transfer_logs
 from scripts.wallet_discoverer import (
     DATA_DIR,
     BLOCKED_ADDRESSES,
@@ -37,9 +38,6 @@ TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523
 # Base chain: ~2 saniye/blok → 5 dakika ≈ 150 blok
 FIRST_5MIN_BLOCKS = 150
 
-# Alchemy eth_getLogs max blok aralığı (500 güvenli limit)
-LOG_CHUNK_SIZE = 500
-
 # Hedef tokenlar
 TARGET_TOKENS = [
     {"symbol": "WILDE",    "address": "0xe4F5b998372443522B08b72D3B5b704c3BDAFAF4"},
@@ -65,48 +63,6 @@ def get_current_block() -> int:
     return int(result["result"], 16)
 
 
-def get_asset_transfers(token_address: str, from_block: int, to_block: int) -> list:
-    """
-    alchemy_getAssetTransfers ile token transfer geçmişini al.
-    eth_getLogs'un free tier 10-blok kısıtlaması yok.
-    Sayfalama ile tüm sonuçları çeker.
-    """
-    all_transfers = []
-    page_key = None
-
-    while True:
-        params = {
-            "fromBlock": hex(from_block),
-            "toBlock": hex(to_block),
-            "contractAddresses": [Web3.to_checksum_address(token_address)],
-            "category": ["erc20"],
-            "withMetadata": False,
-            "excludeZeroValue": True,
-            "maxCount": "0x3e8",  # 1000 per page
-            "order": "asc",
-        }
-        if page_key:
-            params["pageKey"] = page_key
-
-        result = rpc_call("alchemy_getAssetTransfers", [params])
-
-        if "error" in result:
-            print(f"    ⚠️ alchemy_getAssetTransfers hatası: {result['error']}")
-            break
-
-        data = result.get("result", {})
-        transfers = data.get("transfers", [])
-        all_transfers.extend(transfers)
-
-        page_key = data.get("pageKey")
-        if not page_key or not transfers:
-            break
-
-        time.sleep(0.1)
-
-    return all_transfers
-
-
 def is_eoa(address: str) -> bool:
     """Adresin contract olmadığını kontrol et (Web3 ile)."""
     try:
@@ -125,25 +81,27 @@ def find_early_buyers_5min(token_address: str, token_symbol: str, current_block:
     search_from = max(0, current_block - 18000)
     print(f"  📡 Transferler çekiliyor: blok {search_from:,} → {current_block:,}")
 
-    transfers = get_asset_transfers(token_address, search_from, current_block)
+    # Segment cache + adaptif aralık tarayıcı (log'lar blok sırasında döner)
+    try:
+        logs = get_transfer_logs(w3, token_address, search_from, current_block)
+    except LogRangeError as e:
+        print(f"  ❌ Transfer taraması eksik kaldı: {e}")
+        return []
+
+    # Sıfır değerli transferleri at (dust / spam)
+    transfers = [log for log in logs if log["value"] > 0]
 
     if not transfers:
         print(f"  ❌ Transfer bulunamadı")
         return []
 
-    # Blok numarasına göre sırala (eskiden yeniye)
-    transfers.sort(key=lambda x: int(x.get("blockNum", "0x0"), 16))
-
     # İlk transfer = token doğum bloğu
-    creation_block = int(transfers[0].get("blockNum", "0x0"), 16)
+    creation_block = transfers[0]["blockNumber"]
     cutoff_block = creation_block + FIRST_5MIN_BLOCKS
     print(f"  🎂 Doğum bloğu: {creation_block:,} | 5dk sınırı: {cutoff_block:,}")
 
     # 5 dakika içindeki transferleri filtrele
-    early_transfers = [
-        t for t in transfers
-        if int(t.get("blockNum", "0x0"), 16) <= cutoff_block
-    ]
+    early_transfers = [t for t in transfers if t["blockNumber"] <= cutoff_block]
     print(f"  ⏱️  5dk içindeki transfer: {len(early_transfers)}")
 
     # Alıcı adresleri çıkar
@@ -151,8 +109,8 @@ def find_early_buyers_5min(token_address: str, token_symbol: str, current_block:
     buyers = []
 
     for t in early_transfers:
-        from_addr = (t.get("from") or "").lower()
-        to_addr   = (t.get("to")   or "").lower()
+        from_addr = t["from"]
+        to_addr   = t["to"]
 
         if not to_addr or to_addr in seen:
             continue
@@ -164,7 +122,7 @@ def find_early_buyers_5min(token_address: str, token_symbol: str, current_block:
         seen.add(to_addr)
         buyers.append({
             "wallet": to_addr,
-            "block": int(t.get("blockNum", "0x0"), 16),
+            "block": t["blockNumber"],
             "creation_block": creation_block,
         })
 
@@ -18,9 +18,9 @@ from collections import defaultdict
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.database import (
-    get_all_alert_snapshots,
-    get_all_trade_signals_history,
-    get_wallet_alert_participation,
+    iter_alert_snapshots,
+    iter_trade_signals_history,
+    iter_wallet_alert_participation,
     save_token_evaluation,
     get_all_token_evaluations,
     is_db_available
@@ -52,10 +52,15 @@ def get_all_historical_alerts() -> list:
     Zamanlar UTC+3.
     """
     alerts = []
+    snapshot_count = 0
+    signal_count = 0
 
-    # 1. Alert snapshots
-    snapshots = get_all_alert_snapshots()
+    # 1. Alert snapshots (stream — sadece gereken kolonlar)
+    snapshots = iter_alert_snapshots(columns=[
+        "token_address", "token_symbol", "alert_mcap", "wallet_count", "alert_block", "created_at",
+    ])
     for s in snapshots:
+        snapshot_count += 1
         alerts.append({
             "source": "alert_snapshot",
             "token_address": s["token_address"],
@@ -68,10 +73,13 @@ def get_all_historical_alerts() -> list:
         })
 
     # 2. Trade signals (snapshot olmayan ek sinyaller)
-    signals = get_all_trade_signals_history()
+    signals = iter_trade_signals_history(columns=[
+        "token_address", "token_symbol", "entry_mcap", "wallet_count", "trigger_type", "created_at",
+    ])
     snapshot_tokens = {(a["token_address"], a["created_at"][:16]) for a in alerts if a["created_at"]}
 
     for sig in signals:
+        signal_count += 1
         # Zaten snapshot'ta varsa ekleme
         key = (sig["token_address"], sig["created_at"][:16] if sig["created_at"] else "")
         if key in snapshot_tokens:
@@ -90,7 +98,7 @@ def get_all_historical_alerts() -> list:
     # Zamana gore sirala
     alerts.sort(key=lambda x: x.get("created_at", ""))
 
-    print(f"📊 Toplam {len(alerts)} alert bulundu (snapshots: {len(snapshots)}, signals: {len(signals)})")
+    print(f"📊 Toplam {len(alerts)} alert bulundu (snapshots: {snapshot_count}, signals: {signal_count})")
     return alerts
 
 
@@ -290,13 +298,16 @@ def identify_trash_calls(all_alerts: list, short_list: list) -> list:
 
 
 def identify_trash_only_wallets(trash_calls: list, short_list: list,
-                                 wallet_participation: list = None) -> list:
+                                 wallet_participation=None) -> list:
     """
     SADECE trash_calls'ta gorunen cuzdanlar (short_list'te hic yok).
     Bu cuzdanlar smart_money_final.json'dan cikarilacak.
+    wallet_participation: liste veya stream (tek geçişte tüketilir).
     """
     if wallet_participation is None:
-        wallet_participation = get_wallet_alert_participation()
+        wallet_participation = iter_wallet_alert_participation(
+            columns=["wallet_address", "token_address"]
+        )
 
     # Token bazli cuzdan katilimi haritasi
     short_tokens = {a["token_address"] for a in short_list}
@@ -418,9 +429,8 @@ def run_full_alert_analysis() -> dict:
     # FAZ 4: Trash calls
     trash_calls = identify_trash_calls(alerts, short_list)
 
-    # Wallet participation analizi
-    wallet_participation = get_wallet_alert_participation()
-    trash_only_wallets = identify_trash_only_wallets(trash_calls, short_list, wallet_participation)
+    # Wallet participation analizi (stream)
+    trash_only_wallets = identify_trash_only_wallets(trash_calls, short_list)
 
     # Sonuclari kaydet
     results = {
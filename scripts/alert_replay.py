@@ -0,0 +1,376 @@
+"""
+Alert Replay - Alert kurallarını (eşik / pencere / blackout / likidite / hacim) geçmiş
+smart money alım akışı üzerinde yeniden oynatır.
+
+ALERT_THRESHOLD, TIME_WINDOW, BLACKOUT_HOURS veya filtre minimumlarını değiştirmek
+canlı deney demekti. Bu araç:
+- Arşivlenmiş alım akışını (transfer_archive; yoksa wallet_activity) zaman sırasıyla
+  SmartMoneyMonitor ile aynı karar mantığından (alert_rules.AlertWindow) geçirir
+- Saat takılabilir: pencere, cooldown, bullish ve blackout saati olay zamanından okunur
+- Zenginleştirme (DexScreener) mock'tur: alımın arşivlenmiş MCap / likidite / hacim / işlemi
+- Her alert'i token_evaluations'taki sonuçla eşleştirir (5 / 30dk değişim, zirve)
+- Parametre grid'ini ProcessPoolExecutor'da paralel değerlendirir
+
+Notlar:
+- wallet_activity kaynağında likidite / hacim / işlem yok (filtre sonrası kayıt);
+  o kaynakta sadece eşik / pencere / blackout / MCap anlamlıdır
+- Dust filtresi (MIN_BUY_VALUE_USD) ve swap / tx sınıflandırması arşivden önce uygulanır,
+  replay edilmez
+- Canlıda hiç atılmamış alertlerin sonucu yoktur ("eşleşmeyen" sayılır)
+
+Kullanım:
+    python scripts/alert_replay.py --days 14 --workers 4 --top 15 --sort win_rate_30m
+"""
+
+import bisect
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import BULLISH_WINDOW
+from scripts.alert_rules import DEFAULT_ALERT_RULES, AlertWindow, purchase_skip_reason
+from scripts.database import iter_wallet_alert_participation, iter_token_evaluations
+from scripts import transfer_archive
+from scripts.price_paths import alert_epoch
+
+# Replay alert'i ile canlı token_evaluations kaydı arasında izin verilen fark (sn)
+OUTCOME_MATCH_SEC = BULLISH_WINDOW
+SWEEP_CHUNK_SIZE = 16
+
+# Ön filtre anahtarları: aynı değerlerde olay listesi bir kez süzülür
+_FILTER_KEYS = ("min_liquidity", "max_mcap", "min_volume_24h", "min_txns_24h")
+
+DEFAULT_SWEEP = {
+    "alert_threshold": [2, 3, 4, 5],
+    "time_window": [10, 20, 30, 60, 120],
+    "blackout_hours": [DEFAULT_ALERT_RULES["blackout_hours"], ()],
+    "min_liquidity": [2500, 5000, 10000],
+    "min_volume_24h": [5000, 10000, 25000],
+}
+
+_UNKNOWN = float("inf")   # wallet_activity kaynağında bilinmeyen likidite / hacim / işlem
+
+
+class _ReplayClock:
+    """Olay zamanını döndüren saat (AlertWindow'a time.time yerine verilir)."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# =============================================================================
+# VERİ
+# =============================================================================
+
+def load_events(days: int = None, source: str = "auto") -> list:
+    """
+    Alım akışı: [(ts, token, wallet, token_info)] (zaman sıralı).
+    source: "archive" | "activity" | "auto" (arşiv varsa arşiv)
+    """
+    if source == "auto":
+        source = "archive" if transfer_archive.list_days() else "activity"
+
+    events = []
+    if source == "archive":
+        for ts, _, token, wallet, mcap, liq, vol, txns in transfer_archive.iter_transfers(days):
+            events.append((ts, token, wallet, {
+                "mcap": mcap, "liquidity": liq, "volume_24h": vol,
+                "txns_24h_buys": txns, "txns_24h_sells": 0,
+            }))
+    else:
+        columns = ["wallet_address", "token_address", "alert_mcap", "created_at"]
+        for row in iter_wallet_alert_participation(columns=columns, days=days):
+            if not row.get("created_at"):
+                continue
+            try:
+                # created_at = DB NOW() (tz'siz, UTC)
+                created = datetime.fromisoformat(str(row["created_at"]))
+            except ValueError:
+                continue
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)
+            events.append((created.timestamp(), row["token_address"].lower(), row["wallet_address"].lower(), {
+                "mcap": row.get("alert_mcap") or 0, "liquidity": _UNKNOWN, "volume_24h": _UNKNOWN,
+                "txns_24h_buys": _UNKNOWN, "txns_24h_sells": 0,
+            }))
+    events.sort(key=lambda e: e[0])
+    print(f"📼 Replay akışı: {len(events)} alım ({source})")
+    return events
+
+
+def load_outcomes(days: int = None) -> dict:
+    """Canlı alert sonuçları: {token: ([alert_ts...], [outcome...])} (ts sıralı)."""
+    columns = ["token_address", "alert_mcap", "alert_time", "change_5min_pct",
+               "change_30min_pct", "ath_mcap", "classification"]
+    outcomes = {}
+    for row in iter_token_evaluations(columns=columns, days=days):
+        if not row.get("alert_time"):
+            continue
+        try:
+            ts = alert_epoch(row["alert_time"])
+        except (TypeError, ValueError):
+            continue
+        alert_mcap = row.get("alert_mcap") or 0
+        times, items = outcomes.setdefault((row["token_address"] or "").lower(), ([], []))
+        times.append(ts)
+        items.append({
+            "change_5min_pct": row.get("change_5min_pct"),
+            "change_30min_pct": row.get("change_30min_pct"),
+            "ath_x": (row["ath_mcap"] / alert_mcap) if alert_mcap and row.get("ath_mcap") else None,
+            "classification": row.get("classification"),
+        })
+    return outcomes
+
+
+def _match_outcome(outcomes: dict, token: str, ts: float):
+    """Aynı token'ın OUTCOME_MATCH_SEC içindeki en yakın canlı alert sonucu."""
+    entry = outcomes.get(token)
+    if not entry:
+        return None
+    times, items = entry
+    i = bisect.bisect_left(times, ts)
+    best = None
+    for j in (i - 1, i):
+        if 0 <= j < len(times) and abs(times[j] - ts) <= OUTCOME_MATCH_SEC:
+            if best is None or abs(times[j] - ts) < abs(times[best] - ts):
+                best = j
+    return items[best] if best is not None else None
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+def _span_days(events: list) -> float:
+    """Olay akışının kapsadığı gün sayısı (alerts_per_day paydası, en az 1)."""
+    return max((events[-1][0] - events[0][0]) / 86400, 1.0) if events else 1.0
+
+
+def replay(events: list, rules: dict, outcomes: dict = None, prefiltered: bool = False,
+           span_days: float = None) -> dict:
+    """
+    Tek kural setini oynat.
+
+    Args:
+        prefiltered: events zaten purchase_skip_reason'dan geçmiş (sweep cache'i)
+        span_days: alerts_per_day paydası; events budanmış bir alt kümeyse tam akışın
+            süresi verilmeli (yoksa events'ten hesaplanır)
+    Returns:
+        dict: alerts, bullish, fake_blocked, cooldown_skips, matched, win_rate_30m,
+              avg_change_30m, avg_ath_x, alerts_per_day
+    """
+    clock = _ReplayClock()
+    window = AlertWindow(rules, clock=clock)
+    rules = window.rules
+    outcomes = outcomes or {}
+
+    alerts = bullish = fake = cooldown = matched = wins_30m = 0
+    change_30m_sum = ath_sum = 0.0
+    change_30m_n = ath_n = 0
+
+    for ts, token, wallet, info in events:
+        clock.now = ts
+        if window.has_purchase(token, wallet):
+            continue
+        if not prefiltered and purchase_skip_reason(info, rules):
+            continue
+        window.add_purchase(token, wallet, 0.0, info["mcap"])
+        window.clean()
+        # Eşiğin altında kalan token için karar hesaplamaya gerek yok (eşik >= alert_threshold)
+        if len(window.token_purchases.get(token, ())) < rules["alert_threshold"]:
+            continue
+
+        # Zenginleştirme mock'u: alımın arşivlenmiş bilgisi
+        decision = window.check(token, lambda _token: info)
+        action = decision["action"]
+        if action is None:
+            continue
+        if action == "cooldown":
+            cooldown += 1
+            continue
+        if action == "fake":
+            fake += 1
+            continue
+
+        window.record_alert(token, decision, info["mcap"])
+        alerts += 1
+        bullish += decision["is_bullish"]
+        outcome = _match_outcome(outcomes, token, ts)
+        if outcome is None:
+            continue
+        matched += 1
+        if outcome["change_30min_pct"] is not None:
+            change_30m_n += 1
+            change_30m_sum += outcome["change_30min_pct"]
+            wins_30m += outcome["change_30min_pct"] > 0
+        if outcome["ath_x"] is not None:
+            ath_n += 1
+            ath_sum += outcome["ath_x"]
+
+    span_days = span_days or _span_days(events)
+    return {
+        "alerts": alerts,
+        "bullish": bullish,
+        "fake_blocked": fake,
+        "cooldown_skips": cooldown,
+        "matched": matched,
+        "alerts_per_day": round(alerts / span_days, 1),
+        "win_rate_30m": round(wins_30m / change_30m_n * 100, 1) if change_30m_n else 0.0,
+        "avg_change_30m": round(change_30m_sum / change_30m_n, 1) if change_30m_n else 0.0,
+        "avg_ath_x": round(ath_sum / ath_n, 2) if ath_n else 0.0,
+    }
+
+
+def _filter_events(events: list, rules: dict) -> list:
+    return [e for e in events if not purchase_skip_reason(e[3], rules)]
+
+
+def _alertable_events(events: list, threshold: int, window: float) -> list:
+    """
+    Hiçbir time_window içinde threshold alıma ulaşamayan token'ları at.
+    Token'lar birbirinden bağımsız olduğu için sonuç değişmez; olay sayısı çok düşer.
+    """
+    times = {}
+    for e in events:
+        times.setdefault(e[1], []).append(e[0])
+    k = threshold - 1
+    alertable = set()
+    for token, ts in times.items():
+        if k <= 0:
+            alertable.add(token)
+            continue
+        for i in range(k, len(ts)):
+            if ts[i] - ts[i - k] < window:
+                alertable.add(token)
+                break
+    return [e for e in events if e[1] in alertable]
+
+
+def _cached(cache: dict, key, build, limit: int):
+    value = cache.get(key)
+    if value is None:
+        if len(cache) >= limit:
+            cache.clear()
+        value = cache[key] = build()
+    return value
+
+
+def evaluate(events: list, outcomes: dict, grid: list, cache: dict = None) -> list:
+    """
+    Kural setlerini oynat. Ön filtre (filtre anahtarları) ve alert alabilecek token
+    süzmesi (+ eşik, pencere) cache'lenir; replay sadece kalan olayları gezer.
+    """
+    cache = {"filtered": {}, "alertable": {}} if cache is None else cache
+    span_days = _span_days(events)  # Budanmış listeden değil tam akıştan (baseline ile aynı payda)
+    results = []
+    for overrides in grid:
+        rules = dict(DEFAULT_ALERT_RULES, **overrides)
+        filter_key = tuple(rules[k] for k in _FILTER_KEYS)
+        filtered = _cached(cache.setdefault("filtered", {}), filter_key,
+                           lambda: _filter_events(events, rules), 16)
+        alertable = _cached(cache.setdefault("alertable", {}),
+                            (filter_key, rules["alert_threshold"], rules["time_window"]),
+                            lambda: _alertable_events(filtered, rules["alert_threshold"], rules["time_window"]), 64)
+        stats = replay(alertable, rules, outcomes, prefiltered=True, span_days=span_days)
+        results.append({"params": overrides, **stats})
+    return results
+
+
+# =============================================================================
+# TARAMA (process pool)
+# =============================================================================
+
+_worker_events = None
+_worker_outcomes = None
+_worker_cache = {}
+
+
+def _init_worker(events: list, outcomes: dict):
+    global _worker_events, _worker_outcomes
+    _worker_events = events
+    _worker_outcomes = outcomes
+
+
+def _evaluate_chunk(grid: list) -> list:
+    return evaluate(_worker_events, _worker_outcomes, grid, _worker_cache)
+
+
+def build_grid(sweep: dict) -> list:
+    """sweep {kural: [değerler]} → override dict listesi (filtre anahtarları en yavaş değişir)."""
+    keys = sorted(sweep, key=lambda k: (k not in _FILTER_KEYS, k))
+    return [dict(zip(keys, values)) for values in itertools.product(*(sweep[k] for k in keys))]
+
+
+def run_sweep(events: list, outcomes: dict, grid: list, workers: int = None,
+              sort_by: str = "avg_change_30m", top: int = 10) -> list:
+    """Grid'i paralel oynat, sort_by'a göre sıralı döndür."""
+    workers = workers or os.cpu_count() or 1
+    chunks = [grid[i:i + SWEEP_CHUNK_SIZE] for i in range(0, len(grid), SWEEP_CHUNK_SIZE)]
+    started = time.time()
+    print(f"🧪 {len(grid)} kural seti, {len(chunks)} parça, {workers} process")
+
+    results = []
+    if workers <= 1:
+        cache = {}
+        for chunk in chunks:
+            results.extend(evaluate(events, outcomes, chunk, cache))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(events, outcomes)) as pool:
+            for chunk_results in pool.map(_evaluate_chunk, chunks):
+                results.extend(chunk_results)
+
+    results.sort(key=lambda r: r[sort_by], reverse=True)
+    print(f"✅ Replay bitti: {len(results)} sonuç, {time.time() - started:.1f}sn")
+    return results[:top] if top else results
+
+
+def _format_result(rank: int, r: dict) -> str:
+    p = r["params"]
+    params = ", ".join(
+        f"{k}={','.join(map(str, v)) or '-'}" if isinstance(v, (tuple, list)) else f"{k}={v}"
+        for k, v in p.items()
+    )
+    return (f"{rank:>2}. {r['alerts']} alert ({r['alerts_per_day']}/gün, {r['bullish']} bullish) | "
+            f"eşleşen {r['matched']} | 30dk %{r['win_rate_30m']} win, ort {r['avg_change_30m']:+.1f}% | "
+            f"zirve ort {r['avg_ath_x']}x | {params}")
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Alert kuralı replay (eşik / pencere / filtre taraması)")
+    parser.add_argument("--days", type=int, default=None, help="Son N gün (varsayılan: hepsi)")
+    parser.add_argument("--source", choices=["auto", "archive", "activity"], default="auto")
+    parser.add_argument("--workers", type=int, default=None, help="Process sayısı (varsayılan: CPU)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--sort", default="avg_change_30m",
+                        choices=["alerts", "matched", "win_rate_30m", "avg_change_30m", "avg_ath_x"])
+    args = parser.parse_args()
+
+    replay_events = load_events(args.days, args.source)
+    if not replay_events:
+        print("⚠️ Replay için alım verisi yok")
+        sys.exit(0)
+    replay_outcomes = load_outcomes(args.days)
+
+    current = replay(replay_events, DEFAULT_ALERT_RULES, replay_outcomes)
+    print("\n📌 Mevcut kurallar:")
+    print(_format_result(0, {"params": {}, **current}))
+
+    sweep_results = run_sweep(replay_events, replay_outcomes, build_grid(DEFAULT_SWEEP),
+                              args.workers, args.sort, args.top)
+    print(f"\n🏆 En iyi {len(sweep_results)} kural seti ({args.sort}):")
+    for rank, result in enumerate(sweep_results, 1):
+        print(_format_result(rank, result))
@@ -0,0 +1,185 @@
+"""
+Alert Rules - Smart money alert penceresi ve filtreleri (canlı monitor + replay ortak).
+
+SmartMoneyMonitor'ün karar mantığı buradadır; canlıda time.time saatiyle,
+alert_replay'de arşivlenmiş olay zamanını döndüren saatle çalışır:
+- Alım ön filtresi: likidite, MCap, 24s hacim, 24s işlem (purchase_skip_reason)
+- TIME_WINDOW içindeki tekil cüzdanlar, soft blackout eşiği, cooldown, bullish tekrar
+- Alert öncesi 2. katman çöp token kontrolü (fake_alert_reason)
+
+Kurallar dict'tir (DEFAULT_ALERT_RULES); replay grid'i sadece değişen anahtarları verir.
+"""
+
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone, timedelta
+
+from config.settings import (
+    ALERT_THRESHOLD, TIME_WINDOW, ALERT_COOLDOWN, BULLISH_WINDOW, MAX_MCAP,
+    MIN_VOLUME_24H, MIN_TXNS_24H, MIN_LIQUIDITY, BLACKOUT_HOURS, BLACKOUT_EXTRA_THRESHOLD,
+)
+
+DEFAULT_ALERT_RULES = {
+    "alert_threshold": ALERT_THRESHOLD,
+    "time_window": TIME_WINDOW,
+    "alert_cooldown": ALERT_COOLDOWN,
+    "bullish_window": BULLISH_WINDOW,
+    "blackout_hours": tuple(BLACKOUT_HOURS),
+    "blackout_extra_threshold": BLACKOUT_EXTRA_THRESHOLD,
+    "max_mcap": MAX_MCAP,
+    "min_liquidity": MIN_LIQUIDITY,
+    "min_volume_24h": MIN_VOLUME_24H,
+    "min_txns_24h": MIN_TXNS_24H,
+}
+
+
+def purchase_skip_reason(token_info: dict, rules: dict = DEFAULT_ALERT_RULES) -> str:
+    """Alım ön filtresi. Geçerse "" döner, yoksa skip nedeni."""
+    liquidity = token_info.get('liquidity', 0)
+    if liquidity < rules["min_liquidity"]:
+        return f"Likidite: ${liquidity:.0f} < ${rules['min_liquidity']:,} minimum"
+
+    current_mcap = token_info.get('mcap', 0)
+    if current_mcap > rules["max_mcap"]:
+        return f"MCap: ${current_mcap/1e3:.0f}K > ${rules['max_mcap']/1e3:.0f}K limit"
+
+    volume_24h = token_info.get('volume_24h', 0)
+    if volume_24h < rules["min_volume_24h"]:
+        return f"24s Hacim: ${volume_24h:.0f} < ${rules['min_volume_24h']:,} minimum"
+
+    total_txns = token_info.get('txns_24h_buys', 0) + token_info.get('txns_24h_sells', 0)
+    if total_txns < rules["min_txns_24h"]:
+        return f"24s Islem: {total_txns} < {rules['min_txns_24h']} minimum"
+    return ""
+
+
+def fake_alert_reason(token_info: dict, rules: dict = DEFAULT_ALERT_RULES) -> str:
+    """Alert öncesi çöp token kontrolü (2. katman). Geçerse "" döner."""
+    volume_24h = token_info.get('volume_24h', 0)
+    total_txns = token_info.get('txns_24h_buys', 0) + token_info.get('txns_24h_sells', 0)
+
+    reasons = []
+    if volume_24h < rules["min_volume_24h"]:
+        reasons.append(f"24s Hacim: ${volume_24h:.0f} < ${rules['min_volume_24h']:,}")
+    if total_txns < rules["min_txns_24h"]:
+        reasons.append(f"24s Islem: {total_txns} < {rules['min_txns_24h']}")
+    return " | ".join(reasons)
+
+
+class AlertWindow:
+    """Token başına alım penceresi + son alert durumu (saat dışarıdan verilir)."""
+
+    def __init__(self, rules: dict = None, clock=time.time):
+        self.rules = dict(DEFAULT_ALERT_RULES, **(rules or {}))
+        self.clock = clock
+        # {token_address: [(wallet, eth_amount, mcap, timestamp), ...]}
+        self.token_purchases = defaultdict(list)
+        # {token_address: {"time", "mcap", "count", "wallet_count"}}
+        self.last_alerts = {}
+        # Eklenme sırası (ts, token): clean() sadece süresi dolan başları gezer
+        self._order = deque()
+
+    def has_purchase(self, token_address: str, wallet: str) -> bool:
+        """Bu cüzdan bu tokeni pencere içinde zaten aldı mı?"""
+        wallet = wallet.lower()
+        return any(p[0].lower() == wallet for p in self.token_purchases.get(token_address, ()))
+
+    def add_purchase(self, token_address: str, wallet: str, eth_amount: float, mcap: float):
+        now = self.clock()
+        self.token_purchases[token_address].append((wallet, eth_amount, mcap, now))
+        self._order.append((now, token_address))
+
+    def clean(self):
+        """time_window'dan eski alımları temizle (alımlar zaman sırasıyla eklenir)."""
+        current_time = self.clock()
+        window = self.rules["time_window"]
+        while self._order and current_time - self._order[0][0] >= window:
+            _, token = self._order.popleft()
+            purchases = self.token_purchases.get(token)
+            if not purchases:
+                continue  # Fake alert ile zaten temizlendi
+            kept = [p for p in purchases if current_time - p[3] < window]  # p[3] = timestamp
+            if kept:
+                self.token_purchases[token] = kept
+            else:
+                del self.token_purchases[token]
+
+    def unique_wallets(self, token_address: str) -> dict:
+        unique_wallets = {}
+        for p in self.token_purchases.get(token_address, []):
+            wallet = p[0].lower()
+            if wallet not in unique_wallets:
+                unique_wallets[wallet] = p  # (wallet, eth, mcap, ts)
+        return unique_wallets
+
+    def effective_threshold(self) -> tuple:
+        """Soft blackout: düşük başarılı saatlerde (UTC+3) eşik yükselir. Returns: (eşik, saat)."""
+        current_hour = (datetime.fromtimestamp(self.clock(), timezone.utc) + timedelta(hours=3)).hour
+        threshold = self.rules["alert_threshold"]
+        if current_hour in self.rules["blackout_hours"]:
+            threshold += self.rules["blackout_extra_threshold"]
+        return threshold, current_hour
+
+    def can_send(self, token_address: str, unique_wallet_count: int = 0) -> bool:
+        """
+        Alert cooldown kontrolü.
+        - Normal: alert_cooldown
+        - Bullish: Cooldown içinde bile, daha fazla cüzdan aldıysa geçir
+        """
+        if token_address not in self.last_alerts:
+            return True
+        last_info = self.last_alerts[token_address]
+        if self.clock() - last_info["time"] > self.rules["alert_cooldown"]:
+            return True
+        return unique_wallet_count > last_info.get("wallet_count", 0)
+
+    def bullish(self, token_address: str) -> tuple:
+        """Returns: (is_bullish, alert_count, first_alert_mcap)"""
+        if token_address not in self.last_alerts:
+            return False, 1, 0
+        last_info = self.last_alerts[token_address]
+        if self.clock() - last_info["time"] <= self.rules["bullish_window"]:
+            return True, last_info["count"] + 1, last_info["mcap"]
+        return False, 1, 0
+
+    def check(self, token_address: str, enrich) -> dict:
+        """
+        Token için alert kararı (gönderim çağıranda; fake alert token takibini temizler).
+
+        Args:
+            enrich: token_address → token_info (canlıda DexScreener)
+        Returns:
+            {"action": None | "cooldown" | "fake" | "alert", "wallets", "threshold", "hour",
+             "token_info", "fake_reason", "is_bullish", "alert_count", "first_alert_mcap"}
+        """
+        unique_wallets = self.unique_wallets(token_address)
+        threshold, hour = self.effective_threshold()
+        decision = {"action": None, "wallets": unique_wallets, "threshold": threshold, "hour": hour}
+        if len(unique_wallets) < threshold:
+            return decision
+        if not self.can_send(token_address, len(unique_wallets)):
+            decision["action"] = "cooldown"
+            return decision
+
+        token_info = enrich(token_address)
+        decision["token_info"] = token_info
+        fake_reason = fake_alert_reason(token_info, self.rules)
+        if fake_reason:
+            # Bu token icin tracking'i temizle (tekrar alert gondermesin)
+            self.token_purchases.pop(token_address, None)
+            decision.update(action="fake", fake_reason=fake_reason)
+            return decision
+
+        is_bullish, alert_count, first_alert_mcap = self.bullish(token_address)
+        decision.update(action="alert", is_bullish=is_bullish, alert_count=alert_count,
+                        first_alert_mcap=first_alert_mcap)
+        return decision
+
+    def record_alert(self, token_address: str, decision: dict, current_mcap: float):
+        """Gönderilen alert'i cooldown / bullish takibi için kaydet."""
+        self.last_alerts[token_address] = {
+            "time": self.clock(),
+            "mcap": decision["first_alert_mcap"] if decision["is_bullish"] else current_mcap,
+            "count": decision["alert_count"],
+            "wallet_count": len(decision["wallets"]),
+        }
@@ -0,0 +1,480 @@
+"""
+Backtester - Tarihsel alertler üzerinde vektörize strateji simülasyonu.
+
+SNIPER_CONFIG / DEMON_CONFIG / DEFAULT_TP_LEVELS canlı virtual trading'e bakılarak
+elle ayarlanıyordu (değişiklik başına haftalar). Bu modül:
+- token_evaluations'ı (alert / 5dk / 30dk MCap, zirve + zirveye süre, dip) NumPy
+  dizilerine yükler, her alert için dakikalık MCap yolu kurar (PRICE_TRACK_WINDOW boyu)
+- TP merdiveni, SL ve zaman-SL sonuçlarını alert ekseninde vektörize hesaplar
+  (aynı çıkış parametreleri farklı giriş filtreleriyle tekrar hesaplanmaz)
+- Giriş filtreleri maske; pozisyon limiti / exposure / bakiye / ardışık-SL soğukluğu
+  alert sırasıyla tek ucuz geçişte uygulanır
+- Parametre taramasını ProcessPoolExecutor'a parçalar halinde dağıtır
+
+Yol kaynağı: price_paths'te kaydı olan alertler için gerçek örnekler (dakikalık grid'e
+interpolasyon). Kaydı olmayan (eski) alertlerde yol 0 / 5 / 30dk noktaları + zirve
+(zamanıyla) + dip arasında doğrusal interpolasyondur; dipin zamanı bilinmediği için
+varsayılan olarak zirveden önceye konur (kötümser: SL, TP'den önce tetiklenir).
+Smartest wallet filtresi bugünkü smartest listesiyle uygulanır (geçmiş liste saklanmıyor).
+
+NumPy opsiyonel bağımlılıktır (sadece bu araç kullanır): pip install numpy
+
+Kullanım:
+    python scripts/backtester.py --strategy demon --days 30 --workers 4 --top 10
+"""
+
+import heapq
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import SNIPER_CONFIG, DEMON_CONFIG, BULLISH_WINDOW, PRICE_TRACK_WINDOW
+from scripts.real_trade_config import (
+    REAL_TRADE_SIZE_ETH, MAX_OPEN_POSITIONS, MAX_TOTAL_EXPOSURE_ETH,
+    DEFAULT_TP_LEVELS, DEFAULT_SL_MULTIPLIER,
+)
+from scripts.database import iter_token_evaluations, get_smartest_wallet_addresses_db
+from scripts import price_paths
+
+UTC_PLUS_3 = timezone(timedelta(hours=3))
+
+PATH_MINUTES = max(30, PRICE_TRACK_WINDOW // 60)
+INITIAL_BALANCE_ETH = 0.025        # virtual_trader: senaryo başına INITIAL_BALANCE / 2
+SL_COOLDOWN_SEC = 3600             # virtual_trader: ardışık SL → 1 saat soğukluk
+SWEEP_CHUNK_SIZE = 256
+
+# Çıkış türleri
+EXIT_END, EXIT_SL, EXIT_TIME_SL = 0, 1, 2
+
+# Trade sonucunu belirleyen parametreler (aynı değerler → aynı sonuç dizileri, cache'lenir)
+_OUTCOME_KEYS = ("entry_delay_min", "tp_levels", "sl_multiplier", "time_sl_minutes")
+
+# Varsayılan tarama: önce çıkış parametreleri, sonra giriş filtreleri (product'ta en hızlı
+# değişen filtreler → parçalar aynı trade sonuçlarını paylaşır)
+DEFAULT_SWEEP = {
+    "sl_multiplier": [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8],
+    "time_sl_minutes": [15, 30, 45, 60],
+    "tp_levels": [
+        [{"multiplier": tp1, "sell_pct": p1}, {"multiplier": tp2, "sell_pct": p2},
+         {"multiplier": tp3, "sell_pct": p3}]
+        for tp1, tp2, tp3 in itertools.product([1.5, 1.8, 2.0, 2.5], [2.5, 3.5], [4.0, 6.0])
+        if tp1 < tp2 < tp3
+        for p1, p2, p3 in [(40, 30, 30), (30, 30, 40)]
+    ],
+    "min_mcap": [20000, 30000, 50000],
+    "max_mcap": [200000, 300000, 500000],
+    "min_wallet_count": [3, 4, 5],
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("❌ Backtester için numpy gerekli (pip install numpy)")
+
+
+def _base_config(strategy: str) -> dict:
+    """Strateji adı → backtest parametreleri (canlı config'in kopyası)."""
+    if strategy == "sniper":
+        config = dict(SNIPER_CONFIG)
+    elif strategy == "demon":
+        config = dict(DEMON_CONFIG)
+    elif strategy == "real":
+        config = dict(SNIPER_CONFIG)
+        config.update({
+            "name": "Real",
+            "trade_size_eth": REAL_TRADE_SIZE_ETH,
+            "max_positions": MAX_OPEN_POSITIONS,
+            "max_exposure_eth": MAX_TOTAL_EXPOSURE_ETH,
+            "tp_levels": DEFAULT_TP_LEVELS,
+            "sl_multiplier": DEFAULT_SL_MULTIPLIER,
+            "time_sl_minutes": None,
+        })
+    else:
+        raise ValueError(f"Bilinmeyen strateji: {strategy}")
+    # Sniper 5dk MCap check'inden sonra girer
+    config.setdefault("entry_delay_min", 5 if config.get("min_5min_change_pct") is not None else 0)
+    return config
+
+
+# =============================================================================
+# VERİ YÜKLEME
+# =============================================================================
+
+def _recorded_path(samples, alert_ts: int, alert_mcap: float, grid):
+    """Kayıtlı örneklerden dakikalık yol (alert MCap'e oran). Yetersiz kayıtta None."""
+    samples = samples[(samples["mcap"] > 0) & (samples["ts"] > alert_ts)]
+    if len(samples) < 2:
+        return None
+    xs = np.concatenate(([0.0], (samples["ts"].astype(np.float64) - alert_ts) / 60.0))
+    ys = np.concatenate(([1.0], samples["mcap"].astype(np.float64) / alert_mcap))
+    return np.interp(grid, xs, ys)
+
+
+def _build_path(alert_mcap: float, row: dict, grid, min_first: bool):
+    """Bilinen MCap noktalarından dakikalık yol (alert MCap'e oranla)."""
+    knots = {0.0: 1.0}
+    if row.get("mcap_5min"):
+        knots[5.0] = row["mcap_5min"] / alert_mcap
+    if row.get("mcap_30min"):
+        knots[30.0] = row["mcap_30min"] / alert_mcap
+
+    peak_min = None
+    if row.get("ath_mcap") and row.get("time_to_peak_sec") is not None:
+        peak_min = min(row["time_to_peak_sec"] / 60.0, float(PATH_MINUTES))
+        knots[peak_min] = max(knots.get(peak_min, 0.0), row["ath_mcap"] / alert_mcap)
+    if row.get("min_mcap"):
+        if peak_min is None:
+            dip_min = PATH_MINUTES / 2.0
+        else:
+            dip_min = peak_min / 2.0 if min_first else (peak_min + PATH_MINUTES) / 2.0
+        knots[dip_min] = min(knots.get(dip_min, float("inf")), row["min_mcap"] / alert_mcap)
+
+    xs = sorted(knots)
+    return np.interp(grid, xs, [knots[x] for x in xs])
+
+
+def load_dataset(days: int = None, min_first: bool = True) -> dict:
+    """
+    token_evaluations → NumPy dizileri.
+
+    Returns:
+        dict: paths [N, PATH_MINUTES+1] (alert MCap'e oran), alert_ts, hour, alert_mcap,
+              wallet_count, change_5min (yoksa nan), bullish, smartest
+    """
+    _require_numpy()
+    smartest = get_smartest_wallet_addresses_db()
+    grid = np.arange(PATH_MINUTES + 1, dtype=np.float64)
+    last_alert = {}
+
+    columns = ["token_address", "alert_mcap", "mcap_5min", "mcap_30min", "change_5min_pct",
+               "wallets_involved", "alert_time", "ath_mcap", "min_mcap", "time_to_peak_sec"]
+    rows = []
+    for row in iter_token_evaluations(columns=columns, days=days):
+        if (row.get("alert_mcap") or 0) <= 0 or not row.get("alert_time"):
+            continue
+        try:
+            row["alert_ts"] = price_paths.alert_epoch(row["alert_time"])
+        except (TypeError, ValueError):
+            continue
+        row["token_address"] = (row["token_address"] or "").lower()
+        rows.append(row)
+
+    recorded = {}
+    if rows and price_paths.list_days():
+        recorded = price_paths.load_paths([(r["token_address"], r["alert_ts"]) for r in rows],
+                                          hours=PATH_MINUTES / 60.0)
+
+    paths, ts, hours, mcaps, wallets, change5, bullish, has_smartest = [], [], [], [], [], [], [], []
+    from_recording = 0
+    for row in rows:
+        alert_mcap = row["alert_mcap"]
+        alert_ts = row["alert_ts"]
+        token = row["token_address"]
+        involved = [w.lower() for w in (row.get("wallets_involved") or []) if isinstance(w, str)]
+
+        path = None
+        samples = recorded.get((token, alert_ts))
+        if samples is not None:
+            path = _recorded_path(samples, alert_ts, alert_mcap, grid)
+        if path is None:
+            path = _build_path(alert_mcap, row, grid, min_first)
+        else:
+            from_recording += 1
+        paths.append(path)
+        ts.append(alert_ts)
+        hours.append(datetime.fromtimestamp(alert_ts, UTC_PLUS_3).hour)
+        mcaps.append(alert_mcap)
+        wallets.append(len(involved))
+        change5.append(row["change_5min_pct"] if row.get("change_5min_pct") is not None else np.nan)
+        # Bullish: aynı token için BULLISH_WINDOW içinde önceki bir alert
+        prev = last_alert.get(token)
+        bullish.append(prev is not None and alert_ts - prev <= BULLISH_WINDOW)
+        last_alert[token] = alert_ts
+        has_smartest.append(any(w in smartest for w in involved))
+
+    n = len(ts)
+    print(f"📚 Backtest verisi: {n} alert, {PATH_MINUTES}dk yol ({from_recording} kayıtlı, {n - from_recording} sentetik)")
+    if not n:
+        return None
+    return {
+        "paths": np.vstack(paths),
+        "alert_ts": np.asarray(ts, dtype=np.float64),
+        "hour": np.asarray(hours, dtype=np.int16),
+        "alert_mcap": np.asarray(mcaps, dtype=np.float64),
+        "wallet_count": np.asarray(wallets, dtype=np.int32),
+        "change_5min": np.asarray(change5, dtype=np.float64),
+        "bullish": np.asarray(bullish, dtype=bool),
+        "smartest": np.asarray(has_smartest, dtype=bool),
+    }
+
+
+# =============================================================================
+# SİMÜLASYON
+# =============================================================================
+
+def _first_index(mask, never: int):
+    """Her satırda ilk True indeksi (yoksa never)."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), never)
+
+
+def simulate_trades(paths, entry_delay_min: int, tp_levels: list, sl_multiplier: float,
+                    time_sl_minutes) -> dict:
+    """
+    Tüm alertler için tek pozisyonun sonucu (vektörize).
+
+    Returns:
+        dict: ret (çıkış / giriş değeri), exit_min (girişten dakika), exit_kind, hit_tp
+    """
+    entry = min(int(entry_delay_min or 0), paths.shape[1] - 1)
+    m = paths[:, entry:] / paths[:, entry:entry + 1]
+    n, length = m.shape
+    rows = np.arange(n)
+    never = length
+
+    sl_t = _first_index(m <= sl_multiplier, never) if sl_multiplier else np.full(n, never)
+    tp_t = [_first_index(m >= tp["multiplier"], never) for tp in tp_levels]
+    first_tp = np.minimum.reduce(tp_t) if tp_t else np.full(n, never)
+
+    # Zaman SL: süre dolduğunda henüz TP tutmamışsa
+    if time_sl_minutes and time_sl_minutes < length:
+        time_t = np.where(first_tp >= time_sl_minutes, int(time_sl_minutes), never)
+    else:
+        time_t = np.full(n, never)
+
+    exit_t = np.minimum(np.minimum(sl_t, time_t), length - 1)
+    exit_kind = np.where(exit_t == sl_t, EXIT_SL, np.where(exit_t == time_t, EXIT_TIME_SL, EXIT_END))
+
+    remaining = np.ones(n)
+    proceeds = np.zeros(n)
+    for tp, t in zip(tp_levels, tp_t):
+        fired = t <= exit_t
+        sold = remaining * (tp["sell_pct"] / 100.0) * fired
+        proceeds += sold * m[rows, np.minimum(t, length - 1)]
+        remaining -= sold
+    proceeds += remaining * m[rows, exit_t]
+
+    return {
+        "ret": proceeds,
+        "exit_min": exit_t + entry,
+        "exit_kind": exit_kind,
+        "hit_tp": first_tp <= exit_t,
+    }
+
+
+def _entry_mask(data: dict, config: dict):
+    """Giriş filtreleri (virtual_trader._check_entry_conditions'ın portföyden bağımsız kısmı)."""
+    mask = (data["alert_mcap"] >= config["min_mcap"]) & (data["alert_mcap"] <= config["max_mcap"])
+    mask &= data["wallet_count"] >= config["min_wallet_count"]
+    if config.get("only_bullish_alerts"):
+        mask &= data["bullish"]
+    if config.get("only_smartest_wallets"):
+        mask &= data["smartest"]
+    if config.get("active_hours"):
+        start_h, end_h = config["active_hours"]
+        mask &= (data["hour"] >= start_h) & (data["hour"] < end_h)
+    min_change = config.get("min_5min_change_pct")
+    if min_change is not None:
+        # 5dk verisi olmayan alert canlıda da reddedilir (nan karşılaştırması False)
+        mask &= data["change_5min"] >= min_change
+    return mask
+
+
+def run_portfolio(data: dict, outcome: dict, mask, config: dict) -> dict:
+    """
+    Filtreden geçen alertleri zaman sırasıyla portföye uygula:
+    bakiye, max pozisyon, max exposure, ardışık SL soğukluğu.
+    """
+    size = config["trade_size_eth"]
+    max_positions = config["max_positions"]
+    max_exposure = config["max_exposure_eth"]
+    cooldown_after = config.get("consecutive_sl_cooldown", 999)
+    entry_delay = int(config.get("entry_delay_min") or 0) * 60
+
+    alert_ts = data["alert_ts"]
+    ret, exit_min = outcome["ret"], outcome["exit_min"]
+    exit_kind, hit_tp = outcome["exit_kind"], outcome["hit_tp"]
+
+    balance = INITIAL_BALANCE_ETH
+    open_heap = []   # (kapanış ts, alert index)
+    consecutive_sl = 0
+    cooldown_until = 0.0
+    trades = wins = sl_count = 0
+    pnl = peak = max_dd = 0.0
+
+    def close_until(now):
+        nonlocal balance, consecutive_sl, cooldown_until, wins, sl_count, pnl, peak, max_dd
+        while open_heap and open_heap[0][0] <= now:
+            close_ts, i = heapq.heappop(open_heap)
+            trade_pnl = size * (ret[i] - 1.0)
+            balance += size * ret[i]
+            pnl += trade_pnl
+            peak = max(peak, pnl)
+            max_dd = max(max_dd, peak - pnl)
+            if hit_tp[i]:
+                consecutive_sl = 0  # TP partial satışı kâr → sayaç sıfırlanır
+            if exit_kind[i] == EXIT_SL:
+                sl_count += 1
+                consecutive_sl += 1
+                if consecutive_sl >= cooldown_after:
+                    cooldown_until = close_ts + SL_COOLDOWN_SEC
+            elif trade_pnl >= 0:
+                consecutive_sl = 0
+            if trade_pnl >= 0:
+                wins += 1
+
+    for i in np.flatnonzero(mask):
+        now = alert_ts[i] + entry_delay
+        close_until(now)
+        if cooldown_until:
+            if now < cooldown_until:
+                continue
+            cooldown_until = 0.0
+            consecutive_sl = 0
+        if balance < size or len(open_heap) >= max_positions or (len(open_heap) + 1) * size > max_exposure:
+            continue
+        balance -= size
+        trades += 1
+        heapq.heappush(open_heap, (now + (exit_min[i] * 60 - entry_delay), i))
+    close_until(float("inf"))
+
+    return {
+        "trades": trades,
+        "wins": wins,
+        "win_rate": round(wins / trades * 100, 1) if trades else 0.0,
+        "sl_count": sl_count,
+        "total_pnl_eth": float(pnl),
+        "max_drawdown_eth": float(max_dd),
+        "final_balance_eth": float(balance),
+    }
+
+
+def _outcome_key(config: dict) -> tuple:
+    return tuple(
+        tuple((tp["multiplier"], tp["sell_pct"]) for tp in config[k]) if k == "tp_levels" else config.get(k)
+        for k in _OUTCOME_KEYS
+    )
+
+
+def evaluate(data: dict, configs: list, cache: dict = None) -> list:
+    """Parametre setlerini değerlendir (trade sonuçları çıkış parametrelerine göre cache'lenir)."""
+    cache = {} if cache is None else cache
+    results = []
+    for config in configs:
+        key = _outcome_key(config)
+        outcome = cache.get(key)
+        if outcome is None:
+            if len(cache) >= 64:
+                cache.clear()
+            outcome = cache[key] = simulate_trades(
+                data["paths"], config["entry_delay_min"], config["tp_levels"],
+                config["sl_multiplier"], config.get("time_sl_minutes"),
+            )
+        stats = run_portfolio(data, outcome, _entry_mask(data, config), config)
+        results.append({"params": config, **stats})
+    return results
+
+
+# =============================================================================
+# TARAMA (process pool)
+# =============================================================================
+
+_worker_data = None
+_worker_cache = {}
+
+
+def _init_worker(data: dict):
+    global _worker_data
+    _worker_data = data
+
+
+def _evaluate_chunk(configs: list) -> list:
+    return evaluate(_worker_data, configs, _worker_cache)
+
+
+def build_param_grid(base: dict, sweep: dict) -> list:
+    """base config + sweep {anahtar: [değerler]} → tüm kombinasyonlar (son anahtar en hızlı değişir)."""
+    keys = list(sweep)
+    grid = []
+    for values in itertools.product(*(sweep[k] for k in keys)):
+        config = dict(base)
+        config.update(zip(keys, values))
+        if config["min_mcap"] >= config["max_mcap"]:
+            continue
+        grid.append(config)
+    return grid
+
+
+def run_sweep(data: dict, configs: list, workers: int = None, top: int = 10) -> list:
+    """Parametre setlerini process pool'da değerlendir, toplam PnL'e göre sıralı döndür."""
+    _require_numpy()
+    workers = workers or os.cpu_count() or 1
+    chunks = [configs[i:i + SWEEP_CHUNK_SIZE] for i in range(0, len(configs), SWEEP_CHUNK_SIZE)]
+    started = time.time()
+    print(f"🧪 {len(configs)} parametre seti, {len(chunks)} parça, {workers} process")
+
+    results = []
+    if workers <= 1:
+        cache = {}
+        for chunk in chunks:
+            results.extend(evaluate(data, chunk, cache))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+            for done, chunk_results in enumerate(pool.map(_evaluate_chunk, chunks), 1):
+                results.extend(chunk_results)
+                if done % 10 == 0 or done == len(chunks):
+                    print(f"  ⏳ {done}/{len(chunks)} parça ({time.time() - started:.0f}sn)")
+
+    results.sort(key=lambda r: r["total_pnl_eth"], reverse=True)
+    print(f"✅ Tarama bitti: {len(results)} sonuç, {time.time() - started:.1f}sn")
+    return results[:top] if top else results
+
+
+def _format_result(rank: int, r: dict) -> str:
+    p = r["params"]
+    tp_str = "/".join(f"{tp['multiplier']}x:{tp['sell_pct']}%" for tp in p["tp_levels"])
+    return (f"{rank:>2}. PnL {r['total_pnl_eth']:+.4f} ETH | DD {r['max_drawdown_eth']:.4f} | "
+            f"{r['trades']} trade, %{r['win_rate']} win, {r['sl_count']} SL | "
+            f"SL {p['sl_multiplier']}x, zaman-SL {p.get('time_sl_minutes')}dk, TP {tp_str} | "
+            f"MCap ${p['min_mcap'] / 1e3:.0f}K-${p['max_mcap'] / 1e3:.0f}K, cüzdan ≥{p['min_wallet_count']}")
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Strateji backtester (vektörize + process pool)")
+    parser.add_argument("--strategy", choices=["sniper", "demon", "real"], default="demon")
+    parser.add_argument("--days", type=int, default=None, help="Son N günün alertleri (varsayılan: hepsi)")
+    parser.add_argument("--workers", type=int, default=None, help="Process sayısı (varsayılan: CPU)")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--dip-after-peak", action="store_true",
+                        help="Dipi zirveden sonraya yerleştir (iyimser yol)")
+    args = parser.parse_args()
+
+    _require_numpy()
+    dataset = load_dataset(days=args.days, min_first=not args.dip_after_peak)
+    if dataset is None:
+        print("⚠️ Backtest için token_evaluations verisi yok")
+        sys.exit(0)
+
+    base = _base_config(args.strategy)
+    current = evaluate(dataset, [base])[0]
+    print("\n📌 Mevcut config:")
+    print(_format_result(0, current))
+
+    sweep_results = run_sweep(dataset, build_param_grid(base, DEFAULT_SWEEP), args.workers, args.top)
+    print(f"\n🏆 En iyi {len(sweep_results)} parametre seti ({base['name']}):")
+    for rank, result in enumerate(sweep_results, 1):
+        print(_format_result(rank, result))
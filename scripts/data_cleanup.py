@@ -11,7 +11,7 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.settings import DATA_RETENTION_DAYS
-from scripts.database import is_db_available
+from scripts.database import is_db_available, cleanup_fake_alert_events_db
 
 # Data dosya yollari
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -141,6 +141,12 @@ def cleanup_early_smart_money():
 
 def cleanup_fake_alerts():
     """Eski fake alert loglarini temizle."""
+    if is_db_available():
+        removed = cleanup_fake_alert_events_db(DATA_RETENTION_DAYS)
+        if removed > 0:
+            print(f"  🧹 Fake alerts log: {removed} eski kayit silindi (DB)")
+        return removed
+
     if not os.path.exists(FAKE_ALERTS_FILE):
         return 0
 
@@ -1,19 +1,31 @@
 """
 Database Module - PostgreSQL (Neon) ile kalıcı veri depolama.
-JSON dosyaları yerine DB kullanır. DATABASE_URL yoksa JSON fallback çalışır.
+JSON dosyaları yerine DB kullanır. DATABASE_URL yoksa aynı şema ve fonksiyonlarla
+yerel SQLite (WAL) kullanılır (scripts/sqlite_backend.py); SQLITE_PATH boşsa JSON fallback.
 """
 
+import functools
+import inspect
+import itertools
 import json
 import os
 import sys
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.settings import DATABASE_URL
+from config.settings import (
+    DATABASE_URL, SMARTEST_WALLET_TARGET, DB_STREAM_FETCH_SIZE, SQLITE_PATH, DB_SLOW_QUERY_MS,
+    MCAP_CHECK_CLAIM_TIMEOUT,
+)
 
-# PostgreSQL bağlantısı (opsiyonel)
+# Bağlantı (PostgreSQL veya yerel SQLite — import anında seçilir)
 _connection = None
+_thread_conn = threading.local()  # Ana thread dışındaki thread'lerin bağlantıları
 _db_available = False
+_IS_SQLITE = False
 
 if DATABASE_URL:
     try:
@@ -23,25 +35,295 @@ if DATABASE_URL:
     except ImportError:
         print("⚠️ psycopg2 yüklü değil, JSON fallback kullanılacak")
         _db_available = False
+elif SQLITE_PATH:
+    from scripts import sqlite_backend
+    from scripts.sqlite_backend import Json
+    _IS_SQLITE = True
+    _db_available = True
+
+
+# =============================================================================
+# INSTRUMENTATION (çağrı sayısı, gecikme histogramı, satır, hata, yavaş sorgu)
+# =============================================================================
+
+# Gecikme histogram sınırları (ms); son kova bu sınırların üstü
+_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+_SLOW_LOG_SIZE = 50
+
+_stats_lock = threading.Lock()
+_func_stats = {}
+_slow_queries = []
+_call_context = threading.local()
+
+
+def _new_stat() -> dict:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "rows": 0,
+        "statements": 0,
+        "total_ms": 0.0,
+        "max_ms": 0.0,
+        "buckets": [0] * (len(_LATENCY_BUCKETS_MS) + 1),
+    }
+
+
+def _bucket_index(elapsed_ms: float) -> int:
+    for i, limit in enumerate(_LATENCY_BUCKETS_MS):
+        if elapsed_ms <= limit:
+            return i
+    return len(_LATENCY_BUCKETS_MS)
+
+
+def _current_function() -> str:
+    stack = getattr(_call_context, "stack", None)
+    return stack[-1] if stack else "<direct>"
+
+
+def _record_call(name: str, elapsed_ms: float, rows: int):
+    with _stats_lock:
+        stat = _func_stats.setdefault(name, _new_stat())
+        stat["calls"] += 1
+        stat["rows"] += rows
+        stat["total_ms"] += elapsed_ms
+        stat["max_ms"] = max(stat["max_ms"], elapsed_ms)
+        stat["buckets"][_bucket_index(elapsed_ms)] += 1
+
+
+def _record_statement(name: str, sql: str, params, elapsed_ms: float, error: Exception = None):
+    with _stats_lock:
+        stat = _func_stats.setdefault(name, _new_stat())
+        stat["statements"] += 1
+        if error is not None:
+            stat["errors"] += 1
+    if DB_SLOW_QUERY_MS and elapsed_ms >= DB_SLOW_QUERY_MS:
+        entry = {
+            "function": name,
+            "ms": round(elapsed_ms, 1),
+            "sql": _sql_summary(sql),
+            "params": _param_shapes(params),
+            "at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with _stats_lock:
+            _slow_queries.append(entry)
+            del _slow_queries[:-_SLOW_LOG_SIZE]
+        print(f"🐢 Yavaş sorgu ({name}) {entry['ms']}ms: {entry['sql']} | params={entry['params']}")
+
+
+def _sql_summary(sql: str, limit: int = 120) -> str:
+    """SQL'i tek satıra indir (log için)."""
+    text = " ".join(str(sql).split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _param_shapes(params) -> list:
+    """Parametre değerleri yerine şekilleri: tip ve uzunluk (adres/PII loglanmaz)."""
+    if params is None:
+        return []
+    shapes = []
+    for p in params:
+        if p is None:
+            shapes.append("None")
+        elif isinstance(p, (list, tuple, set, dict)):
+            shapes.append(f"{type(p).__name__}[{len(p)}]")
+        elif isinstance(p, (str, bytes)):
+            shapes.append(f"{type(p).__name__}({len(p)})")
+        else:
+            shapes.append(type(p).__name__)
+    return shapes
+
+
+def _result_rows(result) -> int:
+    """Fonksiyon dönüşünden satır sayısı (liste/set uzunluğu, tek kayıt dict = 1)."""
+    if isinstance(result, (list, tuple, set, frozenset)):
+        return len(result)
+    if isinstance(result, dict):
+        return 1 if result else 0
+    return 0
+
+
+def _instrumented(func):
+    """
+    DB fonksiyonu dekoratörü: çağrı sayısı, gecikme, dönen satır sayısı.
+    Fonksiyon içindeki SQL ifadeleri (ve hataları) bu fonksiyona yazılır;
+    fonksiyonlar hataları yutup print ettiği için hata sayısı statement seviyesinde tutulur.
+    Generator fonksiyonlarda süre tüm iterasyonu, satır sayısı üretilen öğeleri kapsar.
+    """
+    name = func.__name__
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            stack = _call_context.__dict__.setdefault("stack", [])
+            start = time.perf_counter()
+            rows = 0
+            gen = func(*args, **kwargs)
+            try:
+                while True:
+                    stack.append(name)
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        return
+                    finally:
+                        stack.pop()
+                    rows += 1
+                    yield item
+            finally:
+                gen.close()
+                _record_call(name, (time.perf_counter() - start) * 1000, rows)
+        return gen_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stack = _call_context.__dict__.setdefault("stack", [])
+        stack.append(name)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            stack.pop()
+            _record_call(name, (time.perf_counter() - start) * 1000, _result_rows(result))
+    return wrapper
+
+
+class _InstrumentedCursor:
+    """Cursor sarmalayıcı: her execute süresini ve hatasını aktif DB fonksiyonuna yazar."""
+
+    def __init__(self, cursor):
+        object.__setattr__(self, "_cursor", cursor)
+
+    def __getattr__(self, attr):
+        return getattr(self._cursor, attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._cursor, attr, value)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            result = self._cursor.execute(sql, params)
+        except Exception as e:
+            _record_statement(_current_function(), sql, params, (time.perf_counter() - start) * 1000, e)
+            raise
+        _record_statement(_current_function(), sql, params, (time.perf_counter() - start) * 1000)
+        return result
+
+
+class _InstrumentedConnection:
+    """Bağlantı sarmalayıcı: cursor'ları _InstrumentedCursor ile döndürür."""
+
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._conn, attr, value)
+
+    def cursor(self, *args, **kwargs):
+        return _InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+
+def get_db_stats() -> dict:
+    """Fonksiyon bazlı DB istatistiklerinin kopyası + son yavaş sorgular."""
+    with _stats_lock:
+        functions = {}
+        for name, stat in _func_stats.items():
+            entry = dict(stat, buckets=list(stat["buckets"]))
+            entry["avg_ms"] = round(stat["total_ms"] / stat["calls"], 1) if stat["calls"] else 0.0
+            functions[name] = entry
+        return {
+            "functions": functions,
+            "slow_queries": list(_slow_queries),
+            "bucket_limits_ms": list(_LATENCY_BUCKETS_MS),
+            "slow_threshold_ms": DB_SLOW_QUERY_MS,
+        }
+
+
+def format_db_stats(top: int = 5) -> list:
+    """Toplam süreye göre en pahalı DB fonksiyonları (watchdog / health report satırları)."""
+    stats = get_db_stats()
+    ranked = sorted(stats["functions"].items(), key=lambda kv: kv[1]["total_ms"], reverse=True)
+    lines = []
+    for name, s in ranked[:top]:
+        if not s["calls"] and not s["statements"]:
+            continue
+        p95 = _bucket_percentile(s["buckets"], 0.95)
+        lines.append(
+            f"{name}: {s['calls']}x ort {s['avg_ms']}ms p95≤{p95} max {s['max_ms']:.0f}ms"
+            f" | {s['rows']} satır" + (f" | ❌ {s['errors']} hata" if s["errors"] else "")
+        )
+    if stats["slow_queries"]:
+        lines.append(f"🐢 Yavaş sorgu (≥{DB_SLOW_QUERY_MS}ms): {len(stats['slow_queries'])} kayıt")
+    return lines
+
+
+def _bucket_percentile(buckets: list, pct: float) -> str:
+    """Histogramdan yaklaşık yüzdelik (kova üst sınırı olarak)."""
+    total = sum(buckets)
+    if not total:
+        return "0ms"
+    target = total * pct
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= target:
+            if i < len(_LATENCY_BUCKETS_MS):
+                return f"{_LATENCY_BUCKETS_MS[i]}ms"
+            return f">{_LATENCY_BUCKETS_MS[-1]}ms"
+    return f">{_LATENCY_BUCKETS_MS[-1]}ms"
+
+
+def reset_db_stats():
+    """İstatistikleri sıfırla (periyodik rapor sonrası)."""
+    with _stats_lock:
+        _func_stats.clear()
+        _slow_queries.clear()
 
 
 def get_connection():
-    """PostgreSQL bağlantısını al veya oluştur."""
+    """
+    DB bağlantısını al veya oluştur (PostgreSQL veya SQLite).
+    Her thread kendi bağlantısını kullanır: arka plan worker'ları ve asyncio.to_thread
+    işleri ana thread'in transaction'ına (autocommit kapalıyken) karışmaz.
+    """
     global _connection
     if not _db_available:
         return None
 
+    is_main = threading.current_thread() is threading.main_thread()
+    conn = _connection if is_main else getattr(_thread_conn, "connection", None)
+
     try:
-        if _connection is None or _connection.closed:
-            _connection = psycopg2.connect(DATABASE_URL, connect_timeout=10)
-            _connection.autocommit = True
-            print("✅ PostgreSQL bağlantısı kuruldu")
-        return _connection
+        if conn is None or conn.closed:
+            if _IS_SQLITE:
+                os.makedirs(os.path.dirname(os.path.abspath(SQLITE_PATH)), exist_ok=True)
+                conn = _InstrumentedConnection(sqlite_backend.connect(SQLITE_PATH))
+                if is_main:
+                    print(f"✅ SQLite bağlantısı kuruldu (WAL): {SQLITE_PATH}")
+            else:
+                conn = _InstrumentedConnection(psycopg2.connect(DATABASE_URL, connect_timeout=10))
+                conn.autocommit = True
+                if is_main:
+                    print("✅ PostgreSQL bağlantısı kuruldu")
+            if is_main:
+                _connection = conn
+            else:
+                _thread_conn.connection = conn
+        return conn
     except Exception as e:
-        print(f"❌ PostgreSQL bağlantı hatası: {e}")
+        print(f"❌ DB bağlantı hatası: {e}")
         return None
 
 
+@_instrumented
 def init_db():
     """Tabloları oluştur (IF NOT EXISTS)."""
     conn = get_connection()
@@ -95,44 +377,9 @@ def init_db():
             except Exception:
                 pass
 
-        # wallet_activity — her cüzdan alımını takip (seçicilik skoru için)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS wallet_activity (
-                id SERIAL PRIMARY KEY,
-                wallet_address VARCHAR(42) NOT NULL,
-                token_address VARCHAR(42) NOT NULL,
-                token_symbol VARCHAR(20),
-                block_number BIGINT,
-                is_early BOOLEAN DEFAULT FALSE,
-                alert_mcap BIGINT DEFAULT 0,
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_wa_wallet ON wallet_activity(wallet_address)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_wa_created ON wallet_activity(created_at)")
-
-        # alert_snapshots — alert anındaki MCap/block kaydı
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS alert_snapshots (
-                id SERIAL PRIMARY KEY,
-                token_address VARCHAR(42) NOT NULL,
-                token_symbol VARCHAR(20),
-                alert_mcap BIGINT,
-                alert_block BIGINT,
-                wallet_count INT,
-                first_sm_block BIGINT,
-                early_buyers_found INT DEFAULT 0,
-                wallets_involved TEXT DEFAULT '',
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        # wallets_involved sütunu yoksa ekle (mevcut tablolar için migration)
-        try:
-            cur.execute("""
-                ALTER TABLE alert_snapshots ADD COLUMN IF NOT EXISTS wallets_involved TEXT DEFAULT ''
-            """)
-        except Exception:
-            pass
+        # wallet_activity + alert_snapshots — created_at'e göre range partitioned
+        # (retention = eski partition'ı detach+drop, zaman filtreli sorgular pruning yapar)
+        _create_partitioned_tables(cur)
 
         # token_evaluations tablosu (alert kalite analizi)
         cur.execute("""
@@ -156,13 +403,28 @@ def init_db():
         cur.execute("CREATE INDEX IF NOT EXISTS idx_te_alert_time ON token_evaluations(alert_time)")
 
         # ath_mcap sütunu yoksa ekle (alert sonrası görülen en yüksek MCap)
-        try:
-            cur.execute("ALTER TABLE token_evaluations ADD COLUMN IF NOT EXISTS ath_mcap BIGINT DEFAULT 0")
-        except Exception:
-            pass
+        # min_mcap / time_to_peak_sec: price_tracker'ın sürekli takip sonuçları
+        for col, dtype in [("ath_mcap", "BIGINT DEFAULT 0"), ("min_mcap", "BIGINT"), ("time_to_peak_sec", "INT")]:
+            try:
+                cur.execute(f"ALTER TABLE token_evaluations ADD COLUMN IF NOT EXISTS {col} {dtype}")
+            except Exception:
+                pass
+
+        # Satır bazlı state tabloları (JSONB blob yerine — her olay O(1) yazım)
+        _create_normalized_state_tables(cur)
+
+        # mcap_checks: planlanmış MCap kontrolleri (restart'ta kaybolmasın)
+        _create_mcap_checks_table(cur)
 
         cur.close()
-        print(f"✅ Database tabloları hazır ({len(tables)} + trade_signals + wallet_activity + alert_snapshots + token_evaluations)")
+
+        # Eski JSONB blob'ları satır tablolarına taşı (tek seferlik)
+        _migrate_legacy_blobs()
+
+        # alert_snapshots.wallets_involved (virgüllü metin) → wallets (text[])
+        _backfill_snapshot_wallets()
+
+        print(f"✅ Database tabloları hazır ({len(tables)} + trade_signals + wallet_activity + alert_snapshots + token_evaluations + mcap_checks + normalized state)")
         return True
 
     except Exception as e:
@@ -170,9 +432,267 @@ def init_db():
         return False
 
 
+# =============================================================================
+# PARTITIONED TABLES (wallet_activity, alert_snapshots)
+# =============================================================================
+# Satır satır DELETE ile retention → tablo şişmesi + uzun vacuum. Bunun yerine
+# created_at'e göre range partition: eski veri = tek DETACH + DROP.
+
+# tablo → partition periyodu ("day" | "month")
+_PARTITIONED_TABLES = {
+    "wallet_activity": "day",
+    "alert_snapshots": "month",
+}
+
+# Kaç gün ileriye partition hazırlanır (daily_refresh her gün tekrar çalıştırır)
+PARTITION_PREMAKE_DAYS = 7
+
+_PARTITIONED_DDL = {
+    "wallet_activity": """
+        CREATE TABLE IF NOT EXISTS wallet_activity (
+            id SERIAL,
+            wallet_address VARCHAR(42) NOT NULL,
+            token_address VARCHAR(42) NOT NULL,
+            token_symbol VARCHAR(20),
+            block_number BIGINT,
+            is_early BOOLEAN DEFAULT FALSE,
+            alert_mcap BIGINT DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """,
+    "alert_snapshots": """
+        CREATE TABLE IF NOT EXISTS alert_snapshots (
+            id SERIAL,
+            token_address VARCHAR(42) NOT NULL,
+            token_symbol VARCHAR(20),
+            alert_mcap BIGINT,
+            alert_block BIGINT,
+            wallet_count INT,
+            first_sm_block BIGINT,
+            early_buyers_found INT DEFAULT 0,
+            wallets_involved TEXT DEFAULT '',
+            wallets TEXT[],
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """,
+}
+
+_PARTITIONED_INDEXES = {
+    "wallet_activity": [
+        "CREATE INDEX IF NOT EXISTS idx_wa_wallet ON wallet_activity(wallet_address)",
+        "CREATE INDEX IF NOT EXISTS idx_wa_created ON wallet_activity(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_wa_wallet_token ON wallet_activity(wallet_address, token_address)",
+    ],
+    "alert_snapshots": [
+        "CREATE INDEX IF NOT EXISTS idx_as_created ON alert_snapshots(created_at)",
+        # "cüzdan X hangi alertlerde" → wallets @> ARRAY[X]
+        "CREATE INDEX IF NOT EXISTS idx_as_wallets ON alert_snapshots USING GIN (wallets)",
+    ],
+}
+
+# Sonradan eklenen kolonlar (mevcut tablolar için migration)
+_PARTITIONED_ADDED_COLUMNS = {
+    "wallet_activity": [],
+    "alert_snapshots": [
+        ("wallets_involved", "TEXT DEFAULT ''"),
+        ("wallets", "TEXT[]"),
+    ],
+}
+
+
+def _period_start(day: datetime, period: str) -> datetime:
+    """Günün ait olduğu partition'ın başlangıcı."""
+    day = datetime(day.year, day.month, day.day)
+    return day.replace(day=1) if period == "month" else day
+
+
+def _period_next(start: datetime, period: str) -> datetime:
+    """Sonraki partition'ın başlangıcı."""
+    if period == "month":
+        return datetime(start.year + (start.month // 12), start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def _partition_name(table: str, start: datetime, period: str) -> str:
+    return f"{table}_p{start.strftime('%Y%m' if period == 'month' else '%Y%m%d')}"
+
+
+def _table_kind(cur, table: str):
+    """'p' = partitioned, 'r' = normal tablo, None = yok."""
+    cur.execute("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = %s AND n.nspname = current_schema()
+    """, (table,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _create_partitions(cur, table: str, start: datetime, end: datetime):
+    """[start, end] aralığını kapsayan partition'ları oluştur (varsa atla)."""
+    period = _PARTITIONED_TABLES[table]
+    current = _period_start(start, period)
+    while current <= end:
+        nxt = _period_next(current, period)
+        try:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {_partition_name(table, current, period)}
+                PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)
+            """, (current, nxt))
+        except Exception as e:
+            # Genelde default partition'da bu aralıkta satır varsa olur
+            print(f"⚠️ Partition oluşturulamadı ({table} {current.date()}): {e}")
+        current = nxt
+
+
+def _create_partitioned_tables(cur):
+    """Partitioned tabloları oluştur; eski (partitionsız) tabloları taşı."""
+    if _IS_SQLITE:
+        # SQLite'ta partition yok: aynı kolonlar + index'ler, düz tablo
+        for table in _PARTITIONED_TABLES:
+            cur.execute(_PARTITIONED_DDL[table])
+            for col, dtype in _PARTITIONED_ADDED_COLUMNS[table]:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {col} {dtype}")
+            for ddl in _PARTITIONED_INDEXES[table]:
+                if "USING GIN" not in ddl:
+                    cur.execute(ddl)
+        return
+
+    now = datetime.now()
+    for table in _PARTITIONED_TABLES:
+        kind = _table_kind(cur, table)
+        if kind == "r":
+            _convert_to_partitioned(table)
+        elif kind is None:
+            cur.execute(_PARTITIONED_DDL[table])
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+        for col, dtype in _PARTITIONED_ADDED_COLUMNS[table]:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {col} {dtype}")
+        for ddl in _PARTITIONED_INDEXES[table]:
+            cur.execute(ddl)
+        _create_partitions(cur, table, now, now + timedelta(days=PARTITION_PREMAKE_DAYS))
+
+
+def _convert_to_partitioned(table: str):
+    """
+    Mevcut normal tabloyu partitioned yapıya taşı (tek seferlik).
+    Eski tablo *_legacy olarak yeniden adlandırılır, veri kopyalanır, sonra silinir.
+    """
+    conn = get_connection()
+    legacy = f"{table}_legacy"
+    print(f"🔄 {table}: partitioned tabloya dönüştürülüyor...")
+    with _transaction(conn) as cur:
+        cur.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        # Eski index isimleri yeni tabloda tekrar kullanılacak
+        for ddl in _PARTITIONED_INDEXES[table]:
+            index_name = ddl.split(" IF NOT EXISTS ")[1].split(" ON ")[0]
+            cur.execute(f"DROP INDEX IF EXISTS {index_name}")
+
+        cur.execute(_PARTITIONED_DDL[table])
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+
+        cur.execute(f"SELECT MIN(created_at), MAX(created_at) FROM {legacy}")
+        min_ts, max_ts = cur.fetchone()
+        if min_ts:
+            _create_partitions(cur, table, min_ts, max_ts)
+
+        cur.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = %s AND table_schema = current_schema()
+            ORDER BY ordinal_position
+        """, (legacy,))
+        columns = ", ".join(r[0] for r in cur.fetchall())
+        cur.execute(f"""
+            INSERT INTO {table} ({columns})
+            SELECT {columns} FROM {legacy} WHERE created_at IS NOT NULL
+        """)
+        copied = cur.rowcount
+        cur.execute(f"""
+            SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))
+        """, (table,))
+        cur.execute(f"DROP TABLE {legacy}")
+    print(f"✅ {table}: {copied} satır partitioned tabloya taşındı")
+
+
+@_instrumented
+def ensure_partitions(days_ahead: int = PARTITION_PREMAKE_DAYS) -> bool:
+    """Önümüzdeki N günün partition'larını hazırla (günlük çağrılır)."""
+    if not is_db_available() or _IS_SQLITE:
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        now = datetime.now()
+        for table in _PARTITIONED_TABLES:
+            _create_partitions(cur, table, now, now + timedelta(days=days_ahead))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Partition hazırlama hatası: {e}")
+        return False
+
+
+@_instrumented
+def drop_old_partitions(table: str, days: int) -> int:
+    """
+    Tamamı retention dışında kalan partition'ları DETACH + DROP et.
+
+    Returns:
+        int: Silinen satır sayısı
+    """
+    conn = get_connection()
+    if not conn or _IS_SQLITE:
+        return 0
+    period = _PARTITIONED_TABLES[table]
+    cutoff = datetime.now() - timedelta(days=days)
+    dropped_rows = 0
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = %s
+        """, (table,))
+        children = [r[0] for r in cur.fetchall()]
+        cur.close()
+
+        prefix = f"{table}_p"
+        fmt = "%Y%m" if period == "month" else "%Y%m%d"
+        for child in sorted(children):
+            if not child.startswith(prefix):
+                continue  # default partition
+            try:
+                start = datetime.strptime(child[len(prefix):], fmt)
+            except ValueError:
+                continue
+            if _period_next(start, period) > cutoff:
+                continue
+
+            with _transaction(conn) as tcur:
+                tcur.execute(f"SELECT COUNT(*) FROM {child}")
+                dropped_rows += tcur.fetchone()[0]
+                tcur.execute(f"ALTER TABLE {table} DETACH PARTITION {child}")
+                tcur.execute(f"DROP TABLE {child}")
+        return dropped_rows
+    except Exception as e:
+        print(f"⚠️ Partition drop hatası ({table}): {e}")
+        return dropped_rows
+
+
 def is_db_available() -> bool:
-    """DB kullanılabilir mi?"""
-    return _db_available and DATABASE_URL != ""
+    """DB kullanılabilir mi? (PostgreSQL veya yerel SQLite)"""
+    return _db_available and (DATABASE_URL != "" or _IS_SQLITE)
+
+
+def is_sqlite_backend() -> bool:
+    """Yerel SQLite backend mi kullanılıyor?"""
+    return _IS_SQLITE
 
 
 # =============================================================================
@@ -232,100 +752,832 @@ def _save_to_db(table_name: str, data: dict):
         return False
 
 
+@contextmanager
+def _transaction(conn):
+    """Çok adımlı yazımlar için geçici transaction (autocommit kapatılır)."""
+    conn.autocommit = False
+    try:
+        cur = conn.cursor()
+        yield cur
+        cur.close()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+
+
+def _json_value(value):
+    """JSONB kolonundan gelen değeri Python objesine çevir."""
+    if value is None or isinstance(value, (dict, list)):
+        return value
+    return json.loads(value)
+
+
+# =============================================================================
+# NORMALIZED STATE TABLES (JSONB blob yerine satır bazlı)
+# =============================================================================
+# Eski yapı: her tablo tek bir büyüyen JSONB doküman → her olay tüm geçmişi
+# yeniden yazar. Yeni yapı: pozisyon, kapanan trade, fake alert, flag ve
+# smartest wallet başına bir satır → her olay O(1) insert/update.
+
+# portfolio → (eski blob tablosu, senaryo anahtarları; "" = kök seviye)
+_PORTFOLIO_LAYOUT = {
+    "virtual": ("virtual_portfolio", ("scenario1", "scenario2")),
+    "real": ("real_portfolio", ("",)),
+}
+
+_ROW_LIST_KEYS = ("positions", "closed_trades")
+
+
+def _create_normalized_state_tables(cur):
+    """Satır bazlı state tablolarını oluştur (init_db içinden çağrılır)."""
+    # Portföy başlık verisi (bakiye, PnL, sayaçlar) — küçük, sabit boyutlu
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_state (
+            portfolio VARCHAR(20) PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_positions (
+            id SERIAL PRIMARY KEY,
+            portfolio VARCHAR(20) NOT NULL,
+            scenario VARCHAR(20) NOT NULL DEFAULT '',
+            token_address VARCHAR(42) NOT NULL,
+            data JSONB NOT NULL,
+            opened_at TIMESTAMP DEFAULT NOW(),
+            updated_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE (portfolio, scenario, token_address)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_closed_trades (
+            id SERIAL PRIMARY KEY,
+            portfolio VARCHAR(20) NOT NULL,
+            scenario VARCHAR(20) NOT NULL DEFAULT '',
+            token_address VARCHAR(42) NOT NULL,
+            data JSONB NOT NULL,
+            closed_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pct_portfolio ON portfolio_closed_trades(portfolio, scenario, id)")
+
+    # Fake alert olayları (her fake alert bir satır)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS fake_alert_events (
+            id SERIAL PRIMARY KEY,
+            token_address VARCHAR(42) NOT NULL,
+            token_symbol VARCHAR(20),
+            volume_24h FLOAT DEFAULT 0,
+            wallets JSONB,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_fae_created ON fake_alert_events(created_at)")
+
+    # Cüzdan başına fake alert sayacı + flag durumu
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS flagged_wallets (
+            wallet_address VARCHAR(42) PRIMARY KEY,
+            fake_count INT DEFAULT 0,
+            tokens JSONB,
+            first_fake TIMESTAMP DEFAULT NOW(),
+            last_fake TIMESTAMP DEFAULT NOW(),
+            flagged BOOLEAN DEFAULT FALSE
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_fw_flagged ON flagged_wallets(flagged)")
+
+    # Smartest wallets (top-N liste, sıra = rank)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS smartest_wallet_scores (
+            wallet_address VARCHAR(42) PRIMARY KEY,
+            rank INT NOT NULL,
+            score FLOAT DEFAULT 0,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+
+    # Early smart money (cüzdan başına bir satır)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS early_smart_money_wallets (
+            wallet_address VARCHAR(42) PRIMARY KEY,
+            data JSONB NOT NULL,
+            updated_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+
+    # Tek seferlik blob → satır migration kayıtları
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS state_migrations (
+            name VARCHAR(50) PRIMARY KEY,
+            migrated_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+
+
+def _migrate_legacy_blobs():
+    """
+    Eski JSONB blob tablolarındaki veriyi satır tablolarına taşı.
+    Her blob bir kez taşınır (state_migrations); sonraki okumalar sadece satırlardan yapılır.
+    """
+    conn = get_connection()
+    if not conn:
+        return
+
+    migrations = [
+        ("virtual_portfolio", lambda d: _sync_portfolio_rows("virtual", d)),
+        ("real_portfolio", lambda d: _sync_portfolio_rows("real", d)),
+        ("fake_alerts", _sync_fake_alert_rows),
+        ("smartest_wallets", _sync_smartest_wallet_rows),
+        ("early_smart_money", _sync_early_smart_money_rows),
+    ]
+
+    for legacy_table, sync_fn in migrations:
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1 FROM state_migrations WHERE name = %s", (legacy_table,))
+            done = cur.fetchone()
+            cur.close()
+            if done:
+                continue
+
+            legacy = _load_from_db(legacy_table)
+            if legacy:
+                sync_fn(legacy)
+                print(f"🔄 {legacy_table}: JSONB blob → satır tablolarına taşındı")
+
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO state_migrations (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+                (legacy_table,)
+            )
+            cur.close()
+        except Exception as e:
+            print(f"⚠️ Blob migration hatası ({legacy_table}): {e}")
+
+
+# -----------------------------------------------------------------------------
+# Portföy (virtual + real)
+# -----------------------------------------------------------------------------
+
+def _portfolio_containers(data: dict, scenarios: tuple):
+    """(senaryo, pozisyon/trade listelerini içeren dict) çiftleri."""
+    for scenario in scenarios:
+        yield scenario, (data.get(scenario, {}) if scenario else data)
+
+
+def _portfolio_header(data: dict, scenarios: tuple) -> dict:
+    """Portföyden pozisyon/trade listeleri çıkarılmış başlık verisi."""
+    header = {k: v for k, v in data.items() if k not in _ROW_LIST_KEYS}
+    for scenario in scenarios:
+        if scenario and isinstance(data.get(scenario), dict):
+            header[scenario] = {
+                k: v for k, v in data[scenario].items() if k not in _ROW_LIST_KEYS
+            }
+    return header
+
+
+def _load_portfolio_rows(portfolio: str) -> dict:
+    """Portföyü satır tablolarından birleştir (eski blob formatıyla aynı şekil)."""
+    conn = get_connection()
+    if not conn:
+        return None
+    _, scenarios = _PORTFOLIO_LAYOUT[portfolio]
+
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT data FROM portfolio_state WHERE portfolio = %s", (portfolio,))
+        row = cur.fetchone()
+        if not row:
+            cur.close()
+            return None
+
+        data = _json_value(row[0])
+        containers = {}
+        for scenario in scenarios:
+            container = data.setdefault(scenario, {}) if scenario else data
+            container["positions"] = []
+            container["closed_trades"] = []
+            containers[scenario] = container
+
+        cur.execute("""
+            SELECT scenario, data FROM portfolio_positions
+            WHERE portfolio = %s ORDER BY id ASC
+        """, (portfolio,))
+        for scenario, pos in cur.fetchall():
+            if scenario in containers:
+                containers[scenario]["positions"].append(_json_value(pos))
+
+        cur.execute("""
+            SELECT scenario, data FROM portfolio_closed_trades
+            WHERE portfolio = %s ORDER BY id ASC
+        """, (portfolio,))
+        for scenario, trade in cur.fetchall():
+            if scenario in containers:
+                containers[scenario]["closed_trades"].append(_json_value(trade))
+
+        cur.close()
+        return data
+    except Exception as e:
+        print(f"⚠️ Portföy okuma hatası ({portfolio}): {e}")
+        return None
+
+
+def _sync_portfolio_rows(portfolio: str, data: dict) -> bool:
+    """Portföyün tamamını satır tablolarına yaz (migration / tam kayıt)."""
+    conn = get_connection()
+    if not conn:
+        return False
+    _, scenarios = _PORTFOLIO_LAYOUT[portfolio]
+
+    try:
+        with _transaction(conn) as cur:
+            cur.execute("DELETE FROM portfolio_positions WHERE portfolio = %s", (portfolio,))
+            cur.execute("DELETE FROM portfolio_closed_trades WHERE portfolio = %s", (portfolio,))
+            for scenario, container in _portfolio_containers(data, scenarios):
+                for pos in container.get("positions", []):
+                    cur.execute("""
+                        INSERT INTO portfolio_positions (portfolio, scenario, token_address, data)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (portfolio, scenario, token_address)
+                        DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+                    """, (portfolio, scenario, pos["token"].lower(), Json(pos)))
+                for trade in container.get("closed_trades", []):
+                    cur.execute("""
+                        INSERT INTO portfolio_closed_trades (portfolio, scenario, token_address, data)
+                        VALUES (%s, %s, %s, %s)
+                    """, (portfolio, scenario, trade.get("token", "").lower(), Json(trade)))
+            cur.execute("""
+                INSERT INTO portfolio_state (portfolio, data) VALUES (%s, %s)
+                ON CONFLICT (portfolio) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+            """, (portfolio, Json(_portfolio_header(data, scenarios))))
+        return True
+    except Exception as e:
+        print(f"⚠️ Portföy yazma hatası ({portfolio}): {e}")
+        return False
+
+
+@_instrumented
+def save_portfolio_state_db(portfolio: str, data: dict) -> bool:
+    """Sadece portföy başlığını yaz (bakiye, PnL, sayaçlar) — pozisyon/trade listeleri hariç."""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    _, scenarios = _PORTFOLIO_LAYOUT[portfolio]
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO portfolio_state (portfolio, data) VALUES (%s, %s)
+            ON CONFLICT (portfolio) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+        """, (portfolio, Json(_portfolio_header(data, scenarios))))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Portföy state yazma hatası ({portfolio}): {e}")
+        return False
+
+
+@_instrumented
+def upsert_position_db(portfolio: str, position: dict, scenario: str = "") -> bool:
+    """Tek pozisyonu ekle/güncelle (alım, partial satış, TP hit)."""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO portfolio_positions (portfolio, scenario, token_address, data)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (portfolio, scenario, token_address)
+            DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+        """, (portfolio, scenario, position["token"].lower(), Json(position)))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Pozisyon yazma hatası ({portfolio}): {e}")
+        return False
+
+
+@_instrumented
+def delete_position_db(portfolio: str, token_address: str, scenario: str = "") -> bool:
+    """Kapanan pozisyonu sil (full exit)."""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM portfolio_positions
+            WHERE portfolio = %s AND scenario = %s AND token_address = %s
+        """, (portfolio, scenario, token_address.lower()))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Pozisyon silme hatası ({portfolio}): {e}")
+        return False
+
+
+@_instrumented
+def insert_closed_trade_db(portfolio: str, trade: dict, scenario: str = "") -> bool:
+    """Kapanan trade kaydını ekle (append-only)."""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO portfolio_closed_trades (portfolio, scenario, token_address, data)
+            VALUES (%s, %s, %s, %s)
+        """, (portfolio, scenario, trade.get("token", "").lower(), Json(trade)))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Closed trade yazma hatası ({portfolio}): {e}")
+        return False
+
+
 # =============================================================================
 # VIRTUAL PORTFOLIO
 # =============================================================================
 
+@_instrumented
 def load_portfolio_db() -> dict:
     """Portföyü DB'den yükle."""
     if not is_db_available():
         return None
-    return _load_from_db("virtual_portfolio")
+    return _load_portfolio_rows("virtual")
 
 
+@_instrumented
 def save_portfolio_db(data: dict) -> bool:
-    """Portföyü DB'ye kaydet."""
+    """Portföyün tamamını DB'ye kaydet (tekil değişiklikler için upsert_position_db vb. kullan)."""
     if not is_db_available():
         return False
-    return _save_to_db("virtual_portfolio", data)
+    return _sync_portfolio_rows("virtual", data)
 
 
 # =============================================================================
 # SMARTEST WALLETS
 # =============================================================================
 
+def _sync_smartest_wallet_rows(data: dict) -> bool:
+    """Top-N listesini satırlara yaz (liste dışı kalanlar silinir)."""
+    conn = get_connection()
+    if not conn:
+        return False
+    wallets = data.get("wallets", [])
+    if isinstance(wallets, dict):  # Eski format: {address: {...}}
+        wallets = [{"address": addr, **(info or {})} for addr, info in wallets.items()]
+    elif wallets and isinstance(wallets[0], str):
+        wallets = [{"address": addr} for addr in wallets]
+
+    try:
+        with _transaction(conn) as cur:
+            cur.execute("DELETE FROM smartest_wallet_scores")
+            for rank, w in enumerate(wallets, start=1):
+                cur.execute("""
+                    INSERT INTO smartest_wallet_scores (wallet_address, rank, score, data)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (wallet_address) DO UPDATE
+                    SET rank = EXCLUDED.rank, score = EXCLUDED.score,
+                        data = EXCLUDED.data, updated_at = NOW()
+                """, (w["address"].lower(), rank, w.get("score", 0), Json(w)))
+        return True
+    except Exception as e:
+        print(f"⚠️ Smartest wallets yazma hatası: {e}")
+        return False
+
+
+@_instrumented
 def load_smartest_wallets_db() -> dict:
     """Smartest wallets'ı DB'den yükle."""
     if not is_db_available():
         return None
-    return _load_from_db("smartest_wallets")
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT data, updated_at FROM smartest_wallet_scores ORDER BY rank ASC")
+        rows = cur.fetchall()
+        cur.close()
+        if not rows:
+            return None
+        wallets = [_json_value(r[0]) for r in rows]
+        last_update = max(r[1] for r in rows if r[1]) if any(r[1] for r in rows) else None
+        return {
+            "wallets": wallets,
+            "target": SMARTEST_WALLET_TARGET,
+            "current_count": len(wallets),
+            "completed": len(wallets) >= SMARTEST_WALLET_TARGET,
+            "last_evaluation": last_update.isoformat() if last_update else None,
+        }
+    except Exception as e:
+        print(f"⚠️ Smartest wallets okuma hatası: {e}")
+        return None
 
 
+@_instrumented
 def save_smartest_wallets_db(data: dict) -> bool:
     """Smartest wallets'ı DB'ye kaydet."""
     if not is_db_available():
         return False
-    return _save_to_db("smartest_wallets", data)
+    return _sync_smartest_wallet_rows(data)
+
+
+@_instrumented
+def get_smartest_wallet_addresses_db() -> set:
+    """Smartest wallet adres seti (küçük harf)."""
+    if not is_db_available():
+        return set()
+    conn = get_connection()
+    if not conn:
+        return set()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT wallet_address FROM smartest_wallet_scores")
+        rows = cur.fetchall()
+        cur.close()
+        return {r[0] for r in rows}
+    except Exception as e:
+        print(f"⚠️ Smartest wallet adres okuma hatası: {e}")
+        return set()
+
+
+@_instrumented
+def is_smartest_wallet_db(address: str) -> bool:
+    """Cüzdan smartest listesinde mi? (PK lookup)"""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM smartest_wallet_scores WHERE wallet_address = %s", (address.lower(),))
+        found = cur.fetchone() is not None
+        cur.close()
+        return found
+    except Exception as e:
+        print(f"⚠️ Smartest wallet kontrol hatası: {e}")
+        return False
 
 
 # =============================================================================
 # EARLY SMART MONEY
 # =============================================================================
 
+def _sync_early_smart_money_rows(data: dict) -> bool:
+    """Early smart money cüzdanlarını satırlara yaz."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with _transaction(conn) as cur:
+            cur.execute("DELETE FROM early_smart_money_wallets")
+            for wallet, info in (data.get("wallets") or {}).items():
+                cur.execute("""
+                    INSERT INTO early_smart_money_wallets (wallet_address, data)
+                    VALUES (%s, %s)
+                    ON CONFLICT (wallet_address) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+                """, (wallet.lower(), Json(info)))
+        return True
+    except Exception as e:
+        print(f"⚠️ Early smart money yazma hatası: {e}")
+        return False
+
+
+@_instrumented
 def load_early_smart_money_db() -> dict:
     """Early smart money'yi DB'den yükle."""
     if not is_db_available():
         return None
-    return _load_from_db("early_smart_money")
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT wallet_address, data, updated_at FROM early_smart_money_wallets")
+        rows = cur.fetchall()
+        cur.close()
+        if not rows:
+            return None
+        updated = max((r[2] for r in rows if r[2]), default=None)
+        return {
+            "wallets": {r[0]: _json_value(r[1]) for r in rows},
+            "updated_at": updated.isoformat() if updated else None,
+        }
+    except Exception as e:
+        print(f"⚠️ Early smart money okuma hatası: {e}")
+        return None
 
 
+@_instrumented
 def save_early_smart_money_db(data: dict) -> bool:
     """Early smart money'yi DB'ye kaydet."""
     if not is_db_available():
         return False
-    return _save_to_db("early_smart_money", data)
+    return _sync_early_smart_money_rows(data)
+
+
+@_instrumented
+def upsert_early_smart_money_wallet_db(wallet_address: str, info: dict) -> bool:
+    """Tek early smart money cüzdanını ekle/güncelle."""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO early_smart_money_wallets (wallet_address, data)
+            VALUES (%s, %s)
+            ON CONFLICT (wallet_address) DO UPDATE SET data = EXCLUDED.data, updated_at = NOW()
+        """, (wallet_address.lower(), Json(info)))
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"⚠️ Early smart money yazma hatası: {e}")
+        return False
+
+
+# =============================================================================
+# FAKE ALERTS
+# =============================================================================
+
+def _sync_fake_alert_rows(data: dict) -> bool:
+    """Fake alert dokümanını (wallets + alerts_log) satırlara yaz."""
+    conn = get_connection()
+    if not conn:
+        return False
+    flagged_set = {w.lower() for w in data.get("flagged_wallets", [])}
+    try:
+        with _transaction(conn) as cur:
+            cur.execute("DELETE FROM fake_alert_events")
+            cur.execute("DELETE FROM flagged_wallets")
+            for a in data.get("alerts_log", []):
+                cur.execute("""
+                    INSERT INTO fake_alert_events (token_address, token_symbol, volume_24h, wallets, created_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, ((a.get("token") or "").lower(), a.get("symbol"), a.get("volume_24h", 0),
+                      Json(a.get("wallets", [])), a.get("time") or datetime.now()))
+            for wallet, w in (data.get("wallets") or {}).items():
+                cur.execute("""
+                    INSERT INTO flagged_wallets (wallet_address, fake_count, tokens, first_fake, last_fake, flagged)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (wallet.lower(), w.get("fake_count", 0), Json(w.get("tokens", [])),
+                      w.get("first_fake") or datetime.now(), w.get("last_fake") or datetime.now(),
+                      bool(w.get("flagged")) or wallet.lower() in flagged_set))
+        return True
+    except Exception as e:
+        print(f"⚠️ Fake alerts yazma hatası: {e}")
+        return False
+
+
+@_instrumented
+def load_fake_alerts_db() -> dict:
+    """Fake alerts'ı DB'den yükle (eski doküman formatında)."""
+    if not is_db_available():
+        return None
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT wallet_address, fake_count, tokens, first_fake, last_fake, flagged
+            FROM flagged_wallets
+        """)
+        wallet_rows = cur.fetchall()
+        cur.execute("""
+            SELECT token_address, token_symbol, volume_24h, wallets, created_at
+            FROM fake_alert_events ORDER BY id ASC
+        """)
+        event_rows = cur.fetchall()
+        cur.close()
+
+        if not wallet_rows and not event_rows:
+            return None
+
+        wallets = {}
+        flagged = []
+        for r in wallet_rows:
+            wallets[r[0]] = {
+                "fake_count": r[1] or 0,
+                "tokens": _json_value(r[2]) or [],
+                "first_fake": r[3].isoformat() if r[3] else None,
+                "last_fake": r[4].isoformat() if r[4] else None,
+                "flagged": bool(r[5]),
+            }
+            if r[5]:
+                flagged.append(r[0])
+
+        alerts_log = [{
+            "token": r[0],
+            "symbol": r[1],
+            "volume_24h": r[2] or 0,
+            "wallets": _json_value(r[3]) or [],
+            "time": r[4].isoformat() if r[4] else None,
+        } for r in event_rows]
+
+        return {
+            "wallets": wallets,
+            "flagged_wallets": flagged,
+            "alerts_log": alerts_log,
+            "updated_at": alerts_log[-1]["time"] if alerts_log else None,
+        }
+    except Exception as e:
+        print(f"⚠️ Fake alerts okuma hatası: {e}")
+        return None
+
+
+@_instrumented
+def save_fake_alerts_db(data: dict) -> bool:
+    """Fake alerts'ı DB'ye kaydet (tam doküman — tekil olaylar için record_fake_alert_db)."""
+    if not is_db_available():
+        return False
+    return _sync_fake_alert_rows(data)
+
+
+# Token sembolünü flagged_wallets.tokens dizisine (yoksa) ekle — upsert içinde, okumadan
+_FAKE_TOKENS_APPEND_SQL = (
+    """CASE WHEN EXISTS (SELECT 1 FROM json_each(flagged_wallets.tokens) WHERE value = %s)
+            THEN flagged_wallets.tokens
+            ELSE json_insert(COALESCE(flagged_wallets.tokens, '[]'), '$[#]', %s) END"""
+    if _IS_SQLITE else
+    """CASE WHEN COALESCE(flagged_wallets.tokens, '[]'::jsonb) @> to_jsonb(%s::text)
+            THEN flagged_wallets.tokens
+            ELSE COALESCE(flagged_wallets.tokens, '[]'::jsonb) || to_jsonb(%s::text) END"""
+)
+
+
+@_instrumented
+def record_fake_alert_db(wallet_addresses: list, token_address: str, token_symbol: str,
+                         volume_24h: float, flag_threshold: int) -> list:
+    """
+    Tek fake alert olayını kaydet: 1 event insert + cüzdan başına atomik sayaç upsert
+    (fake_count DB'de artırılır, eşzamanlı alertlerde artış kaybolmaz).
+
+    Returns:
+        list: Yeni flaglenen [(wallet, fake_count), ...] veya hata durumunda None
+    """
+    if not is_db_available():
+        return None
+    conn = get_connection()
+    if not conn:
+        return None
+
+    try:
+        newly_flagged = []
+        with _transaction(conn) as cur:
+            cur.execute("""
+                INSERT INTO fake_alert_events (token_address, token_symbol, volume_24h, wallets)
+                VALUES (%s, %s, %s, %s)
+            """, (token_address.lower(), token_symbol, volume_24h,
+                  Json([w[:10] + "..." for w in wallet_addresses])))
+
+            for wallet in wallet_addresses:
+                wallet_lower = wallet.lower()
+                cur.execute(f"""
+                    INSERT INTO flagged_wallets (wallet_address, fake_count, tokens, flagged)
+                    VALUES (%s, 1, %s, FALSE)
+                    ON CONFLICT (wallet_address) DO UPDATE
+                    SET fake_count = COALESCE(flagged_wallets.fake_count, 0) + 1,
+                        tokens = {_FAKE_TOKENS_APPEND_SQL},
+                        last_fake = NOW()
+                    RETURNING fake_count
+                """, (wallet_lower, Json([token_symbol]), token_symbol, token_symbol))
+                fake_count = cur.fetchone()[0]
+
+                # Flag geçişi koşullu UPDATE ile: sadece flagi ilk açan çağrı satırı günceller
+                cur.execute("""
+                    UPDATE flagged_wallets SET flagged = TRUE
+                    WHERE wallet_address = %s AND NOT COALESCE(flagged, FALSE) AND fake_count >= %s
+                """, (wallet_lower, flag_threshold))
+                if cur.rowcount == 1:
+                    newly_flagged.append((wallet_lower, fake_count))
+        return newly_flagged
+    except Exception as e:
+        print(f"⚠️ Fake alert yazma hatası: {e}")
+        return None
+
+
+@_instrumented
+def is_flagged_wallet_db(address: str) -> bool:
+    """Cüzdan flagli mi? (PK lookup)"""
+    if not is_db_available():
+        return False
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT flagged FROM flagged_wallets WHERE wallet_address = %s", (address.lower(),))
+        row = cur.fetchone()
+        cur.close()
+        return bool(row and row[0])
+    except Exception as e:
+        print(f"⚠️ Flag kontrol hatası: {e}")
+        return False
 
 
-# =============================================================================
-# FAKE ALERTS
-# =============================================================================
+@_instrumented
+def get_wallet_fake_count_db(address: str) -> int:
+    """Cüzdanın fake alert sayısı."""
+    if not is_db_available():
+        return 0
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT fake_count FROM flagged_wallets WHERE wallet_address = %s", (address.lower(),))
+        row = cur.fetchone()
+        cur.close()
+        return (row[0] or 0) if row else 0
+    except Exception as e:
+        print(f"⚠️ Fake count okuma hatası: {e}")
+        return 0
 
-def load_fake_alerts_db() -> dict:
-    """Fake alerts'ı DB'den yükle."""
+
+@_instrumented
+def get_flagged_wallets_db() -> list:
+    """Tüm flagli cüzdan adresleri."""
     if not is_db_available():
-        return None
-    return _load_from_db("fake_alerts")
+        return []
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT wallet_address FROM flagged_wallets WHERE flagged = TRUE")
+        rows = cur.fetchall()
+        cur.close()
+        return [r[0] for r in rows]
+    except Exception as e:
+        print(f"⚠️ Flagli cüzdan okuma hatası: {e}")
+        return []
 
 
-def save_fake_alerts_db(data: dict) -> bool:
-    """Fake alerts'ı DB'ye kaydet."""
+@_instrumented
+def cleanup_fake_alert_events_db(days: int = 30) -> int:
+    """Eski fake alert olaylarını sil (sayaçlar korunur)."""
     if not is_db_available():
-        return False
-    return _save_to_db("fake_alerts", data)
+        return 0
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM fake_alert_events WHERE created_at < NOW() - INTERVAL '%s days'
+        """, (days,))
+        count = cur.rowcount
+        cur.close()
+        return count
+    except Exception as e:
+        print(f"⚠️ Fake alert cleanup hatası: {e}")
+        return 0
 
 
 # =============================================================================
 # REAL PORTFOLIO
 # =============================================================================
 
+@_instrumented
 def load_real_portfolio_db() -> dict:
     """Gerçek trading portföyünü DB'den yükle."""
     if not is_db_available():
         return None
-    return _load_from_db("real_portfolio")
+    return _load_portfolio_rows("real")
 
 
+@_instrumented
 def save_real_portfolio_db(data: dict) -> bool:
-    """Gerçek trading portföyünü DB'ye kaydet."""
+    """Gerçek trading portföyünün tamamını DB'ye kaydet."""
     if not is_db_available():
         return False
-    return _save_to_db("real_portfolio", data)
-
+    return _sync_portfolio_rows("real", data)
 
 # =============================================================================
 # TRADE SIGNALS (Trading bot ile iletişim kuyruğu)
 # =============================================================================
 
+@_instrumented
 def save_trade_signal(token_address: str, token_symbol: str, entry_mcap: int,
                       trigger_type: str, wallet_count: int = 1, status: str = None,
                       is_bullish: bool = False, wallets_involved: list = None) -> bool:
@@ -348,13 +1600,12 @@ def save_trade_signal(token_address: str, token_symbol: str, entry_mcap: int,
             status = "pending"
 
     try:
-        import psycopg2.extras
         cur = conn.cursor()
         cur.execute("""
             INSERT INTO trade_signals (token_address, token_symbol, entry_mcap, trigger_type, wallet_count, status, is_bullish, wallets_involved)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """, (token_address.lower(), token_symbol, entry_mcap, trigger_type, wallet_count, status,
-              is_bullish, psycopg2.extras.Json(wallets_involved) if wallets_involved else None))
+              is_bullish, Json(wallets_involved) if wallets_involved else None))
         cur.close()
         status_emoji = "🎯" if status == "pending_confirmation" else "📡"
         print(f"{status_emoji} Trade signal yazıldı: {token_symbol} ({trigger_type}) → {status}")
@@ -364,6 +1615,7 @@ def save_trade_signal(token_address: str, token_symbol: str, entry_mcap: int,
         return False
 
 
+@_instrumented
 def get_pending_signals(max_age_seconds: int = 300) -> list:
     """Pending durumundaki sinyalleri al (max 5dk eski)."""
     conn = get_connection()
@@ -399,6 +1651,7 @@ def get_pending_signals(max_age_seconds: int = 300) -> list:
         return []
 
 
+@_instrumented
 def update_signal_status(signal_id: int, status: str, trade_result: dict = None) -> bool:
     """Sinyal durumunu güncelle (processing, executed, failed, skipped)."""
     conn = get_connection()
@@ -426,6 +1679,7 @@ def update_signal_status(signal_id: int, status: str, trade_result: dict = None)
         return False
 
 
+@_instrumented
 def expire_old_signals(max_age_seconds: int = 300) -> int:
     """5dk'dan eski pending sinyalleri 'skipped' olarak işaretle.
     pending_confirmation sinyalleri 10dk'da expire olur (MCap check süresi).
@@ -475,6 +1729,7 @@ def expire_old_signals(max_age_seconds: int = 300) -> int:
         return 0
 
 
+@_instrumented
 def is_duplicate_signal(token_address: str, cooldown_seconds: int = 300) -> bool:
     """Aynı token için son 5dk içinde sinyal var mı? (dedup)"""
     conn = get_connection()
@@ -501,6 +1756,7 @@ def is_duplicate_signal(token_address: str, cooldown_seconds: int = 300) -> bool
 # WALLET ACTIVITY (Smartest wallet scorer için)
 # =============================================================================
 
+@_instrumented
 def save_wallet_activity(wallet_address: str, token_address: str, token_symbol: str,
                          block_number: int, is_early: bool = False, alert_mcap: int = 0) -> bool:
     """Cüzdan alım aktivitesini kaydet."""
@@ -535,6 +1791,7 @@ def save_wallet_activity(wallet_address: str, token_address: str, token_symbol:
         return False
 
 
+@_instrumented
 def get_wallet_activity_summary(wallet_address: str, days: int = 30) -> dict:
     """Cüzdanın son N gündeki aktivite özeti."""
     conn = get_connection()
@@ -560,6 +1817,7 @@ def get_wallet_activity_summary(wallet_address: str, days: int = 30) -> dict:
         return {"unique_tokens": 0, "early_hits": 0, "early_hit_rate": 0.0}
 
 
+@_instrumented
 def get_weekly_token_count(wallet_address: str) -> int:
     """Cüzdanın son 7 gündeki benzersiz token alım sayısı."""
     conn = get_connection()
@@ -578,6 +1836,7 @@ def get_weekly_token_count(wallet_address: str) -> int:
         return 0
 
 
+@_instrumented
 def get_all_early_wallets(min_early_count: int = 3, days: int = 30) -> list:
     """Early buy sayısı eşiği geçen tüm cüzdanları getir."""
     conn = get_connection()
@@ -603,6 +1862,54 @@ def get_all_early_wallets(min_early_count: int = 3, days: int = 30) -> list:
         return []
 
 
+@_instrumented
+def get_early_wallet_stats(min_early_count: int = 3, days: int = 30) -> list:
+    """
+    Tüm aday cüzdanların skorlama metriklerini tek sorguda getir
+    (cüzdan başına get_wallet_activity_summary + get_weekly_token_count yerine).
+
+    Returns:
+        list: [{"wallet", "early_hits", "unique_tokens", "early_hit_rate", "weekly_tokens"}, ...]
+    """
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT wallet_address,
+                   COUNT(DISTINCT token_address) FILTER (
+                       WHERE is_early AND created_at > NOW() - INTERVAL '%s days') as early_hits,
+                   COUNT(DISTINCT token_address) FILTER (
+                       WHERE created_at > NOW() - INTERVAL '%s days') as unique_tokens,
+                   COUNT(DISTINCT token_address) FILTER (
+                       WHERE created_at > NOW() - INTERVAL '7 days') as weekly_tokens
+            FROM wallet_activity
+            WHERE created_at > NOW() - INTERVAL '%s days'
+            GROUP BY wallet_address
+            HAVING COUNT(DISTINCT token_address) FILTER (
+                       WHERE is_early AND created_at > NOW() - INTERVAL '%s days') >= %s
+        """, (days, days, max(days, 7), days, min_early_count))
+        rows = cur.fetchall()
+        cur.close()
+        result = []
+        for r in rows:
+            early = r[1] or 0
+            unique = r[2] or 0
+            result.append({
+                "wallet": r[0],
+                "early_hits": early,
+                "unique_tokens": unique,
+                "early_hit_rate": round(early / unique, 3) if unique > 0 else 0.0,
+                "weekly_tokens": r[3] or 0,
+            })
+        return result
+    except Exception as e:
+        print(f"⚠️ Early wallet stats okuma hatası: {e}")
+        return []
+
+
+@_instrumented
 def save_alert_snapshot(token_address: str, token_symbol: str, alert_mcap: int,
                         alert_block: int, wallet_count: int, first_sm_block: int,
                         early_buyers_found: int = 0, wallets_involved: list = None) -> bool:
@@ -611,14 +1918,14 @@ def save_alert_snapshot(token_address: str, token_symbol: str, alert_mcap: int,
     if not conn:
         return False
     try:
-        wallets_str = ",".join(wallets_involved) if wallets_involved else ""
+        wallets = [w.lower() for w in (wallets_involved or []) if w]
         cur = conn.cursor()
         cur.execute("""
             INSERT INTO alert_snapshots (token_address, token_symbol, alert_mcap, alert_block,
-                                         wallet_count, first_sm_block, early_buyers_found, wallets_involved)
+                                         wallet_count, first_sm_block, early_buyers_found, wallets)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """, (token_address.lower(), token_symbol, alert_mcap, alert_block,
-              wallet_count, first_sm_block, early_buyers_found, wallets_str))
+              wallet_count, first_sm_block, early_buyers_found, wallets))
         cur.close()
         return True
     except Exception as e:
@@ -626,10 +1933,164 @@ def save_alert_snapshot(token_address: str, token_symbol: str, alert_mcap: int,
         return False
 
 
+def _backfill_snapshot_wallets(batch_size: int = 1000) -> int:
+    """
+    Eski virgüllü wallets_involved değerlerini wallets (text[]) kolonuna taşı.
+    Uzun kilit tutmamak için batch'ler halinde; tamamlanmış satırlara dokunmaz.
+    """
+    conn = get_connection()
+    if not conn:
+        return 0
+    total = 0
+    if _IS_SQLITE:
+        return _backfill_snapshot_wallets_sqlite(conn, batch_size)
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute("""
+                UPDATE alert_snapshots
+                SET wallets = array_remove(string_to_array(lower(replace(wallets_involved, ' ', '')), ','), '')
+                WHERE (id, created_at) IN (
+                    SELECT id, created_at FROM alert_snapshots
+                    WHERE wallets IS NULL AND wallets_involved IS NOT NULL AND wallets_involved != ''
+                    LIMIT %s
+                )
+            """, (batch_size,))
+            if cur.rowcount <= 0:
+                break
+            total += cur.rowcount
+        cur.close()
+        if total > 0:
+            print(f"🔄 alert_snapshots: {total} satırın wallets kolonu dolduruldu")
+        return total
+    except Exception as e:
+        print(f"⚠️ Snapshot wallets backfill hatası: {e}")
+        return total
+
+
+def _backfill_snapshot_wallets_sqlite(conn, batch_size: int) -> int:
+    """SQLite: string_to_array yok, dönüşüm Python'da (yine batch'ler halinde)."""
+    total = 0
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute("""
+                SELECT id, wallets_involved FROM alert_snapshots
+                WHERE wallets IS NULL AND wallets_involved IS NOT NULL AND wallets_involved != ''
+                LIMIT %s
+            """, (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            with _transaction(conn) as tcur:
+                for row_id, wallets_str in rows:
+                    wallets = [w.strip().lower() for w in wallets_str.split(",") if w.strip()]
+                    tcur.execute("UPDATE alert_snapshots SET wallets = %s WHERE id = %s", (wallets, row_id))
+            total += len(rows)
+        cur.close()
+        if total > 0:
+            print(f"🔄 alert_snapshots: {total} satırın wallets kolonu dolduruldu")
+        return total
+    except Exception as e:
+        print(f"⚠️ Snapshot wallets backfill hatası: {e}")
+        return total
+
+
+# SQLite'ta text[] yerine JSON dizisi: üyelik ve unnest json_each ile
+_WALLET_MEMBER_SQL = (
+    "EXISTS (SELECT 1 FROM json_each(wallets) WHERE value = %s)"
+    if _IS_SQLITE else "wallets @> ARRAY[%s]::text[]"
+)
+_WALLET_UNNEST_SQL = (
+    "alert_snapshots s, json_each(s.wallets) AS w"
+    if _IS_SQLITE else "alert_snapshots s, unnest(s.wallets) AS w(wallet)"
+)
+_WALLET_UNNEST_COL = "w.value" if _IS_SQLITE else "w.wallet"
+
+
+@_instrumented
+def get_wallet_alerts(wallet_address: str, days: int = None) -> list:
+    """Cüzdanın katıldığı alertler (GIN index: wallets @> ARRAY[wallet])."""
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        cur = conn.cursor()
+        sql = f"""
+            SELECT id, token_address, token_symbol, alert_mcap, wallet_count, created_at
+            FROM alert_snapshots
+            WHERE {_WALLET_MEMBER_SQL}
+        """
+        params = [wallet_address.lower()]
+        if days is not None:
+            sql += " AND created_at > NOW() - INTERVAL '%s days'"
+            params.append(days)
+        cur.execute(sql + " ORDER BY created_at ASC", tuple(params))
+        rows = cur.fetchall()
+        cur.close()
+        return [{
+            "id": r[0], "token_address": r[1], "token_symbol": r[2],
+            "alert_mcap": r[3], "wallet_count": r[4],
+            "created_at": r[5].isoformat() if r[5] else None,
+        } for r in rows]
+    except Exception as e:
+        print(f"⚠️ Wallet alerts okuma hatası: {e}")
+        return []
+
+
+@_instrumented
+def get_wallet_participation_counts(wallets: list = None, days: int = None) -> dict:
+    """
+    Cüzdan başına alert katılım sayıları (SQL tarafında unnest + GROUP BY).
+
+    Returns:
+        dict: {wallet: {"alert_count": int, "token_count": int, "last_alert": str}}
+    """
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        cur = conn.cursor()
+        where = ["wallets IS NOT NULL"]
+        params = []
+        if wallets and not _IS_SQLITE:
+            # && (overlap) GIN index ile sadece ilgili snapshot'ları okur
+            where.append("wallets && %s::text[]")
+            params.append([w.lower() for w in wallets])
+        if days is not None:
+            where.append("created_at > NOW() - INTERVAL '%s days'")
+            params.append(days)
+        sql = f"""
+            SELECT {_WALLET_UNNEST_COL}, COUNT(*), COUNT(DISTINCT s.token_address), MAX(s.created_at)
+            FROM {_WALLET_UNNEST_SQL}
+            WHERE {' AND '.join('s.' + c for c in where)}
+        """
+        if wallets:
+            if _IS_SQLITE:
+                sql += f" AND {_WALLET_UNNEST_COL} IN (SELECT value FROM json_each(%s))"
+            else:
+                sql += f" AND {_WALLET_UNNEST_COL} = ANY(%s)"
+            params.append([w.lower() for w in wallets])
+        cur.execute(sql + f" GROUP BY {_WALLET_UNNEST_COL}", tuple(params))
+        rows = cur.fetchall()
+        cur.close()
+        return {
+            r[0]: {
+                "alert_count": r[1],
+                "token_count": r[2],
+                "last_alert": r[3].isoformat() if r[3] else None,
+            } for r in rows
+        }
+    except Exception as e:
+        print(f"⚠️ Wallet participation count okuma hatası: {e}")
+        return {}
+
+
 # =============================================================================
 # TOKEN EVALUATIONS (Alert kalite analizi için)
 # =============================================================================
 
+@_instrumented
 def init_token_evaluations():
     """token_evaluations tablosunu oluştur."""
     conn = get_connection()
@@ -663,6 +2124,7 @@ def init_token_evaluations():
         return False
 
 
+@_instrumented
 def save_token_evaluation(token_address: str, token_symbol: str, alert_mcap: int,
                           wallets_involved: list = None, alert_time: str = None,
                           mcap_5min: int = None, mcap_30min: int = None,
@@ -729,152 +2191,432 @@ def save_token_evaluation(token_address: str, token_symbol: str, alert_mcap: int
         return False
 
 
-def get_all_token_evaluations() -> list:
-    """Tüm token değerlendirmelerini getir."""
+@_instrumented
+def update_token_price_extremes(entries: list) -> list:
+    """
+    price_tracker sonuçlarını token_evaluations'a tek transaction'da yaz.
+    entries: [{token_address, alert_time, max_mcap, min_mcap, time_to_peak_sec}, ...]
+    ath_mcap sadece büyürse, min_mcap sadece küçülürse güncellenir.
+    Returns: satırı bulunan (yazılan) entry'lerin listesi; henüz
+    token_evaluations kaydı olmayanlar (ilk check öncesi) sonraki flush'a kalır.
+    """
     conn = get_connection()
-    if not conn:
+    if not conn or not entries:
         return []
+
+    written = []
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, token_address, token_symbol, alert_mcap, mcap_5min, mcap_30min,
-                   change_5min_pct, change_30min_pct, classification, wallets_involved, alert_time, created_at
-            FROM token_evaluations ORDER BY alert_time ASC
-        """)
-        rows = cur.fetchall()
-        cur.close()
-        return [{
-            "id": r[0], "token_address": r[1], "token_symbol": r[2],
-            "alert_mcap": r[3], "mcap_5min": r[4], "mcap_30min": r[5],
-            "change_5min_pct": r[6], "change_30min_pct": r[7],
-            "classification": r[8], "wallets_involved": r[9],
-            "alert_time": r[10].isoformat() if r[10] else None,
-            "created_at": r[11].isoformat() if r[11] else None
-        } for r in rows]
-    except Exception as e:
-        print(f"⚠️ Token evaluations okuma hatası: {e}")
+        with _transaction(conn) as cur:
+            for e in entries:
+                cur.execute("""
+                    UPDATE token_evaluations SET
+                        time_to_peak_sec = CASE WHEN COALESCE(ath_mcap, 0) < %s THEN %s ELSE time_to_peak_sec END,
+                        ath_mcap = CASE WHEN COALESCE(ath_mcap, 0) < %s THEN %s ELSE ath_mcap END,
+                        min_mcap = CASE WHEN min_mcap IS NULL OR min_mcap > %s THEN %s ELSE min_mcap END
+                    WHERE token_address = %s AND alert_time = %s
+                """, (e["max_mcap"], e["time_to_peak_sec"], e["max_mcap"], e["max_mcap"],
+                      e["min_mcap"], e["min_mcap"], e["token_address"].lower(), e["alert_time"]))
+                if cur.rowcount > 0:
+                    written.append(e)
+        return written
+    except Exception as ex:
+        print(f"⚠️ Fiyat takibi yazma hatası: {ex}")
         return []
 
 
 # =============================================================================
-# ALERT SNAPSHOT & TRADE SIGNAL QUERIES (Tarihsel analiz)
+# MCAP CHECK KUYRUĞU (mcap_checker için kalıcı zamanlama)
 # =============================================================================
+# Her planlanmış kontrol bir satır: status = pending → claimed → done / failed.
+# Claim tek UPDATE ile yapılır (WHERE status='pending' ...) → aynı anda çalışan
+# eski + yeni instance'tan sadece biri kazanır. Aynı sahibin tekrar claim'i True
+# döner (idempotent); MCAP_CHECK_CLAIM_TIMEOUT'u aşan claim'ler tekrar alınabilir.
+
+def _create_mcap_checks_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS mcap_checks (
+            id SERIAL PRIMARY KEY,
+            token_address VARCHAR(42) NOT NULL,
+            token_symbol VARCHAR(20),
+            alert_mcap BIGINT,
+            wallets_involved JSONB,
+            alert_time VARCHAR(40),
+            check_type VARCHAR(10) NOT NULL,
+            check_at DOUBLE PRECISION NOT NULL,
+            threshold DOUBLE PRECISION,
+            status VARCHAR(10) DEFAULT 'pending',
+            claimed_by VARCHAR(64),
+            claimed_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_mc_unique
+        ON mcap_checks(token_address, alert_time, check_type)
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_mc_status_at ON mcap_checks(status, check_at)")
+
+
+@_instrumented
+def save_mcap_checks(checks: list) -> dict:
+    """
+    Planlanan kontrolleri tek INSERT ile yaz.
+    Returns: {check_type: id} (zaten kayıtlı olanlar atlanır) veya DB yoksa {}.
+    """
+    conn = get_connection()
+    if not conn or not checks:
+        return {}
 
-def get_all_alert_snapshots() -> list:
-    """Tüm alert snapshot'ları getir (tarihsel analiz için)."""
+    try:
+        values = []
+        params = []
+        for c in checks:
+            values.append("(%s, %s, %s, %s, %s, %s, %s, %s)")
+            params.extend([
+                c["token_address"].lower(), c.get("token_symbol"), c.get("alert_mcap"),
+                Json(c.get("wallets_involved") or []), str(c.get("alert_time")),
+                c["check_type"], c["check_at"], c.get("threshold"),
+            ])
+        cur = conn.cursor()
+        cur.execute(f"""
+            INSERT INTO mcap_checks
+                (token_address, token_symbol, alert_mcap, wallets_involved, alert_time,
+                 check_type, check_at, threshold)
+            VALUES {", ".join(values)}
+            ON CONFLICT DO NOTHING
+            RETURNING id, check_type
+        """, tuple(params))
+        ids = {r[1]: r[0] for r in cur.fetchall()}
+        cur.close()
+        return ids
+    except Exception as e:
+        print(f"⚠️ MCap check kayıt hatası: {e}")
+        return {}
+
+
+@_instrumented
+def load_pending_mcap_checks() -> list:
+    """Bekleyen (veya claim'i zaman aşımına uğramış) kontrolleri check_at sırasıyla oku."""
     conn = get_connection()
     if not conn:
         return []
+
     try:
         cur = conn.cursor()
         cur.execute("""
-            SELECT id, token_address, token_symbol, alert_mcap, alert_block,
-                   wallet_count, first_sm_block, early_buyers_found, created_at,
-                   COALESCE(wallets_involved, '')
-            FROM alert_snapshots ORDER BY created_at ASC
-        """)
+            SELECT id, token_address, token_symbol, alert_mcap, wallets_involved, alert_time,
+                   check_type, check_at, threshold
+            FROM mcap_checks
+            WHERE status = 'pending'
+               OR (status = 'claimed' AND claimed_at <= NOW() - INTERVAL '%s seconds')
+            ORDER BY check_at
+        """, (MCAP_CHECK_CLAIM_TIMEOUT,))
         rows = cur.fetchall()
         cur.close()
         return [{
-            "id": r[0], "token_address": r[1], "token_symbol": r[2],
-            "alert_mcap": r[3], "alert_block": r[4], "wallet_count": r[5],
-            "first_sm_block": r[6], "early_buyers_found": r[7],
-            "created_at": r[8].isoformat() if r[8] else None,
-            "wallets_involved": [w for w in r[9].split(",") if w] if r[9] else [],
+            "id": r[0],
+            "token_address": r[1],
+            "token_symbol": r[2],
+            "alert_mcap": r[3] or 0,
+            "wallets_involved": _json_value(r[4]) or [],
+            "alert_time": r[5],
+            "check_type": r[6],
+            "check_at": float(r[7]),
+            "threshold": r[8],
         } for r in rows]
     except Exception as e:
-        print(f"⚠️ Alert snapshots okuma hatası: {e}")
+        print(f"⚠️ MCap check okuma hatası: {e}")
         return []
 
 
-def get_all_trade_signals_history() -> list:
-    """Tüm trade signal geçmişini getir."""
+@_instrumented
+def claim_mcap_check(check_id: int, owner: str) -> bool:
+    """
+    Kontrolü bu instance adına al. Başka instance almışsa False.
+    Aynı owner tekrar çağırırsa True (idempotent). DB hatasında None (tekrar denenmeli).
+    """
     conn = get_connection()
     if not conn:
-        return []
+        return True  # DB yok → tek instance, bellekteki kuyruk yeterli
+
     try:
         cur = conn.cursor()
         cur.execute("""
-            SELECT id, token_address, token_symbol, entry_mcap, trigger_type,
-                   wallet_count, status, created_at, processed_at, trade_result
-            FROM trade_signals ORDER BY created_at ASC
-        """)
-        rows = cur.fetchall()
+            UPDATE mcap_checks
+            SET status = 'claimed', claimed_by = %s, claimed_at = NOW()
+            WHERE id = %s
+              AND (status = 'pending'
+                   OR (status = 'claimed' AND claimed_by = %s)
+                   OR (status = 'claimed' AND claimed_at <= NOW() - INTERVAL '%s seconds'))
+        """, (owner, check_id, owner, MCAP_CHECK_CLAIM_TIMEOUT))
+        claimed = cur.rowcount == 1
         cur.close()
-        return [{
-            "id": r[0], "token_address": r[1], "token_symbol": r[2],
-            "entry_mcap": r[3], "trigger_type": r[4], "wallet_count": r[5],
-            "status": r[6],
-            "created_at": r[7].isoformat() if r[7] else None,
-            "processed_at": r[8].isoformat() if r[8] else None,
-            "trade_result": r[9]
-        } for r in rows]
+        return claimed
     except Exception as e:
-        print(f"⚠️ Trade signals history okuma hatası: {e}")
-        return []
+        print(f"⚠️ MCap check claim hatası: {e}")
+        return None
 
 
-def get_wallet_alert_participation() -> list:
-    """Her cüzdanın hangi alertlere katıldığını getir."""
+@_instrumented
+def complete_mcap_check(check_id: int, owner: str, status: str = "done") -> bool:
+    """Claim edilmiş kontrolü sonuçlandır (done / failed)."""
     conn = get_connection()
     if not conn:
-        return []
+        return False
+
     try:
         cur = conn.cursor()
         cur.execute("""
-            SELECT wallet_address, token_address, token_symbol, alert_mcap, created_at
-            FROM wallet_activity
-            ORDER BY wallet_address, created_at ASC
-        """)
-        rows = cur.fetchall()
+            UPDATE mcap_checks
+            SET status = %s, completed_at = NOW()
+            WHERE id = %s AND claimed_by = %s
+        """, (status, check_id, owner))
+        done = cur.rowcount == 1
         cur.close()
-        return [{
-            "wallet_address": r[0], "token_address": r[1], "token_symbol": r[2],
-            "alert_mcap": r[3],
-            "created_at": r[4].isoformat() if r[4] else None
-        } for r in rows]
+        return done
     except Exception as e:
-        print(f"⚠️ Wallet alert participation okuma hatası: {e}")
-        return []
+        print(f"⚠️ MCap check tamamlama hatası: {e}")
+        return False
 
 
-def get_wallet_participation_from_snapshots() -> list:
-    """Alert snapshot'lardan her cüzdanın hangi alertlere katıldığını çıkar."""
+@_instrumented
+def cleanup_old_mcap_checks(days: int = 7) -> int:
+    """Sonuçlanmış eski kontrol satırlarını sil."""
     conn = get_connection()
     if not conn:
-        return []
+        return 0
+
     try:
         cur = conn.cursor()
         cur.execute("""
-            SELECT token_address, token_symbol, wallets_involved, created_at
-            FROM alert_snapshots
-            WHERE wallets_involved IS NOT NULL AND wallets_involved != ''
-            ORDER BY created_at ASC
-        """)
-        rows = cur.fetchall()
+            DELETE FROM mcap_checks
+            WHERE status IN ('done', 'failed')
+              AND completed_at < NOW() - INTERVAL '%s days'
+        """, (days,))
+        deleted = cur.rowcount
         cur.close()
+        if deleted > 0:
+            print(f"🧹 {deleted} eski mcap_checks kaydı silindi")
+        return deleted
+    except Exception as e:
+        print(f"⚠️ MCap check temizlik hatası: {e}")
+        return 0
 
-        results = []
-        for r in rows:
-            token_addr = r[0]
-            token_symbol = r[1]
-            wallets_str = r[2] or ""
-            created_at = r[3]
-            for wallet in wallets_str.split(","):
-                wallet = wallet.strip().lower()
-                if wallet:
-                    results.append({
-                        "wallet_address": wallet,
-                        "token_address": token_addr,
-                        "token_symbol": token_symbol,
-                        "created_at": created_at.isoformat() if created_at else None,
-                    })
-        return results
+
+# =============================================================================
+# STREAMING OKUYUCULAR (server-side cursor — tam geçmiş için sabit bellek)
+# =============================================================================
+# get_all_* fonksiyonları tüm tabloyu fetchall() ile RAM'e alır. iter_* varyantları
+# named cursor ile fetch_size'lık parçalar halinde satır üretir; tüketici satırı
+# işleyip bıraktıkça tepe bellek geçmiş büyüdükçe artmaz (256MB instance).
+
+_stream_counter = itertools.count(1)
+
+
+def _stream_query(sql: str, params: tuple = (), fetch_size: int = None, label: str = "stream"):
+    """Named (server-side) cursor ile satırları parça parça üret."""
+    conn = get_connection()
+    if not conn:
+        return
+    # autocommit bağlantıda named cursor için withhold=True gerekli
+    cur = conn.cursor(name=f"{label}_{next(_stream_counter)}", withhold=True)
+    cur.itersize = fetch_size or DB_STREAM_FETCH_SIZE
+    try:
+        cur.execute(sql, params)
+        for row in cur:
+            yield row
     except Exception as e:
-        print(f"⚠️ Snapshot wallet participation okuma hatası: {e}")
-        return []
+        print(f"⚠️ {label} stream okuma hatası: {e}")
+    finally:
+        try:
+            cur.close()
+        except Exception:
+            pass
+
+
+def _build_stream_sql(table: str, available: dict, columns, time_column: str,
+                      since: datetime = None, days: int = None,
+                      extra_where: list = None, order_by: str = None,
+                      limit: int = None) -> tuple:
+    """
+    Projeksiyon + zaman penceresi ile SELECT oluştur.
+
+    Returns:
+        (sql, params, names): names = projekte edilen çıktı alanları
+    """
+    names = list(columns) if columns else list(available.keys())
+    unknown = [n for n in names if n not in available]
+    if unknown:
+        raise ValueError(f"{table}: bilinmeyen kolon(lar) {unknown}")
+
+    where = list(extra_where or [])
+    params = []
+    if since is not None:
+        where.append(f"{time_column} >= %s")
+        params.append(since)
+    if days is not None:
+        where.append(f"{time_column} > NOW() - INTERVAL '%s days'")
+        params.append(days)
+
+    sql = f"SELECT {', '.join(available[n] for n in names)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    return sql, tuple(params), names
+
+
+def _row_to_dict(names: list, row: tuple) -> dict:
+    """Satırı dict'e çevir (datetime → isoformat)."""
+    return {
+        n: (v.isoformat() if isinstance(v, datetime) else v)
+        for n, v in zip(names, row)
+    }
+
+
+_TOKEN_EVALUATION_COLUMNS = {
+    "id": "id", "token_address": "token_address", "token_symbol": "token_symbol",
+    "alert_mcap": "alert_mcap", "mcap_5min": "mcap_5min", "mcap_30min": "mcap_30min",
+    "change_5min_pct": "change_5min_pct", "change_30min_pct": "change_30min_pct",
+    "classification": "classification", "wallets_involved": "wallets_involved",
+    "alert_time": "alert_time", "created_at": "created_at",
+    "ath_mcap": "ath_mcap", "min_mcap": "min_mcap", "time_to_peak_sec": "time_to_peak_sec",
+}
+
+_ALERT_SNAPSHOT_COLUMNS = {
+    "id": "id", "token_address": "token_address", "token_symbol": "token_symbol",
+    "alert_mcap": "alert_mcap", "alert_block": "alert_block", "wallet_count": "wallet_count",
+    "first_sm_block": "first_sm_block", "early_buyers_found": "early_buyers_found",
+    "created_at": "created_at",
+    "wallets_involved": (
+        "COALESCE(wallets, '[]')" if _IS_SQLITE
+        else "COALESCE(wallets, string_to_array(NULLIF(wallets_involved, ''), ','), '{}')"
+    ),
+}
+
+_TRADE_SIGNAL_HISTORY_COLUMNS = {
+    "id": "id", "token_address": "token_address", "token_symbol": "token_symbol",
+    "entry_mcap": "entry_mcap", "trigger_type": "trigger_type", "wallet_count": "wallet_count",
+    "status": "status", "created_at": "created_at", "processed_at": "processed_at",
+    "trade_result": "trade_result",
+}
+
+_WALLET_PARTICIPATION_COLUMNS = {
+    "wallet_address": "wallet_address", "token_address": "token_address",
+    "token_symbol": "token_symbol", "alert_mcap": "alert_mcap", "is_early": "is_early",
+    "created_at": "created_at",
+}
+
+
+@_instrumented
+def iter_token_evaluations(columns: list = None, since: datetime = None, days: int = None,
+                           fetch_size: int = None):
+    """Token değerlendirmelerini alert_time sırasıyla stream et."""
+    sql, params, names = _build_stream_sql(
+        "token_evaluations", _TOKEN_EVALUATION_COLUMNS, columns, "alert_time",
+        since=since, days=days, order_by="alert_time ASC",
+    )
+    for row in _stream_query(sql, params, fetch_size, "token_evaluations"):
+        yield _row_to_dict(names, row)
+
+
+@_instrumented
+def iter_alert_snapshots(columns: list = None, since: datetime = None, days: int = None,
+                         fetch_size: int = None, limit: int = None):
+    """Alert snapshot'ları created_at sırasıyla stream et."""
+    sql, params, names = _build_stream_sql(
+        "alert_snapshots", _ALERT_SNAPSHOT_COLUMNS, columns, "created_at",
+        since=since, days=days, order_by="created_at ASC", limit=limit,
+    )
+    for row in _stream_query(sql, params, fetch_size, "alert_snapshots"):
+        yield _row_to_dict(names, row)
+
+
+@_instrumented
+def iter_trade_signals_history(columns: list = None, since: datetime = None, days: int = None,
+                               fetch_size: int = None):
+    """Trade signal geçmişini created_at sırasıyla stream et."""
+    sql, params, names = _build_stream_sql(
+        "trade_signals", _TRADE_SIGNAL_HISTORY_COLUMNS, columns, "created_at",
+        since=since, days=days, order_by="created_at ASC",
+    )
+    for row in _stream_query(sql, params, fetch_size, "trade_signals_history"):
+        yield _row_to_dict(names, row)
+
+
+@_instrumented
+def iter_wallet_alert_participation(columns: list = None, since: datetime = None, days: int = None,
+                                    fetch_size: int = None, wallet_address: str = None):
+    """Cüzdan-alert katılımlarını (wallet_activity) stream et."""
+    extra_where = []
+    params_prefix = ()
+    if wallet_address:
+        extra_where.append("wallet_address = %s")
+        params_prefix = (wallet_address.lower(),)
+    sql, params, names = _build_stream_sql(
+        "wallet_activity", _WALLET_PARTICIPATION_COLUMNS, columns, "created_at",
+        since=since, days=days, extra_where=extra_where,
+        order_by="wallet_address, created_at ASC",
+    )
+    for row in _stream_query(sql, params_prefix + params, fetch_size, "wallet_participation"):
+        yield _row_to_dict(names, row)
+
+
+@_instrumented
+def iter_wallet_participation_from_snapshots(since: datetime = None, days: int = None,
+                                             fetch_size: int = None):
+    """Alert snapshot'lardan (cüzdan, token) katılım satırlarını stream et (SQL unnest)."""
+    sql, params, names = _build_stream_sql(
+        _WALLET_UNNEST_SQL,
+        {"wallet_address": _WALLET_UNNEST_COL, "token_address": "s.token_address",
+         "token_symbol": "s.token_symbol", "created_at": "s.created_at"},
+        None, "s.created_at", since=since, days=days,
+        extra_where=["s.wallets IS NOT NULL"],
+        order_by="s.created_at ASC",
+    )
+    for row in _stream_query(sql, params, fetch_size, "snapshot_participation"):
+        yield _row_to_dict(names, row)
+
+
+@_instrumented
+def get_all_token_evaluations() -> list:
+    """Tüm token değerlendirmelerini getir (büyük geçmişte iter_token_evaluations tercih et)."""
+    return list(iter_token_evaluations())
+
+
+# =============================================================================
+# ALERT SNAPSHOT & TRADE SIGNAL QUERIES (Tarihsel analiz)
+# =============================================================================
+
+@_instrumented
+def get_all_alert_snapshots() -> list:
+    """Tüm alert snapshot'ları getir (tarihsel analiz için)."""
+    return list(iter_alert_snapshots())
+
+
+@_instrumented
+def get_all_trade_signals_history() -> list:
+    """Tüm trade signal geçmişini getir."""
+    return list(iter_trade_signals_history())
+
+
+@_instrumented
+def get_wallet_alert_participation() -> list:
+    """Her cüzdanın hangi alertlere katıldığını getir."""
+    return list(iter_wallet_alert_participation())
+
+
+@_instrumented
+def get_wallet_participation_from_snapshots() -> list:
+    """Alert snapshot'lardan her cüzdanın hangi alertlere katıldığını çıkar."""
+    return list(iter_wallet_participation_from_snapshots())
 
 
+@_instrumented
 def get_signal_by_token_recent(token_address: str, max_age_seconds: int = 600) -> dict:
     """Token adresi ile son 10dk içindeki pending/pending_confirmation sinyali bul."""
     conn = get_connection()
@@ -905,6 +2647,7 @@ def get_signal_by_token_recent(token_address: str, max_age_seconds: int = 600) -
         return None
 
 
+@_instrumented
 def approve_signal(signal_id: int, approval_data: dict = None) -> bool:
     """Pending_confirmation sinyalini 'approved' yap (5dk MCap check geçtikten sonra)."""
     conn = get_connection()
@@ -934,6 +2677,7 @@ def approve_signal(signal_id: int, approval_data: dict = None) -> bool:
         return False
 
 
+@_instrumented
 def get_approved_signals(max_age_seconds: int = 600) -> list:
     """Approved durumundaki sinyalleri al (Confirmation Sniper için)."""
     conn = get_connection()
@@ -960,6 +2704,7 @@ def get_approved_signals(max_age_seconds: int = 600) -> list:
         return []
 
 
+@_instrumented
 def expire_old_confirmation_signals(max_age_seconds: int = 600) -> int:
     """10dk'dan eski pending_confirmation sinyalleri 'skipped' yap (MCap check geçemedi)."""
     conn = get_connection()
@@ -984,17 +2729,23 @@ def expire_old_confirmation_signals(max_age_seconds: int = 600) -> int:
         return 0
 
 
+@_instrumented
 def cleanup_old_wallet_activity(days: int = 30) -> int:
-    """Eski wallet activity kayıtlarını temizle."""
+    """
+    Eski wallet activity kayıtlarını temizle.
+    Tamamen eski günler partition drop ile gider; kalan DELETE sadece sınır
+    günü + default partition'a dokunur (partition pruning).
+    """
     conn = get_connection()
     if not conn:
         return 0
     try:
+        count = drop_old_partitions("wallet_activity", days)
         cur = conn.cursor()
         cur.execute("""
             DELETE FROM wallet_activity WHERE created_at < NOW() - INTERVAL '%s days'
         """, (days,))
-        count = cur.rowcount
+        count += cur.rowcount
         cur.close()
         if count > 0:
             print(f"🗑️ {count} eski wallet activity kaydı temizlendi")
@@ -1004,6 +2755,40 @@ def cleanup_old_wallet_activity(days: int = 30) -> int:
         return 0
 
 
+@_instrumented
+def cleanup_old_alert_snapshots(days: int) -> int:
+    """Retention dışındaki alert snapshot partition'larını düşür (days <= 0 → saklanır)."""
+    if days <= 0:
+        return 0
+    count = drop_old_partitions("alert_snapshots", days)
+    if count > 0:
+        print(f"🗑️ {count} eski alert snapshot kaydı temizlendi")
+    return count
+
+
+# Alert + zaman olarak en yakın token_evaluations satırı (SQLite'ta LATERAL yok)
+_ALERTS_WITH_NEAREST_EVALUATION = """
+            FROM alert_snapshots a
+            LEFT JOIN (
+                SELECT s.id AS snapshot_id, t.alert_mcap, t.classification, t.ath_mcap,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY s.id
+                           ORDER BY ABS(julianday(t.alert_time) - julianday(s.created_at))
+                       ) AS rn
+                FROM alert_snapshots s
+                JOIN token_evaluations t ON t.token_address = s.token_address
+            ) te ON te.snapshot_id = a.id AND te.rn = 1""" if _IS_SQLITE else """
+            FROM alert_snapshots a
+            LEFT JOIN LATERAL (
+                SELECT alert_mcap, classification, ath_mcap
+                FROM token_evaluations
+                WHERE token_address = a.token_address
+                ORDER BY ABS(EXTRACT(EPOCH FROM (alert_time - a.created_at))) ASC
+                LIMIT 1
+            ) te ON true"""
+
+
+@_instrumented
 def get_alerts_by_date_range(start_utc: str, end_utc: str) -> list:
     """
     Belirli UTC tarih aralığındaki alert snapshot'larını getir.
@@ -1027,17 +2812,10 @@ def get_alerts_by_date_range(start_utc: str, end_utc: str) -> list:
                 a.created_at,
                 te.classification,
                 COALESCE(te.ath_mcap, 0) as ath_mcap
-            FROM alert_snapshots a
-            LEFT JOIN LATERAL (
-                SELECT alert_mcap, classification, ath_mcap
-                FROM token_evaluations
-                WHERE token_address = a.token_address
-                ORDER BY ABS(EXTRACT(EPOCH FROM (alert_time - a.created_at))) ASC
-                LIMIT 1
-            ) te ON true
+            {_ALERTS_WITH_NEAREST_EVALUATION}
             WHERE a.created_at >= %s AND a.created_at < %s
             ORDER BY a.created_at ASC
-        """, (start_utc, end_utc))
+        """.format(_ALERTS_WITH_NEAREST_EVALUATION=_ALERTS_WITH_NEAREST_EVALUATION), (start_utc, end_utc))
         rows = cur.fetchall()
         cur.close()
         return [{
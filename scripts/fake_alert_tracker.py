@@ -11,7 +11,11 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.settings import FAKE_ALERT_FLAG_THRESHOLD, DATA_RETENTION_DAYS
-from scripts.database import load_fake_alerts_db, save_fake_alerts_db, is_db_available
+from scripts.database import (
+    load_fake_alerts_db, save_fake_alerts_db, is_db_available,
+    record_fake_alert_db, is_flagged_wallet_db, get_flagged_wallets_db,
+    get_wallet_fake_count_db, cleanup_fake_alert_events_db,
+)
 
 # Data dosya yolu
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -60,6 +64,16 @@ def record_fake_alert(wallet_addresses: list, token_address: str, token_symbol:
         token_symbol: Token sembolu
         volume_24h: 24 saatlik hacim (USD)
     """
+    # DB varsa: 1 event insert + cüzdan başına 1 upsert (tüm dokümanı yeniden yazmadan)
+    if is_db_available():
+        flagged = record_fake_alert_db(wallet_addresses, token_address, token_symbol,
+                                       volume_24h, FAKE_ALERT_FLAG_THRESHOLD)
+        if flagged is not None:
+            for wallet_lower, fake_count in flagged:
+                print(f"  🚩 FLAGGED: {wallet_lower[:10]}... | {fake_count} fake alert")
+            print(f"  📝 Fake alert kaydedildi: {token_symbol} | Vol: ${volume_24h:.0f} | {len(wallet_addresses)} cuzdan")
+            return [w for w, _ in flagged]
+
     data = load_fake_alerts()
 
     # Alert loguna ekle
@@ -110,18 +124,24 @@ def record_fake_alert(wallet_addresses: list, token_address: str, token_symbol:
 
 def is_flagged_wallet(address: str) -> bool:
     """Cuzdanin flagli olup olmadigini kontrol et."""
+    if is_db_available():
+        return is_flagged_wallet_db(address)
     data = load_fake_alerts()
     return address.lower() in data.get("flagged_wallets", [])
 
 
 def get_flagged_wallets() -> list:
     """Tum flagli cuzdanlari dondur."""
+    if is_db_available():
+        return get_flagged_wallets_db()
     data = load_fake_alerts()
     return data.get("flagged_wallets", [])
 
 
 def get_wallet_fake_count(address: str) -> int:
     """Cuzdanin fake alert sayisini dondur."""
+    if is_db_available():
+        return get_wallet_fake_count_db(address)
     data = load_fake_alerts()
     w_data = data.get("wallets", {}).get(address.lower(), {})
     return w_data.get("fake_count", 0)
@@ -129,6 +149,12 @@ def get_wallet_fake_count(address: str) -> int:
 
 def cleanup_old_fake_alerts():
     """Eski fake alert loglarini temizle (DATA_RETENTION_DAYS gun oncesi)."""
+    if is_db_available():
+        removed = cleanup_fake_alert_events_db(DATA_RETENTION_DAYS)
+        if removed > 0:
+            print(f"  🧹 {removed} eski fake alert logu temizlendi")
+        return removed
+
     data = load_fake_alerts()
     cutoff = datetime.now() - timedelta(days=DATA_RETENTION_DAYS)
     cutoff_str = cutoff.isoformat()
@@ -0,0 +1,289 @@
+"""
+Log Cache - Token Transfer log'ları için diskte kalıcı segment cache.
+
+Bullish re-alert, yeniden değerlendirme ve keşif işleri aynı token'ın son
+~3600 bloğunu tekrar tekrar tarıyor. Bu modül taranmış aralıkları diskte tutar:
+- LOG_CACHE_DIR/<token>/<from>_<to>.seg → o aralıktaki tüm Transfer log'ları
+- Sabit boyutlu satırlar (blok, log index, tx hash, from, to, value), mmap ile okunur
+- İstek sadece cache'te olmayan boşlukları scan_logs ile çeker, segmentlerle birleştirir
+- Sadece head - LOG_CACHE_CONFIRMATIONS altındaki bloklar yazılır; reorg'a açık
+  kuyruk her istekte canlı çekilir, cache'e girmez
+- Token başına segment sayısı artınca bitişik segmentler tek dosyada birleştirilir;
+  birleştirme ortasında çökme çakışan segment bırakabilir, okuma (blok, log index)
+  ile tekilleştirir
+- Toplam boyut LOG_CACHE_MAX_MB'ı aşınca en uzun süre okunmamış segmentler silinir
+
+LOG_CACHE_DIR boşsa cache kapalıdır, her istek doğrudan taranır.
+Dönen kayıtlar: {"blockNumber", "logIndex", "transactionHash", "from", "to", "value"}
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+
+from web3 import Web3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import (
+    TRANSFER_EVENT_SIGNATURE, LOG_CACHE_DIR, LOG_CACHE_MAX_MB, LOG_CACHE_CONFIRMATIONS,
+)
+from scripts.log_scanner import scan_logs
+
+_MAGIC = b"TLS1"
+_HEADER = struct.Struct("<4sI")                  # magic, satır sayısı
+_ROW = struct.Struct("<II32s20s20s32s")          # blok, log index, tx hash, from, to, value
+_MAX_SEGMENTS_PER_TOKEN = 8
+
+_token_locks = {}
+_locks_guard = threading.Lock()
+_stats = {"hits": 0, "gap_fetches": 0, "blocks_from_cache": 0, "blocks_fetched": 0,
+          "blocks_live": 0, "evicted": 0}
+
+
+def _token_lock(token: str) -> threading.Lock:
+    with _locks_guard:
+        return _token_locks.setdefault(token, threading.Lock())
+
+
+def _token_dir(token: str) -> str:
+    return os.path.join(LOG_CACHE_DIR, token.lower())
+
+
+def _list_segments(token: str) -> list:
+    """Token'ın segmentleri: [(from_block, to_block, path)] (from'a göre sıralı)."""
+    tdir = _token_dir(token)
+    if not os.path.isdir(tdir):
+        return []
+    segments = []
+    for name in os.listdir(tdir):
+        if not name.endswith(".seg"):
+            continue
+        try:
+            lo, hi = name[:-4].split("_")
+            segments.append((int(lo), int(hi), os.path.join(tdir, name)))
+        except ValueError:
+            continue
+    return sorted(segments)
+
+
+def _gaps(segments: list, from_block: int, to_block: int) -> list:
+    """[from_block, to_block] içinde hiçbir segmentin kapsamadığı aralıklar."""
+    gaps = []
+    cursor = from_block
+    for lo, hi, _ in segments:
+        if hi < cursor or lo > to_block:
+            continue
+        if lo > cursor:
+            gaps.append((cursor, lo - 1))
+        cursor = max(cursor, hi + 1)
+        if cursor > to_block:
+            break
+    if cursor <= to_block:
+        gaps.append((cursor, to_block))
+    return gaps
+
+
+def _pad(raw: bytes, size: int) -> bytes:
+    raw = bytes(raw or b"")
+    return raw[-size:].rjust(size, b"\x00")
+
+
+def _encode_log(log) -> bytes:
+    topics = log["topics"]
+    return _ROW.pack(
+        log["blockNumber"],
+        log["logIndex"],
+        _pad(log["transactionHash"], 32),
+        _pad(topics[1], 20),
+        _pad(topics[2], 20),
+        _pad(log["data"], 32),
+    )
+
+
+def _decode_row(row: tuple) -> dict:
+    block, log_index, tx_hash, from_addr, to_addr, value = row
+    return {
+        "blockNumber": block,
+        "logIndex": log_index,
+        "transactionHash": "0x" + tx_hash.hex(),
+        "from": "0x" + from_addr.hex(),
+        "to": "0x" + to_addr.hex(),
+        "value": int.from_bytes(value, "big"),
+    }
+
+
+def _write_segment(token: str, lo: int, hi: int, rows: list):
+    """Segmenti atomik yaz (tmp + rename)."""
+    tdir = _token_dir(token)
+    os.makedirs(tdir, exist_ok=True)
+    path = os.path.join(tdir, f"{lo}_{hi}.seg")
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(rows)))
+        f.write(b"".join(rows))
+    os.replace(tmp, path)
+
+
+def _read_segment(path: str, from_block: int, to_block: int) -> list:
+    """Segmentteki (aralık içi) ham satırları mmap ile oku."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, count = _HEADER.unpack_from(mm, 0)
+            if magic != _MAGIC or size < _HEADER.size + count * _ROW.size:
+                raise ValueError(f"Bozuk segment: {path}")
+            body = mm[_HEADER.size:_HEADER.size + count * _ROW.size]
+    os.utime(path)  # LRU eviction için son kullanım
+    return [r for r in _ROW.iter_unpack(body) if from_block <= r[0] <= to_block]
+
+
+def _compact(token: str):
+    """Bitişik segmentleri tek dosyada birleştir (segment sayısı limiti aşılınca)."""
+    segments = _list_segments(token)
+    if len(segments) <= _MAX_SEGMENTS_PER_TOKEN:
+        return
+    groups = []
+    for seg in segments:
+        if groups and seg[0] <= max(s[1] for s in groups[-1]) + 1:
+            groups[-1].append(seg)
+        else:
+            groups.append([seg])
+    for group in groups:
+        if len(group) < 2:
+            continue
+        lo, hi = group[0][0], max(s[1] for s in group)
+        rows = {}
+        for s_lo, s_hi, path in group:
+            for r in _read_segment(path, s_lo, s_hi):
+                rows[(r[0], r[1])] = r
+        _write_segment(token, lo, hi, [_ROW.pack(*rows[k]) for k in sorted(rows)])
+        for _, _, path in group:
+            if os.path.basename(path) != f"{lo}_{hi}.seg":
+                os.remove(path)
+
+
+def _evict():
+    """Cache boyutu LOG_CACHE_MAX_MB'ı aşarsa en eski kullanılan segmentleri sil."""
+    limit = LOG_CACHE_MAX_MB * 1024 * 1024
+    files = []
+    total = 0
+    for root, _, names in os.walk(LOG_CACHE_DIR):
+        for name in names:
+            if not name.endswith(".seg"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= limit:
+        return
+    for _, size, path in sorted(files):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        _stats["evicted"] += 1
+        total -= size
+        if total <= limit * 0.9:
+            break
+
+
+def get_transfer_logs(w3, token_address: str, from_block: int, to_block: int,
+                      on_progress=None, _retry: bool = True) -> list:
+    """
+    Token'ın [from_block, to_block] Transfer log'larını (blok/log index sırasında) döndür.
+    Cache'te olmayan onaylı aralıklar scan_logs ile çekilip segment olarak yazılır;
+    head - LOG_CACHE_CONFIRMATIONS üstündeki kuyruk canlı çekilir, yazılmaz.
+
+    Raises:
+        LogRangeError: Boşluk aralıkları eksiksiz taranamadı (scan_logs'tan)
+    """
+    checksum = Web3.to_checksum_address(token_address)
+    if to_block < from_block:
+        return []
+    if not LOG_CACHE_DIR:
+        logs = scan_logs(w3, checksum, [TRANSFER_EVENT_SIGNATURE], from_block, to_block,
+                         on_progress=on_progress)
+        return [_decode_row(_ROW.unpack(_encode_log(l))) for l in logs if len(l["topics"]) >= 3]
+
+    token = token_address.lower()
+    total = to_block - from_block + 1
+    safe_block = min(to_block, w3.eth.block_number - LOG_CACHE_CONFIRMATIONS)
+    with _token_lock(token):
+        gaps = _gaps(_list_segments(token), from_block, safe_block) if safe_block >= from_block else []
+        gap_blocks = sum(hi - lo + 1 for lo, hi in gaps)
+        live_from = max(from_block, safe_block + 1)
+        live_blocks = to_block - live_from + 1 if live_from <= to_block else 0
+        done_before = total - gap_blocks - live_blocks
+
+        for lo, hi in gaps:
+            def _progress(done, _total, base=done_before):
+                if on_progress:
+                    on_progress(base + done, total)
+
+            logs = scan_logs(w3, checksum, [TRANSFER_EVENT_SIGNATURE], lo, hi, on_progress=_progress)
+            _write_segment(token, lo, hi, [_encode_log(l) for l in logs if len(l["topics"]) >= 3])
+            done_before += hi - lo + 1
+
+        # Reorg'a açık kuyruk: canlı çek, cache'e yazma
+        live_rows = []
+        if live_blocks:
+            def _live_progress(done, _total, base=done_before):
+                if on_progress:
+                    on_progress(base + done, total)
+
+            logs = scan_logs(w3, checksum, [TRANSFER_EVENT_SIGNATURE], live_from, to_block,
+                             on_progress=_live_progress)
+            live_rows = [_ROW.unpack(_encode_log(l)) for l in logs if len(l["topics"]) >= 3]
+
+        _stats["gap_fetches"] += len(gaps)
+        _stats["blocks_fetched"] += gap_blocks
+        _stats["blocks_live"] += live_blocks
+        _stats["blocks_from_cache"] += total - gap_blocks - live_blocks
+        if not gaps:
+            _stats["hits"] += 1
+
+        # (blok, log index) → satır: yarım kalan birleştirmenin çakışan segmentleri tekilleşir
+        rows = {}
+        corrupt = False
+        for lo, hi, path in _list_segments(token):
+            if hi < from_block or lo > min(to_block, safe_block):
+                continue
+            try:
+                for r in _read_segment(path, from_block, min(to_block, safe_block)):
+                    rows[(r[0], r[1])] = r
+            except (ValueError, OSError) as e:
+                # Bozuk / yarım segment → sil, aralık tekrar çekilsin
+                print(f"⚠️ Log cache segmenti okunamadı, siliniyor: {e}")
+                corrupt = True
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        if gaps and not corrupt:
+            _compact(token)
+
+    if corrupt and _retry:
+        return get_transfer_logs(w3, token_address, from_block, to_block, on_progress, _retry=False)
+    if gaps:
+        _evict()
+    if on_progress:
+        on_progress(total, total)
+
+    for r in live_rows:
+        rows[(r[0], r[1])] = r
+    return [_decode_row(rows[k]) for k in sorted(rows)]
+
+
+def get_cache_stats() -> dict:
+    """Cache isabet / çekilen blok sayıları."""
+    return dict(_stats)
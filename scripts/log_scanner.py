@@ -0,0 +1,196 @@
+"""
+Log Scanner - Tarihsel eth_getLogs taramaları için adaptif blok aralığı.
+
+Sabit chunk + hata olunca `continue` yaklaşımı yoğun tokenlarda sessizce veri
+kaybettirir. scan_logs():
+- Büyük aralıkla başlar; "too many results" / response size / timeout
+  hatalarında aralığı ikiye böler, ardışık başarılarda tekrar büyütür
+- Rate limit (429, compute units) aralık hatası sayılmaz: aynı aralık üstel
+  backoff ile tekrar denenir; bekleme dispatch döngüsünü bloklamaz
+- Aralıkları LOG_SCAN_CONCURRENCY'ye kadar paralel sorgular
+- Tüm [from_block, to_block] aralığını eksiksiz kapsar; kapsayamazsa
+  LogRangeError fırlatır (kısmi sonuç dönmez)
+- Sonuç blok sırasına göre döner
+
+Kullanım:
+    logs = scan_logs(w3, token, [TRANSFER_EVENT_SIGNATURE], start, end)
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import LOG_SCAN_INITIAL_RANGE, LOG_SCAN_MAX_RANGE, LOG_SCAN_CONCURRENCY
+
+# Rate limit hata mesajı parçaları — bölme değil, aynı aralıkta backoff (önce kontrol edilir)
+_RATE_LIMIT_ERRORS = (
+    "429", "too many requests", "rate limit", "rate-limit", "ratelimit",
+    "compute units", "throughput", "capacity", "request rate", "-32029",
+)
+
+# Aralık küçültmeyi gerektiren hata mesajı parçaları (Alchemy / geth / public RPC)
+_SPLIT_ERRORS = (
+    "too many", "more than", "response size", "exceed", "limit", "range",
+    "timeout", "timed out", "-32005", "-32602", "query returned",
+)
+
+# Bu kadar ardışık başarıdan sonra aralık iki katına çıkar
+_GROW_AFTER = 2
+_MAX_RETRIES = 3
+_RATE_LIMIT_RETRIES = 8
+_RATE_LIMIT_MAX_BACKOFF = 8.0
+
+
+class LogRangeError(Exception):
+    """Blok aralığı eksiksiz taranamadı (en küçük aralıkta bile hata)."""
+
+
+def _is_rate_limit(err: Exception) -> bool:
+    msg = str(err).lower()
+    return any(s in msg for s in _RATE_LIMIT_ERRORS)
+
+
+def _is_split_error(err: Exception) -> bool:
+    msg = str(err).lower()
+    return not _is_rate_limit(err) and any(s in msg for s in _SPLIT_ERRORS)
+
+
+def scan_logs(w3, address, topics: list, from_block: int, to_block: int,
+              initial_range: int = None, max_range: int = None,
+              concurrency: int = None, on_progress=None) -> list:
+    """
+    [from_block, to_block] aralığındaki log'ları adaptif aralıklarla çek.
+
+    Args:
+        w3: Web3 instance
+        address: Kontrat adresi veya adres listesi (checksum)
+        topics: get_logs topic filtresi
+        from_block / to_block: Kapalı aralık
+        initial_range / max_range / concurrency: Varsayılanlar config'den
+        on_progress: callback(blocks_done, blocks_total)
+
+    Returns:
+        list: Log'lar (blok sırasında)
+
+    Raises:
+        LogRangeError: Bir aralık tek bloğa kadar bölünmesine rağmen alınamadı,
+            bölünemeyen hata _MAX_RETRIES kez ya da rate limit _RATE_LIMIT_RETRIES kez tekrarlandı.
+    """
+    if to_block < from_block:
+        return []
+
+    span = max(1, initial_range or LOG_SCAN_INITIAL_RANGE)
+    max_range = max(span, max_range or LOG_SCAN_MAX_RANGE)
+    concurrency = max(1, concurrency or LOG_SCAN_CONCURRENCY)
+    total = to_block - from_block + 1
+
+    def fetch(start, end):
+        return w3.eth.get_logs({
+            'fromBlock': start,
+            'toBlock': end,
+            'address': address,
+            'topics': topics,
+        })
+
+    results = {}          # start → (end, logs)
+    retry = []            # Bölünmüş / tekrar denenecek aralıklar: [(start, end, attempt, ready_at)]
+    cursor = from_block
+    streak = 0
+    done_blocks = 0
+    paused_until = 0.0    # Rate limit sonrası yeni aralık gönderimi bu ana kadar bekler
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = {}
+
+        def submit_next():
+            nonlocal cursor
+            now = time.monotonic()
+            ready = [i for i, r in enumerate(retry) if r[3] <= now]
+            if ready:
+                start, end, attempt, _ = retry.pop(ready[-1])
+            elif cursor <= to_block and now >= paused_until:
+                start, end, attempt = cursor, min(cursor + span - 1, to_block), 0
+                cursor = end + 1
+            else:
+                return False
+            in_flight[pool.submit(fetch, start, end)] = (start, end, attempt)
+            return True
+
+        def next_ready():
+            """Backoff'taki bir işin gönderilebileceği en erken an (yoksa None)."""
+            times = [r[3] for r in retry]
+            if cursor <= to_block:
+                times.append(paused_until)
+            return min(times) if times else None
+
+        while True:
+            while len(in_flight) < concurrency and submit_next():
+                pass
+            wake = next_ready()
+            if not in_flight:
+                if wake is None:
+                    break
+                # Sadece backoff bekleyen aralıklar var: en erkenine kadar uyu
+                time.sleep(max(0.0, wake - time.monotonic()))
+                continue
+
+            # Backoff'taki aralık hazır olunca yeni iş gönderilebilsin diye timeout'lu bekle
+            timeout = None if wake is None else max(0.0, wake - time.monotonic())
+            finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                start, end, attempt = in_flight.pop(fut)
+                try:
+                    logs = fut.result()
+                except Exception as e:
+                    size = end - start + 1
+                    streak = 0
+                    now = time.monotonic()
+                    if _is_rate_limit(e):
+                        if attempt + 1 < _RATE_LIMIT_RETRIES:
+                            backoff = min(_RATE_LIMIT_MAX_BACKOFF, 0.5 * 2 ** attempt)
+                            retry.append((start, end, attempt + 1, now + backoff))
+                            # Yeni aralık gönderimini de backoff süresince durdur
+                            paused_until = max(paused_until, now + backoff)
+                            continue
+                        raise LogRangeError(
+                            f"Blok {start}-{end} rate limit nedeniyle taranamadı ({attempt + 1} deneme): {e}"
+                        ) from e
+                    if _is_split_error(e) and size > 1:
+                        mid = start + size // 2
+                        span = max(1, min(span, size // 2))
+                        # Önce alt yarı işlensin diye üst yarı önce eklenir (pop sondan alır)
+                        retry.append((mid, end, 0, now))
+                        retry.append((start, mid - 1, 0, now))
+                        continue
+                    if attempt + 1 < _MAX_RETRIES:
+                        retry.append((start, end, attempt + 1, now + 0.5 * (attempt + 1)))
+                        continue
+                    raise LogRangeError(
+                        f"Blok {start}-{end} taranamadı ({attempt + 1} deneme): {e}"
+                    ) from e
+
+                results[start] = (end, logs)
+                done_blocks += end - start + 1
+                streak += 1
+                if streak >= _GROW_AFTER and span < max_range:
+                    span = min(max_range, span * 2)
+                    streak = 0
+                if on_progress:
+                    on_progress(done_blocks, total)
+
+    # Kapsama kontrolü: aralıklar boşluksuz from_block → to_block
+    expected = from_block
+    ordered = []
+    for start in sorted(results):
+        end, logs = results[start]
+        if start != expected:
+            raise LogRangeError(f"Kapsama boşluğu: blok {expected}-{start - 1}")
+        ordered.extend(logs)
+        expected = end + 1
+    if expected != to_block + 1:
+        raise LogRangeError(f"Kapsama eksik: blok {expected}-{to_block}")
+
+    return ordered
@@ -8,22 +8,55 @@ Kontrol noktaları:
 - 30dk: contracts_check kontrolü (MCap +50%)
 
 Her kontrol noktasında ATH MCap güncellenir.
+
+Zamanlama: check_at anahtarlı min-heap + ayrı asyncio task (run_mcap_scheduler).
+Task bir sonraki kontrolün vaktine kadar uyur; yeni kontrol planlanınca uyandırılır.
+Aynı anda vadesi gelen kontroller tek batch'te işlenir (token başına tek DexScreener çağrısı).
+
+Kalıcılık: planlanan kontroller mcap_checks tablosuna yazılır, scheduler başlarken
+geri yüklenir (vadesi geçmişler hemen çalışır). Her kontrol çalışmadan önce bu
+instance adına claim edilir → restart sırasında eski ve yeni instance aynı kontrolü
+iki kez işlemez. Claim'de DB hatası ya da MCap çekiminde exception olursa kontrol
+kaybolmaz: MCAP_CHECK_RETRY_DELAY sonra tekrar kuyruğa girer (MCAP_CHECK_MAX_ATTEMPTS'a kadar).
 """
 
+import asyncio
+import heapq
+import itertools
+import os
+import socket
 import time
 import threading
 from datetime import datetime, timezone, timedelta
 from collections import deque
 
+from config.settings import MCAP_CHECK_BATCH_WINDOW, MCAP_CHECK_RETRY_DELAY, MCAP_CHECK_MAX_ATTEMPTS
 from scripts.alert_analyzer import fetch_current_mcap, SHORT_LIST_THRESHOLD, CONTRACTS_CHECK_THRESHOLD, DEAD_TOKEN_MCAP
-from scripts.database import save_token_evaluation, get_signal_by_token_recent, approve_signal
+from scripts.database import (
+    save_token_evaluation, get_signal_by_token_recent, approve_signal,
+    save_mcap_checks, load_pending_mcap_checks, claim_mcap_check, complete_mcap_check,
+)
 
 # UTC+3
 UTC_PLUS_3 = timezone(timedelta(hours=3))
 
-# Bekleyen kontroller (thread-safe deque)
-_pending_checks = deque()
+# Bekleyen kontroller: (check_at, sıra, check) min-heap (thread-safe erişim _lock ile)
+_pending_checks = []
 _lock = threading.Lock()
+_seq = itertools.count()
+
+# Heap'teki kalıcı kontrol id'leri (DB'den tekrar yüklemede çift eklemeyi önler)
+_queued_ids = set()
+
+# Claim sahibi: host + pid (aynı anda çalışan iki instance'ı ayırt eder)
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+# Scheduler task'ını uyandırmak için (run_mcap_scheduler içinde oluşturulur)
+_wakeup = None
+_scheduler_loop = None
+
+# Son kontrollerin gecikmesi (sn): gerçek çalışma zamanı - check_at
+_lateness = deque(maxlen=500)
 
 # Kontrol noktaları: (süre_saniye, check_type, threshold)
 CHECK_POINTS = [
@@ -52,47 +85,198 @@ def schedule_mcap_check(token_address: str, token_symbol: str, alert_mcap: int,
         "alert_time": alert_time,
     }
 
-    with _lock:
-        for delay_secs, check_type, threshold in CHECK_POINTS:
-            _pending_checks.append({
-                **check_data,
-                "check_type": check_type,
-                "check_at": now + delay_secs,
-                "threshold": threshold,
-            })
+    checks = [{
+        **check_data,
+        "check_type": check_type,
+        "check_at": now + delay_secs,
+        "threshold": threshold,
+    } for delay_secs, check_type, threshold in CHECK_POINTS]
+
+    # DB'ye yaz (restart'ta geri yüklenir); DB yoksa sadece bellekte
+    ids = save_mcap_checks(checks)
+    for check in checks:
+        check["id"] = ids.get(check["check_type"])
+
+    _push_checks(checks)
 
     check_names = ", ".join(ct for _, ct, _ in CHECK_POINTS)
     print(f"⏰ MCap check planlandı: {token_symbol} → {check_names}")
 
 
-def process_pending_checks() -> list:
+def _push_checks(checks: list) -> int:
+    """Kontrolleri heap'e ekle (zaten kuyruktaki kalıcı id'ler atlanır) ve scheduler'ı uyandır."""
+    added = 0
+    with _lock:
+        for check in checks:
+            check_id = check.get("id")
+            if check_id is not None:
+                if check_id in _queued_ids:
+                    continue
+                _queued_ids.add(check_id)
+            heapq.heappush(_pending_checks, (check["check_at"], next(_seq), check))
+            added += 1
+    if added:
+        _wake_scheduler()
+    return added
+
+
+def restore_pending_checks() -> int:
     """
-    Zamanı gelen kontrolleri işle.
-    Ana monitoring loop'tan periyodik çağrılır.
+    DB'deki bekleyen kontrolleri heap'e yükle (startup).
+    Vadesi geçmiş olanlar scheduler'ın ilk turunda hemen çalışır.
     """
-    now = time.time()
-    results = []
-    checks_to_process = []
+    checks = load_pending_mcap_checks()
+    if not checks:
+        return 0
+    added = _push_checks(checks)
+    overdue = sum(1 for c in checks if c["check_at"] <= time.time())
+    if added:
+        print(f"♻️ {added} MCap check DB'den geri yüklendi ({overdue} vadesi geçmiş)")
+    return added
+
+
+def _wake_scheduler():
+    """Scheduler task'ı uyandır (başka thread'den çağrılabilir)."""
+    loop, event = _scheduler_loop, _wakeup
+    if loop is None or event is None or loop.is_closed():
+        return
+    try:
+        loop.call_soon_threadsafe(event.set)
+    except RuntimeError:
+        pass
+
+
+def _pop_due(now: float) -> list:
+    """Vadesi gelmiş kontrolleri heap'ten çıkar (check_at sırasıyla)."""
+    due = []
+    with _lock:
+        while _pending_checks and _pending_checks[0][0] <= now:
+            check = heapq.heappop(_pending_checks)[2]
+            _queued_ids.discard(check.get("id"))
+            due.append(check)
+    return due
 
+
+def _requeue(checks: list, reason: str) -> list:
+    """
+    Hata alan kontrolleri kısa gecikmeyle tekrar kuyruğa koy.
+    Returns: deneme hakkı biten kontroller (çağıran failed olarak kapatır)
+    """
+    retry, exhausted = [], []
+    for check in checks:
+        attempts = check.get("attempts", 0) + 1
+        if attempts >= MCAP_CHECK_MAX_ATTEMPTS:
+            exhausted.append(check)
+        else:
+            retry.append({**check, "attempts": attempts, "check_at": time.time() + MCAP_CHECK_RETRY_DELAY})
+    if retry:
+        _push_checks(retry)
+        print(f"🔁 {len(retry)} MCap check {MCAP_CHECK_RETRY_DELAY:.0f}sn sonra tekrar denenecek ({reason})")
+    return exhausted
+
+
+def _next_due_at():
     with _lock:
-        remaining = deque()
-        while _pending_checks:
-            check = _pending_checks.popleft()
-            if check["check_at"] <= now:
-                checks_to_process.append(check)
-            else:
-                remaining.append(check)
-        _pending_checks.extend(remaining)
-
-    for check in checks_to_process:
-        result = _execute_check(check)
-        results.append(result)
+        return _pending_checks[0][0] if _pending_checks else None
 
+
+def _run_batch(checks: list) -> list:
+    """
+    Bir batch kontrolü çalıştır: token başına tek MCap çekimi,
+    sonra her kontrol noktası kendi eşiğiyle değerlendirilir.
+    """
+    # Kalıcı kontrolleri claim et — başka instance aldıysa atla, DB hatasında tekrar dene
+    claimed, claim_errors, skipped = [], [], 0
+    for check in checks:
+        result = True if check.get("id") is None else claim_mcap_check(check["id"], INSTANCE_ID)
+        if result is None:
+            claim_errors.append(check)
+        elif result:
+            claimed.append(check)
+        else:
+            skipped += 1
+    if skipped:
+        print(f"⏭️ {skipped} MCap check başka instance tarafından alınmış, atlandı")
+    if claim_errors:
+        # Claim edilemedi → DB'de pending kalır, deneme hakkı bitse de restart'ta geri yüklenir
+        _requeue(claim_errors, "claim hatası")
+
+    started = time.time()
+    for check in claimed:
+        _lateness.append(max(0.0, started - check["check_at"]))
+
+    mcap_cache = {}
+    results = []
+    for check in claimed:
+        token_addr = check["token_address"]
+        try:
+            if token_addr not in mcap_cache:
+                mcap_cache[token_addr] = fetch_current_mcap(token_addr)
+            results.append(_execute_check(check, current=mcap_cache[token_addr]))
+        except Exception as e:
+            print(f"⚠️ MCap check hatası ({check.get('token_symbol')} {check.get('check_type')}): {e}")
+            # Claim bizde kalır (aynı owner tekrar claim edebilir); deneme hakkı bittiyse failed
+            if _requeue([check], "MCap check hatası") and check.get("id") is not None:
+                complete_mcap_check(check["id"], INSTANCE_ID, "failed")
+            continue
+        if check.get("id") is not None:
+            complete_mcap_check(check["id"], INSTANCE_ID, "done")
     return results
 
 
-def _execute_check(check: dict) -> dict:
-    """Tek bir MCap kontrolünü çalıştır + ATH MCap güncelle."""
+def process_pending_checks() -> list:
+    """
+    Zamanı gelen kontrolleri işle (senkron; scheduler task çalışmıyorsa kullanılır).
+    """
+    checks = _pop_due(time.time())
+    if not checks:
+        return []
+    return _run_batch(checks)
+
+
+async def run_mcap_scheduler():
+    """
+    MCap kontrol scheduler'ı — bağımsız asyncio task olarak çalışır.
+    Bir sonraki check_at'e kadar uyur; yeni plan gelince uyanır.
+    MCAP_CHECK_BATCH_WINDOW içinde vadesi gelenler birlikte işlenir.
+    Bloklayan HTTP/DB çağrıları thread'de çalışır, event loop bloklanmaz.
+    """
+    global _wakeup, _scheduler_loop
+    _scheduler_loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    await asyncio.to_thread(restore_pending_checks)
+    print(f"⏱️ MCap scheduler başladı ({get_pending_count()} bekleyen kontrol)")
+
+    while True:
+        try:
+            next_at = _next_due_at()
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            if timeout is None or timeout > 0:
+                _wakeup.clear()
+                try:
+                    await asyncio.wait_for(_wakeup.wait(), timeout=timeout)
+                    continue  # Yeni kontrol eklendi → sıradaki vakti yeniden hesapla
+                except asyncio.TimeoutError:
+                    pass
+
+            checks = _pop_due(time.time() + MCAP_CHECK_BATCH_WINDOW)
+            if not checks:
+                continue
+
+            results = await asyncio.to_thread(_run_batch, checks)
+            if len(results) > 1:
+                print(f"📈 MCap check batch: {len(results)} kontrol ({get_pending_count()} bekliyor)")
+
+        except asyncio.CancelledError:
+            print("⏹️ MCap scheduler durduruldu")
+            raise
+        except Exception as e:
+            print(f"⚠️ MCap scheduler hatası: {e}")
+            await asyncio.sleep(5)
+
+
+def _execute_check(check: dict, current: dict = None) -> dict:
+    """Tek bir MCap kontrolünü çalıştır + ATH MCap güncelle (current: batch'te çekilmiş MCap)."""
     token_addr = check["token_address"]
     token_symbol = check["token_symbol"]
     alert_mcap = check["alert_mcap"]
@@ -100,7 +284,8 @@ def _execute_check(check: dict) -> dict:
     threshold = check["threshold"]
 
     # DexScreener'dan güncel MCap
-    current = fetch_current_mcap(token_addr)
+    if current is None:
+        current = fetch_current_mcap(token_addr)
     current_mcap = current["mcap"]
 
     # Değişim yüzdesi
@@ -191,3 +376,26 @@ def get_pending_count() -> int:
     """Bekleyen kontrol sayısı."""
     with _lock:
         return len(_pending_checks)
+
+
+def get_lateness_stats() -> dict:
+    """Son kontrollerin gecikme dağılımı (sn): p50 / p95 / max."""
+    samples = sorted(_lateness)
+    if not samples:
+        return {"count": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    n = len(samples)
+    return {
+        "count": n,
+        "p50": round(samples[n // 2], 2),
+        "p95": round(samples[min(n - 1, int(n * 0.95))], 2),
+        "max": round(samples[-1], 2),
+    }
+
+
+def format_lateness_stats() -> str:
+    """Watchdog / sağlık raporu için tek satır gecikme özeti."""
+    stats = get_lateness_stats()
+    if not stats["count"]:
+        return "gecikme verisi yok"
+    return (f"gecikme p50 {stats['p50']:.1f}sn | p95 {stats['p95']:.1f}sn | "
+            f"max {stats['max']:.1f}sn ({stats['count']} kontrol)")
@@ -25,7 +25,7 @@ UTC_PLUS_3 = timezone(timedelta(hours=3))
 # =============================================================================
 
 def analyze_wallet_patterns(short_list: list, contracts_check: list,
-                             trash_calls: list, wallet_participation: list = None) -> dict:
+                             trash_calls: list, wallet_participation=None) -> dict:
     """
     Cüzdan bazlı pattern analizi:
     - Cüzdan kesişimi (hangi listeler arasında)
@@ -488,9 +488,11 @@ def generate_full_pattern_report(analysis_data: dict = None) -> dict:
     contracts_check = analysis_data.get("contracts_check", [])
     trash_calls = analysis_data.get("trash_calls", [])
 
-    # Wallet participation (DB'den veya analiz verisinden)
-    from scripts.database import get_wallet_alert_participation
-    wallet_participation = get_wallet_alert_participation()
+    # Wallet participation (DB'den stream — tek geçişte tüketilir)
+    from scripts.database import iter_wallet_alert_participation
+    wallet_participation = iter_wallet_alert_participation(
+        columns=["wallet_address", "token_address"]
+    )
 
     print("=" * 60)
     print("🔬 PATTERN ANALİZİ BAŞLADI")
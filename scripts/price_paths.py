@@ -0,0 +1,257 @@
+"""
+Price Paths - Alert'li token'ların fiyat yolu kaydı (günlük binary dosyalar, mmap okuma).
+
+token_evaluations alert başına sadece 3-4 MCap örneği (5 / 30dk, zirve, dip) tutuyor;
+backtest ve ATH analizi için gerçek yol gerekiyor. Bu modül price_tracker'ın her
+örneğini (ts, fiyat, MCap, likidite) alert'ten sonra PRICE_PATH_HOURS boyunca saklar:
+- PRICE_PATH_DIR/YYYYMMDD.pp (UTC gün) → append-only sabit boyutlu satırlar
+  (token, alert ts, örnek ts, fiyat, MCap, likidite) = 40 byte / örnek
+- Yazım poll başına tek append; çökmede yarım kalan son satır açılışta kırpılır
+- Okuma mmap ile: iter_day / get_path saf Python, day_array / load_paths numpy
+  memmap (dosya RAM'e yüklenmez, sadece istenen satırlar kopyalanır)
+- PRICE_PATH_RETENTION_DAYS'ten eski gün dosyaları gün değişiminde silinir
+
+Path anahtarı (token, alert_epoch(alert_time)); alert_time token_evaluations ile aynı.
+PRICE_PATH_DIR boşsa kayıt kapalıdır.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from config.settings import PRICE_PATH_DIR, PRICE_PATH_HOURS, PRICE_PATH_RETENTION_DAYS
+
+UTC_PLUS_3 = timezone(timedelta(hours=3))
+
+_MAGIC = b"PPD1"
+_HEADER = struct.Struct("<4sI")          # magic, satır boyutu
+_ROW = struct.Struct("<20sIIfff")        # token, alert ts, örnek ts, fiyat, MCap, likidite
+
+_lock = threading.Lock()
+_writer = {"day": None, "file": None}
+_stats = {"samples": 0, "bytes": 0, "pruned_days": 0}
+
+
+def is_enabled() -> bool:
+    return bool(PRICE_PATH_DIR)
+
+
+def alert_epoch(alert_time) -> int:
+    """alert_time (ISO string / datetime, tz yoksa UTC+3) → epoch saniye (path anahtarı)."""
+    dt = alert_time if isinstance(alert_time, datetime) else datetime.fromisoformat(str(alert_time))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC_PLUS_3)
+    return int(dt.timestamp())
+
+
+def _day_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%d")
+
+
+def _day_path(day: str) -> str:
+    return os.path.join(PRICE_PATH_DIR, f"{day}.pp")
+
+
+def list_days() -> list:
+    """Kayıtlı günler (YYYYMMDD, sıralı)."""
+    if not is_enabled() or not os.path.isdir(PRICE_PATH_DIR):
+        return []
+    return sorted(name[:-3] for name in os.listdir(PRICE_PATH_DIR) if name.endswith(".pp"))
+
+
+# =============================================================================
+# YAZMA
+# =============================================================================
+
+def _open_day(day: str):
+    """Gün dosyasını append için aç; yarım kalmış son satırı kırp."""
+    os.makedirs(PRICE_PATH_DIR, exist_ok=True)
+    f = open(_day_path(day), "ab")
+    size = f.seek(0, os.SEEK_END)
+    if size < _HEADER.size:
+        f.truncate(0)
+        f.write(_HEADER.pack(_MAGIC, _ROW.size))
+    else:
+        torn = (size - _HEADER.size) % _ROW.size
+        if torn:
+            f.truncate(size - torn)
+    return f
+
+
+def _prune(today: str):
+    if not PRICE_PATH_RETENTION_DAYS:
+        return
+    cutoff = (datetime.strptime(today, "%Y%m%d") - timedelta(days=PRICE_PATH_RETENTION_DAYS)).strftime("%Y%m%d")
+    for day in list_days():
+        if day >= cutoff:
+            break
+        try:
+            os.remove(_day_path(day))
+            _stats["pruned_days"] += 1
+        except OSError:
+            pass
+
+
+def append_samples(samples: list) -> int:
+    """
+    Örnekleri günün dosyasına ekle (tek write).
+    samples: [(token_address, alert_ts, ts, price, mcap, liquidity)]
+    """
+    if not is_enabled() or not samples:
+        return 0
+    by_day = {}
+    for token, alert_ts, ts, price, mcap, liq in samples:
+        try:
+            raw = bytes.fromhex(token[2:] if token.startswith("0x") else token)
+        except ValueError:
+            continue
+        by_day.setdefault(_day_of(ts), []).append(
+            _ROW.pack(raw, int(alert_ts), int(ts), float(price), float(mcap), float(liq))
+        )
+
+    written = 0
+    try:
+        with _lock:
+            for day, rows in sorted(by_day.items()):
+                if _writer["day"] != day:
+                    if _writer["file"] is not None:
+                        _writer["file"].close()
+                    _writer["file"] = _open_day(day)
+                    _writer["day"] = day
+                    _prune(day)
+                data = b"".join(rows)
+                _writer["file"].write(data)
+                _writer["file"].flush()
+                written += len(rows)
+                _stats["bytes"] += len(data)
+            _stats["samples"] += written
+    except Exception as e:
+        print(f"⚠️ Fiyat yolu yazılamadı: {e}")
+    return written
+
+
+def close():
+    with _lock:
+        if _writer["file"] is not None:
+            _writer["file"].close()
+        _writer["file"] = None
+        _writer["day"] = None
+
+
+# =============================================================================
+# OKUMA (mmap)
+# =============================================================================
+
+def _decode(row: tuple) -> dict:
+    token, alert_ts, ts, price, mcap, liq = row
+    return {"token_address": "0x" + token.hex(), "alert_ts": alert_ts, "ts": ts,
+            "price": price, "mcap": mcap, "liquidity": liq}
+
+
+def iter_day(day: str, token_address: str = None, alert_ts: int = None):
+    """Gün dosyasındaki örnekleri mmap üzerinden stream et (opsiyonel token / alert filtresi)."""
+    path = _day_path(day)
+    if not os.path.exists(path) or os.path.getsize(path) <= _HEADER.size:
+        return
+    token_raw = bytes.fromhex(token_address.lower()[2:]) if token_address else None
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = _HEADER.size + (len(mm) - _HEADER.size) // _ROW.size * _ROW.size
+            for offset in range(_HEADER.size, end, _ROW.size):
+                if token_raw is not None and mm[offset:offset + 20] != token_raw:
+                    continue
+                row = _ROW.unpack_from(mm, offset)
+                if alert_ts is not None and row[1] != alert_ts:
+                    continue
+                yield _decode(row)
+
+
+def _days_for(alert_ts: int, hours: float = None) -> list:
+    """Path'in düştüğü UTC günleri."""
+    end = alert_ts + (hours or PRICE_PATH_HOURS) * 3600
+    days, ts = [], alert_ts
+    while True:
+        days.append(_day_of(ts))
+        if ts >= end:
+            break
+        ts = min(ts + 86400, end)
+    return sorted(set(days))
+
+
+def get_path(token_address: str, alert_time, hours: float = None) -> list:
+    """Tek alert'in kayıtlı yolu: [{"ts", "price", "mcap", "liquidity", ...}] (ts sıralı)."""
+    alert_ts = alert_epoch(alert_time)
+    samples = []
+    for day in _days_for(alert_ts, hours):
+        samples.extend(iter_day(day, token_address, alert_ts))
+    samples.sort(key=lambda s: s["ts"])
+    return samples
+
+
+def _dtype():
+    return np.dtype([("token", "S20"), ("alert_ts", "<u4"), ("ts", "<u4"),
+                     ("price", "<f4"), ("mcap", "<f4"), ("liquidity", "<f4")])
+
+
+def day_array(day: str):
+    """Gün dosyası → numpy memmap structured array (salt okunur, kopyasız). Yoksa None."""
+    if np is None:
+        raise RuntimeError("❌ day_array için numpy gerekli (pip install numpy)")
+    path = _day_path(day)
+    if not os.path.exists(path):
+        return None
+    rows = (os.path.getsize(path) - _HEADER.size) // _ROW.size
+    if rows <= 0:
+        return None
+    return np.memmap(path, dtype=_dtype(), mode="r", offset=_HEADER.size, shape=(rows,))
+
+
+def load_paths(keys, hours: float = None) -> dict:
+    """
+    Birden çok alert'in yolu tek geçişte (gün başına bir memmap taraması).
+
+    Args:
+        keys: [(token_address, alert_ts)]
+    Returns:
+        {(token_address, alert_ts): structured ndarray (ts sıralı)}; kaydı olmayan anahtar yok
+    """
+    if np is None:
+        raise RuntimeError("❌ load_paths için numpy gerekli (pip install numpy)")
+    wanted = {}
+    for token, alert_ts in keys:
+        wanted[(bytes.fromhex(token.lower()[2:]), int(alert_ts))] = (token.lower(), int(alert_ts))
+    days = sorted({d for _, alert_ts in wanted for d in _days_for(alert_ts, hours)})
+    alert_set = np.fromiter({a for _, a in wanted}, dtype="<u4")
+
+    parts = {}
+    for day in days:
+        arr = day_array(day)
+        if arr is None:
+            continue
+        # Önce alert ts ile ucuz eleme, sonra sadece eşleşen satırlar gruplanır
+        rows = np.asarray(arr[np.isin(arr["alert_ts"], alert_set)])
+        if not len(rows):
+            continue
+        rows = rows[np.lexsort((rows["ts"], rows["alert_ts"], rows["token"]))]
+        change = (rows["token"][1:] != rows["token"][:-1]) | (rows["alert_ts"][1:] != rows["alert_ts"][:-1])
+        bounds = np.concatenate(([0], np.flatnonzero(change) + 1, [len(rows)]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            key = wanted.get((rows["token"][lo].ljust(20, b"\0"), int(rows["alert_ts"][lo])))
+            if key is not None:
+                parts.setdefault(key, []).append(rows[lo:hi])
+        del arr
+
+    return {key: np.concatenate(chunks) if len(chunks) > 1 else chunks[0] for key, chunks in parts.items()}
+
+
+def get_recorder_stats() -> dict:
+    """Kayıt istatistikleri (sağlık raporu için)."""
+    with _lock:
+        return dict(_stats, day=_writer["day"], enabled=is_enabled())
@@ -0,0 +1,247 @@
+"""
+Price Tracker - Alert sonrası sürekli MCap takibi (gerçek ATH yakalama).
+
+mcap_checker sadece 1/5/15/30dk noktalarında örnekler; arada 5x yapıp düşen
+token "zarar" görünür. Bu modül alert'li her token'ı PRICE_TRACK_WINDOW boyunca
+PRICE_TRACK_INTERVAL aralıkla izler:
+- DexScreener çoklu token endpoint'i ile batch sorgu (30 adres / istek)
+- Bellekte running max / min MCap ve zirveye kadar geçen süre
+- PRICE_TRACK_FLUSH_INTERVAL'da bir token_evaluations'a toplu yazım
+- Her örnek (fiyat, MCap, likidite) price_paths'e kaydedilir; pencereden sonra
+  PRICE_PATH_HOURS dolana kadar PRICE_PATH_SLOW_INTERVAL aralıkla örneklenmeye devam eder
+
+Not: İzlenen log akışı sadece Transfer event'i içerdiği için (Swap yok)
+fiyat kaynağı olarak batch DexScreener sorgusu kullanılır.
+"""
+
+import asyncio
+import threading
+import time
+
+import requests
+
+from config.settings import (
+    PRICE_TRACK_WINDOW, PRICE_TRACK_INTERVAL, PRICE_TRACK_FLUSH_INTERVAL,
+    PRICE_PATH_HOURS, PRICE_PATH_SLOW_INTERVAL,
+)
+from scripts.database import update_token_price_extremes
+from scripts import price_paths
+
+DEXSCREENER_TOKENS_URL = "https://api.dexscreener.com/latest/dex/tokens/"
+DEXSCREENER_BATCH_SIZE = 30  # DexScreener tek istekte max 30 adres
+
+# İzlenen alert'ler: {(token_address, alert_time): state}
+_tracked = {}
+_lock = threading.Lock()
+
+
+def _horizon() -> float:
+    """Alert'in takipte kalacağı süre (sn): max/min penceresi veya fiyat yolu süresi."""
+    if price_paths.is_enabled():
+        return max(PRICE_TRACK_WINDOW, PRICE_PATH_HOURS * 3600)
+    return PRICE_TRACK_WINDOW
+
+
+def track_alert(token_address: str, token_symbol: str, alert_mcap: int, alert_time: str):
+    """Alert'li token'ı takibe al (alert_time, token_evaluations kaydıyla eşleşme anahtarı)."""
+    now = time.time()
+    key = (token_address.lower(), str(alert_time))
+    with _lock:
+        if key in _tracked:
+            return
+        try:
+            alert_ts = price_paths.alert_epoch(alert_time)
+        except (TypeError, ValueError):
+            alert_ts = int(now)
+        _tracked[key] = {
+            "token_address": token_address.lower(),
+            "token_symbol": token_symbol,
+            "alert_time": alert_time,
+            "alert_mcap": alert_mcap,
+            "started": now,
+            "alert_ts": alert_ts,
+            "last_sample_at": 0.0,
+            "max_mcap": alert_mcap,
+            "min_mcap": alert_mcap,
+            "peak_at": now,
+            "last_mcap": alert_mcap,
+            "samples": 0,
+            "dirty": False,
+        }
+
+
+def fetch_quotes_batch(addresses: list) -> dict:
+    """
+    Birden çok token'ın fiyat + MCap'ini DexScreener'dan batch çek.
+    Returns: {token_address: {"price", "mcap", "liquidity"}} (en yüksek likiditeli pair)
+    """
+    result = {}
+    best_liq = {}
+    for i in range(0, len(addresses), DEXSCREENER_BATCH_SIZE):
+        chunk = addresses[i:i + DEXSCREENER_BATCH_SIZE]
+        try:
+            resp = requests.get(DEXSCREENER_TOKENS_URL + ",".join(chunk), timeout=10)
+            pairs = resp.json().get("pairs") or []
+        except Exception as e:
+            print(f"⚠️ DexScreener batch hatası ({len(chunk)} token): {e}")
+            continue
+
+        for pair in pairs:
+            base = (pair.get("baseToken", {}).get("address") or "").lower()
+            if base not in chunk:
+                continue
+            liq = float(pair.get("liquidity", {}).get("usd", 0) or 0)
+            if liq >= best_liq.get(base, -1):
+                best_liq[base] = liq
+                result[base] = {
+                    "price": float(pair.get("priceUsd", 0) or 0),
+                    "mcap": float(pair.get("marketCap", 0) or 0),
+                    "liquidity": liq,
+                }
+    return result
+
+
+def fetch_mcaps_batch(addresses: list) -> dict:
+    """
+    Birden çok token'ın MCap'ini DexScreener'dan batch çek.
+    Returns: {token_address: mcap} (en yüksek likiditeli pair)
+    """
+    return {addr: q["mcap"] for addr, q in fetch_quotes_batch(addresses).items()}
+
+
+def _is_due(state: dict, now: float) -> bool:
+    """Pencere içinde her tur, sonrasında (sadece fiyat yolu) PRICE_PATH_SLOW_INTERVAL'da bir."""
+    if now - state["started"] < PRICE_TRACK_WINDOW:
+        return True
+    return now - state["last_sample_at"] >= PRICE_PATH_SLOW_INTERVAL
+
+
+def poll_once() -> int:
+    """Sırası gelen token'ları tek turda sorgula, max/min güncelle, yolu kaydet. Returns: güncellenen alert sayısı."""
+    now = time.time()
+    with _lock:
+        addresses = sorted({s["token_address"] for s in _tracked.values() if _is_due(s, now)})
+    if not addresses:
+        return 0
+
+    quotes = fetch_quotes_batch(addresses)
+    now = time.time()
+    updated = 0
+    samples = []
+
+    with _lock:
+        for state in _tracked.values():
+            quote = quotes.get(state["token_address"])
+            if not quote or not quote["mcap"] or not _is_due(state, now):
+                continue
+            mcap = quote["mcap"]
+            state["last_mcap"] = mcap
+            state["last_sample_at"] = now
+            state["samples"] += 1
+            samples.append((state["token_address"], state["alert_ts"], now,
+                            quote["price"], mcap, quote["liquidity"]))
+            updated += 1
+            if now - state["started"] >= PRICE_TRACK_WINDOW:
+                continue  # max/min sadece PRICE_TRACK_WINDOW için
+            if mcap > state["max_mcap"]:
+                state["max_mcap"] = mcap
+                state["peak_at"] = now
+                state["dirty"] = True
+            if mcap < state["min_mcap"]:
+                state["min_mcap"] = mcap
+                state["dirty"] = True
+
+    price_paths.append_samples(samples)
+    return updated
+
+
+def flush() -> int:
+    """
+    Değişen token'ları token_evaluations'a toplu yaz; süresi dolanları takipten çıkar.
+    Kaydı henüz oluşmamış (ilk MCap check öncesi) token'lar dirty kalır, sonraki flush'ta denenir.
+    """
+    now = time.time()
+    with _lock:
+        dirty = [(key, dict(state)) for key, state in _tracked.items() if state["dirty"]]
+
+    entries = [{
+        "token_address": state["token_address"],
+        "alert_time": state["alert_time"],
+        "max_mcap": int(state["max_mcap"]),
+        "min_mcap": int(state["min_mcap"]),
+        "time_to_peak_sec": int(state["peak_at"] - state["started"]),
+    } for _, state in dirty]
+    written = update_token_price_extremes(entries)
+    written_keys = {(e["token_address"], str(e["alert_time"])) for e in written}
+
+    expired = 0
+    horizon = _horizon()
+    with _lock:
+        for key in written_keys:
+            if key in _tracked:
+                _tracked[key]["dirty"] = False
+        for key in list(_tracked):
+            state = _tracked[key]
+            age = now - state["started"]
+            # Kayıt hiç oluşmadıysa pencere + 1 flush sonra max/min yazımından vazgeç
+            if state["dirty"] and age >= PRICE_TRACK_WINDOW + PRICE_TRACK_FLUSH_INTERVAL:
+                state["dirty"] = False
+            # Takip süresi doldu ve yazılacak bir şey kalmadı → takipten çık
+            if age >= horizon and not state["dirty"]:
+                del _tracked[key]
+                expired += 1
+
+    if written or expired:
+        print(f"📉📈 Fiyat takibi: {len(written)} token yazıldı, {expired} takip bitti ({get_tracked_count()} aktif)")
+    return len(written)
+
+
+async def run_price_tracker():
+    """
+    Sürekli fiyat takibi — bağımsız asyncio task.
+    HTTP ve DB çağrıları thread'de çalışır, event loop bloklanmaz.
+    """
+    print(f"📈 Fiyat takibi başladı (her {PRICE_TRACK_INTERVAL:.0f}sn, {PRICE_TRACK_WINDOW // 60}dk pencere"
+          + (f", fiyat yolu {PRICE_PATH_HOURS:g}sa)" if price_paths.is_enabled() else ")"))
+    last_flush = time.time()
+
+    while True:
+        try:
+            if get_tracked_count():
+                await asyncio.to_thread(poll_once)
+            if time.time() - last_flush >= PRICE_TRACK_FLUSH_INTERVAL:
+                await asyncio.to_thread(flush)
+                last_flush = time.time()
+            await asyncio.sleep(PRICE_TRACK_INTERVAL)
+        except asyncio.CancelledError:
+            # Kapanışta son durumu yaz
+            try:
+                flush()
+                price_paths.close()
+            except Exception:
+                pass
+            raise
+        except Exception as e:
+            print(f"⚠️ Fiyat takibi hatası: {e}")
+            await asyncio.sleep(PRICE_TRACK_INTERVAL)
+
+
+def get_tracked_count() -> int:
+    """Takipteki alert sayısı."""
+    with _lock:
+        return len(_tracked)
+
+
+def get_tracker_summary(limit: int = 5) -> list:
+    """En yüksek zirve yapan takipteki token'lar (sağlık raporu için)."""
+    with _lock:
+        states = [dict(s) for s in _tracked.values()]
+    states.sort(key=lambda s: s["max_mcap"] / s["alert_mcap"] if s["alert_mcap"] else 0, reverse=True)
+    lines = []
+    for s in states[:limit]:
+        if not s["alert_mcap"]:
+            continue
+        peak_x = s["max_mcap"] / s["alert_mcap"]
+        lines.append(f"{s['token_symbol']}: zirve {peak_x:.2f}x ({int(s['peak_at'] - s['started']) // 60}dk)"
+                     f" | şimdi {s['last_mcap'] / s['alert_mcap']:.2f}x")
+    return lines
@@ -32,9 +32,12 @@ MAX_DAILY_LOSS_ETH = float(os.getenv("MAX_DAILY_LOSS_ETH", "0.01"))
 # =============================================================================
 # SLIPPAGE
 # =============================================================================
-# Memecoins için %20 güvenli. DEXScreener fiyatına göre hesaplanır.
+# Memecoins için %20 güvenli. DEXScreener fiyatına göre hesaplanır (quote alınamazsa).
 SLIPPAGE_PERCENT = float(os.getenv("SLIPPAGE_PERCENT", "20"))
 
+# On-chain quote'a göre amountOutMinimum payı (transfer vergisi + blok içi hareket)
+QUOTE_SLIPPAGE_PERCENT = float(os.getenv("QUOTE_SLIPPAGE_PERCENT", "10"))
+
 # =============================================================================
 # TP/SL VARSAYILANLARI (Konservatif strateji)
 # =============================================================================
@@ -49,13 +52,24 @@ DEFAULT_SL_MULTIPLIER = float(os.getenv("DEFAULT_SL_MULTIPLIER", "0.6"))  # -40%
 # =============================================================================
 GAS_MULTIPLIER = float(os.getenv("GAS_MULTIPLIER", "2.0"))  # current_gas × 2
 MAX_GAS_GWEI = float(os.getenv("MAX_GAS_GWEI", "1.0"))  # Base chain ucuz
+# Base fee / bakiye her yeni blokta arka planda yenilenir (Base ~2sn blok)
+GAS_REFRESH_INTERVAL = float(os.getenv("GAS_REFRESH_INTERVAL", "1.0"))
+# Cache bundan eskiyse (refresher takıldıysa) TX öncesi senkron çekilir
+GAS_CACHE_MAX_AGE = float(os.getenv("GAS_CACHE_MAX_AGE", "6.0"))
 
 # =============================================================================
 # İZLEME
 # =============================================================================
-# Pozisyon fiyat kontrol sıklığı (saniye)
+# Pozisyon listesi bu sürede bir TP/SL motoruna değişiklik olmasa da yeniden yüklenir (saniye)
 POSITION_CHECK_INTERVAL = int(os.getenv("POSITION_CHECK_INTERVAL", "30"))
 
+# TP/SL tetik motoru: batch fiyat sorgusu aralığı (~1 Base bloğu) ve zaman-SL timer wheel adımı (sn)
+TP_SL_POLL_INTERVAL = float(os.getenv("TP_SL_POLL_INTERVAL", "2.0"))
+TP_SL_TIMER_TICK = float(os.getenv("TP_SL_TIMER_TICK", "1.0"))
+
+# Gönderilen TX bu sürede onaylanmazsa başarısız sayılır (nonce zincirden yeniden okunur)
+TX_CONFIRM_TIMEOUT = int(os.getenv("TX_CONFIRM_TIMEOUT", "120"))
+
 # =============================================================================
 # FEATURE TOGGLE (Kill Switch)
 # =============================================================================
@@ -66,8 +80,10 @@ REAL_TRADING_ENABLED = os.getenv("REAL_TRADING_ENABLED", "false").lower() == "tr
 # UNISWAP V3 FEE TIERS
 # =============================================================================
 # Memecoin pool'ları genelde %1 (10000) veya %0.3 (3000) fee kullanır
-PRIMARY_FEE_TIER = 10000    # Önce dene
-FALLBACK_FEE_TIER = 3000    # Revert ederse bunu dene
+PRIMARY_FEE_TIER = 10000    # Eski pozisyonlarda route yoksa varsayılan
+
+# Swap öncesi tek batch eth_call ile quote alınan fee tier'ları (+ Aerodrome volatile/stable)
+QUOTE_FEE_TIERS = [100, 500, 3000, 10000]
 
 # =============================================================================
 # BASE CHAIN
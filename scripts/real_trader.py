@@ -10,9 +10,11 @@ import sys
 import time
 import asyncio
 import copy
+import threading
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+import requests
 from web3 import Web3
 
 # Config imports
@@ -21,8 +23,12 @@ from config.settings import (
     BASE_RPC_HTTP,
     WETH_ADDRESS,
     UNISWAP_V3_ROUTER,
+    UNISWAP_V3_QUOTER,
+    AERODROME_ROUTER,
+    AERODROME_FACTORY,
     TRADING_PRIVATE_KEY,
-    REAL_TRADING_ENABLED
+    REAL_TRADING_ENABLED,
+    TRANSFER_EVENT_SIGNATURE
 )
 from scripts.real_trade_config import (
     REAL_TRADE_SIZE_ETH,
@@ -31,15 +37,21 @@ from scripts.real_trade_config import (
     MAX_OPEN_POSITIONS,
     MAX_DAILY_LOSS_ETH,
     SLIPPAGE_PERCENT,
+    QUOTE_SLIPPAGE_PERCENT,
     DEFAULT_TP_LEVELS,
     DEFAULT_SL_MULTIPLIER,
     GAS_MULTIPLIER,
     MAX_GAS_GWEI,
+    GAS_REFRESH_INTERVAL,
+    GAS_CACHE_MAX_AGE,
+    TX_CONFIRM_TIMEOUT,
     POSITION_CHECK_INTERVAL,
     PRIMARY_FEE_TIER,
-    FALLBACK_FEE_TIER,
+    QUOTE_FEE_TIERS,
     BASE_CHAIN_ID
 )
+from scripts import tp_sl_engine
+from scripts.trade_journal import get_journal
 from scripts.telegram_alert import (
     get_token_info_dexscreener,
     send_telegram_message,
@@ -48,7 +60,10 @@ from scripts.telegram_alert import (
 from scripts.database import (
     is_db_available,
     load_real_portfolio_db,
-    save_real_portfolio_db
+    save_portfolio_state_db,
+    upsert_position_db,
+    delete_position_db,
+    insert_closed_trade_db
 )
 
 # Flush
@@ -124,6 +139,71 @@ WETH_WITHDRAW_ABI = [
     }
 ]
 
+# Calldata şablonları için selector'lar (TX başına ABI encode yerine)
+EXACT_INPUT_SINGLE_SELECTOR = Web3.keccak(
+    text="exactInputSingle((address,address,uint24,address,uint256,uint256,uint160))"
+)[:4]
+APPROVE_SELECTOR = Web3.keccak(text="approve(address,uint256)")[:4]
+WITHDRAW_SELECTOR = Web3.keccak(text="withdraw(uint256)")[:4]
+
+# Quote + Aerodrome swap selector'ları (Route = (from, to, stable, factory))
+QUOTE_EXACT_INPUT_SINGLE_SELECTOR = Web3.keccak(
+    text="quoteExactInputSingle((address,address,uint256,uint24,uint160))"
+)[:4]
+AERO_GET_AMOUNTS_OUT_SELECTOR = Web3.keccak(
+    text="getAmountsOut(uint256,(address,address,bool,address)[])"
+)[:4]
+AERO_SWAP_EXACT_ETH_SELECTOR = Web3.keccak(
+    text="swapExactETHForTokens(uint256,(address,address,bool,address)[],address,uint256)"
+)[:4]
+AERO_SWAP_EXACT_TOKENS_SELECTOR = Web3.keccak(
+    text="swapExactTokensForTokens(uint256,uint256,(address,address,bool,address)[],address,uint256)"
+)[:4]
+SWAP_DEADLINE_SEC = 120
+
+PRIORITY_FEE_GWEI = 0.001
+
+# Nonce'un zincirle uyuşmadığını gösteren send hataları (resync + yeni nonce ile tekrar)
+_NONCE_ERRORS = ("nonce too low", "nonce too high", "invalid nonce")
+# İmzalı TX zaten mempool'da → gönderim başarılı sayılır (tekrar imzalanırsa swap iki kez çalışır)
+_ALREADY_KNOWN_ERRORS = ("already known", "known transaction")
+
+
+def _word(value: int) -> bytes:
+    """uint256 → 32 byte ABI word."""
+    return int(value).to_bytes(32, "big")
+
+
+def _address_word(address: str) -> bytes:
+    """Adres → 32 byte ABI word (sola sıfır dolgulu)."""
+    return bytes.fromhex(address[2:]).rjust(32, b"\x00")
+
+
+def _aero_route_words(token_in: str, token_out: str, stable: bool) -> bytes:
+    """Tek elemanlı Aerodrome Route[] (uzunluk + statik tuple)."""
+    return (_word(1) + _address_word(token_in) + _address_word(token_out)
+            + _word(1 if stable else 0) + _address_word(AERODROME_FACTORY))
+
+
+def _route_label(route: dict) -> str:
+    """Log için kısa route adı."""
+    if route["dex"] == "aerodrome":
+        return f"Aerodrome {'stable' if route['stable'] else 'volatile'}"
+    return f"UniV3 {route['fee'] / 10000:g}%"
+
+
+def _tx_hex(tx_hash) -> str:
+    """TX hash → 0x'li küçük harf hex (hexbytes >= 1 .hex() öneksiz döner, web3 sürümünden bağımsız)."""
+    h = tx_hash if isinstance(tx_hash, str) else bytes(tx_hash).hex()
+    h = h.lower()
+    return h if h.startswith("0x") else "0x" + h
+
+
+def _topic_address(topic) -> str:
+    """Log topic'inden (32 byte) adres."""
+    raw = bytes(topic) if not isinstance(topic, str) else bytes.fromhex(topic[2:])
+    return "0x" + raw[-20:].hex()
+
 
 # =============================================================================
 # Singleton
@@ -161,24 +241,52 @@ class RealTrader:
         self.wallet_address = self.account.address
         print(f"💼 Trading cüzdanı: {self.wallet_address}")
 
-        # Bakiye kontrol
-        balance = self.w3.eth.get_balance(self.wallet_address)
-        balance_eth = float(self.w3.from_wei(balance, 'ether'))
+        # Yerel nonce (hata olunca zincirden yeniden senkron)
+        self._nonce_lock = threading.Lock()
+        self._next_nonce = None
+
+        # Blok başına yenilenen gas / bakiye cache'i
+        self._chain_lock = threading.Lock()
+        self._chain_state = {"block": None, "gas_params": None, "balance_wei": 0, "updated": 0.0}
+        # Gönderilmiş TX'lerin azami maliyeti: {tx_hash: (wei, gönderim zamanı)} — 'latest' bakiyeden düşülür
+        self._tx_costs = {}
+        self._refresh_chain_state()
+        balance_eth = float(self.w3.from_wei(self._chain_state["balance_wei"], 'ether'))
         print(f"💰 Cüzdan bakiyesi: {balance_eth:.4f} ETH")
 
+        # Token decimals / contract / calldata şablon cache'leri
+        self._decimals_cache = {}
+        self._token_contracts = {}
+        self._calldata_templates = {}
+
         # Router contract
         self.router = self.w3.eth.contract(
             address=Web3.to_checksum_address(UNISWAP_V3_ROUTER),
             abi=SWAP_ROUTER_ABI
         )
 
-        # Portfolio yükle
+        # Portfolio yükle (DB yoksa append-only günlükten)
+        self._journal = get_journal("real")
         self.portfolio = self._load_portfolio()
 
         # Daily loss tracker
         self._daily_loss_eth = self.portfolio.get("daily_loss_tracker", {}).get("loss_eth", 0.0)
         self._daily_reset_date = self.portfolio.get("daily_loss_tracker", {}).get("date", "")
 
+        # Yoldaki TX'ler (restart sonrası portföy başlığından devam) + risk rezervasyonları
+        self._state_lock = threading.RLock()
+        self._pending = {}
+        for r in self.portfolio.get("pending_txs", []):
+            r["tx_hash"] = _tx_hex(r["tx_hash"])  # Eski kayıtlar 0x'siz olabilir
+            self._pending[r["tx_hash"]] = r
+        self._callbacks = {}
+        self._reserved = {}
+        self._selling = {r["token"].lower() for r in self._pending.values() if r["kind"] == "sell"}
+        self._tracker_loop = None
+        self._block_event = None
+
+        threading.Thread(target=self._chain_state_loop, name="gas-refresher", daemon=True).start()
+
     # =========================================================================
     # PORTFOLIO MANAGEMENT
     # =========================================================================
@@ -200,7 +308,7 @@ class RealTrader:
         }
 
     def _load_portfolio(self) -> dict:
-        """Portföyü yükle (DB → JSON → default)."""
+        """Portföyü yükle (DB → günlük snapshot + replay → eski JSON → default)."""
         # DB'den dene
         if is_db_available():
             data = load_real_portfolio_db()
@@ -208,7 +316,12 @@ class RealTrader:
                 print("🗄️  Real portfolio DB'den yüklendi")
                 return data
 
-        # JSON'dan dene
+        # Günlükten dene
+        data = self._journal.load()
+        if data:
+            return data
+
+        # Eski tam JSON yedeğinden dene (günlük öncesi)
         json_path = os.path.join(
             os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
             "data", "real_portfolio.json"
@@ -225,22 +338,25 @@ class RealTrader:
         print("📋 Yeni real portfolio oluşturuldu")
         return self._default_portfolio()
 
-    def _save_portfolio(self):
-        """Portföyü kaydet (DB + JSON backup)."""
-        # DB'ye kaydet
+    def _persist(self, position: dict = None, closed_trade: dict = None,
+                 removed_token: str = None):
+        """
+        Tek bir olayı kaydet: sadece değişen satırlar DB'ye yazılır
+        (pozisyon upsert/silme, closed trade insert, portföy başlığı),
+        günlüğe tek satır eklenir.
+        """
         if is_db_available():
-            save_real_portfolio_db(self.portfolio)
-
-        # JSON backup
-        json_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-            "data", "real_portfolio.json"
-        )
-        try:
-            with open(json_path, 'w') as f:
-                json.dump(self.portfolio, f, indent=2, default=str)
-        except Exception:
-            pass  # Koyeb ephemeral, JSON yazılamazsa sorun değil
+            if closed_trade is not None:
+                insert_closed_trade_db("real", closed_trade)
+            if removed_token:
+                delete_position_db("real", removed_token)
+            elif position is not None:
+                upsert_position_db("real", position)
+            save_portfolio_state_db("real", self.portfolio)
+
+        self._journal.record(self.portfolio, position=position,
+                             closed_trade=closed_trade, removed_token=removed_token)
+        tp_sl_engine.invalidate("real")
 
     def _get_open_positions(self) -> list:
         """Açık pozisyonları döndür."""
@@ -271,14 +387,13 @@ class RealTrader:
                 "date": today,
                 "loss_eth": 0.0
             }
-            self._save_portfolio()
+            self._persist()
 
     def _record_daily_loss(self, loss_eth: float):
         """Günlük kayba ekle (sadece pozitif kayıp)."""
         if loss_eth > 0:
             self._daily_loss_eth += loss_eth
             self.portfolio["daily_loss_tracker"]["loss_eth"] = self._daily_loss_eth
-            self._save_portfolio()
 
     def _get_eth_price(self) -> float:
         """ETH fiyatını USD olarak al."""
@@ -291,221 +406,449 @@ class RealTrader:
             pass
         return 2500  # Fallback
 
-    def _get_gas_params(self) -> dict:
-        """Gas parametrelerini hesapla."""
-        gas_price = self.w3.eth.gas_price
-        max_fee = int(gas_price * GAS_MULTIPLIER)
+    # =========================================================================
+    # CHAIN STATE CACHE (gas + bakiye)
+    # =========================================================================
+
+    def _refresh_chain_state(self, force: bool = False) -> bool:
+        """
+        Son bloğu oku; yeni blok geldiyse gas parametrelerini ve bakiyeyi güncelle.
+        'latest' bakiye henüz onaylanmamış TX'leri görmez: takipteki (ya da takibe girmek
+        üzere olan) TX'lerin maliyeti tekrar düşülür, eşzamanlı alımlar fonu aşmasın.
+        Returns: cache güncellendi mi?
+        """
+        block = self.w3.eth.get_block('latest')
+        number = block['number']
+        if not force and number == self._chain_state["block"]:
+            with self._chain_lock:
+                self._chain_state["updated"] = time.time()
+            return False
+
+        priority = self.w3.to_wei(PRIORITY_FEE_GWEI, 'gwei')
+        base_fee = block.get('baseFeePerGas') or self.w3.eth.gas_price
+        max_fee = int((base_fee + priority) * GAS_MULTIPLIER)
         max_gas_wei = self.w3.to_wei(MAX_GAS_GWEI, 'gwei')
 
         # Cap uygula
         if max_fee > max_gas_wei:
             max_fee = max_gas_wei
 
-        return {
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': self.w3.to_wei(0.001, 'gwei'),
-            'chainId': BASE_CHAIN_ID
+        balance = self.w3.eth.get_balance(self.wallet_address)
+        state_lock = getattr(self, "_state_lock", None)  # __init__'teki ilk çağrıda henüz yok
+        if state_lock is not None:
+            with state_lock:
+                pending = set(self._pending)
+        else:
+            pending = set()
+        now = time.time()
+        with self._chain_lock:
+            # Onaylanıp takipten çıkanlar 'latest' bakiyede; gönderilip henüz _track_tx'e girmemişler kısa süre tutulur
+            self._tx_costs = {h: (cost, sent) for h, (cost, sent) in self._tx_costs.items()
+                              if h in pending or now - sent < GAS_CACHE_MAX_AGE}
+            balance -= sum(cost for cost, _ in self._tx_costs.values())
+            self._chain_state = {
+                "block": number,
+                "gas_params": {
+                    'maxFeePerGas': max_fee,
+                    'maxPriorityFeePerGas': min(priority, max_fee),
+                    'chainId': BASE_CHAIN_ID,
+                    'type': 2,
+                },
+                "balance_wei": balance,
+                "updated": time.time(),
+            }
+        return True
+
+    def _chain_state_loop(self):
+        """Arka plan thread'i: her GAS_REFRESH_INTERVAL'da yeni blok kontrolü (TX tracker'ı da uyandırır)."""
+        while True:
+            try:
+                if self._refresh_chain_state():
+                    self._notify_new_block()
+            except Exception as e:
+                print(f"⚠️ Gas cache yenileme hatası: {e}")
+                time.sleep(5)
+            time.sleep(GAS_REFRESH_INTERVAL)
+
+    def _ensure_chain_state(self):
+        """Cache çok eskiyse (refresher takıldıysa) senkron yenile."""
+        if time.time() - self._chain_state["updated"] > GAS_CACHE_MAX_AGE:
+            self._refresh_chain_state(force=True)
+
+    def _get_gas_params(self) -> dict:
+        """Gas parametreleri (blok başına cache'ten)."""
+        self._ensure_chain_state()
+        with self._chain_lock:
+            return dict(self._chain_state["gas_params"])
+
+    def _get_balance_wei(self) -> int:
+        """ETH bakiyesi (blok başına cache'ten, gönderilen TX'ler düşülmüş)."""
+        self._ensure_chain_state()
+        with self._chain_lock:
+            return self._chain_state["balance_wei"]
+
+    # =========================================================================
+    # NONCE + TX GÖNDERİM
+    # =========================================================================
+
+    def _reserve_nonce(self) -> int:
+        """Sıradaki nonce'u yerelden ver (ilk kullanımda zincirden 'pending' ile senkron)."""
+        with self._nonce_lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.w3.eth.get_transaction_count(self.wallet_address, 'pending')
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def _resync_nonce(self):
+        """Yerel nonce'u sıfırla; sonraki TX zincirden tekrar okur."""
+        with self._nonce_lock:
+            self._next_nonce = None
+
+    def _send_transaction(self, to: str, data: str, value: int, gas: int, _retry: bool = True):
+        """
+        Hazır calldata ile TX'i imzala ve gönder (tek RPC: send_raw_transaction).
+        - "already known": aynı imzalı TX mempool'da → hash'i döner
+        - Nonce hatası (too low / too high / invalid): nonce resync, bir kez tekrar denenir
+        - Diğer hatalar ("replacement transaction underpriced" dahil): nonce resync, çağırana fırlatılır
+        Returns: tx_hash
+        """
+        gas_params = self._get_gas_params()
+        tx = {
+            'to': to,
+            'value': value,
+            'data': data,
+            'gas': gas,
+            'nonce': self._reserve_nonce(),
+            **gas_params
         }
+        try:
+            signed_tx = self.account.sign_transaction(tx)
+        except Exception:
+            self._resync_nonce()  # Ayrılan nonce kullanılmadı → boşluk kalmasın
+            raise
+        try:
+            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        except Exception as e:
+            if any(m in str(e).lower() for m in _ALREADY_KNOWN_ERRORS):
+                print(f"ℹ️ TX zaten mempool'da, tekrar gönderilmedi: {_tx_hex(signed_tx.hash)}")
+                tx_hash = signed_tx.hash
+            else:
+                self._resync_nonce()
+                if _retry and any(m in str(e).lower() for m in _NONCE_ERRORS):
+                    print(f"🔁 Nonce yeniden senkronlandı, TX tekrar gönderiliyor: {e}")
+                    return self._send_transaction(to, data, value, gas, _retry=False)
+                raise
+
+        # Sonraki bakiye kontrolleri bu TX'in maliyetini görsün (onaylanana kadar her yenilemede düşülür)
+        cost = value + gas * gas_params['maxFeePerGas']
+        with self._chain_lock:
+            self._chain_state["balance_wei"] -= cost
+            self._tx_costs[_tx_hex(tx_hash)] = (cost, time.time())
+        return tx_hash
+
+    # =========================================================================
+    # CALLDATA ŞABLONLARI + TOKEN CACHE
+    # =========================================================================
+
+    def _swap_calldata(self, token_in: str, token_out: str, fee_tier: int,
+                       amount_in: int, min_amount_out: int) -> str:
+        """
+        exactInputSingle calldata'sı. Selector + tokenIn/tokenOut/fee/recipient
+        (token çifti başına sabit) şablondan, sadece miktarlar eklenir.
+        """
+        key = (token_in.lower(), token_out.lower(), fee_tier)
+        prefix = self._calldata_templates.get(key)
+        if prefix is None:
+            prefix = (EXACT_INPUT_SINGLE_SELECTOR + _address_word(token_in) + _address_word(token_out)
+                      + _word(fee_tier) + _address_word(self.wallet_address))
+            self._calldata_templates[key] = prefix
+        return "0x" + (prefix + _word(amount_in) + _word(min_amount_out) + _word(0)).hex()
+
+    def _token_contract(self, token_address: str):
+        """ERC20 contract objesi (cache'li)."""
+        key = token_address.lower()
+        contract = self._token_contracts.get(key)
+        if contract is None:
+            contract = self.w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=ERC20_ABI)
+            self._token_contracts[key] = contract
+        return contract
+
+    def _get_decimals(self, token_address: str) -> int:
+        """Token decimals (ilk sorgudan sonra cache'ten)."""
+        key = token_address.lower()
+        if key not in self._decimals_cache:
+            try:
+                self._decimals_cache[key] = self._token_contract(token_address).functions.decimals().call()
+            except Exception:
+                return 18  # Cache'leme, sonraki sefer tekrar dene
+        return self._decimals_cache[key]
+
+    def _received_from_receipt(self, receipt, token_address: str) -> int:
+        """Receipt'teki Transfer log'larından cüzdana gelen token miktarı (raw)."""
+        token = token_address.lower()
+        wallet = self.wallet_address.lower()
+        received = 0
+        for log in receipt.get('logs', []):
+            topics = log.get('topics') or []
+            if len(topics) < 3 or str(log.get('address', '')).lower() != token:
+                continue
+            topic0 = topics[0] if isinstance(topics[0], str) else "0x" + bytes(topics[0]).hex()
+            if topic0.lower() != TRANSFER_EVENT_SIGNATURE or _topic_address(topics[2]) != wallet:
+                continue
+            data = log.get('data') or b""
+            raw = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+            received += int.from_bytes(raw[:32], "big")
+        return received
+
+    # =========================================================================
+    # QUOTE (tek batch eth_call ile tüm route'lar)
+    # =========================================================================
+
+    def _candidate_routes(self) -> list:
+        """Quote alınacak route'lar: Uniswap V3 fee tier'ları + Aerodrome volatile/stable."""
+        routes = [{"dex": "uniswap_v3", "fee": fee} for fee in QUOTE_FEE_TIERS]
+        routes += [{"dex": "aerodrome", "stable": stable} for stable in (False, True)]
+        return routes
+
+    def _quote_call(self, route: dict, token_in: str, token_out: str, amount_in: int) -> dict:
+        """Route için eth_call parametresi ({to, data})."""
+        if route["dex"] == "aerodrome":
+            data = AERO_GET_AMOUNTS_OUT_SELECTOR + _word(amount_in) + _word(0x40) \
+                + _aero_route_words(token_in, token_out, route["stable"])
+            return {"to": AERODROME_ROUTER, "data": "0x" + data.hex()}
+        data = (QUOTE_EXACT_INPUT_SINGLE_SELECTOR + _address_word(token_in) + _address_word(token_out)
+                + _word(amount_in) + _word(route["fee"]) + _word(0))
+        return {"to": UNISWAP_V3_QUOTER, "data": "0x" + data.hex()}
+
+    def _batch_eth_call(self, calls: list) -> list:
+        """
+        eth_call'ları tek JSON-RPC batch isteğinde gönder.
+        Returns: her çağrı için dönen bytes veya None (revert / hata)
+        """
+        results = self._batch_rpc("eth_call", [[call, "latest"] for call in calls])
+        return [bytes.fromhex(r[2:]) if r and len(r) > 2 else None for r in results]
+
+    def _quote_best_route(self, token_in: str, token_out: str, amount_in: int):
+        """
+        Tüm route'lar için quote al, en yüksek çıktıyı seç.
+        Returns: (route, amount_out) — hiç pool yoksa (None, 0)
+        """
+        routes = self._candidate_routes()
+        try:
+            results = self._batch_eth_call([
+                self._quote_call(r, token_in, token_out, amount_in) for r in routes
+            ])
+        except Exception as e:
+            print(f"⚠️ Quote hatası: {e}")
+            return None, 0
+
+        best_route, best_out = None, 0
+        for route, raw in zip(routes, results):
+            if not raw:
+                continue
+            # Quoter: amountOut ilk word; Aerodrome: amounts[] son eleman
+            amount_out = int.from_bytes(raw[:32] if route["dex"] == "uniswap_v3" else raw[-32:], "big")
+            if amount_out > best_out:
+                best_route, best_out = route, amount_out
+        if best_route:
+            print(f"💱 Quote: {_route_label(best_route)} → {best_out} "
+                  f"({sum(1 for r in results if r)}/{len(routes)} route)")
+        return best_route, best_out
+
+    def _route_swap(self, route: dict, token_in: str, token_out: str,
+                    amount_in: int, min_amount_out: int) -> tuple:
+        """
+        Route için swap TX hedefi + calldata + value.
+        ETH girişinde value gönderilir (router wrap eder), çıkış her zaman token/WETH.
+        Returns: (to, data, value)
+        """
+        value = amount_in if token_in.lower() == WETH_ADDRESS.lower() else 0
+        if route["dex"] == "uniswap_v3":
+            calldata = self._swap_calldata(token_in, token_out, route["fee"], amount_in, min_amount_out)
+            return self.router.address, calldata, value
+
+        deadline = int(time.time()) + SWAP_DEADLINE_SEC
+        routes = _aero_route_words(token_in, token_out, route["stable"])
+        if value:
+            data = (AERO_SWAP_EXACT_ETH_SELECTOR + _word(min_amount_out) + _word(0x80)
+                    + _address_word(self.wallet_address) + _word(deadline) + routes)
+        else:
+            data = (AERO_SWAP_EXACT_TOKENS_SELECTOR + _word(amount_in) + _word(min_amount_out) + _word(0xa0)
+                    + _address_word(self.wallet_address) + _word(deadline) + routes)
+        return AERODROME_ROUTER, "0x" + data.hex(), value
+
+    def _route_spender(self, route: dict) -> str:
+        """Sell öncesi approve verilecek router."""
+        return AERODROME_ROUTER if route["dex"] == "aerodrome" else self.router.address
 
     # =========================================================================
     # BUY
     # =========================================================================
 
+    def _committed(self) -> tuple:
+        """Açık + yolda (pending/rezerve) alımlar: (pozisyon sayısı, ETH exposure, token seti)."""
+        tokens = {p["token"].lower() for p in self._get_open_positions()}
+        exposure = self._get_total_exposure()
+        for rec in self._pending.values():
+            if rec["kind"] == "buy":
+                tokens.add(rec["token"].lower())
+                exposure += rec["eth_spent"]
+        for token, eth in self._reserved.items():
+            tokens.add(token)
+            exposure += eth
+        return len(tokens), exposure, tokens
+
     def buy_token(
         self,
         token_address: str,
         token_symbol: str,
         entry_mcap: float,
-        eth_amount: float = None
+        eth_amount: float = None,
+        on_complete=None
     ) -> Optional[dict]:
         """
-        ETH → Token swap via Uniswap V3 exactInputSingle.
-        Returns: position dict veya None.
+        ETH → Token swap (quote'taki en iyi route).
+        TX gönderilince hemen döner; onay track_transactions'ta işlenir.
+        on_complete(position | None): onay / hata sonrası çağrılır.
+        Returns: pending kaydı veya None (risk kontrolü / gönderim hatası).
         """
         if not REAL_TRADING_ENABLED:
             return None
 
         if eth_amount is None:
             eth_amount = REAL_TRADE_SIZE_ETH
+        token_key = token_address.lower()
 
-        # --- Safety Checks ---
-        if eth_amount > MAX_SINGLE_TRADE_ETH:
-            print(f"🛡️ SAFETY: Trade {eth_amount} > max {MAX_SINGLE_TRADE_ETH} ETH")
-            return None
+        # --- Safety Checks (yoldaki alımlar dahil, slot rezerve edilir) ---
+        with self._state_lock:
+            if eth_amount > MAX_SINGLE_TRADE_ETH:
+                print(f"🛡️ SAFETY: Trade {eth_amount} > max {MAX_SINGLE_TRADE_ETH} ETH")
+                return None
 
-        if len(self._get_open_positions()) >= MAX_OPEN_POSITIONS:
-            print(f"🛡️ SAFETY: Max pozisyon limiti ({MAX_OPEN_POSITIONS})")
-            return None
+            count, exposure, tokens = self._committed()
+            if count >= MAX_OPEN_POSITIONS:
+                print(f"🛡️ SAFETY: Max pozisyon limiti ({MAX_OPEN_POSITIONS})")
+                return None
 
-        if self._get_total_exposure() + eth_amount > MAX_TOTAL_EXPOSURE_ETH:
-            print(f"🛡️ SAFETY: Max exposure limiti ({MAX_TOTAL_EXPOSURE_ETH} ETH)")
-            return None
+            if exposure + eth_amount > MAX_TOTAL_EXPOSURE_ETH:
+                print(f"🛡️ SAFETY: Max exposure limiti ({MAX_TOTAL_EXPOSURE_ETH} ETH)")
+                return None
 
-        self._check_daily_loss_reset()
-        if self._daily_loss_eth >= MAX_DAILY_LOSS_ETH:
-            print(f"🛡️ SAFETY: Günlük kayıp limiti ({self._daily_loss_eth:.4f}/{MAX_DAILY_LOSS_ETH} ETH)")
-            return None
+            self._check_daily_loss_reset()
+            if self._daily_loss_eth >= MAX_DAILY_LOSS_ETH:
+                print(f"🛡️ SAFETY: Günlük kayıp limiti ({self._daily_loss_eth:.4f}/{MAX_DAILY_LOSS_ETH} ETH)")
+                return None
 
-        # Duplikat kontrolü
-        if self._find_position(token_address):
-            print(f"🛡️ SAFETY: {token_symbol} için zaten açık pozisyon var")
-            return None
+            # Duplikat kontrolü
+            if token_key in tokens:
+                print(f"🛡️ SAFETY: {token_symbol} için zaten açık/bekleyen pozisyon var")
+                return None
 
-        # Bakiye kontrolü
-        balance = self.w3.eth.get_balance(self.wallet_address)
-        balance_eth = float(self.w3.from_wei(balance, 'ether'))
-        if balance_eth < eth_amount + 0.002:
-            print(f"🛡️ SAFETY: Yetersiz bakiye: {balance_eth:.4f} ETH")
-            return None
+            # Bakiye kontrolü (blok cache'i, gönderilmiş TX'ler düşülmüş)
+            balance = self._get_balance_wei()
+            balance_eth = float(self.w3.from_wei(balance, 'ether'))
+            if balance_eth < eth_amount + 0.002:
+                print(f"🛡️ SAFETY: Yetersiz bakiye: {balance_eth:.4f} ETH")
+                return None
 
-        # --- Token bilgisi ---
-        token_info = get_token_info_dexscreener(token_address)
-        price_usd = token_info.get('price', 0)
-        if price_usd <= 0:
-            print(f"⚠️ {token_symbol} fiyat alınamadı, trade iptal")
-            return None
+            self._reserved[token_key] = eth_amount
 
-        # Token decimals
-        token_contract = self.w3.eth.contract(
-            address=Web3.to_checksum_address(token_address),
-            abi=ERC20_ABI
-        )
         try:
-            decimals = token_contract.functions.decimals().call()
-        except:
-            decimals = 18
-
-        # Slippage hesaplama
-        eth_price_usd = self._get_eth_price()
-        expected_tokens = (eth_amount * eth_price_usd) / price_usd
-        min_amount_out = int(expected_tokens * (1 - SLIPPAGE_PERCENT / 100) * (10 ** decimals))
-        amount_in_wei = self.w3.to_wei(eth_amount, 'ether')
-
-        # --- İlk deneme: PRIMARY_FEE_TIER ---
-        result = self._execute_buy(
-            token_address, token_symbol, entry_mcap,
-            eth_amount, amount_in_wei, min_amount_out,
-            token_contract, decimals, price_usd,
-            PRIMARY_FEE_TIER
-        )
-
-        # Başarısızsa FALLBACK_FEE_TIER dene
-        if result is None:
-            print(f"🔄 {token_symbol} fee tier {PRIMARY_FEE_TIER} başarısız, {FALLBACK_FEE_TIER} deneniyor...")
-            result = self._execute_buy(
-                token_address, token_symbol, entry_mcap,
-                eth_amount, amount_in_wei, min_amount_out,
-                token_contract, decimals, price_usd,
-                FALLBACK_FEE_TIER
-            )
+            # --- Token bilgisi ---
+            token_info = get_token_info_dexscreener(token_address)
+            price_usd = token_info.get('price', 0)
+            if price_usd <= 0:
+                print(f"⚠️ {token_symbol} fiyat alınamadı, trade iptal")
+                return None
 
-        return result
+            # Token decimals (cache'li)
+            decimals = self._get_decimals(token_address)
 
-    def _execute_buy(
-        self,
-        token_address: str,
-        token_symbol: str,
-        entry_mcap: float,
-        eth_amount: float,
-        amount_in_wei: int,
-        min_amount_out: int,
-        token_contract,
-        decimals: int,
-        price_usd: float,
-        fee_tier: int
-    ) -> Optional[dict]:
-        """Swap TX oluştur, imzala, gönder."""
-        try:
-            # Önceki token bakiyesini oku (delta hesaplamak için)
-            pre_balance = token_contract.functions.balanceOf(self.wallet_address).call()
-
-            swap_params = (
-                Web3.to_checksum_address(WETH_ADDRESS),      # tokenIn
-                Web3.to_checksum_address(token_address),      # tokenOut
-                fee_tier,                                      # fee
-                self.wallet_address,                           # recipient
-                amount_in_wei,                                 # amountIn
-                min_amount_out,                                # amountOutMinimum
-                0                                              # sqrtPriceLimitX96
-            )
+            amount_in_wei = self.w3.to_wei(eth_amount, 'ether')
 
-            gas_params = self._get_gas_params()
-            nonce = self.w3.eth.get_transaction_count(self.wallet_address)
-
-            tx = self.router.functions.exactInputSingle(swap_params).build_transaction({
-                'from': self.wallet_address,
-                'value': amount_in_wei,
-                'nonce': nonce,
-                'gas': 300000,
-                **gas_params
+            # --- Tüm pool / fee tier'lar için quote → en iyi route, tek TX ---
+            route, quoted_out = self._quote_best_route(WETH_ADDRESS, token_address, amount_in_wei)
+            if route is None:
+                print(f"⚠️ {token_symbol} için swap route'u bulunamadı (quote yok), trade iptal")
+                return None
+            min_amount_out = int(quoted_out * (1 - QUOTE_SLIPPAGE_PERCENT / 100))
+
+            to, calldata, value = self._route_swap(route, WETH_ADDRESS, token_address,
+                                                   amount_in_wei, min_amount_out)
+            tx_hash = self._send_transaction(to, calldata, value, 300000)
+            print(f"📤 Buy TX gönderildi: {token_symbol} | {_tx_hex(tx_hash)[:18]}... ({_route_label(route)})")
+
+            # Rezervasyon bırakılmadan önce pending'e alınır (risk sayımında boşluk olmasın)
+            return self._track_tx(tx_hash, "buy", token_address, token_symbol, on_complete, {
+                "entry_mcap": entry_mcap,
+                "eth_spent": eth_amount,
+                "decimals": decimals,
+                "entry_price": price_usd,
+                "route": route,
+                "fee_tier": route.get("fee"),
+                "buy_tx": _tx_hex(tx_hash),
             })
+        except Exception as e:
+            print(f"⚠️ Buy error ({token_symbol}): {e}")
+            return None
+        finally:
+            with self._state_lock:
+                self._reserved.pop(token_key, None)
+
+    def _confirm_buy(self, rec: dict, receipt: dict) -> Optional[dict]:
+        """Buy receipt'i geldi: pozisyonu oluştur, kaydet, bildir."""
+        if receipt['status'] != 1:
+            print(f"❌ Buy TX FAILED: {rec['symbol']} | {rec['tx_hash']}")
+            return None
 
-            # İmzala ve gönder
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key=TRADING_PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            print(f"📤 Buy TX gönderildi: {tx_hash.hex()[:16]}...")
-
-            # Receipt bekle
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
-
-            if receipt['status'] == 1:
-                # Gerçek alınan token miktarı (delta)
-                post_balance = token_contract.functions.balanceOf(self.wallet_address).call()
-                tokens_received = post_balance - pre_balance
-                actual_amount = tokens_received / (10 ** decimals)
-
-                # Gas maliyeti
-                gas_cost_wei = receipt['gasUsed'] * receipt.get('effectiveGasPrice', self.w3.eth.gas_price)
-                gas_cost_eth = float(self.w3.from_wei(gas_cost_wei, 'ether'))
-                self.portfolio["total_gas_spent_eth"] = self.portfolio.get("total_gas_spent_eth", 0) + gas_cost_eth
-
-                # Pozisyon oluştur
-                position = {
-                    "token": token_address,
-                    "symbol": token_symbol,
-                    "amount": actual_amount,
-                    "amount_raw": str(tokens_received),
-                    "decimals": decimals,
-                    "entry_price": price_usd,
-                    "entry_mcap": entry_mcap,
-                    "entry_time": datetime.now().isoformat(),
-                    "eth_spent": eth_amount,
-                    "buy_tx": tx_hash.hex(),
-                    "fee_tier": fee_tier,
-                    "tp_levels": copy.deepcopy(DEFAULT_TP_LEVELS),
-                    "sl_multiplier": DEFAULT_SL_MULTIPLIER
-                }
+        # Gerçek alınan token miktarı (receipt Transfer log'ları)
+        tokens_received = self._received_from_receipt(receipt, rec["token"])
+        actual_amount = tokens_received / (10 ** rec["decimals"])
+
+        with self._state_lock:
+            self._add_gas_cost(receipt)
+
+            # Pozisyon oluştur
+            position = {
+                "token": rec["token"],
+                "symbol": rec["symbol"],
+                "amount": actual_amount,
+                "amount_raw": str(tokens_received),
+                "decimals": rec["decimals"],
+                "entry_price": rec["entry_price"],
+                "entry_mcap": rec["entry_mcap"],
+                "entry_time": datetime.now().isoformat(),
+                "eth_spent": rec["eth_spent"],
+                "buy_tx": rec["tx_hash"],
+                "fee_tier": rec["fee_tier"],
+                "route": rec["route"],
+                "tp_levels": copy.deepcopy(DEFAULT_TP_LEVELS),
+                "sl_multiplier": DEFAULT_SL_MULTIPLIER
+            }
 
-                self.portfolio["positions"].append(position)
-                self._save_portfolio()
-
-                # Telegram bildirim
-                _send_real_trade_alert(
-                    action="BUY",
-                    token_symbol=token_symbol,
-                    token_address=token_address,
-                    eth_amount=eth_amount,
-                    tx_hash=tx_hash.hex(),
-                    position_count=len(self._get_open_positions()),
-                    wallet_balance=float(self.w3.from_wei(
-                        self.w3.eth.get_balance(self.wallet_address), 'ether'
-                    )),
-                    extra_info=f"Entry MCap: {format_number(entry_mcap)}"
-                )
+            self.portfolio["positions"].append(position)
+            self._persist(position=position)
 
-                print(f"✅ BUY başarılı: {token_symbol} | {eth_amount:.4f} ETH | {actual_amount:.2f} token")
-                return position
-            else:
-                print(f"❌ Buy TX FAILED: {tx_hash.hex()}")
-                return None
+        # Satış yolunu hızlandırmak için alımın router'ına approve şimdiden (onay beklenmez)
+        if tokens_received > 0:
+            self._pre_approve(position)
 
-        except Exception as e:
-            error_msg = str(e)
-            # execution reverted = pool yok veya yanlış fee tier
-            if "execution reverted" in error_msg.lower():
-                return None  # Caller will retry with fallback fee
-            print(f"⚠️ Buy error ({fee_tier}): {error_msg}")
-            return None
+        # Telegram bildirim
+        _send_real_trade_alert(
+            action="BUY",
+            token_symbol=rec["symbol"],
+            token_address=rec["token"],
+            eth_amount=rec["eth_spent"],
+            tx_hash=rec["tx_hash"],
+            position_count=len(self._get_open_positions()),
+            wallet_balance=float(self.w3.from_wei(self._get_balance_wei(), 'ether')),
+            extra_info=f"Entry MCap: {format_number(rec['entry_mcap'])}"
+        )
+
+        print(f"✅ BUY onaylandı: {rec['symbol']} | {rec['eth_spent']:.4f} ETH | {actual_amount:.2f} token "
+              f"({time.time() - rec['submitted_at']:.1f}sn)")
+        return position
 
     # =========================================================================
     # SELL
@@ -515,193 +858,186 @@ class RealTrader:
         self,
         token_address: str,
         sell_ratio: float = 1.0,
-        reason: str = "MANUAL"
+        reason: str = "MANUAL",
+        on_complete=None
     ) -> Optional[dict]:
         """
-        Token → WETH swap + WETH unwrap.
+        Token → WETH swap (+ onay sonrası WETH unwrap).
         sell_ratio: 0.0-1.0 (0.5 = yarısını sat)
+        Approve gerekiyorsa approve + swap ardışık nonce'larla beklemeden gönderilir.
+        on_complete(closed_trade | None): onay / hata sonrası çağrılır.
+        Returns: pending kaydı veya None.
         """
         position = self._find_position(token_address)
         if not position:
             print(f"⚠️ {token_address[:10]}... için açık pozisyon bulunamadı")
             return None
 
-        token_contract = self.w3.eth.contract(
-            address=Web3.to_checksum_address(token_address),
-            abi=ERC20_ABI
-        )
-        decimals = position.get("decimals", 18)
-
-        # On-chain bakiye (güvenilir kaynak)
-        on_chain_balance = token_contract.functions.balanceOf(self.wallet_address).call()
-        sell_amount_raw = int(on_chain_balance * sell_ratio)
-
-        if sell_amount_raw <= 0:
-            print(f"⚠️ {position['symbol']} satacak bakiye yok")
-            return None
-
-        # --- Step 1: Approve ---
-        try:
-            current_allowance = token_contract.functions.allowance(
-                self.wallet_address,
-                Web3.to_checksum_address(UNISWAP_V3_ROUTER)
-            ).call()
-
-            if current_allowance < sell_amount_raw:
-                max_approval = 2**256 - 1
-                gas_params = self._get_gas_params()
-                approve_tx = token_contract.functions.approve(
-                    Web3.to_checksum_address(UNISWAP_V3_ROUTER),
-                    max_approval
-                ).build_transaction({
-                    'from': self.wallet_address,
-                    'nonce': self.w3.eth.get_transaction_count(self.wallet_address),
-                    'gas': 100000,
-                    **gas_params
-                })
-
-                signed = self.w3.eth.account.sign_transaction(approve_tx, TRADING_PRIVATE_KEY)
-                approve_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
-                self.w3.eth.wait_for_transaction_receipt(approve_hash, timeout=30)
-                print(f"✅ Approve: {position['symbol']}")
-        except Exception as e:
-            print(f"❌ Approve hatası: {e}")
-            return None
+        token_key = token_address.lower()
+        with self._state_lock:
+            if token_key in self._selling:
+                print(f"⏳ {position['symbol']} için satış zaten yolda")
+                return None
+            self._selling.add(token_key)
 
-        # --- Step 2: Swap Token → WETH ---
+        submitted = False
         try:
-            token_info = get_token_info_dexscreener(token_address)
-            price_usd = token_info.get('price', 0)
-            eth_price_usd = self._get_eth_price()
-
-            sell_amount_human = sell_amount_raw / (10 ** decimals)
-            expected_eth = (sell_amount_human * price_usd) / eth_price_usd if eth_price_usd > 0 else 0
-            min_eth_out = self.w3.to_wei(max(expected_eth * (1 - SLIPPAGE_PERCENT / 100), 0), 'ether')
-
-            fee_tier = position.get('fee_tier', PRIMARY_FEE_TIER)
-
-            swap_params = (
-                Web3.to_checksum_address(token_address),  # tokenIn
-                Web3.to_checksum_address(WETH_ADDRESS),    # tokenOut
-                fee_tier,
-                self.wallet_address,                        # recipient
-                sell_amount_raw,
-                min_eth_out,
-                0
-            )
-
-            gas_params = self._get_gas_params()
-            nonce = self.w3.eth.get_transaction_count(self.wallet_address)
+            token_contract = self._token_contract(token_address)
+            decimals = position.get("decimals", 18)
 
-            # ETH bakiye öncesi (WETH dahil değil)
-            pre_eth_balance = self.w3.eth.get_balance(self.wallet_address)
-
-            tx = self.router.functions.exactInputSingle(swap_params).build_transaction({
-                'from': self.wallet_address,
-                'value': 0,
-                'nonce': nonce,
-                'gas': 350000,
-                **gas_params
-            })
+            # On-chain bakiye (güvenilir kaynak)
+            on_chain_balance = token_contract.functions.balanceOf(self.wallet_address).call()
+            sell_amount_raw = int(on_chain_balance * sell_ratio)
 
-            signed_tx = self.w3.eth.account.sign_transaction(tx, TRADING_PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            print(f"📤 Sell TX gönderildi: {tx_hash.hex()[:16]}...")
-
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=60)
+            if sell_amount_raw <= 0:
+                print(f"⚠️ {position['symbol']} satacak bakiye yok")
+                return None
 
-            if receipt['status'] != 1:
-                print(f"❌ Sell TX FAILED: {tx_hash.hex()}")
+            # --- Step 1: Quote → en iyi route + amountOutMinimum ---
+            route, quoted_out = self._quote_best_route(token_address, WETH_ADDRESS, sell_amount_raw)
+            if route is not None:
+                min_eth_out = int(quoted_out * (1 - QUOTE_SLIPPAGE_PERCENT / 100))
+            else:
+                # Quote alınamadı → pozisyonun route'u + DexScreener fiyatından min çıktı
+                route = position.get("route") or {"dex": "uniswap_v3", "fee": position.get('fee_tier') or PRIMARY_FEE_TIER}
+                info = get_token_info_dexscreener(token_address)
+                eth_price_usd = self._get_eth_price()
+                sell_amount_human = sell_amount_raw / (10 ** decimals)
+                expected_eth = (sell_amount_human * info.get('price', 0)) / eth_price_usd if eth_price_usd > 0 else 0
+                min_eth_out = self.w3.to_wei(max(expected_eth * (1 - SLIPPAGE_PERCENT / 100), 0), 'ether')
+                print(f"⚠️ {position['symbol']} quote alınamadı, {_route_label(route)} + DexScreener fiyatı kullanılıyor")
+
+            # --- Step 2: Approve ---
+            # Buy onayında arka planda verilen approve'lar pozisyonda tutulur:
+            # approved → hiçbir çağrı yok; pending → approve nonce'u önde, swap arkasından gider.
+            spender = self._route_spender(route)
+            state = self._approval_state(position, spender)
+            if state not in ("approved", "pending"):
+                try:
+                    current_allowance = token_contract.functions.allowance(
+                        self.wallet_address,
+                        spender
+                    ).call()
+
+                    if current_allowance < sell_amount_raw:
+                        self._submit_approval(position, spender)
+                    else:
+                        self._set_approval(position, spender, "approved")
+                except Exception as e:
+                    print(f"❌ Approve hatası: {e}")
+                    return None
+
+            # --- Step 3: Swap Token → WETH (approve'dan sonraki nonce) ---
+            try:
+                to, calldata, _ = self._route_swap(route, token_address, WETH_ADDRESS,
+                                                   sell_amount_raw, min_eth_out)
+                tx_hash = self._send_transaction(to, calldata, 0, 350000)
+                print(f"📤 Sell TX gönderildi: {position['symbol']} | {_tx_hex(tx_hash)[:18]}...")
+            except Exception as e:
+                print(f"❌ Sell swap hatası: {e}")
                 return None
 
-            # Gas maliyeti
-            gas_cost_wei = receipt['gasUsed'] * receipt.get('effectiveGasPrice', self.w3.eth.gas_price)
-            gas_cost_eth = float(self.w3.from_wei(gas_cost_wei, 'ether'))
-            self.portfolio["total_gas_spent_eth"] = self.portfolio.get("total_gas_spent_eth", 0) + gas_cost_eth
+            submitted = True
+            return self._track_tx(tx_hash, "sell", token_address, position["symbol"], on_complete, {
+                "sell_ratio": sell_ratio,
+                "reason": reason,
+                "route": route,
+            })
+        finally:
+            if not submitted:
+                with self._state_lock:
+                    self._selling.discard(token_key)
+
+    def _confirm_sell(self, rec: dict, receipt: dict) -> Optional[dict]:
+        """Sell receipt'i geldi: unwrap gönder, PnL hesapla, pozisyonu güncelle."""
+        token_address = rec["token"]
+        sell_ratio = rec["sell_ratio"]
+        reason = rec["reason"]
+
+        if receipt['status'] != 1:
+            print(f"❌ Sell TX FAILED: {rec['symbol']} | {rec['tx_hash']}")
+            return None
 
-        except Exception as e:
-            print(f"❌ Sell swap hatası: {e}")
+        position = self._find_position(token_address)
+        if not position:
+            print(f"⚠️ {rec['symbol']} satışı onaylandı ama pozisyon bulunamadı")
             return None
 
-        # --- Step 3: Unwrap WETH → ETH ---
+        # Swap çıktısı: receipt'te cüzdana gelen WETH
+        weth_received = self._received_from_receipt(receipt, WETH_ADDRESS)
+
+        # --- Step 4: Unwrap WETH → ETH (sadece bu swap'tan gelen miktar, onayı beklenmez) ---
         try:
-            weth_contract = self.w3.eth.contract(
-                address=Web3.to_checksum_address(WETH_ADDRESS),
-                abi=WETH_WITHDRAW_ABI
-            )
-            weth_balance = self.w3.eth.contract(
-                address=Web3.to_checksum_address(WETH_ADDRESS),
-                abi=ERC20_ABI
-            ).functions.balanceOf(self.wallet_address).call()
-
-            if weth_balance > 0:
-                gas_params = self._get_gas_params()
-                unwrap_tx = weth_contract.functions.withdraw(weth_balance).build_transaction({
-                    'from': self.wallet_address,
-                    'nonce': self.w3.eth.get_transaction_count(self.wallet_address),
-                    'gas': 50000,
-                    **gas_params
-                })
-                signed = self.w3.eth.account.sign_transaction(unwrap_tx, TRADING_PRIVATE_KEY)
-                unwrap_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
-                self.w3.eth.wait_for_transaction_receipt(unwrap_hash, timeout=30)
-                print(f"✅ WETH unwrap tamamlandı")
+            if weth_received > 0:
+                calldata = "0x" + (WITHDRAW_SELECTOR + _word(weth_received)).hex()
+                unwrap_hash = self._send_transaction(
+                    Web3.to_checksum_address(WETH_ADDRESS), calldata, 0, 50000
+                )
+                self._track_tx(unwrap_hash, "unwrap", WETH_ADDRESS, rec["symbol"])
         except Exception as e:
             print(f"⚠️ WETH unwrap hatası (ETH olarak WETH'te kalabilir): {e}")
 
-        # --- Step 4: PnL Hesaplama ---
-        post_eth_balance = self.w3.eth.get_balance(self.wallet_address)
-        # Alınan ETH = yeni bakiye - eski bakiye + gas harcanan
-        eth_received = float(self.w3.from_wei(post_eth_balance - pre_eth_balance + gas_cost_wei, 'ether'))
-
-        eth_spent = position["eth_spent"] * sell_ratio
-        pnl_eth = eth_received - eth_spent
-        pnl_percent = (pnl_eth / eth_spent * 100) if eth_spent > 0 else 0
-
-        # Closed trade kaydı
-        closed_trade = {
-            "token": token_address,
-            "symbol": position["symbol"],
-            "entry_price": position["entry_price"],
-            "exit_price": price_usd,
-            "entry_mcap": position["entry_mcap"],
-            "exit_mcap": token_info.get('mcap', 0),
-            "eth_spent": eth_spent,
-            "eth_received": eth_received,
-            "pnl_eth": pnl_eth,
-            "pnl_percent": pnl_percent,
-            "entry_time": position["entry_time"],
-            "exit_time": datetime.now().isoformat(),
-            "buy_tx": position["buy_tx"],
-            "sell_tx": tx_hash.hex(),
-            "reason": reason,
-            "sell_ratio": sell_ratio
-        }
+        # --- Step 5: PnL Hesaplama ---
+        # Alınan ETH = swap'ın receipt'teki WETH çıktısı
+        eth_received = float(self.w3.from_wei(weth_received, 'ether'))
+        token_info = get_token_info_dexscreener(token_address)
+        price_usd = token_info.get('price', 0)
 
-        self.portfolio["closed_trades"].append(closed_trade)
-        self.portfolio["total_pnl_eth"] = self.portfolio.get("total_pnl_eth", 0) + pnl_eth
+        with self._state_lock:
+            self._add_gas_cost(receipt)
+
+            eth_spent = position["eth_spent"] * sell_ratio
+            pnl_eth = eth_received - eth_spent
+            pnl_percent = (pnl_eth / eth_spent * 100) if eth_spent > 0 else 0
+
+            # Closed trade kaydı
+            closed_trade = {
+                "token": token_address,
+                "symbol": position["symbol"],
+                "entry_price": position["entry_price"],
+                "exit_price": price_usd,
+                "entry_mcap": position["entry_mcap"],
+                "exit_mcap": token_info.get('mcap', 0),
+                "eth_spent": eth_spent,
+                "eth_received": eth_received,
+                "pnl_eth": pnl_eth,
+                "pnl_percent": pnl_percent,
+                "entry_time": position["entry_time"],
+                "exit_time": datetime.now().isoformat(),
+                "buy_tx": position["buy_tx"],
+                "sell_tx": rec["tx_hash"],
+                "reason": reason,
+                "sell_ratio": sell_ratio
+            }
 
-        if pnl_eth >= 0:
-            self.portfolio["win_count"] = self.portfolio.get("win_count", 0) + 1
-        else:
-            self.portfolio["loss_count"] = self.portfolio.get("loss_count", 0) + 1
-            self._record_daily_loss(abs(pnl_eth))
-
-        # Pozisyonu güncelle
-        if sell_ratio >= 1.0:
-            # Full exit — pozisyonu kaldır
-            self.portfolio["positions"] = [
-                p for p in self.portfolio["positions"]
-                if p["token"].lower() != token_address.lower()
-            ]
-        else:
-            # Partial exit — miktarı güncelle
-            position["eth_spent"] = position["eth_spent"] * (1 - sell_ratio)
-            position["amount"] = position["amount"] * (1 - sell_ratio)
-            remaining_raw = int(int(position["amount_raw"]) * (1 - sell_ratio))
-            position["amount_raw"] = str(remaining_raw)
+            self.portfolio["closed_trades"].append(closed_trade)
+            self.portfolio["total_pnl_eth"] = self.portfolio.get("total_pnl_eth", 0) + pnl_eth
 
-        self._save_portfolio()
+            if pnl_eth >= 0:
+                self.portfolio["win_count"] = self.portfolio.get("win_count", 0) + 1
+            else:
+                self.portfolio["loss_count"] = self.portfolio.get("loss_count", 0) + 1
+                self._record_daily_loss(abs(pnl_eth))
+
+            # Pozisyonu güncelle
+            if sell_ratio >= 1.0:
+                # Full exit — pozisyonu kaldır
+                self.portfolio["positions"] = [
+                    p for p in self.portfolio["positions"]
+                    if p["token"].lower() != token_address.lower()
+                ]
+            else:
+                # Partial exit — miktarı güncelle
+                position["eth_spent"] = position["eth_spent"] * (1 - sell_ratio)
+                position["amount"] = position["amount"] * (1 - sell_ratio)
+                remaining_raw = int(int(position["amount_raw"]) * (1 - sell_ratio))
+                position["amount_raw"] = str(remaining_raw)
+
+            self._persist(
+                position=position,
+                closed_trade=closed_trade,
+                removed_token=token_address if sell_ratio >= 1.0 else None
+            )
 
         # Telegram bildirim
         action = "TP_HIT" if "TP" in reason else ("SL_HIT" if "SL" in reason else "SELL")
@@ -710,80 +1046,345 @@ class RealTrader:
             token_symbol=position["symbol"],
             token_address=token_address,
             eth_amount=eth_received,
-            tx_hash=tx_hash.hex(),
+            tx_hash=rec["tx_hash"],
             pnl_eth=pnl_eth,
             pnl_percent=pnl_percent,
             reason=reason,
             position_count=len(self._get_open_positions()),
-            wallet_balance=float(self.w3.from_wei(
-                self.w3.eth.get_balance(self.wallet_address), 'ether'
-            ))
+            wallet_balance=float(self.w3.from_wei(self._get_balance_wei(), 'ether'))
         )
 
         pnl_emoji = "🟢" if pnl_eth >= 0 else "🔴"
         print(f"{pnl_emoji} SELL: {position['symbol']} | {eth_received:.4f} ETH | PnL: {pnl_eth:+.4f} ETH ({pnl_percent:+.1f}%) | {reason}")
         return closed_trade
 
+    def _add_gas_cost(self, receipt: dict):
+        """Receipt'in gas maliyetini portföye ekle."""
+        gas_cost_wei = receipt['gasUsed'] * (receipt.get('effectiveGasPrice') or self.w3.eth.gas_price)
+        gas_cost_eth = float(self.w3.from_wei(gas_cost_wei, 'ether'))
+        self.portfolio["total_gas_spent_eth"] = self.portfolio.get("total_gas_spent_eth", 0) + gas_cost_eth
+
     # =========================================================================
-    # TP/SL MONITOR
+    # APPROVE ÖN-ONAYI (satış anında allowance sorgusu / approve beklemesi yok)
     # =========================================================================
+    # position["approvals"] = {spender: {"status": pending|approved|failed, "tx", "since"}}
+
+    def _approval_state(self, position: dict, spender: str) -> Optional[str]:
+        return (position.get("approvals") or {}).get(spender.lower(), {}).get("status")
+
+    def _set_approval(self, position: dict, spender: str, status: str, tx_hash: str = None):
+        with self._state_lock:
+            approvals = position.setdefault("approvals", {})
+            entry = approvals.setdefault(spender.lower(), {})
+            entry["status"] = status
+            if tx_hash:
+                entry["tx"] = tx_hash
+                entry["since"] = time.time()
+            if self._find_position(position["token"]):
+                self._persist(position=position)
+
+    def _submit_approval(self, position: dict, spender: str):
+        """Max approve TX'ini gönder (beklemeden) ve pozisyonda pending işaretle."""
+        calldata = "0x" + (APPROVE_SELECTOR + _address_word(spender) + _word(2**256 - 1)).hex()
+        approve_hash = self._send_transaction(
+            self._token_contract(position["token"]).address, calldata, 0, 100000
+        )
+        rec = self._track_tx(approve_hash, "approve", position["token"], position["symbol"],
+                             extra={"spender": spender})
+        self._set_approval(position, spender, "pending", rec["tx_hash"])
+        print(f"📤 Approve gönderildi: {position['symbol']} → {self._spender_label(spender)}")
 
-    async def monitor_positions(self):
+    def _pre_approve(self, position: dict):
         """
-        Her POSITION_CHECK_INTERVAL saniyede açık pozisyonları kontrol et.
-        TP veya SL tetiklenirse otomatik sat.
+        Buy onayı sonrası: sadece alımın quote'unun seçtiği router için approve'u arka planda ver.
+        Satış başka router'dan geçerse o router'ın approve'u satışta (allowance kontrolüyle) verilir.
         """
-        print(f"📊 Pozisyon monitörü başladı (her {POSITION_CHECK_INTERVAL}sn)")
+        spender = self._route_spender(position.get("route") or {"dex": "uniswap_v3"})
+        if self._approval_state(position, spender) in ("approved", "pending"):
+            return
+        try:
+            self._submit_approval(position, spender)
+        except Exception as e:
+            self._set_approval(position, spender, "failed")
+            print(f"⚠️ Ön-approve gönderilemedi ({position['symbol']} → {self._spender_label(spender)}): {e}")
+
+    def _finish_approval(self, rec: dict, ok: bool):
+        """Approve TX'i sonuçlandı: pozisyondaki durumu güncelle."""
+        spender = rec.get("spender") or self.router.address
+        label = self._spender_label(spender)
+        if ok:
+            print(f"✅ Approve: {rec['symbol']} → {label}")
+        else:
+            print(f"❌ Approve başarısız: {rec['symbol']} → {label} (satışta allowance tekrar kontrol edilecek)")
+        position = self._find_position(rec["token"])
+        if position:
+            self._set_approval(position, spender, "approved" if ok else "failed")
+
+    def _spender_label(self, spender: str) -> str:
+        return "Aerodrome" if spender.lower() == AERODROME_ROUTER.lower() else "UniV3"
+
+    def get_pending_approvals(self) -> list:
+        """Onay bekleyen approve'lar: [(sembol, router, bekleme sn)]."""
+        now = time.time()
+        pending = []
+        for pos in self._get_open_positions():
+            for spender, entry in (pos.get("approvals") or {}).items():
+                if entry.get("status") == "pending":
+                    pending.append((pos["symbol"], self._spender_label(spender), int(now - entry.get("since", now))))
+        return pending
 
-        while True:
+    # =========================================================================
+    # TX TAKİBİ (gönderim ≠ onay)
+    # =========================================================================
+
+    def _track_tx(self, tx_hash, kind: str, token_address: str, token_symbol: str,
+                  on_complete=None, extra: dict = None) -> dict:
+        """Gönderilen TX'i takibe al (portföy başlığında pending_txs olarak saklanır)."""
+        rec = {
+            "tx_hash": _tx_hex(tx_hash),
+            "kind": kind,
+            "token": token_address,
+            "symbol": token_symbol,
+            "submitted_at": time.time(),
+            "status": "pending",
+            **(extra or {}),
+        }
+        with self._state_lock:
+            self._pending[rec["tx_hash"]] = rec
+            if on_complete:
+                self._callbacks[rec["tx_hash"]] = on_complete
+            self._save_pending()
+        return rec
+
+    def _save_pending(self):
+        self.portfolio["pending_txs"] = list(self._pending.values())
+        self._persist()
+
+    def _notify_new_block(self):
+        """Gas refresher thread'inden: yeni blok → tracker'ı uyandır."""
+        loop, event = self._tracker_loop, self._block_event
+        if loop is not None and event is not None and self._pending:
             try:
-                positions = list(self._get_open_positions())
-
-                for pos in positions:
-                    try:
-                        token_info = get_token_info_dexscreener(pos["token"])
-                        current_price = token_info.get('price', 0)
-
-                        if current_price <= 0:
-                            continue
-
-                        entry_price = pos.get("entry_price", 0)
-                        if entry_price <= 0:
-                            continue
-
-                        price_multiple = current_price / entry_price
-
-                        # --- STOP LOSS ---
-                        sl = pos.get("sl_multiplier", DEFAULT_SL_MULTIPLIER)
-                        if price_multiple <= sl:
-                            print(f"🛑 STOP LOSS: {pos['symbol']} @ {price_multiple:.2f}x (SL: {sl}x)")
-                            self.sell_token(pos["token"], sell_ratio=1.0, reason=f"SL_{sl}x")
-                            continue
-
-                        # --- TAKE PROFIT ---
-                        for tp_level in pos.get("tp_levels", []):
-                            if not tp_level.get("hit", False) and price_multiple >= tp_level["multiplier"]:
-                                sell_pct = tp_level["sell_pct"]
-                                sell_ratio = sell_pct / 100.0
-
-                                print(f"🎯 TP HIT: {pos['symbol']} @ {price_multiple:.2f}x → %{sell_pct} sat")
-                                self.sell_token(
-                                    pos["token"],
-                                    sell_ratio=sell_ratio,
-                                    reason=f"TP_{tp_level['multiplier']}x"
-                                )
-                                tp_level["hit"] = True
-                                self._save_portfolio()
-                                break
-
-                    except Exception as e:
-                        print(f"⚠️ Pozisyon kontrol hatası ({pos.get('symbol', '?')}): {e}")
-
-                await asyncio.sleep(POSITION_CHECK_INTERVAL)
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop kapandı
 
+    def _batch_rpc(self, method: str, params_list: list, errors: dict = None) -> list:
+        """
+        Aynı metodu farklı parametrelerle tek JSON-RPC batch isteğinde çağır (sonuçlar sırayla).
+        Eleman bazlı hatalar sonuçta None olur; errors verilirse {index: hata} olarak doldurulur
+        (eth_call revert'leri beklenen hata olduğu için quote'ta kullanılmaz).
+        """
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, params in enumerate(params_list)
+        ]
+        resp = requests.post(BASE_RPC_HTTP, json=payload, timeout=10)
+        body = resp.json()
+        if not isinstance(body, list):
+            raise RuntimeError(f"Batch {method} hatası: {body}")
+
+        results = [None] * len(params_list)
+        for item in body:
+            if item.get("id") is None:
+                continue
+            if item.get("error") is not None and errors is not None:
+                errors[item["id"]] = item["error"]
+            results[item["id"]] = item.get("result")
+        return results
+
+    def _poll_receipts(self) -> int:
+        """
+        Yoldaki tüm TX'lerin receipt'lerini tek batch istekte sorgula; gelenleri işle.
+        TX_CONFIRM_TIMEOUT'u aşanlar sadece düştüğü / yerine başka TX geçtiği doğrulanınca
+        başarısız sayılır. Returns: sonuçlanan TX sayısı.
+        """
+        with self._state_lock:
+            records = list(self._pending.values())
+        if not records:
+            return 0
+
+        errors = {}
+        results = self._batch_rpc("eth_getTransactionReceipt", [[r["tx_hash"]] for r in records], errors)
+        now = time.time()
+        resolved = 0
+        timed_out = []
+        for i, (rec, raw) in enumerate(zip(records, results)):
+            if i in errors:
+                # Node hatası "henüz mine olmadı" değildir; timeout'a sayılmaz, görünür olsun
+                print(f"⚠️ Receipt sorgu hatası: {rec['kind']} {rec['symbol']} | {rec['tx_hash'][:18]}... → {errors[i]}")
+                continue
+            if raw:
+                receipt = {
+                    "status": int(raw.get("status", "0x0"), 16),
+                    "gasUsed": int(raw.get("gasUsed", "0x0"), 16),
+                    "effectiveGasPrice": int(raw.get("effectiveGasPrice") or "0x0", 16),
+                    "logs": raw.get("logs", []),
+                }
+                self._resolve_tx(rec, receipt)
+                resolved += 1
+            elif now - rec.get("checked_at", rec["submitted_at"]) > TX_CONFIRM_TIMEOUT:
+                timed_out.append(rec)
+
+        for rec in self._dropped_txs(timed_out):
+            print(f"⌛ TX düştü / yerine başka TX geçti: {rec['kind']} {rec['symbol']} | {rec['tx_hash'][:18]}...")
+            self._resync_nonce()
+            self._resolve_tx(rec, None)
+            resolved += 1
+        return resolved
+
+    def _dropped_txs(self, records: list) -> list:
+        """
+        Timeout'u aşan TX'lerden gerçekten düşenleri ayır (TX nonce'u ↔ hesap nonce'u).
+        - TX bloğa girmiş → receipt gecikiyor, beklemeye devam
+        - TX mempool'da, nonce henüz kullanılmamış → yavaş, beklemeye devam
+        - Node TX'i bilmiyor ya da nonce başka TX ile kullanılmış → düştü / replace edildi
+        """
+        if not records:
+            return []
+        errors = {}
+        txs = self._batch_rpc("eth_getTransactionByHash", [[r["tx_hash"]] for r in records], errors)
+        account_nonce = self.w3.eth.get_transaction_count(self.wallet_address, 'latest')
+
+        dropped = []
+        now = time.time()
+        for i, (rec, tx) in enumerate(zip(records, txs)):
+            if i in errors:
+                print(f"⚠️ TX sorgu hatası: {rec['kind']} {rec['symbol']} | {rec['tx_hash'][:18]}... → {errors[i]}")
+                continue
+            if tx is None:
+                dropped.append(rec)
+                continue
+            mined = tx.get("blockNumber") is not None
+            if not mined and int(tx.get("nonce", "0x0"), 16) < account_nonce:
+                dropped.append(rec)  # Nonce başka bir TX ile kullanıldı
+                continue
+            with self._state_lock:
+                rec["checked_at"] = now  # Sonraki kontrol bir timeout sonra
+            print(f"⏳ TX {int(now - rec['submitted_at'])}sn'dir onaylanmadı "
+                  f"({'blokta, receipt bekleniyor' if mined else 'hâlâ mempool içinde'}): "
+                  f"{rec['kind']} {rec['symbol']} | {rec['tx_hash'][:18]}...")
+        return dropped
+
+    def _resolve_tx(self, rec: dict, receipt: Optional[dict]):
+        """Sonuçlanan TX'i işle, takipten çıkar, callback'i çağır."""
+        result = None
+        try:
+            if receipt is not None:
+                if rec["kind"] == "buy":
+                    result = self._confirm_buy(rec, receipt)
+                elif rec["kind"] == "sell":
+                    result = self._confirm_sell(rec, receipt)
+                elif rec["kind"] == "approve":
+                    with self._state_lock:
+                        self._add_gas_cost(receipt)
+                    self._finish_approval(rec, receipt["status"] == 1)
+                else:
+                    with self._state_lock:
+                        self._add_gas_cost(receipt)
+                    ok = receipt["status"] == 1
+                    print(f"{'✅' if ok else '❌'} WETH unwrap: {rec['symbol']}")
+            elif rec["kind"] == "approve":
+                self._finish_approval(rec, False)
+        except Exception as e:
+            print(f"⚠️ TX sonucu işlenemedi ({rec['kind']} {rec['symbol']}): {e}")
+        finally:
+            with self._state_lock:
+                self._pending.pop(rec["tx_hash"], None)
+                if rec["kind"] == "sell":
+                    self._selling.discard(rec["token"].lower())
+                    tp_sl_engine.invalidate("real")
+                callback = self._callbacks.pop(rec["tx_hash"], None)
+                self._save_pending()
+
+        if callback:
+            try:
+                callback(result)
             except Exception as e:
-                print(f"⚠️ Monitor loop hatası: {e}")
-                await asyncio.sleep(60)
+                print(f"⚠️ TX callback hatası ({rec['symbol']}): {e}")
+
+    async def track_transactions(self):
+        """
+        Yoldaki tüm TX'lerin onay takibi — bağımsız asyncio task.
+        Yeni blok bildirimiyle (gas refresher) uyanır, receipt'ler tek batch'te sorgulanır;
+        işleme thread'de yapılır, event loop bloklanmaz.
+        """
+        self._tracker_loop = asyncio.get_running_loop()
+        self._block_event = asyncio.Event()
+        print(f"🧾 TX takipçisi başladı ({len(self._pending)} bekleyen TX)")
+        last_approval_log = time.time()
+
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._block_event.wait(), timeout=GAS_CACHE_MAX_AGE)
+                except asyncio.TimeoutError:
+                    pass
+                self._block_event.clear()
+                if self._pending:
+                    await asyncio.to_thread(self._poll_receipts)
+
+                if time.time() - last_approval_log >= POSITION_CHECK_INTERVAL:
+                    last_approval_log = time.time()
+                    pending_approvals = self.get_pending_approvals()
+                    if pending_approvals:
+                        print("⏳ Onay bekleyen approve: " + ", ".join(
+                            f"{sym}→{router} ({age}sn)" for sym, router, age in pending_approvals
+                        ))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ TX takip hatası: {e}")
+                await asyncio.sleep(2)
+
+    def get_pending_summary(self) -> list:
+        """Yoldaki TX'ler (log / sağlık için)."""
+        now = time.time()
+        with self._state_lock:
+            return [f"{r['kind']} {r['symbol']} ({now - r['submitted_at']:.0f}sn)" for r in self._pending.values()]
+
+    # =========================================================================
+    # TP/SL TETİKLERİ (tp_sl_engine)
+    # =========================================================================
+
+    def register_triggers(self):
+        """Pozisyonları TP/SL motoruna kaydet (satış RPC yaptığı için handler thread'de çalışır)."""
+        tp_sl_engine.register_owner("real", self._collect_triggers, self._on_trigger, threaded=True)
+
+    def _collect_triggers(self) -> list:
+        """Açık pozisyonların SL / TP eşikleri; satışı yolda olanlar onaylanana kadar izlenmez."""
+        with self._state_lock:
+            return [{
+                "key": pos["token"].lower(),
+                "token": pos["token"],
+                "symbol": pos["symbol"],
+                "entry_price": pos.get("entry_price", 0),
+                "sl_multiplier": pos.get("sl_multiplier", DEFAULT_SL_MULTIPLIER),
+                "tp_levels": pos.get("tp_levels", []),
+                "time_sl_at": None,
+            } for pos in self._get_open_positions() if pos["token"].lower() not in self._selling]
+
+    def _on_trigger(self, watch: dict, trigger: dict):
+        """TP/SL motoru eşik geçişi bildirdi → satış TX'i (onay track_transactions'ta)."""
+        pos = self._find_position(watch["token"])
+        if not pos:
+            return
+
+        if trigger["kind"] != "TP":
+            print(f"🛑 STOP LOSS: {pos['symbol']} @ {trigger['multiple']:.2f}x ({trigger['reason']})")
+            self.sell_token(pos["token"], 1.0, trigger["reason"])
+            return
+
+        tp_level = pos["tp_levels"][trigger["tp_index"]]
+        if tp_level.get("hit", False):
+            return
+        print(f"🎯 TP HIT: {pos['symbol']} @ {trigger['multiple']:.2f}x → %{tp_level['sell_pct']} sat")
+        pending = self.sell_token(pos["token"], trigger["sell_ratio"], trigger["reason"])
+        if pending:
+            with self._state_lock:
+                tp_level["hit"] = True
+                if self._find_position(pos["token"]):
+                    self._persist(position=pos)
 
 
 # =============================================================================
@@ -0,0 +1,218 @@
+"""
+SQLite Backend - DATABASE_URL yokken database.py'nin kullandığı yerel depolama.
+
+psycopg2 bağlantısını taklit eden ince bir sarmalayıcı:
+- Postgres SQL'i SQLite'a çevirir (%s → ?, NOW() - INTERVAL, ::jsonb, SERIAL, JSONB...)
+- datetime / list / dict parametrelerini TEXT olarak saklar
+- Okurken timestamp ve JSON metinlerini tekrar Python objesine çevirir; VARCHAR
+  kolonlar Postgres'teki gibi str kalır (örn. mcap_checks.alert_time)
+- autocommit / commit / rollback / closed arayüzü psycopg2 ile aynı
+
+Böylece database.py'deki fonksiyonlar aynı imza ve aynı sorgularla çalışır;
+sadece SQLite'ın desteklemediği birkaç yapı (partition, array, LATERAL) için
+database.py içinde ayrı dal vardır.
+"""
+
+import json
+import re
+import sqlite3
+from datetime import datetime
+
+# WAL modunda eşzamanlı okuma + tek yazar; busy_timeout ile kısa kilitler beklenir
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+)
+
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?$")
+_ISO_PARAM_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2}(?:\.\d+)?)(?:Z|[+-]\d{2}:\d{2})?$")
+_ADD_COLUMN_RE = re.compile(
+    r"^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+(.+?)\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+# (regex, replacement) — sırası önemli
+_TRANSLATIONS = [
+    # Parametreli interval: NOW() - INTERVAL '%s days' → datetime('now', '-' || ? || ' days')
+    (re.compile(r"NOW\(\)\s*-\s*INTERVAL\s*'%s\s+(\w+)'", re.IGNORECASE),
+     r"datetime('now', '-' || %s || ' \1')"),
+    # Sabit interval: NOW() - INTERVAL '7 days' → datetime('now', '-7 days')
+    (re.compile(r"NOW\(\)\s*-\s*INTERVAL\s*'(\d+)\s+(\w+)'", re.IGNORECASE),
+     r"datetime('now', '-\1 \2')"),
+    (re.compile(r"\bNOW\(\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+    # DDL tipleri
+    (re.compile(r"\bSERIAL\s+PRIMARY\s+KEY\b", re.IGNORECASE), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bid\s+SERIAL\s*,", re.IGNORECASE), "id INTEGER PRIMARY KEY AUTOINCREMENT,"),
+    (re.compile(r",\s*PRIMARY\s+KEY\s*\(\s*id\s*,\s*created_at\s*\)", re.IGNORECASE), ""),
+    (re.compile(r"\)\s*PARTITION\s+BY\s+RANGE\s*\([^)]*\)", re.IGNORECASE), ")"),
+    (re.compile(r"\bJSONB\b", re.IGNORECASE), "TEXT"),
+    (re.compile(r"\bTEXT\[\]", re.IGNORECASE), "TEXT"),
+    # Tip dönüşümleri
+    (re.compile(r"::(jsonb|text\[\]|text|int|bigint|float)(?!\w)", re.IGNORECASE), ""),
+]
+
+
+def translate_sql(sql: str) -> str:
+    """Postgres SQL'ini SQLite diyalektine çevir."""
+    for pattern, repl in _TRANSLATIONS:
+        sql = pattern.sub(repl, sql)
+    return sql.replace("%s", "?").replace("%%", "%")
+
+
+def Json(obj):
+    """psycopg2.extras.Json karşılığı: JSON kolonları TEXT olarak saklanır."""
+    return json.dumps(obj)
+
+
+def _adapt_param(value):
+    """Parametreyi SQLite'ın saklayabileceği tipe çevir."""
+    if isinstance(value, datetime):
+        # Postgres TIMESTAMP gibi: timezone atılır, ' ' ayraçlı (CURRENT_TIMESTAMP ile karşılaştırılabilir)
+        return value.replace(tzinfo=None).isoformat(" ")
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(list(value) if isinstance(value, tuple) else value)
+    if isinstance(value, str):
+        m = _ISO_PARAM_RE.match(value)
+        if m:
+            return f"{m.group(1)} {m.group(2)}"
+    return value
+
+
+class _VarcharText(str):
+    """VARCHAR tanımlı kolondan okunan metin (PARSE_DECLTYPES converter'ı işaretler)."""
+
+
+def _convert_varchar(raw: bytes) -> _VarcharText:
+    return _VarcharText(raw.decode("utf-8"))
+
+
+sqlite3.register_converter("VARCHAR", _convert_varchar)
+# sqlite3'ün varsayılan date/timestamp converter'ları tz'li metinde hata verir; metin
+# olarak bırak, _convert_value eskisi gibi çevirsin
+for _decltype in ("TIMESTAMP", "DATE"):
+    sqlite3.register_converter(_decltype, lambda raw: raw.decode("utf-8"))
+
+
+def _convert_value(value):
+    """
+    Okunan TEXT değerini timestamp / JSON ise Python objesine çevir.
+    VARCHAR kolonlar çevrilmez: Postgres'te de str döner, iki backend aynı tipi verir.
+    """
+    if isinstance(value, _VarcharText):
+        return str(value)
+    if not isinstance(value, str) or not value:
+        return value
+    if _TIMESTAMP_RE.match(value):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if value[0] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _convert_row(row):
+    if row is None:
+        return None
+    return tuple(_convert_value(v) for v in row)
+
+
+class SQLiteCursor:
+    """psycopg2 cursor arayüzünün kullanılan alt kümesi."""
+
+    def __init__(self, conn: "SQLiteConnection"):
+        self._conn = conn
+        self._cur = conn._raw.cursor()
+        self.itersize = 2000
+
+    @property
+    def rowcount(self) -> int:
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def execute(self, sql: str, params=None):
+        m = _ADD_COLUMN_RE.match(sql)
+        if m:
+            table, column, dtype = m.groups()
+            existing = {r[1] for r in self._conn._raw.execute(f"PRAGMA table_info({table})")}
+            if column in existing:
+                return self
+            sql = f"ALTER TABLE {table} ADD COLUMN {column} {dtype}"
+
+        # autocommit kapalıysa ilk sorguda transaction aç (psycopg2 davranışı)
+        if not self._conn.autocommit and not self._conn._raw.in_transaction:
+            self._conn._raw.execute("BEGIN")
+
+        args = tuple(_adapt_param(p) for p in (params or ()))
+        self._cur.execute(translate_sql(sql), args)
+        return self
+
+    def fetchone(self):
+        return _convert_row(self._cur.fetchone())
+
+    def fetchall(self):
+        return [_convert_row(r) for r in self._cur.fetchall()]
+
+    def fetchmany(self, size: int = None):
+        return [_convert_row(r) for r in self._cur.fetchmany(size or self.itersize)]
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    """psycopg2 connection arayüzünün kullanılan alt kümesi (autocommit varsayılan)."""
+
+    def __init__(self, path: str):
+        # isolation_level=None → sqlite3 modülü kendiliğinden BEGIN açmaz
+        # PARSE_DECLTYPES → VARCHAR kolonlar _VarcharText olarak gelir (timestamp'e çevrilmez)
+        self._raw = sqlite3.connect(path, isolation_level=None, check_same_thread=False,
+                                    detect_types=sqlite3.PARSE_DECLTYPES)
+        for pragma in _PRAGMAS:
+            self._raw.execute(pragma)
+        self._autocommit = True
+        self.closed = 0
+
+    @property
+    def autocommit(self) -> bool:
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value: bool):
+        self._autocommit = bool(value)
+
+    def cursor(self, name: str = None, withhold: bool = False) -> SQLiteCursor:
+        # Named (server-side) cursor yok; SQLite cursor zaten satırları tembel üretir
+        return SQLiteCursor(self)
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._raw.execute("COMMIT")
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._raw.execute("ROLLBACK")
+
+    def close(self):
+        self._raw.close()
+        self.closed = 1
+
+
+def connect(path: str) -> SQLiteConnection:
+    """WAL modunda SQLite bağlantısı aç."""
+    return SQLiteConnection(path)
@@ -0,0 +1,338 @@
+"""
+TP/SL Engine - Real + virtual pozisyonlar için ortak, olay güdümlü tetik motoru.
+
+Eski yaklaşım: her 30sn'de pozisyon başına ayrı DexScreener isteği; 2x yapıp
+düşen token iki kontrol arasında kaçıyordu, zaman-SL her turda yeniden hesaplanıyordu.
+Bu modül:
+- Tüm açık pozisyonların SL / TP eşiklerini token bazında indeksler
+  (token başına en yakın alt/üst fiyat → fiyat güncellemesi O(1) eşik kontrolü)
+- Fiyatları TP_SL_POLL_INTERVAL'da (~1 blok) tek batch istekle çeker;
+  başka bir fiyat kaynağı on_price() ile doğrudan besleyebilir
+- Zaman bazlı stop'ları timer wheel'de tutar (süresi dolan tick'te bir kez tetiklenir)
+- Eşik geçilince pozisyon sahibinin handler'ını çağırır (threaded sahipler thread'de, diğerleri inline)
+
+Not: wallet_monitor'ün log akışı sadece Transfer event'i içerdiği için (Swap yok)
+fiyat kaynağı price_tracker ile aynı batch DexScreener sorgusudur.
+
+Kullanım:
+    register_owner("virtual", collect_fn, handler_fn)
+    invalidate("virtual")          # pozisyon değişince
+    await run_tp_sl_engine()
+"""
+
+import asyncio
+import threading
+import time
+
+from scripts.price_tracker import fetch_quotes_batch
+from scripts.real_trade_config import TP_SL_POLL_INTERVAL, TP_SL_TIMER_TICK, POSITION_CHECK_INTERVAL
+
+_TIMER_SLOTS = 4096  # TICK=1sn → ~68dk tek tur; daha uzak deadline'lar tur sayısıyla bekler
+
+
+class _TimerWheel:
+    """Hashed timer wheel: deadline → slot (tick % slot sayısı), mutlak tick ile tur ayrımı."""
+
+    def __init__(self, tick: float, slots: int = _TIMER_SLOTS):
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = int(time.time() // tick)
+        self.count = 0
+
+    def add(self, deadline: float, item):
+        at = max(int(deadline // self.tick), self.current)
+        self.slots[at % len(self.slots)].append((at, item))
+        self.count += 1
+
+    def advance(self, now: float) -> list:
+        """now'a kadar süresi dolan item'ları döndür (her slot en fazla bir kez gezilir)."""
+        target = int(now // self.tick)
+        if target < self.current:
+            return []
+        expired = []
+        for step in range(min(target - self.current + 1, len(self.slots))):
+            idx = (self.current + step) % len(self.slots)
+            bucket = self.slots[idx]
+            if not bucket:
+                continue
+            keep = []
+            for at, item in bucket:
+                (expired if at <= target else keep).append((at, item))
+            self.slots[idx] = keep
+        self.current = target + 1
+        self.count -= len(expired)
+        return [item for _, item in expired]
+
+
+# Pozisyon sahipleri: {owner: {"collect", "handler", "threaded", "dirty", "loaded_at"}}
+_owners = {}
+# Aktif tetikler: {(owner, key): watch}
+_watches = {}
+# Token indeksi: {token: {"ids": set, "low": en yüksek SL fiyatı, "high": en düşük sıradaki TP fiyatı}}
+_by_token = {}
+# Son fiyatlar: {token: {"price", "mcap", "at"}}
+_quotes = {}
+# Handler'ı çalışan tetikler (tekrar tetiklenmez, bitince sahip yeniden yüklenir)
+_in_flight = set()
+# Tetiklenip dispatch bekleyenler: [(watch, trigger)]
+_fired = []
+_timers = _TimerWheel(TP_SL_TIMER_TICK)
+_scheduled = set()  # Wheel'deki (watch id, deadline) — yeniden yüklemede aynı timer tekrar eklenmez
+_lock = threading.RLock()
+_stats = {"price_updates": 0, "fired": 0, "timer_fired": 0}
+
+
+def register_owner(owner: str, collect, handler, threaded: bool = True):
+    """
+    Pozisyon sahibini kaydet.
+
+    Args:
+        owner: "real" / "virtual"
+        collect(): açık pozisyonların tetik listesi. Her biri:
+            {"key", "token", "symbol", "entry_price", "sl_multiplier",
+             "tp_levels": [{"multiplier", "sell_pct", "hit"}], "time_sl_at", "time_sl_minutes"}
+        handler(watch, trigger): satışı yapar. trigger:
+            {"kind": SL|TP|TIME_SL, "reason", "sell_ratio", "tp_index", "price", "mcap", "multiple"}
+        threaded: handler thread'de mi (ağ / RPC) yoksa event loop'ta mı çalışsın
+    """
+    with _lock:
+        _owners[owner] = {"collect": collect, "handler": handler, "threaded": threaded,
+                          "dirty": True, "loaded_at": 0.0}
+
+
+def invalidate(owner: str):
+    """Sahibin pozisyonları değişti → bir sonraki turda tetikler yeniden yüklenir."""
+    with _lock:
+        if owner in _owners:
+            _owners[owner]["dirty"] = True
+
+
+def _reindex(token: str):
+    """Token'ın en yakın alt / üst eşiğini yeniden hesapla."""
+    ids = {wid for wid, w in _watches.items() if w["token"] == token}
+    if not ids:
+        _by_token.pop(token, None)
+        return
+    low, high = 0.0, float("inf")
+    for wid in ids:
+        if wid in _in_flight:
+            continue
+        w = _watches[wid]
+        if w["sl_multiplier"]:
+            low = max(low, w["entry_price"] * w["sl_multiplier"])
+        for tp in w["tp_levels"]:
+            if not tp.get("hit", False):
+                high = min(high, w["entry_price"] * tp["multiplier"])
+    _by_token[token] = {"ids": ids, "low": low, "high": high}
+
+
+def _apply_watches(owner: str, watches: list):
+    """Sahibin tetiklerini baştan kur (lock altında çağrılır)."""
+    touched = {w["token"] for wid, w in _watches.items() if wid[0] == owner}
+    for wid in [wid for wid in _watches if wid[0] == owner]:
+        del _watches[wid]
+
+    for w in watches:
+        entry_price = w.get("entry_price") or 0
+        if entry_price <= 0:
+            continue
+        watch = dict(w)
+        watch["owner"] = owner
+        watch["token"] = w["token"].lower()
+        watch["tp_levels"] = [dict(tp) for tp in w.get("tp_levels", [])]
+        wid = (owner, w["key"])
+        _watches[wid] = watch
+        touched.add(watch["token"])
+        timer = (wid, watch.get("time_sl_at"))
+        if timer[1] and timer not in _scheduled:
+            _timers.add(timer[1], timer)
+            _scheduled.add(timer)
+
+    for token in touched:
+        _reindex(token)
+
+
+def _refresh_owners():
+    """
+    Değişen (veya POSITION_CHECK_INTERVAL'dır yüklenmemiş) sahipleri yeniden yükle.
+    collect() lock dışında çağrılır: trader'lar kendi lock'ları altındayken invalidate() eder.
+    """
+    now = time.time()
+    with _lock:
+        due = [(owner, state) for owner, state in _owners.items()
+               if state["dirty"] or now - state["loaded_at"] >= POSITION_CHECK_INTERVAL]
+        for _, state in due:
+            state["dirty"] = False
+            state["loaded_at"] = now
+
+    for owner, state in due:
+        try:
+            watches = state["collect"]() or []
+        except Exception as e:
+            print(f"⚠️ TP/SL tetikleri yüklenemedi ({owner}): {e}")
+            invalidate(owner)
+            continue
+        with _lock:
+            _apply_watches(owner, watches)
+
+
+def _fire(wid, kind: str, quote: dict, sell_ratio: float, reason: str, tp_index: int = None):
+    """Tetiği dispatch kuyruğuna al (lock altında çağrılır)."""
+    watch = _watches[wid]
+    price = (quote or {}).get("price", 0)
+    _in_flight.add(wid)
+    _fired.append((watch, {
+        "kind": kind,
+        "reason": reason,
+        "sell_ratio": sell_ratio,
+        "tp_index": tp_index,
+        "price": price,
+        "mcap": (quote or {}).get("mcap", 0),
+        "multiple": price / watch["entry_price"] if price else 0,
+    }))
+    _stats["fired"] += 1
+
+
+def on_price(token: str, price: float, mcap: float = 0) -> int:
+    """
+    Token için yeni fiyat. Eşik geçilmediyse O(1) döner; geçildiyse
+    o token'daki pozisyonlar değerlendirilip tetikler kuyruğa alınır.
+    Returns: tetiklenen sayısı
+    """
+    if price <= 0:
+        return 0
+    token = token.lower()
+    fired = 0
+    with _lock:
+        quote = {"price": price, "mcap": mcap, "at": time.time()}
+        _quotes[token] = quote
+        _stats["price_updates"] += 1
+        idx = _by_token.get(token)
+        if not idx or idx["low"] < price < idx["high"]:
+            return 0
+
+        for wid in sorted(idx["ids"], key=str):
+            if wid in _in_flight or wid not in _watches:
+                continue
+            w = _watches[wid]
+            multiple = price / w["entry_price"]
+
+            # --- STOP LOSS ---
+            sl = w["sl_multiplier"]
+            if sl and multiple <= sl:
+                _fire(wid, "SL", quote, 1.0, f"SL_{sl}x")
+                fired += 1
+                continue
+
+            # --- TAKE PROFIT (bir seferde bir seviye) ---
+            for i, tp in enumerate(w["tp_levels"]):
+                if not tp.get("hit", False) and multiple >= tp["multiplier"]:
+                    tp["hit"] = True
+                    _fire(wid, "TP", quote, tp["sell_pct"] / 100.0, f"TP_{tp['multiplier']}x", i)
+                    fired += 1
+                    break
+
+        if fired:
+            _reindex(token)
+    return fired
+
+
+def _expire_timers() -> int:
+    """Süresi dolan zaman-SL'leri tetikle (TP tutmuş veya kapanmış pozisyonlar atlanır). Returns: token sayısı."""
+    fired = set()
+    with _lock:
+        for wid, deadline in _timers.advance(time.time()):
+            _scheduled.discard((wid, deadline))
+            w = _watches.get(wid)
+            if not w or wid in _in_flight or w.get("time_sl_at") != deadline:
+                continue  # Pozisyon kapandı / deadline değişti (eski kayıt)
+            if any(tp.get("hit", False) for tp in w["tp_levels"]):
+                continue
+            _fire(wid, "TIME_SL", _quotes.get(w["token"]), 1.0,
+                  f"TIME_SL_{w.get('time_sl_minutes', 0)}min")
+            _stats["timer_fired"] += 1
+            fired.add(w["token"])
+        for token in fired:
+            _reindex(token)
+    return len(fired)
+
+
+def _run_handler(watch: dict, trigger: dict):
+    wid = (watch["owner"], watch["key"])
+    try:
+        handler = _owners[watch["owner"]]["handler"]
+        handler(watch, trigger)
+    except Exception as e:
+        print(f"⚠️ TP/SL handler hatası ({watch.get('symbol', '?')} {trigger['reason']}): {e}")
+    finally:
+        with _lock:
+            _in_flight.discard(wid)
+            if wid in _watches:
+                _reindex(watch["token"])
+            if watch["owner"] in _owners:
+                _owners[watch["owner"]]["dirty"] = True
+
+
+async def _dispatch():
+    """Kuyruktaki tetikleri çalıştır: thread'li handler'lar paralel, inline olanlar sırayla."""
+    with _lock:
+        batch = list(_fired)
+        _fired.clear()
+    if not batch:
+        return
+
+    threaded = []
+    for watch, trigger in batch:
+        if _owners.get(watch["owner"], {}).get("threaded", True):
+            threaded.append(asyncio.to_thread(_run_handler, watch, trigger))
+        else:
+            _run_handler(watch, trigger)
+    if threaded:
+        await asyncio.gather(*threaded)
+
+
+def poll_prices() -> int:
+    """İndeksteki tüm token'ları tek batch'te sorgula ve motoru besle. Returns: tetiklenen sayısı."""
+    with _lock:
+        tokens = sorted(_by_token)
+    if not tokens:
+        return 0
+    fired = 0
+    for token, quote in fetch_quotes_batch(tokens).items():
+        fired += on_price(token, quote["price"], quote["mcap"])
+    return fired
+
+
+async def run_tp_sl_engine():
+    """
+    TP/SL motoru — bağımsız asyncio task.
+    Her turda: değişen sahipleri yükle → batch fiyat → timer wheel → tetikleri çalıştır.
+    """
+    print(f"🎯 TP/SL motoru başladı (fiyat her {TP_SL_POLL_INTERVAL:.0f}sn, "
+          f"zaman-SL timer wheel {TP_SL_TIMER_TICK:.0f}sn adım)")
+
+    while True:
+        try:
+            _refresh_owners()
+            if _by_token:
+                await asyncio.to_thread(poll_prices)
+            _expire_timers()
+            await _dispatch()
+            await asyncio.sleep(TP_SL_POLL_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ TP/SL motoru hatası: {e}")
+            await asyncio.sleep(TP_SL_POLL_INTERVAL)
+
+
+def get_engine_summary() -> dict:
+    """İzlenen pozisyon / token / timer sayıları ve tetik istatistikleri."""
+    with _lock:
+        return {
+            "watches": len(_watches),
+            "tokens": len(_by_token),
+            "timers": _timers.count,
+            "in_flight": len(_in_flight),
+            **_stats,
+        }
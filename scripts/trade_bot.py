@@ -14,7 +14,7 @@ Koyeb'de ayrı Worker servis olarak çalışır.
 import asyncio
 import sys
 import os
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -25,22 +25,29 @@ from config.settings import (
 from scripts.database import (
     init_db,
     is_db_available,
+    is_sqlite_backend,
     get_pending_signals,
     get_approved_signals,
     update_signal_status,
     expire_old_signals,
 )
 from scripts.telegram_alert import send_status_update, send_error_alert
-from scripts.real_trade_config import POSITION_CHECK_INTERVAL
-from scripts.virtual_trader import get_trader as get_virtual_trader
+from scripts.virtual_trader import get_trader as get_virtual_trader, get_current_price
+from scripts.tp_sl_engine import run_tp_sl_engine
 
 sys.stdout.reconfigure(line_buffering=True)
 
 # Signal polling interval (saniye)
 SIGNAL_POLL_INTERVAL = 5
 
-# Virtual trader TP/SL check interval (saniye)
-VIRTUAL_CHECK_INTERVAL = 30
+
+# Aynı anda işlenebilecek max sinyal (aynı token'ın sinyalleri yine sırayla)
+SIGNAL_CONCURRENCY = 4
+
+# İşlenmekte olan sinyal id'leri (bir sonraki poll'da tekrar alınmasın)
+_inflight_signals = set()
+# Token başına kilit: {token: [asyncio.Lock, bekleyen/çalışan sinyal sayısı]}
+_token_locks = {}
 
 
 async def poll_trade_signals(real_trader):
@@ -49,94 +56,42 @@ async def poll_trade_signals(real_trader):
 
     confirmation_sniper: status='approved' sinyalleri (5dk MCap check geçmiş)
     speed_demon: status='pending' sinyalleri (anında)
+
+    Sinyaller SIGNAL_CONCURRENCY'ye kadar paralel işlenir; aynı token için tek seferde
+    bir sinyal. Alınan sinyal hemen 'processing' olur (sırada beklerken expire edilmez).
+    Risk limitleri tam kalır: virtual portföy VirtualTrader._state_lock ile korunur,
+    real alımlar RealTrader'ın kilitli rezervasyonundan (pozisyon / exposure / duplikat) geçer.
     """
     strategy_config = get_active_strategy_config()
     strategy_name = strategy_config["name"]
     v_trader = get_virtual_trader()
+    semaphore = asyncio.Semaphore(SIGNAL_CONCURRENCY)
+    stats = {"processed": 0, "skipped": 0}
+    running = set()
 
-    print(f"📡 Signal poller başladı | Strateji: {strategy_name} | Her {SIGNAL_POLL_INTERVAL}sn...")
-
-    processed_count = 0
-    skipped_count = 0
+    print(f"📡 Signal poller başladı | Strateji: {strategy_name} | Her {SIGNAL_POLL_INTERVAL}sn "
+          f"| {SIGNAL_CONCURRENCY} paralel")
 
     while True:
         try:
             # Eski sinyalleri expire et
-            expire_old_signals(300)
+            await asyncio.to_thread(expire_old_signals, 300)
 
             # Aktif stratejiye göre sinyal al
             if ACTIVE_STRATEGY == "confirmation_sniper":
-                signals = get_approved_signals(max_age_seconds=600)
+                signals = await asyncio.to_thread(get_approved_signals, max_age_seconds=600)
             else:  # speed_demon
-                signals = get_pending_signals(max_age_seconds=300)
+                signals = await asyncio.to_thread(get_pending_signals, max_age_seconds=300)
 
             for signal in signals:
-                signal_id = signal['id']
-                token_address = signal['token_address']
-                token_symbol = signal['token_symbol']
-                entry_mcap = signal['entry_mcap']
-                trigger_type = signal['trigger_type']
-                wallet_count = signal.get('wallet_count', 3)
-                sig_is_bullish = signal.get('is_bullish', False)
-                sig_wallets = signal.get('wallets_involved') or []
-
-                bullish_tag = " 🔥BULLISH" if sig_is_bullish else ""
-                print(f"\n📡 Sinyal: {token_symbol} ({trigger_type}){bullish_tag} | MCap: ${entry_mcap/1e3:.0f}K | Strateji: {strategy_name}")
-
-                # === VIRTUAL TRADING (her zaman aktif) ===
-                try:
-                    # Scenario 2 (Speed Demon) her zaman anında alır
-                    v_trader.buy_token(2, token_address, token_symbol, entry_mcap, wallet_count,
-                                       is_bullish=sig_is_bullish, wallet_list=sig_wallets)
-
-                    # Scenario 1 (Confirmation Sniper) sadece approved sinyallerde alır
-                    if ACTIVE_STRATEGY == "confirmation_sniper":
-                        # Bu zaten approved sinyal — trade_result'tan 5dk verisini al
-                        trade_result = signal.get('trade_result') or {}
-                        change_5min = trade_result.get('change_5min_pct')
-                        v_trader.buy_token(1, token_address, token_symbol, entry_mcap,
-                                          wallet_count, change_5min_pct=change_5min,
-                                          is_bullish=sig_is_bullish, wallet_list=sig_wallets)
-                except Exception as e:
-                    print(f"⚠️ Virtual trade hatası: {e}")
-
-                # === REAL TRADING ===
-                if not REAL_TRADING_ENABLED:
-                    update_signal_status(signal_id, 'skipped', {"reason": "trading_disabled"})
-                    skipped_count += 1
+                if signal['id'] in _inflight_signals:
                     continue
-
-                # Processing olarak işaretle
-                update_signal_status(signal_id, 'processing')
-
-                try:
-                    result = real_trader.buy_token(
-                        token_address=token_address,
-                        token_symbol=token_symbol,
-                        entry_mcap=entry_mcap
-                    )
-
-                    if result:
-                        trade_result = {
-                            "buy_tx": result.get('buy_tx', ''),
-                            "eth_spent": result.get('eth_spent', 0),
-                            "token_amount": result.get('amount', 0),
-                            "entry_price": result.get('entry_price', 0),
-                            "fee_tier": result.get('fee_tier', 0),
-                            "strategy": strategy_name,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        }
-                        update_signal_status(signal_id, 'executed', trade_result)
-                        processed_count += 1
-                        print(f"✅ Trade executed: {token_symbol} | {result.get('eth_spent', 0):.4f} ETH")
-                    else:
-                        update_signal_status(signal_id, 'failed', {"reason": "buy_returned_none"})
-                        print(f"❌ Trade failed: {token_symbol}")
-
-                except Exception as e:
-                    update_signal_status(signal_id, 'failed', {"reason": str(e)})
-                    print(f"❌ Trade error: {token_symbol} | {e}")
-                    send_error_alert(f"Trade bot error: {token_symbol} - {e}")
+                _inflight_signals.add(signal['id'])
+                task = asyncio.create_task(
+                    _run_signal(signal, real_trader, v_trader, strategy_name, semaphore, stats)
+                )
+                running.add(task)
+                task.add_done_callback(running.discard)
 
         except Exception as e:
             print(f"⚠️ Signal poller hatası: {e}")
@@ -144,22 +99,118 @@ async def poll_trade_signals(real_trader):
         await asyncio.sleep(SIGNAL_POLL_INTERVAL)
 
 
-async def virtual_tp_sl_monitor():
-    """Virtual trader pozisyonlarını periyodik olarak kontrol et (TP/SL)."""
-    print(f"📊 Virtual TP/SL monitor başladı (her {VIRTUAL_CHECK_INTERVAL}sn)...")
-
-    while True:
-        try:
-            v_trader = get_virtual_trader()
-            v_trader.check_tp_sl()
-        except Exception as e:
-            print(f"⚠️ Virtual TP/SL check hatası: {e}")
+async def _run_signal(signal: dict, real_trader, v_trader, strategy_name: str,
+                      semaphore: asyncio.Semaphore, stats: dict):
+    """Tek sinyal: global eşzamanlılık limiti + token kilidi altında işle."""
+    token_key = signal['token_address'].lower()
+    entry = _token_locks.setdefault(token_key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        # Semaphore / token kilidi beklerken expire_old_signals 'pending' / 'approved' sinyali atlamasın
+        await asyncio.to_thread(update_signal_status, signal['id'], 'processing')
+        async with entry[0], semaphore:
+            await _process_signal(signal, real_trader, v_trader, strategy_name, stats)
+    except Exception as e:
+        print(f"⚠️ Sinyal işleme hatası ({signal.get('token_symbol', '?')}): {e}")
+    finally:
+        _inflight_signals.discard(signal['id'])
+        entry[1] -= 1
+        if entry[1] == 0:
+            _token_locks.pop(token_key, None)
+
+
+async def _process_signal(signal: dict, real_trader, v_trader, strategy_name: str, stats: dict):
+    """Sinyal → virtual alımlar (S2 + S1) → real alım TX'i (onay callback'le yazılır)."""
+    signal_id = signal['id']
+    token_address = signal['token_address']
+    token_symbol = signal['token_symbol']
+    entry_mcap = signal['entry_mcap']
+    trigger_type = signal['trigger_type']
+    wallet_count = signal.get('wallet_count', 3)
+    sig_is_bullish = signal.get('is_bullish', False)
+    sig_wallets = signal.get('wallets_involved') or []
+
+    bullish_tag = " 🔥BULLISH" if sig_is_bullish else ""
+    print(f"\n📡 Sinyal: {token_symbol} ({trigger_type}){bullish_tag} | MCap: ${entry_mcap/1e3:.0f}K | Strateji: {strategy_name}")
+
+    # === VIRTUAL TRADING (her zaman aktif) ===
+    # Fiyat bir kez çekilir; alımlar (DB + günlük yazımı) thread'de, portföy VirtualTrader._state_lock ile korunur
+    try:
+        price, _ = await asyncio.to_thread(get_current_price, token_address)
+
+        # Scenario 2 (Speed Demon) her zaman anında alır
+        await asyncio.to_thread(
+            v_trader.buy_token, 2, token_address, token_symbol, entry_mcap, wallet_count,
+            is_bullish=sig_is_bullish, wallet_list=sig_wallets, price=price)
+
+        # Scenario 1 (Confirmation Sniper) sadece approved sinyallerde alır
+        if ACTIVE_STRATEGY == "confirmation_sniper":
+            # Bu zaten approved sinyal — trade_result'tan 5dk verisini al
+            trade_result = signal.get('trade_result') or {}
+            change_5min = trade_result.get('change_5min_pct')
+            await asyncio.to_thread(
+                v_trader.buy_token, 1, token_address, token_symbol, entry_mcap,
+                wallet_count, change_5min_pct=change_5min,
+                is_bullish=sig_is_bullish, wallet_list=sig_wallets, price=price)
+    except Exception as e:
+        print(f"⚠️ Virtual trade hatası: {e}")
+
+    # === REAL TRADING ===
+    if not REAL_TRADING_ENABLED:
+        await asyncio.to_thread(update_signal_status, signal_id, 'skipped', {"reason": "trading_disabled"})
+        stats["skipped"] += 1
+        return
 
-        await asyncio.sleep(VIRTUAL_CHECK_INTERVAL)
+    try:
+        # TX gönderilir gönderilmez döner; sonuç onayda callback ile yazılır
+        pending = await asyncio.to_thread(
+            real_trader.buy_token,
+            token_address=token_address,
+            token_symbol=token_symbol,
+            entry_mcap=entry_mcap,
+            on_complete=_make_buy_callback(signal_id, token_symbol, strategy_name)
+        )
+
+        if pending:
+            await asyncio.to_thread(update_signal_status, signal_id, 'processing', {
+                "buy_tx": pending.get('buy_tx', ''),
+                "status": "submitted",
+                "strategy": strategy_name,
+            })
+            stats["processed"] += 1
+        else:
+            await asyncio.to_thread(update_signal_status, signal_id, 'failed', {"reason": "buy_returned_none"})
+            print(f"❌ Trade failed: {token_symbol}")
+
+    except Exception as e:
+        await asyncio.to_thread(update_signal_status, signal_id, 'failed', {"reason": str(e)})
+        print(f"❌ Trade error: {token_symbol} | {e}")
+        send_error_alert(f"Trade bot error: {token_symbol} - {e}")
+
+
+def _make_buy_callback(signal_id: int, token_symbol: str, strategy_name: str):
+    """Buy TX onaylanınca / başarısız olunca sinyal durumunu güncelleyen callback."""
+    def _on_complete(result):
+        if result:
+            trade_result = {
+                "buy_tx": result.get('buy_tx', ''),
+                "eth_spent": result.get('eth_spent', 0),
+                "token_amount": result.get('amount', 0),
+                "entry_price": result.get('entry_price', 0),
+                "fee_tier": result.get('fee_tier', 0),
+                "strategy": strategy_name,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+            update_signal_status(signal_id, 'executed', trade_result)
+            print(f"✅ Trade executed: {token_symbol} | {result.get('eth_spent', 0):.4f} ETH")
+        else:
+            update_signal_status(signal_id, 'failed', {"reason": "buy_tx_failed"})
+            print(f"❌ Trade failed (onay): {token_symbol}")
+    return _on_complete
 
 
 async def main():
-    """Ana fonksiyon — signal poller + virtual TP/SL + real position monitor paralel."""
+    """Ana fonksiyon — signal poller + TP/SL motoru (virtual + real) + TX takipçisi paralel."""
     strategy_config = get_active_strategy_config()
 
     print("\n" + "=" * 60)
@@ -177,7 +228,8 @@ async def main():
     if ACTIVE_STRATEGY == "confirmation_sniper":
         print(f"⏱️  5dk MCap filtre: +{strategy_config['min_5min_change_pct']}%")
         print(f"🕐 Aktif saatler: {strategy_config['active_hours'][0]}:00-{strategy_config['active_hours'][1]}:00 UTC+3")
-    print(f"🗄️  Database: {'Bağlı' if DATABASE_URL else 'YOK'}")
+    db_label = 'SQLite (yerel)' if is_sqlite_backend() else ('PostgreSQL' if DATABASE_URL else 'YOK')
+    print(f"🗄️  Database: {db_label if is_db_available() else 'YOK'}")
     print("=" * 60 + "\n")
 
     # Database başlat
@@ -208,15 +260,20 @@ async def main():
         f"• TP: {strategy_config['tp_levels'][0]['multiplier']}x/{strategy_config['tp_levels'][1]['multiplier']}x/{strategy_config['tp_levels'][2]['multiplier']}x | SL: {strategy_config['sl_multiplier']}x"
     )
 
+    # TP/SL motoru: virtual + real pozisyonlar tek indekste, tek batch fiyat akışıyla izlenir
+    get_virtual_trader().register_triggers()
+    if real_trader:
+        real_trader.register_triggers()
+
     # Async tasks
     tasks = [
         poll_trade_signals(real_trader),
-        virtual_tp_sl_monitor(),
+        run_tp_sl_engine(),
     ]
 
     if REAL_TRADING_ENABLED and real_trader:
-        tasks.append(real_trader.monitor_positions())
-        print("📊 Real pozisyon monitörü başlatıldı")
+        tasks.append(real_trader.track_transactions())
+        print("📊 Real pozisyonlar TP/SL motorunda + TX takipçisi başlatıldı")
 
     print("🚀 Trade bot v2 çalışıyor...\n")
 
@@ -0,0 +1,231 @@
+"""
+Trade Journal - Portföy olayları için append-only günlük + periyodik snapshot.
+
+JSON yedeği her alım / satış / TP hit'te tüm portföyü (bütün closed trade
+geçmişiyle) indent=2 ile baştan yazıyordu; maliyet geçmişle büyüyordu. Bu modül:
+- Her olayı TRADE_JOURNAL_DIR/<portföy>_journal.jsonl'a tek satır olarak ekler
+  (pozisyon açma / partial / kapanış, closed trade, gas, günlük kayıp reset...)
+- Başlıktan (bakiye, PnL, sayaçlar) sadece değişen alanları yazar; sona eklenen
+  listelerde (daily_snapshots) sadece yeni elemanlar yazılır
+- TRADE_JOURNAL_SNAPSHOT_EVERY olayda bir kompakt snapshot alır, günlüğü sıfırlar
+- Başlangıçta state = snapshot + sonrasındaki olayların replay'i
+
+Olay satırı:
+    {"seq", "ts", "type", "scenario", "set": {scope: {key: value}},
+     "extend": {scope: {key: [yeni elemanlar]}}, "position", "removed", "trade"}
+scope "" → portföyün kökü, "scenario1" vb. → senaryo sözlüğü.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from config.settings import TRADE_JOURNAL_DIR, TRADE_JOURNAL_SNAPSHOT_EVERY
+
+_ROW_LIST_KEYS = ("positions", "closed_trades")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _container(state: dict, scope: str) -> dict:
+    return state.setdefault(scope, {}) if scope else state
+
+
+class TradeJournal:
+    """Tek portföyün (real / virtual) günlüğü ve snapshot'ı."""
+
+    def __init__(self, name: str, scenarios: tuple = ("",)):
+        self.name = name
+        self.scenarios = scenarios
+        self.journal_path = os.path.join(TRADE_JOURNAL_DIR, f"{name}_journal.jsonl")
+        self.snapshot_path = os.path.join(TRADE_JOURNAL_DIR, f"{name}_snapshot.json")
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._since_snapshot = 0
+        self._header = None   # Son yazılan başlık: {scope: {key: json}}
+
+    # -------------------------------------------------------------------------
+    # Başlık diff
+    # -------------------------------------------------------------------------
+
+    def _header_of(self, state: dict) -> dict:
+        header = {"": {k: _dumps(v) for k, v in state.items()
+                       if k not in _ROW_LIST_KEYS and k not in self.scenarios}}
+        for scope in self.scenarios:
+            if scope and isinstance(state.get(scope), dict):
+                header[scope] = {k: _dumps(v) for k, v in state[scope].items() if k not in _ROW_LIST_KEYS}
+        return header
+
+    def _diff(self, state: dict, header: dict) -> tuple:
+        """Önceki başlığa göre değişen alanlar: (set, extend)."""
+        changes, extends = {}, {}
+        for scope, fields in header.items():
+            old_fields = (self._header or {}).get(scope, {})
+            container = _container(state, scope)
+            for key, encoded in fields.items():
+                old = old_fields.get(key)
+                if old == encoded:
+                    continue
+                value = container[key]
+                # Sona ekleme → sadece yeni elemanlar
+                if old and isinstance(value, list) and old.startswith("["):
+                    prev = json.loads(old)
+                    if len(value) > len(prev) and _dumps(value[:len(prev)]) == old:
+                        extends.setdefault(scope, {})[key] = value[len(prev):]
+                        continue
+                changes.setdefault(scope, {})[key] = value
+        return changes, extends
+
+    # -------------------------------------------------------------------------
+    # Yazma
+    # -------------------------------------------------------------------------
+
+    def record(self, state: dict, scenario: str = "", position: dict = None,
+               closed_trade: dict = None, removed_token: str = None):
+        """Tek olayı günlüğe ekle (tek satır). İlk kayıtta / eşikte snapshot alınır."""
+        try:
+            with self._lock:
+                if self._header is None:
+                    self._write_snapshot(state)
+                    return
+
+                header = self._header_of(state)
+                changes, extends = self._diff(state, header)
+                if closed_trade is not None:
+                    kind = "close" if removed_token else "partial_close"
+                elif removed_token:
+                    kind = "remove"
+                elif position is not None:
+                    kind = "position"
+                else:
+                    kind = "state"
+
+                event = {"seq": self._seq + 1, "ts": time.time(), "type": kind, "scenario": scenario}
+                if changes:
+                    event["set"] = changes
+                if extends:
+                    event["extend"] = extends
+                if removed_token:
+                    event["removed"] = removed_token.lower()
+                elif position is not None:
+                    event["position"] = position
+                if closed_trade is not None:
+                    event["trade"] = closed_trade
+                if kind == "state" and not changes and not extends:
+                    return
+
+                if self._file is None:
+                    self._file = open(self.journal_path, "a", encoding="utf-8")
+                self._file.write(_dumps(event) + "\n")
+                self._file.flush()
+                self._seq += 1
+                self._since_snapshot += 1
+                self._header = header
+
+                if self._since_snapshot >= TRADE_JOURNAL_SNAPSHOT_EVERY:
+                    self._write_snapshot(state)
+        except Exception as e:
+            print(f"⚠️ Trade journal yazılamadı ({self.name}): {e}")
+
+    def snapshot(self, state: dict):
+        """Tam state'i kompakt snapshot olarak yaz, günlüğü sıfırla."""
+        try:
+            with self._lock:
+                self._write_snapshot(state)
+        except Exception as e:
+            print(f"⚠️ Trade journal snapshot yazılamadı ({self.name}): {e}")
+
+    def _write_snapshot(self, state: dict):
+        os.makedirs(TRADE_JOURNAL_DIR, exist_ok=True)
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_dumps({"seq": self._seq, "ts": time.time(), "state": state}))
+        os.replace(tmp, self.snapshot_path)
+
+        # Snapshot seq'i kapsadığı için günlük güvenle sıfırlanır
+        # (arada çökme olursa replay seq <= snapshot olan satırları atlar)
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+        self._since_snapshot = 0
+        self._header = self._header_of(state)
+
+    # -------------------------------------------------------------------------
+    # Okuma (replay)
+    # -------------------------------------------------------------------------
+
+    def load(self) -> Optional[dict]:
+        """Snapshot + günlük replay ile state. Snapshot yoksa None."""
+        with self._lock:
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    snap = json.load(f)
+            except FileNotFoundError:
+                return None
+            except Exception as e:
+                print(f"⚠️ Trade journal snapshot okunamadı ({self.name}): {e}")
+                return None
+
+            state = snap["state"]
+            self._seq = snap.get("seq", 0)
+            replayed = 0
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            break  # Yarım kalmış son satır (çökme)
+                        if event.get("seq", 0) <= self._seq:
+                            continue
+                        self._apply(state, event)
+                        self._seq = event["seq"]
+                        replayed += 1
+
+            self._since_snapshot = replayed
+            self._header = self._header_of(state)
+            print(f"📒 {self.name} portföyü günlükten yüklendi (snapshot + {replayed} olay)")
+            return state
+
+    @staticmethod
+    def _apply(state: dict, event: dict):
+        for scope, fields in event.get("set", {}).items():
+            _container(state, scope).update(fields)
+        for scope, fields in event.get("extend", {}).items():
+            container = _container(state, scope)
+            for key, items in fields.items():
+                container.setdefault(key, []).extend(items)
+
+        if not any(k in event for k in ("removed", "position", "trade")):
+            return
+        container = _container(state, event.get("scenario", ""))
+        positions = container.setdefault("positions", [])
+        if "removed" in event:
+            container["positions"] = [p for p in positions if p["token"].lower() != event["removed"]]
+        elif "position" in event:
+            token = event["position"]["token"].lower()
+            for i, pos in enumerate(positions):
+                if pos["token"].lower() == token:
+                    positions[i] = event["position"]
+                    break
+            else:
+                positions.append(event["position"])
+        if "trade" in event:
+            container.setdefault("closed_trades", []).append(event["trade"])
+
+
+_journals = {}
+_journals_guard = threading.Lock()
+
+
+def get_journal(name: str, scenarios: tuple = ("",)) -> TradeJournal:
+    """Portföy başına tek TradeJournal instance."""
+    with _journals_guard:
+        if name not in _journals:
+            _journals[name] = TradeJournal(name, scenarios)
+        return _journals[name]
@@ -0,0 +1,115 @@
+"""
+Transfer Archive - Smart money alım adaylarının arşivi (alert kuralı replay'i için).
+
+wallet_activity sadece filtreleri geçen alımları (cüzdan+token başına ilk alım)
+tutuyor; eşik / likidite / hacim değişikliğini geçmişte denemek için filtre
+öncesi akış gerekiyor. process_transfer swap doğrulaması ve tx sınıflandırmasını
+geçen her alımı, o anki DexScreener zenginleştirmesiyle buraya yazar:
+- TRANSFER_ARCHIVE_DIR/YYYYMMDD.tra (UTC gün) → append-only sabit boyutlu satırlar
+  (ts, blok, token, cüzdan, MCap, likidite, 24s hacim, 24s işlem) = 72 byte
+- Çökmede yarım kalan son satır açılışta kırpılır (price_paths ile aynı düzen)
+- Okuma mmap + struct.iter_unpack ile gün gün stream
+
+TRANSFER_ARCHIVE_DIR boşsa arşiv kapalıdır.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+
+from config.settings import TRANSFER_ARCHIVE_DIR
+
+_MAGIC = b"TRA1"
+_HEADER = struct.Struct("<4sI")          # magic, satır boyutu
+_ROW = struct.Struct("<dQ20s20sfffI")    # ts, blok, token, cüzdan, MCap, likidite, hacim, işlem
+
+_lock = threading.Lock()
+_writer = {"day": None, "file": None}
+
+
+def is_enabled() -> bool:
+    return bool(TRANSFER_ARCHIVE_DIR)
+
+
+def _day_path(day: str) -> str:
+    return os.path.join(TRANSFER_ARCHIVE_DIR, f"{day}.tra")
+
+
+def list_days() -> list:
+    """Arşivdeki günler (YYYYMMDD, sıralı)."""
+    if not is_enabled() or not os.path.isdir(TRANSFER_ARCHIVE_DIR):
+        return []
+    return sorted(name[:-4] for name in os.listdir(TRANSFER_ARCHIVE_DIR) if name.endswith(".tra"))
+
+
+def _open_day(day: str):
+    """Gün dosyasını append için aç; yarım kalmış son satırı kırp."""
+    os.makedirs(TRANSFER_ARCHIVE_DIR, exist_ok=True)
+    f = open(_day_path(day), "ab")
+    size = f.seek(0, os.SEEK_END)
+    if size < _HEADER.size:
+        f.truncate(0)
+        f.write(_HEADER.pack(_MAGIC, _ROW.size))
+    else:
+        torn = (size - _HEADER.size) % _ROW.size
+        if torn:
+            f.truncate(size - torn)
+    return f
+
+
+def archive_transfer(ts: float, block_number: int, token_address: str, wallet: str, token_info: dict):
+    """Tek alım adayını arşive ekle (hata canlı akışı durdurmaz)."""
+    if not is_enabled():
+        return
+    try:
+        row = _ROW.pack(
+            ts, int(block_number or 0),
+            bytes.fromhex(token_address[2:]), bytes.fromhex(wallet[2:]),
+            float(token_info.get('mcap', 0) or 0),
+            float(token_info.get('liquidity', 0) or 0),
+            float(token_info.get('volume_24h', 0) or 0),
+            int(token_info.get('txns_24h_buys', 0) or 0) + int(token_info.get('txns_24h_sells', 0) or 0),
+        )
+        day = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%d")
+        with _lock:
+            if _writer["day"] != day:
+                if _writer["file"] is not None:
+                    _writer["file"].close()
+                _writer["file"] = _open_day(day)
+                _writer["day"] = day
+            _writer["file"].write(row)
+            _writer["file"].flush()
+    except Exception as e:
+        print(f"⚠️ Transfer arşivi yazılamadı: {e}")
+
+
+def iter_day(day: str):
+    """
+    Gün dosyasını mmap üzerinden stream et.
+    Yields: (ts, block, token_address, wallet, mcap, liquidity, volume_24h, txns_24h)
+    """
+    path = _day_path(day)
+    if not os.path.exists(path) or os.path.getsize(path) <= _HEADER.size:
+        return
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = _HEADER.size + (len(mm) - _HEADER.size) // _ROW.size * _ROW.size
+            for ts, block, token, wallet, mcap, liq, vol, txns in _ROW.iter_unpack(mm[_HEADER.size:end]):
+                yield ts, block, "0x" + token.hex(), "0x" + wallet.hex(), mcap, liq, vol, txns
+
+
+def iter_transfers(days: int = None):
+    """Son N günün (None = tümü) arşivini zaman sırasıyla stream et."""
+    all_days = list_days()
+    if days is not None:
+        cutoff = datetime.now(timezone.utc).timestamp() - days * 86400
+        cutoff_day = datetime.fromtimestamp(cutoff, timezone.utc).strftime("%Y%m%d")
+        all_days = [d for d in all_days if d >= cutoff_day]
+    else:
+        cutoff = 0
+    for day in all_days:
+        for row in iter_day(day):
+            if row[0] >= cutoff:
+                yield row
@@ -8,16 +8,22 @@ Her senaryo kendi TP/SL kurallarını uygular.
 
 import json
 import os
+import threading
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from scripts.telegram_alert import get_token_info_dexscreener
-from scripts.database import load_portfolio_db, save_portfolio_db, is_db_available, load_smartest_wallets_db
+from scripts.database import (
+    load_portfolio_db, is_db_available, get_smartest_wallet_addresses_db,
+    save_portfolio_state_db, upsert_position_db, delete_position_db, insert_closed_trade_db,
+)
+from scripts import tp_sl_engine
+from scripts.trade_journal import get_journal
 from config.settings import SNIPER_CONFIG, DEMON_CONFIG
 
-# Data dosya yolu
+# Data dosya yolu (PORTFOLIO_FILE: eski tam JSON yedeği, sadece ilk geçişte okunur)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PORTFOLIO_FILE = os.path.join(BASE_DIR, "data", "virtual_portfolio.json")
 TRADES_LOG = os.path.join(BASE_DIR, "logs", "trades.log")
@@ -71,8 +77,12 @@ def _default_portfolio() -> dict:
     }
 
 
+def _journal():
+    return get_journal("virtual", ("scenario1", "scenario2"))
+
+
 def load_portfolio() -> dict:
-    """Portföyü yükle. Önce DB, yoksa JSON fallback."""
+    """Portföyü yükle. Önce DB, yoksa günlük (snapshot + replay), yoksa eski JSON."""
     if is_db_available():
         db_data = load_portfolio_db()
         if db_data:
@@ -82,6 +92,10 @@ def load_portfolio() -> dict:
                 return _default_portfolio()
             return db_data
 
+    data = _journal().load()
+    if data and data.get("version") == 2:
+        return data
+
     if os.path.exists(PORTFOLIO_FILE):
         with open(PORTFOLIO_FILE, 'r') as f:
             data = json.load(f)
@@ -92,20 +106,6 @@ def load_portfolio() -> dict:
     return _default_portfolio()
 
 
-def save_portfolio(data: dict):
-    """Portföyü kaydet. DB + JSON (ikisine de yaz)."""
-    data["updated_at"] = datetime.now().isoformat()
-
-    if is_db_available():
-        save_portfolio_db(data)
-
-    try:
-        with open(PORTFOLIO_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-    except Exception:
-        pass
-
-
 def log_trade(scenario: str, action: str, token: str, details: str):
     """Trade logla."""
     ensure_logs_dir()
@@ -139,10 +139,31 @@ class VirtualTrader:
 
     def __init__(self):
         self.portfolio = load_portfolio()
+        # buy_token (trade_bot thread'i) ve TP/SL satışları (motor thread'i) aynı portföyü değiştirir
+        self._state_lock = threading.RLock()
+
+    def _persist(self, scenario_num: int = None, position: dict = None,
+                 closed_trade: dict = None, removed_token: str = None):
+        """
+        Tek bir olayı kaydet: sadece değişen satırlar DB'ye yazılır
+        (pozisyon upsert/silme, closed trade insert, senaryo başlığı),
+        günlüğe tek satır eklenir.
+        """
+        self.portfolio["updated_at"] = datetime.now().isoformat()
+        key = f"scenario{scenario_num}"
 
-    def save(self):
-        """Değişiklikleri kaydet."""
-        save_portfolio(self.portfolio)
+        if is_db_available():
+            if closed_trade is not None:
+                insert_closed_trade_db("virtual", closed_trade, key)
+            if removed_token:
+                delete_position_db("virtual", removed_token, key)
+            elif position is not None:
+                upsert_position_db("virtual", position, key)
+            save_portfolio_state_db("virtual", self.portfolio)
+
+        _journal().record(self.portfolio, key if scenario_num else "", position=position,
+                          closed_trade=closed_trade, removed_token=removed_token)
+        tp_sl_engine.invalidate("virtual")
 
     def get_scenario(self, scenario_num: int) -> dict:
         """Senaryo verilerini al."""
@@ -168,8 +189,7 @@ class VirtualTrader:
         # Smartest wallet filtresi
         if config.get("only_smartest_wallets"):
             try:
-                smartest_data = load_smartest_wallets_db() or {}
-                smartest_addrs = {a.lower() for a in smartest_data.get("wallets", {}).keys()}
+                smartest_addrs = get_smartest_wallet_addresses_db()
                 wallet_list_lower = [w.lower() for w in (wallet_list or [])]
                 if not any(w in smartest_addrs for w in wallet_list_lower):
                     return False, "Smartest wallet yok"
@@ -228,7 +248,7 @@ class VirtualTrader:
 
     def buy_token(self, scenario_num: int, token_address: str, token_symbol: str,
                   entry_mcap: float, wallet_count: int = 3, change_5min_pct: float = None,
-                  is_bullish: bool = False, wallet_list: list = None) -> bool:
+                  is_bullish: bool = False, wallet_list: list = None, price: float = None) -> bool:
         """
         Strateji bazlı token alımı.
 
@@ -241,7 +261,18 @@ class VirtualTrader:
             change_5min_pct: 5dk MCap değişim % (Sniper için zorunlu)
             is_bullish: 30dk içinde 2+ alert geldi mi
             wallet_list: Alert'i tetikleyen cüzdan adresleri
+            price: Önceden çekilmiş fiyat (verilmezse DexScreener'dan alınır)
         """
+        if not price:
+            price, _ = get_current_price(token_address)
+        with self._state_lock:
+            return self._open_position(scenario_num, token_address, token_symbol, entry_mcap,
+                                       wallet_count, change_5min_pct, is_bullish, wallet_list, price)
+
+    def _open_position(self, scenario_num: int, token_address: str, token_symbol: str,
+                       entry_mcap: float, wallet_count: int, change_5min_pct: float,
+                       is_bullish: bool, wallet_list: list, price: float) -> bool:
+        """buy_token gövdesi (_state_lock altında çağrılır)."""
         config = _get_strategy_config(scenario_num)
         scenario = self.portfolio[f"scenario{scenario_num}"]
         tag = f"S{scenario_num}"
@@ -262,8 +293,7 @@ class VirtualTrader:
             return False
 
         # Fiyat bilgisi
-        price, mcap = get_current_price(token_address)
-        if price <= 0:
+        if not price or price <= 0:
             print(f"⚠️ {tag}: {token_symbol} fiyat alınamadı")
             return False
 
@@ -299,7 +329,7 @@ class VirtualTrader:
 
         scenario["positions"].append(position)
         scenario["balance_eth"] -= eth_to_spend
-        self.save()
+        self._persist(scenario_num, position=position)
 
         change_info = f" | 5dk: +{change_5min_pct:.1f}%" if change_5min_pct else ""
         log_trade(tag, "BUY", token_symbol,
@@ -310,8 +340,24 @@ class VirtualTrader:
         return True
 
     def sell_token(self, scenario_num: int, token_address: str,
-                   sell_ratio: float = 1.0, reason: str = "MANUAL") -> bool:
-        """Token sat (partial veya full)."""
+                   sell_ratio: float = 1.0, reason: str = "MANUAL",
+                   price: float = None, mcap: float = None) -> bool:
+        """Token sat (partial veya full). price verilirse (TP/SL motorundan) tekrar sorgulanmaz."""
+        if not price:
+            with self._state_lock:
+                held = any(p["token"].lower() == token_address.lower()
+                           for p in self.portfolio[f"scenario{scenario_num}"]["positions"])
+            if not held:
+                return False
+            price, mcap = get_current_price(token_address)
+        if not price or price <= 0:
+            return False
+        with self._state_lock:
+            return self._close_position(scenario_num, token_address, sell_ratio, reason, price, mcap)
+
+    def _close_position(self, scenario_num: int, token_address: str, sell_ratio: float,
+                        reason: str, price: float, mcap: float) -> bool:
+        """sell_token gövdesi (_state_lock altında çağrılır)."""
         scenario = self.portfolio[f"scenario{scenario_num}"]
         tag = f"S{scenario_num}"
 
@@ -325,9 +371,6 @@ class VirtualTrader:
             return False
 
         position = scenario["positions"][position_idx]
-        price, mcap = get_current_price(token_address)
-        if price <= 0:
-            return False
 
         sell_amount = position["amount"] * sell_ratio
         sell_value_usd = sell_amount * price
@@ -378,11 +421,11 @@ class VirtualTrader:
         # Pozisyonu güncelle veya kaldır
         if sell_ratio >= 1.0:
             scenario["positions"].pop(position_idx)
+            self._persist(scenario_num, closed_trade=closed_trade, removed_token=position["token"])
         else:
             position["amount"] -= sell_amount
             position["eth_spent"] -= entry_value_eth
-
-        self.save()
+            self._persist(scenario_num, position=position, closed_trade=closed_trade)
 
         emoji = "🟢" if pnl_eth >= 0 else "🔴"
         log_trade(tag, "SELL", position["symbol"],
@@ -391,71 +434,67 @@ class VirtualTrader:
         print(f"{emoji} {tag} SELL: {position['symbol']} | PnL: {pnl_eth:+.4f} ETH ({pnl_percent:+.1f}%) | {reason}")
         return True
 
-    def check_tp_sl(self):
-        """
-        Tüm açık pozisyonlar için TP/SL kontrol et.
-        Periyodik olarak çağrılır (30sn veya daily_report'ta).
-        """
-        for scenario_num in [1, 2]:
-            scenario = self.portfolio[f"scenario{scenario_num}"]
-            tag = f"S{scenario_num}"
-            positions_to_check = list(scenario["positions"])  # Copy
-
-            for pos in positions_to_check:
-                token_addr = pos["token"]
-                symbol = pos["symbol"]
-
-                price, mcap = get_current_price(token_addr)
-                if price <= 0:
-                    continue
-
-                entry_price = pos["entry_price"]
-                if entry_price <= 0:
-                    continue
+    def register_triggers(self):
+        """Pozisyonları TP/SL motoruna kaydet (handler thread'de, _state_lock altında çalışır)."""
+        tp_sl_engine.register_owner("virtual", self._collect_triggers, self._on_trigger, threaded=True)
 
-                multiplier = price / entry_price
-
-                # --- STOP LOSS ---
-                sl_mult = pos.get("sl_multiplier", 0.6)
-                if multiplier <= sl_mult:
-                    self.sell_token(scenario_num, token_addr, 1.0,
-                                   reason=f"SL_{sl_mult}x")
-                    continue
-
-                # --- TIME-BASED SL ---
+    def _collect_triggers(self) -> list:
+        """Açık pozisyonların SL / TP / zaman-SL eşikleri (TP/SL motoru için)."""
+        watches = []
+        for scenario_num in [1, 2]:
+            with self._state_lock:
+                positions = list(self.portfolio[f"scenario{scenario_num}"]["positions"])
+            for pos in positions:
+                tp_levels = pos.get("tp_levels", [])
                 time_sl_min = pos.get("time_sl_minutes", 30)
-                entry_time = datetime.fromisoformat(pos["entry_time"])
-                elapsed_minutes = (datetime.now() - entry_time).total_seconds() / 60
-
                 # Zaman SL: süresi dolmuş VE TP1 henüz tutmamış
-                tp_levels = pos.get("tp_levels", [])
-                any_tp_hit = any(tp.get("hit", False) for tp in tp_levels)
-
-                if elapsed_minutes >= time_sl_min and not any_tp_hit:
-                    self.sell_token(scenario_num, token_addr, 1.0,
-                                   reason=f"TIME_SL_{time_sl_min}min")
-                    continue
-
-                # --- TAKE PROFIT ---
-                for tp in tp_levels:
-                    if tp.get("hit", False):
-                        continue
-                    if multiplier >= tp["multiplier"]:
-                        sell_ratio = tp["sell_pct"] / 100
-                        tp["hit"] = True
-                        self.sell_token(scenario_num, token_addr, sell_ratio,
-                                       reason=f"TP_{tp['multiplier']}x")
-                        break  # Bir seferde bir TP
-
-            self.save()
+                time_sl_at = None
+                if not any(tp.get("hit", False) for tp in tp_levels):
+                    entry_time = datetime.fromisoformat(pos["entry_time"])
+                    time_sl_at = entry_time.timestamp() + time_sl_min * 60
+                watches.append({
+                    "key": (scenario_num, pos["token"].lower()),
+                    "token": pos["token"],
+                    "symbol": pos["symbol"],
+                    "entry_price": pos["entry_price"],
+                    "sl_multiplier": pos.get("sl_multiplier", 0.6),
+                    "tp_levels": tp_levels,
+                    "time_sl_at": time_sl_at,
+                    "time_sl_minutes": time_sl_min,
+                })
+        return watches
+
+    def _on_trigger(self, watch: dict, trigger: dict):
+        """TP/SL motoru eşik geçişi bildirdi → motorun fiyatıyla sat."""
+        scenario_num, token_key = watch["key"]
+        # Fiyat kilit dışında: cache'te quote yoksa (zaman-SL) DexScreener alımları bekletmesin
+        price, mcap = trigger["price"], trigger["mcap"]
+        if not price:
+            price, mcap = get_current_price(watch["token"])
+        if not price or price <= 0:
+            return
+        with self._state_lock:
+            if trigger["kind"] == "TP":
+                pos = next((p for p in self.portfolio[f"scenario{scenario_num}"]["positions"]
+                            if p["token"].lower() == token_key), None)
+                if not pos:
+                    return
+                tp = pos["tp_levels"][trigger["tp_index"]]
+                if tp.get("hit", False):
+                    return
+                tp["hit"] = True
+            self._close_position(scenario_num, watch["token"], trigger["sell_ratio"],
+                                 trigger["reason"], price, mcap)
 
     def get_portfolio_value(self, scenario_num: int) -> tuple:
         """Senaryo portföy değerini hesapla. Returns: (total_eth, unrealized_pnl_eth)"""
-        scenario = self.portfolio[f"scenario{scenario_num}"]
-        total_eth = scenario["balance_eth"]
+        with self._state_lock:
+            scenario = self.portfolio[f"scenario{scenario_num}"]
+            total_eth = scenario["balance_eth"]
+            positions = list(scenario["positions"])
         unrealized_pnl = 0.0
 
-        for pos in scenario["positions"]:
+        for pos in positions:
             price, _ = get_current_price(pos["token"])
             if price > 0:
                 current_value_usd = pos["amount"] * price
@@ -515,11 +554,12 @@ class VirtualTrader:
     def take_daily_snapshot(self):
         """Günlük snapshot al."""
         summary = self.get_daily_summary()
-        self.portfolio["daily_snapshots"].append({
-            "timestamp": datetime.now().isoformat(),
-            "summary": summary
-        })
-        self.save()
+        with self._state_lock:
+            self.portfolio["daily_snapshots"].append({
+                "timestamp": datetime.now().isoformat(),
+                "summary": summary
+            })
+            self._persist()
 
     # === Eski uyumluluk (wallet_monitor.py'den çağrılıyor olabilir) ===
     def buy_token_scenario1(self, token_address: str, token_symbol: str, entry_mcap: float):
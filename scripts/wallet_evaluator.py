@@ -16,9 +16,9 @@ from collections import defaultdict
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.database import (
-    get_all_token_evaluations,
-    get_wallet_alert_participation,
-    get_all_alert_snapshots,
+    iter_token_evaluations,
+    iter_wallet_alert_participation,
+    iter_alert_snapshots,
     is_db_available
 )
 
@@ -33,10 +33,35 @@ MIN_WALLET_COUNT = 50            # Minimum cüzdan sayısı korunur
 INACTIVE_DAYS_THRESHOLD = 14     # 14 gün hiç alert'te görünmediyse pasif → çıkar
 
 
+def load_token_classes(token_evaluations=None) -> dict:
+    """token_address → classification haritası (liste veya DB stream'inden)."""
+    if token_evaluations is None:
+        token_evaluations = iter_token_evaluations(columns=["token_address", "classification"])
+    return {te["token_address"]: te.get("classification", "unknown") for te in token_evaluations}
+
+
+def load_wallet_tokens(wallets: set = None, wallet_participation=None) -> dict:
+    """
+    wallet → {token, ...} haritası. wallets verilirse sadece o cüzdanlar tutulur,
+    böylece stream edilen katılım satırları bellekte birikmez.
+    """
+    if wallet_participation is None:
+        wallet_participation = iter_wallet_alert_participation(
+            columns=["wallet_address", "token_address"]
+        )
+    wallet_tokens = defaultdict(set)
+    for wp in wallet_participation:
+        if wallets is None or wp["wallet_address"] in wallets:
+            wallet_tokens[wp["wallet_address"]].add(wp["token_address"])
+    return wallet_tokens
+
+
 def evaluate_wallet_quality(wallet_address: str, token_evaluations: list = None,
-                             wallet_participation: list = None) -> dict:
+                             wallet_participation: list = None,
+                             token_classes: dict = None, wallet_tokens: set = None) -> dict:
     """
     Tek bir cüzdanın kalitesini değerlendir.
+    Toplu değerlendirmede token_classes / wallet_tokens önceden hesaplanıp verilir.
 
     Returns:
         {
@@ -51,18 +76,15 @@ def evaluate_wallet_quality(wallet_address: str, token_evaluations: list = None,
             "flag": "keep" | "warn" | "remove"
         }
     """
-    if token_evaluations is None:
-        token_evaluations = get_all_token_evaluations()
-    if wallet_participation is None:
-        wallet_participation = get_wallet_alert_participation()
-
     wallet_addr = wallet_address.lower()
 
     # Bu cüzdanın katıldığı tokenlar
-    wallet_tokens = set()
-    for wp in wallet_participation:
-        if wp["wallet_address"] == wallet_addr:
-            wallet_tokens.add(wp["token_address"])
+    if wallet_tokens is None:
+        if wallet_participation is None:
+            wallet_participation = iter_wallet_alert_participation(
+                columns=["wallet_address", "token_address"], wallet_address=wallet_addr
+            )
+        wallet_tokens = load_wallet_tokens({wallet_addr}, wallet_participation).get(wallet_addr, set())
 
     if not wallet_tokens:
         return {
@@ -78,9 +100,8 @@ def evaluate_wallet_quality(wallet_address: str, token_evaluations: list = None,
         }
 
     # Token sınıflandırmaları
-    token_classes = {}
-    for te in token_evaluations:
-        token_classes[te["token_address"]] = te.get("classification", "unknown")
+    if token_classes is None:
+        token_classes = load_token_classes(token_evaluations)
 
     # Sayımlar
     # short_list veya contracts_check = başarılı sinyal
@@ -152,14 +173,18 @@ def run_daily_wallet_evaluation() -> dict:
         wallet_data = json.load(f)
     current_wallets = [w.lower() for w in wallet_data.get("wallets", [])]
 
-    # Verileri yükle (tek seferde, her cüzdan için tekrar çekmemek için)
-    token_evaluations = get_all_token_evaluations()
-    wallet_participation = get_wallet_alert_participation()
+    # Verileri tek geçişte stream'den topla (her cüzdan için tekrar taramamak için)
+    token_classes = load_token_classes()
+    wallet_tokens = load_wallet_tokens(set(current_wallets))
 
     # Her cüzdanı değerlendir
     evaluations = []
     for wallet in current_wallets:
-        ev = evaluate_wallet_quality(wallet, token_evaluations, wallet_participation)
+        ev = evaluate_wallet_quality(
+            wallet,
+            token_classes=token_classes,
+            wallet_tokens=wallet_tokens.get(wallet, set()),
+        )
         evaluations.append(ev)
 
     # İstatistikler
@@ -173,7 +198,7 @@ def run_daily_wallet_evaluation() -> dict:
     inactive_removed = 0
     if no_data > 0 and is_db_available():
         try:
-            snapshots = get_all_alert_snapshots()
+            snapshots = list(iter_alert_snapshots(columns=["created_at"], limit=1))
             if snapshots:
                 first_alert = snapshots[0].get("created_at", "")
                 if first_alert:
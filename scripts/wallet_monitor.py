@@ -10,7 +10,6 @@ import sys
 import os
 import time
 from datetime import datetime, timezone, timedelta
-from collections import defaultdict
 from web3 import Web3
 
 # Config'i import et
@@ -43,25 +42,22 @@ from scripts.telegram_alert import (
     send_error_alert,
     get_token_info_dexscreener
 )
-from scripts.database import load_smartest_wallets_db as _load_smartest_db
+from scripts.database import is_smartest_wallet_db
 
 def _is_smartest_wallet(address: str) -> bool:
-    """Smartest wallets DB'sinde kontrol et (early_detector yerine)."""
+    """Smartest wallets DB'sinde kontrol et (tek satır PK lookup)."""
     try:
-        data = _load_smartest_db()
-        if not data:
-            return False
-        wallets = data.get("wallets", [])
-        addr_lower = address.lower()
-        return any(w.lower() == addr_lower for w in wallets)
+        return is_smartest_wallet_db(address)
     except Exception:
         return False
 from scripts.virtual_trader import get_trader
 from scripts.daily_report import check_and_send_if_time
 from scripts.tx_classifier import classify_transaction
 from scripts.fake_alert_tracker import record_fake_alert, is_flagged_wallet
-from scripts.database import init_db, is_db_available, save_trade_signal, is_duplicate_signal, save_wallet_activity
-from scripts.wallet_scorer import process_alert_v2, record_wallet_activity
+from scripts.database import init_db, is_db_available, is_sqlite_backend, save_trade_signal, is_duplicate_signal, save_wallet_activity
+from scripts.wallet_scorer import submit_early_detection, record_wallet_activity
+from scripts.alert_rules import AlertWindow, purchase_skip_reason
+from scripts.transfer_archive import archive_transfer
 
 # Flush için
 sys.stdout.reconfigure(line_buffering=True)
@@ -79,11 +75,12 @@ class SmartMoneyMonitor:
         self.wallets_set = set(w.lower() for w in self.wallets)
         print(f"📋 {len(self.wallets)} cüzdan yüklendi")
 
-        # Token alımlarını takip et: {token_address: [(wallet, eth_amount, mcap, timestamp), ...]}
-        self.token_purchases = defaultdict(list)
+        # Alım penceresi + son alert bilgileri (alert_replay ile ortak karar mantığı)
+        self.alert_window = AlertWindow()
 
-        # Son alert bilgileri: {token_address: {"time": timestamp, "mcap": mcap, "count": alert_count}}
-        self.last_alerts = {}
+        # MCap check scheduler + fiyat takibi task'ları (start_monitoring'de başlatılır)
+        self._mcap_task = None
+        self._price_task = None
 
         # Web3 bağlantısı — günlük rotasyon + failover
         self._current_day = datetime.now().day
@@ -94,7 +91,7 @@ class SmartMoneyMonitor:
             f"https://base-mainnet.g.alchemy.com/v2/{daily_key}"
         ))
         if self.w3.is_connected():
-            print(f"✅ Base chain'e bağlandı (HTTP)")
+            print("✅ Base chain'e bağlandı (HTTP)")
             print(f"📦 Güncel blok: {self.w3.eth.block_number}")
             print(f"🔑 Bugünün key'i: #{self._api_key_index + 1} (gün {self._current_day}) | Toplam: {len(ALCHEMY_API_KEYS)} key")
         else:
@@ -236,8 +233,9 @@ class SmartMoneyMonitor:
         Pipeline'ların çalışıp çalışmadığını kontrol eder.
         Sorun tespit ederse Telegram'a alarm gönderir.
         """
-        from scripts.database import is_db_available
-        from scripts.mcap_checker import get_pending_count
+        from scripts.database import is_db_available, format_db_stats
+        from scripts.mcap_checker import get_pending_count, format_lateness_stats
+        from scripts.wallet_scorer import get_early_detection_status
 
         issues = []
 
@@ -253,9 +251,23 @@ class SmartMoneyMonitor:
             pending = get_pending_count()
             if pending > 50:
                 issues.append(f"⚠️ MCap checker birikme: {pending} bekleyen kontrol!")
+            if self._mcap_task is not None and self._mcap_task.done():
+                issues.append("❌ MCap scheduler task durmuş!")
+            if self._price_task is not None and self._price_task.done():
+                issues.append("❌ Fiyat takibi task durmuş!")
         except Exception as e:
             issues.append(f"❌ MCap checker erişilemez: {e}")
 
+        # 2b. Early detection kuyruğu
+        try:
+            ed = get_early_detection_status()
+            if ed["queued"] >= 10:
+                issues.append(f"⚠️ Early detection birikme: {ed['queued']} iş sırada!")
+            if ed["failed_recent"] >= 3:
+                issues.append(f"⚠️ Early detection: son işlerde {ed['failed_recent']} hata")
+        except Exception as e:
+            issues.append(f"❌ Early detection durumu okunamadı: {e}")
+
         # 3. RPC sağlığı
         try:
             block = self.w3.eth.block_number
@@ -267,8 +279,8 @@ class SmartMoneyMonitor:
         # Sorun varsa Telegram'a gönder
         if issues:
             alert_msg = (
-                f"🚨 <b>WATCHDOG ALARM</b>\n"
-                f"━━━━━━━━━━━━━━━━━━━━\n"
+                "🚨 <b>WATCHDOG ALARM</b>\n"
+                "━━━━━━━━━━━━━━━━━━━━\n"
                 + "\n".join(issues) + "\n"
                 f"━━━━━━━━━━━━━━━━━━━━\n"
                 f"📊 {block_count} blok | {transfer_count} transfer"
@@ -279,21 +291,29 @@ class SmartMoneyMonitor:
                 pass
             print(f"🚨 Watchdog: {len(issues)} sorun tespit edildi!")
         else:
-            print(f"✅ Watchdog OK | {block_count} blok | MCap pending: {get_pending_count()}")
+            print(f"✅ Watchdog OK | {block_count} blok | MCap pending: {get_pending_count()} | {format_lateness_stats()}")
+
+        # DB gecikme özeti (en pahalı fonksiyonlar)
+        try:
+            db_lines = format_db_stats(top=3)
+            if db_lines:
+                print("🗄️ DB gecikme:\n   " + "\n   ".join(db_lines))
+        except Exception:
+            pass
 
     def _send_health_report(self, block_count: int, transfer_count: int):
         """
         Detaylı sistem sağlık raporu — günde 5 kez Telegram'a gönderir.
         Her ~7200 blokta (~4.8 saat) tetiklenir.
         """
-        from scripts.database import is_db_available, get_connection
-        from scripts.mcap_checker import get_pending_count
+        from scripts.database import is_db_available, get_connection, format_db_stats, reset_db_stats
+        from scripts.mcap_checker import get_pending_count, format_lateness_stats
 
         tr_now = datetime.now(timezone.utc) + timedelta(hours=3)
         uptime_hours = block_count * 2 / 3600  # ~2sn/blok
 
         lines = [
-            f"💚 <b>SİSTEM SAĞLIK RAPORU</b>",
+            "💚 <b>SİSTEM SAĞLIK RAPORU</b>",
             f"🕐 {tr_now.strftime('%d.%m.%Y %H:%M')} UTC+3",
             f"━━━━━━━━━━━━━━━━━━━━",
         ]
@@ -331,9 +351,51 @@ class SmartMoneyMonitor:
         try:
             pending = get_pending_count()
             lines.append(f"📈 MCap Checker: ✅ | {pending} bekleyen kontrol")
+            lines.append(f"  ⏱️ {format_lateness_stats()}")
         except Exception:
             lines.append(f"📈 MCap Checker: ❌ Erişilemez")
 
+        # Early detection kuyruğu
+        try:
+            from scripts.wallet_scorer import get_early_detection_status
+            ed = get_early_detection_status()
+            lines.append(f"🔎 Early Detection: {ed['workers_alive']} worker | "
+                         f"{ed['queued']} sırada | {len(ed['running'])} çalışıyor")
+            for job in ed["running"]:
+                lines.append(f"  • {job['token_symbol']}: {job['stage']} "
+                             f"(blok {job['blocks']}, {job['candidates']} aday, {job['elapsed_sec']:.0f}sn)")
+            if ed["recent"]:
+                avg = sum(j["elapsed_sec"] for j in ed["recent"]) / len(ed["recent"])
+                lines.append(f"  ✔️ Son {len(ed['recent'])} iş ort. {avg:.0f}sn")
+            from scripts.log_cache import get_cache_stats
+            lc = get_cache_stats()
+            lines.append(f"  🗃️ Log cache: {lc['blocks_from_cache']:,} blok cache'ten | "
+                         f"{lc['blocks_fetched']:,} blok RPC'den | {lc['evicted']} segment silindi")
+        except Exception:
+            lines.append("🔎 Early Detection: ❌ Erişilemez")
+
+        # Fiyat takibi (alert sonrası gerçek zirve)
+        try:
+            from scripts.price_tracker import get_tracked_count, get_tracker_summary
+            from scripts.price_paths import get_recorder_stats
+            path_stats = get_recorder_stats()
+            path_str = (f" | yol kaydı {path_stats['samples']} örnek, {path_stats['bytes'] / 1024:.0f} KB"
+                        if path_stats["enabled"] else "")
+            lines.append(f"📉📈 Fiyat takibi: {get_tracked_count()} aktif alert{path_str}")
+            lines.extend(f"  • {l}" for l in get_tracker_summary(3))
+        except Exception:
+            lines.append("📉📈 Fiyat takibi: ❌ Erişilemez")
+
+        # DB gecikme özeti (son rapordan bu yana)
+        try:
+            db_lines = format_db_stats(top=5)
+            if db_lines:
+                lines.append("⏱️ <b>DB gecikme (top 5):</b>")
+                lines.extend(f"  • {l}" for l in db_lines)
+            reset_db_stats()
+        except Exception as e:
+            lines.append(f"⏱️ DB gecikme: ⚠️ {e}")
+
         # Genel istatistikler
         lines.append(f"━━━━━━━━━━━━━━━━━━━━")
         lines.append(f"📊 {block_count:,} blok | {transfer_count:,} SM transfer")
@@ -347,55 +409,6 @@ class SmartMoneyMonitor:
         except Exception as e:
             print(f"⚠️ Sağlık raporu gönderilemedi: {e}")
 
-    def _clean_old_purchases(self):
-        """TIME_WINDOW'dan eski alımları temizle."""
-        current_time = time.time()
-        for token in list(self.token_purchases.keys()):
-            self.token_purchases[token] = [
-                p for p in self.token_purchases[token]
-                if current_time - p[3] < TIME_WINDOW  # p[3] = timestamp
-            ]
-            if not self.token_purchases[token]:
-                del self.token_purchases[token]
-
-    def _can_send_alert(self, token_address: str, unique_wallet_count: int = 0) -> bool:
-        """
-        Alert cooldown kontrolü.
-        - Normal: 5dk cooldown
-        - Bullish: Cooldown içinde bile, daha fazla cüzdan aldıysa geçir
-        """
-        if token_address not in self.last_alerts:
-            return True
-        last_info = self.last_alerts[token_address]
-        elapsed = time.time() - last_info["time"]
-
-        # Cooldown geçmişse → normal alert
-        if elapsed > ALERT_COOLDOWN:
-            return True
-
-        # Cooldown içinde ama daha fazla cüzdan aldıysa → bullish alert olarak geçir
-        if unique_wallet_count > last_info.get("wallet_count", 0):
-            return True
-
-        return False
-
-    def _is_bullish_alert(self, token_address: str) -> tuple:
-        """
-        Bullish alert kontrolü.
-        Returns: (is_bullish, alert_count, first_alert_mcap)
-        """
-        if token_address not in self.last_alerts:
-            return False, 1, 0
-
-        last_info = self.last_alerts[token_address]
-        elapsed = time.time() - last_info["time"]
-
-        # BULLISH_WINDOW (30dk) içinde tekrar alert geliyorsa = bullish
-        if elapsed <= BULLISH_WINDOW:
-            return True, last_info["count"] + 1, last_info["mcap"]
-
-        return False, 1, 0
-
     def _get_eth_value_from_tx(self, tx_hash: str, wallet: str) -> float:
         """Transaction'dan ETH değerini al."""
         try:
@@ -459,11 +472,8 @@ class SmartMoneyMonitor:
             if to_address.lower() not in self.wallets_set:
                 return
 
-            current_time = time.time()
-
             # Bu cüzdan bu tokeni zaten aldı mı? (son TIME_WINDOW içinde)
-            existing_wallets = [p[0] for p in self.token_purchases[token_address]]
-            if to_address.lower() in [w.lower() for w in existing_wallets]:
+            if self.alert_window.has_purchase(token_address, to_address):
                 return  # Aynı cüzdan aynı tokeni zaten aldı
 
             # === SWAP DOĞRULAMASI ===
@@ -500,11 +510,14 @@ class SmartMoneyMonitor:
             if token_symbol.upper() in [s.upper() for s in EXCLUDED_SYMBOLS]:
                 return
 
-            # === AIRDROP/DUST FILTRESI ===
-            # Kontrol 1: Likidite kontrolü - düşük likidite = güvenilmez token
-            liquidity = token_info.get('liquidity', 0)
-            if liquidity < MIN_LIQUIDITY:
-                print(f"⏭️  Skip: {token_symbol} | Likidite: ${liquidity:.0f} < ${MIN_LIQUIDITY:,} minimum")
+            # Filtre öncesi aday arşivi (alert kuralı replay'i için)
+            archive_transfer(time.time(), log.get('blockNumber', 0), token_address, to_address.lower(), token_info)
+
+            # === AIRDROP/DUST + COP TOKEN FILTRESI ===
+            # Likidite, MCap limiti, 24s hacim, 24s işlem sayısı (alert_rules ile replay'de aynı)
+            skip_reason = purchase_skip_reason(token_info)
+            if skip_reason:
+                print(f"⏭️  Skip: {token_symbol} | {skip_reason}")
                 return
 
             # NOT: from_address whitelist kontrolü kaldırıldı (v1) - çok agresifti
@@ -522,30 +535,8 @@ class SmartMoneyMonitor:
 
             current_mcap = token_info.get('mcap', 0)
 
-            # Market cap filtresi - MAX_MCAP üstündeki tokenlar alert dışı
-            if current_mcap > MAX_MCAP:
-                print(f"⏭️  Skip: {token_symbol} | MCap: ${current_mcap/1e3:.0f}K > ${MAX_MCAP/1e3:.0f}K limit")
-                return
-
-            # === COP TOKEN FILTRESI (Erken eleme) ===
-            # Hacim kontrolu - dusuk hacimli tokenlar direkt elensin
-            volume_24h = token_info.get('volume_24h', 0)
-            if volume_24h < MIN_VOLUME_24H:
-                print(f"⏭️  Skip: {token_symbol} | 24s Hacim: ${volume_24h:.0f} < ${MIN_VOLUME_24H:,} minimum")
-                return
-
-            # Islem sayisi kontrolu (makers proxy) - cok az islem = cop token
-            txns_buys = token_info.get('txns_24h_buys', 0)
-            txns_sells = token_info.get('txns_24h_sells', 0)
-            total_txns = txns_buys + txns_sells
-            if total_txns < MIN_TXNS_24H:
-                print(f"⏭️  Skip: {token_symbol} | 24s Islem: {total_txns} < {MIN_TXNS_24H} minimum")
-                return
-
             # Alımı kaydet: (wallet, eth_amount, mcap, timestamp)
-            self.token_purchases[token_address].append(
-                (to_address, eth_amount, current_mcap, current_time)
-            )
+            self.alert_window.add_purchase(token_address, to_address, eth_amount, current_mcap)
 
             print(f"📥 Alım: {to_address[:10]}... → {token_symbol} | {eth_amount:.3f} ETH | MCap: ${current_mcap/1e6:.2f}M")
 
@@ -583,7 +574,7 @@ class SmartMoneyMonitor:
                 print(f"⚠️ Trade signal S2 hatası: {e}")
 
             # Eski alımları temizle
-            self._clean_old_purchases()
+            self.alert_window.clean()
 
             # Alert kontrolü
             self._check_and_alert(token_address)
@@ -596,63 +587,36 @@ class SmartMoneyMonitor:
         Token için alert koşullarını kontrol et.
         ALERT_THRESHOLD cüzdan alım yapmışsa alert gönder.
         """
-        purchases = self.token_purchases.get(token_address, [])
-        unique_wallets = {}
-        for p in purchases:
-            wallet = p[0].lower()
-            if wallet not in unique_wallets:
-                unique_wallets[wallet] = p  # (wallet, eth, mcap, ts)
-
-        # === SOFT BLACKOUT: Düşük başarılı saatlerde eşiği yükselt ===
-        tr_now = datetime.now(timezone.utc) + timedelta(hours=3)
-        current_hour = tr_now.hour
-        effective_threshold = ALERT_THRESHOLD
-        if current_hour in BLACKOUT_HOURS:
-            effective_threshold = ALERT_THRESHOLD + BLACKOUT_EXTRA_THRESHOLD
+        decision = self.alert_window.check(token_address, get_token_info_dexscreener)
+        unique_wallets = decision["wallets"]
 
-        if len(unique_wallets) >= effective_threshold:
-            if not self._can_send_alert(token_address, len(unique_wallets)):
+        if decision["action"] is not None:
+            if decision["action"] == "cooldown":
                 print(f"⏳ Alert cooldown aktif: {token_address[:10]}...")
                 return
 
-            if current_hour in BLACKOUT_HOURS:
-                print(f"🌙 Soft blackout ({current_hour:02d}:00 UTC+3): Eşik {ALERT_THRESHOLD}→{effective_threshold}, {len(unique_wallets)} cüzdan geçti!")
+            # === SOFT BLACKOUT: Düşük başarılı saatlerde eşik yükselir ===
+            current_hour = decision["hour"]
+            rules = self.alert_window.rules
+            if current_hour in rules["blackout_hours"]:
+                print(f"🌙 Soft blackout ({current_hour:02d}:00 UTC+3): Eşik {rules['alert_threshold']}→{decision['threshold']}, {len(unique_wallets)} cüzdan geçti!")
 
             print(f"\n🚨 ALERT! {len(unique_wallets)} cüzdan aynı tokeni aldı!")
 
-            # Token bilgisi al
-            token_info = get_token_info_dexscreener(token_address)
-
-            # === COP TOKEN KONTROLU (2. katman - alert oncesi son kontrol) ===
-            volume_24h = token_info.get('volume_24h', 0)
-            txns_buys = token_info.get('txns_24h_buys', 0)
-            txns_sells = token_info.get('txns_24h_sells', 0)
-            total_txns = txns_buys + txns_sells
+            token_info = decision["token_info"]
             token_sym = token_info.get('symbol', 'UNKNOWN')
 
-            is_fake = False
-            fake_reason = ""
-
-            if volume_24h < MIN_VOLUME_24H:
-                is_fake = True
-                fake_reason = f"24s Hacim: ${volume_24h:.0f} < ${MIN_VOLUME_24H:,}"
-
-            if total_txns < MIN_TXNS_24H:
-                is_fake = True
-                fake_reason += f" | 24s Islem: {total_txns} < {MIN_TXNS_24H}" if fake_reason else f"24s Islem: {total_txns} < {MIN_TXNS_24H}"
-
-            if is_fake:
-                print(f"⚠️  FAKE ALERT ENGELLENDI: {token_sym} | {fake_reason}")
+            # === COP TOKEN KONTROLU (2. katman - alert oncesi son kontrol) ===
+            if decision["action"] == "fake":
+                print(f"⚠️  FAKE ALERT ENGELLENDI: {token_sym} | {decision['fake_reason']}")
                 # Fake alert'teki cuzdanlari flagle
                 wallet_list = [p[0] for p in unique_wallets.values()]
                 record_fake_alert(
                     wallet_addresses=wallet_list,
                     token_address=token_address,
                     token_symbol=token_sym,
-                    volume_24h=volume_24h
+                    volume_24h=token_info.get('volume_24h', 0)
                 )
-                # Bu token icin tracking'i temizle (tekrar alert gondermesin)
-                self.token_purchases.pop(token_address, None)
                 return
 
             # wallet_purchases formatı: [(wallet, eth_amount, buy_mcap), ...]
@@ -663,7 +627,9 @@ class SmartMoneyMonitor:
 
             # === BULLISH KONTROL ===
             current_mcap_val = token_info.get('mcap', 0)
-            is_bullish, alert_count, first_alert_mcap = self._is_bullish_alert(token_address)
+            is_bullish = decision["is_bullish"]
+            alert_count = decision["alert_count"]
+            first_alert_mcap = decision["first_alert_mcap"]
 
             if is_bullish:
                 print(f"🔥 BULLISH ALERT! {token_sym} — {alert_count}. alert | İlk: ${first_alert_mcap/1e3:.0f}K → Şimdi: ${current_mcap_val/1e3:.0f}K")
@@ -683,17 +649,12 @@ class SmartMoneyMonitor:
             )
 
             if success:
-                self.last_alerts[token_address] = {
-                    "time": time.time(),
-                    "mcap": first_alert_mcap if is_bullish else current_mcap_val,
-                    "count": alert_count,
-                    "wallet_count": len(unique_wallets)
-                }
+                self.alert_window.record_alert(token_address, decision, current_mcap_val)
                 print(f"✅ Alert gönderildi: {token_info.get('symbol', token_address[:10])}")
 
-                # === EARLY DETECTION (v2 - wallet scorer entegrasyonu) ===
+                # === EARLY DETECTION (v2 - arka plan worker, loop'u bloklamaz) ===
                 try:
-                    process_alert_v2(
+                    submit_early_detection(
                         token_address=token_address,
                         token_symbol=token_info.get('symbol', 'UNKNOWN'),
                         smart_money_purchases=wallet_purchases,
@@ -727,16 +688,27 @@ class SmartMoneyMonitor:
                     print(f"⚠️ Trade signal S1 hatası: {e}")
 
                 # === MCap CHECKER: 5dk + 30dk kalite kontrolü (CORE pipeline) ===
+                # alert_time ortak: price_tracker aynı token_evaluations satırını günceller
+                alert_time = datetime.now(timezone(timedelta(hours=3))).isoformat()
                 try:
                     from scripts.mcap_checker import schedule_mcap_check
                     schedule_mcap_check(
                         token_address=token_address,
                         token_symbol=token_info.get('symbol', 'UNKNOWN'),
                         alert_mcap=int(current_mcap_val),
-                        wallets_involved=[p[0] for p in wallet_purchases]
+                        wallets_involved=[p[0] for p in wallet_purchases],
+                        alert_time=alert_time,
                     )
                 except Exception as e:
                     print(f"⚠️ MCap checker planlama hatası: {e}")
+
+                # === FİYAT TAKİBİ: pencere boyunca gerçek ATH / dip ===
+                try:
+                    from scripts.price_tracker import track_alert
+                    track_alert(token_address, token_info.get('symbol', 'UNKNOWN'),
+                                int(current_mcap_val), alert_time)
+                except Exception as e:
+                    print(f"⚠️ Fiyat takibi planlama hatası: {e}")
             else:
                 print(f"❌ Alert gönderilemedi!")
 
@@ -780,8 +752,20 @@ class SmartMoneyMonitor:
             f"• Self-Improving: {'Aktif' if os.getenv('SELF_IMPROVE_ENABLED', 'false').lower() == 'true' else 'Kapalı'}"
         )
 
+        # MCap check scheduler: ayrı task, kontrol vaktinde uyanır
+        from scripts.mcap_checker import run_mcap_scheduler
+        self._mcap_task = asyncio.create_task(run_mcap_scheduler())
+
+        # Alert sonrası sürekli fiyat takibi (gerçek ATH)
+        from scripts.price_tracker import run_price_tracker
+        self._price_task = asyncio.create_task(run_price_tracker())
+
         # Polling başlat
-        await self._poll_transfers()
+        try:
+            await self._poll_transfers()
+        finally:
+            self._mcap_task.cancel()
+            self._price_task.cancel()
 
     async def _poll_transfers(self):
         """
@@ -820,18 +804,6 @@ class SmartMoneyMonitor:
                         except Exception as e:
                             print(f"⚠️ Daily report hatası: {e}")
 
-                        # MCap checker: Bekleyen 5dk/30dk kontrolleri işle
-                        try:
-                            from scripts.mcap_checker import process_pending_checks, get_pending_count
-                            pending = get_pending_count()
-                            if pending > 0:
-                                results = process_pending_checks()
-                                if results:
-                                    print(f"📈 MCap check: {len(results)} token kontrol edildi ({get_pending_count()} bekliyor)")
-                        except Exception as e:
-                            if "No module" not in str(e):
-                                print(f"⚠️ MCap checker hatası: {e}")
-
                     # === WATCHDOG: Her 500 blokta (~16dk) sistem sağlığı kontrolü ===
                     if block_count % 500 == 0 and block_count > 0:
                         self._run_watchdog(block_count, transfer_count)
@@ -929,9 +901,9 @@ def main():
     # Database başlat
     if is_db_available():
         init_db()
-        print("🗄️  PostgreSQL aktif")
+        print(f"🗄️  {'SQLite (yerel, WAL)' if is_sqlite_backend() else 'PostgreSQL'} aktif")
     else:
-        print("📁 JSON dosya sistemi aktif (DATABASE_URL yok)")
+        print("📁 JSON dosya sistemi aktif (DATABASE_URL ve SQLITE_PATH yok)")
 
     # Monitor başlat
     monitor = SmartMoneyMonitor(wallets_file)
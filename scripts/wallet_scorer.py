@@ -8,19 +8,27 @@ Alert tetiklendiğinde:
 4. Smartest wallets tablosunu günceller
 
 Skor formülü: early_hit_rate * log2(early_hits + 1) * recency_weight
+
+Alert akışından submit_early_detection() ile çağrılır: iş sınırlı bir kuyruğa
+eklenir, arka plan worker thread'leri process_alert_v2'yi çalıştırır.
 """
 
+import heapq
 import math
+import queue
 import sys
 import os
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from web3 import Web3
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.settings import (
     BASE_RPC_HTTP,
-    TRANSFER_EVENT_SIGNATURE,
     SWAP_SIGNATURES,
     EARLY_BUY_THRESHOLD,
     MAX_TOKENS_PER_WEEK,
@@ -28,14 +36,23 @@ from config.settings import (
     EARLY_LOOKBACK_BLOCKS,
     WALLET_SCORING_WINDOW_DAYS,
     SMARTEST_WALLET_TARGET,
+    ALERT_SNAPSHOT_RETENTION_DAYS,
+    EARLY_DETECTION_WORKERS,
+    EARLY_DETECTION_QUEUE_SIZE,
+    EARLY_RECEIPT_WORKERS,
 )
+from scripts.log_scanner import scan_logs, LogRangeError
+from scripts.log_cache import get_transfer_logs
 from scripts.database import (
     save_wallet_activity,
     get_wallet_activity_summary,
     get_weekly_token_count,
-    get_all_early_wallets,
+    iter_wallet_alert_participation,
     save_alert_snapshot,
     cleanup_old_wallet_activity,
+    cleanup_old_alert_snapshots,
+    cleanup_old_mcap_checks,
+    ensure_partitions,
     save_smartest_wallets_db,
     is_db_available,
 )
@@ -53,6 +70,7 @@ def find_early_buyers_time_based(
     first_sm_block: int,
     lookback_blocks: int = None,
     smart_money_wallets: set = None,
+    progress: dict = None,
 ) -> list:
     """
     Alert'ten ÖNCE tokeni alan cüzdanları bul.
@@ -63,9 +81,13 @@ def find_early_buyers_time_based(
         first_sm_block: İlk smart money alımının blok numarası
         lookback_blocks: Geriye bakılacak blok sayısı (varsayılan: config)
         smart_money_wallets: Smart money cüzdan seti (bunları hariç tut)
+        progress: İlerleme dict'i (blocks_done / blocks_total / candidates / receipts / fast_path)
 
     Returns:
         list: [{"wallet": addr, "block": block_num}, ...]
+
+    Raises:
+        LogRangeError: Blok aralığı eksiksiz taranamadı (kısmi sonuç kaydedilmez)
     """
     if lookback_blocks is None:
         lookback_blocks = EARLY_LOOKBACK_BLOCKS
@@ -79,63 +101,129 @@ def find_early_buyers_time_based(
     if end_block <= start_block:
         return []
 
-    early_buyers = []
+    # 1. Transfer log'larını topla: alıcı → ilk transfer (blok, tx hash)
+    # Adaptif aralık tarayıcı: eksik aralık kalırsa LogRangeError (sessiz veri kaybı yok)
+    candidates = []          # [(wallet, block, tx_hash)]
     seen_wallets = set()
 
+    if progress is not None:
+        progress["blocks_total"] = end_block - start_block + 1
+        progress["blocks_done"] = 0
+        progress["candidates"] = 0
+
+    def _on_progress(done, total):
+        if progress is not None:
+            progress["blocks_done"] = done
+
+    # Segment cache: sadece daha önce taranmamış blok aralıkları RPC'den çekilir
+    logs = get_transfer_logs(w3, token_address, start_block, end_block, on_progress=_on_progress)
+
+    for log in logs:
+        to_lower = log['to']
+
+        # Zaten gördüysek veya smart money ise atla
+        if to_lower in seen_wallets or to_lower in smart_money_wallets:
+            continue
+        seen_wallets.add(to_lower)
+        candidates.append((to_lower, log['blockNumber'], _hex(log['transactionHash'])))
+
+    if progress is not None:
+        progress["candidates"] = len(candidates)
+
+    # 2. Swap doğrulaması - gerçek alım mı? (tx hash başına tek kontrol)
+    swap_txs = _verify_swap_txs({c[2] for c in candidates}, start_block, end_block, progress)
+
+    # Swap yoksa airdrop/dust, atla
+    return [{"wallet": w, "block": b} for w, b, tx in candidates if tx in swap_txs]
+
+
+_SWAP_TOPICS = {s.lower().replace('0x', '') for s in SWAP_SIGNATURES}
+
+# Fast path için pool'ları öğrenmek üzere önce bu kadar receipt çekilir
+_POOL_BOOTSTRAP_RECEIPTS = 8
+
+
+def _hex(value) -> str:
+    """HexBytes / str → küçük harf, 0x'siz hex (web3 sürümünden bağımsız)."""
+    h = value.hex() if hasattr(value, 'hex') else str(value)
+    return h.lower().replace('0x', '', 1) if h.lower().startswith('0x') else h.lower()
+
+
+def _receipt_swap_pools(tx_hash: str):
+    """
+    Receipt'i çek; Swap log'u yayan adresleri döndür.
+    Returns: set (boş = swap yok) veya None (receipt alınamadı).
+    """
     try:
-        # Alchemy blok aralığı limiti nedeniyle parçalı sorgula
-        CHUNK_SIZE = 2000
-        for chunk_start in range(start_block, end_block + 1, CHUNK_SIZE):
-            chunk_end = min(chunk_start + CHUNK_SIZE - 1, end_block)
-
-            try:
-                logs = w3.eth.get_logs({
-                    'fromBlock': chunk_start,
-                    'toBlock': chunk_end,
-                    'address': Web3.to_checksum_address(token_address),
-                    'topics': [TRANSFER_EVENT_SIGNATURE]
-                })
-            except Exception as e:
-                # Blok aralığı çok genişse daha küçük parçalarla dene
-                print(f"  ⚠️ Chunk hatası ({chunk_start}-{chunk_end}): {e}")
-                continue
-
-            for log in logs:
-                if len(log['topics']) < 3:
-                    continue
-
-                to_address = '0x' + log['topics'][2].hex()[-40:]
-                to_lower = to_address.lower()
-
-                # Zaten gördüysek veya smart money ise atla
-                if to_lower in seen_wallets or to_lower in smart_money_wallets:
-                    continue
-                seen_wallets.add(to_lower)
-
-                # Swap doğrulaması - gerçek alım mı?
-                try:
-                    receipt = w3.eth.get_transaction_receipt(log['transactionHash'])
-                    has_swap = False
-                    for rlog in receipt['logs']:
-                        if rlog['topics'] and rlog['topics'][0].hex() in [
-                            s.replace('0x', '') for s in SWAP_SIGNATURES
-                        ]:
-                            has_swap = True
-                            break
-                    if not has_swap:
-                        continue  # Swap yoksa airdrop/dust, atla
-                except Exception:
-                    continue  # Receipt alınamadıysa güvenli tarafta kal, atla
-
-                early_buyers.append({
-                    "wallet": to_lower,
-                    "block": log['blockNumber'],
-                })
-
-    except Exception as e:
-        print(f"  ⚠️ Early buyer tarama hatası: {e}")
-
-    return early_buyers
+        receipt = w3.eth.get_transaction_receipt('0x' + tx_hash)
+    except Exception:
+        return None
+    return {
+        rlog['address'].lower()
+        for rlog in receipt['logs']
+        if rlog['topics'] and _hex(rlog['topics'][0]) in _SWAP_TOPICS
+    }
+
+
+def _fetch_receipts_parallel(tx_hashes: list) -> dict:
+    """Receipt'leri sınırlı thread havuzunda paralel çek: {tx_hash: swap_pools | None}."""
+    if not tx_hashes:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(EARLY_RECEIPT_WORKERS, len(tx_hashes))) as pool:
+        return dict(zip(tx_hashes, pool.map(_receipt_swap_pools, tx_hashes)))
+
+
+def _swap_txs_from_pool_logs(pools: set, start_block: int, end_block: int) -> set:
+    """Bilinen pool'ların Swap log'larını get_logs ile çek → Swap içeren tx hash'leri."""
+    addresses = [Web3.to_checksum_address(p) for p in pools]
+    topics = [['0x' + t for t in _SWAP_TOPICS]]
+    try:
+        logs = scan_logs(w3, addresses, topics, start_block, end_block)
+    except LogRangeError as e:
+        # Fast path opsiyonel: kapsanamazsa tüm tx'ler receipt ile doğrulanır
+        print(f"  ⚠️ Swap log taraması eksik, receipt'e dönülüyor: {e}")
+        return set()
+    return {_hex(log['transactionHash']) for log in logs}
+
+
+def _verify_swap_txs(tx_hashes: set, start_block: int, end_block: int, progress: dict = None) -> set:
+    """
+    Hangi tx'lerde Swap var? (receipt'siz alıcı = airdrop/dust)
+    1. Birkaç receipt çekip token'ın pool'larını öğren
+    2. Fast path: bu pool'ların Swap log'ları (get_logs) → eşleşen tx'ler receipt'siz onaylanır
+    3. Kalan tx'ler için receipt'ler paralel çekilir (farklı pool / multi-hop)
+    Receipt alınamazsa güvenli tarafta kalınır (swap sayılmaz).
+    """
+    pending = sorted(tx_hashes)
+    swap_txs = set()
+
+    bootstrap = _fetch_receipts_parallel(pending[:_POOL_BOOTSTRAP_RECEIPTS])
+    pools = set()
+    for tx, swap_pools in bootstrap.items():
+        if swap_pools:
+            swap_txs.add(tx)
+            pools |= swap_pools
+    pending = pending[_POOL_BOOTSTRAP_RECEIPTS:]
+
+    fast = 0
+    if pools and pending:
+        pool_txs = _swap_txs_from_pool_logs(pools, start_block, end_block)
+        fast = sum(1 for tx in pending if tx in pool_txs)
+        swap_txs.update(tx for tx in pending if tx in pool_txs)
+        pending = [tx for tx in pending if tx not in pool_txs]
+
+    if progress is not None:
+        progress["stage"] = "verifying"
+        progress["receipts"] = len(bootstrap) + len(pending)
+        progress["fast_path"] = fast
+
+    for tx, swap_pools in _fetch_receipts_parallel(pending).items():
+        if swap_pools:
+            swap_txs.add(tx)
+
+    print(f"  🧾 {len(tx_hashes)} tx doğrulandı: {fast} fast path (pool log), "
+          f"{len(bootstrap) + len(pending)} receipt ({len(pools)} pool)")
+    return swap_txs
 
 
 # =========================================================================
@@ -162,6 +250,9 @@ def record_wallet_activity(
         is_early=is_early,
         alert_mcap=alert_mcap,
     )
+    if _score_book.loaded:
+        _score_book.roll()
+        _score_book.record(wallet_address.lower(), token_address.lower(), is_early)
 
 
 # =========================================================================
@@ -192,13 +283,24 @@ def calculate_selectivity_score(wallet_address: str) -> dict:
     """
     # Aktivite özeti (son 30 gün)
     summary = get_wallet_activity_summary(wallet_address, WALLET_SCORING_WINDOW_DAYS)
-    early_hits = summary["early_hits"]
-    unique_tokens = summary["unique_tokens"]
-    early_hit_rate = summary["early_hit_rate"]
 
     # Haftalık token sayısı (spray filtresi)
     weekly_tokens = get_weekly_token_count(wallet_address)
 
+    return score_wallet_stats(
+        summary["early_hits"],
+        summary["unique_tokens"],
+        summary["early_hit_rate"],
+        weekly_tokens,
+    )
+
+
+def score_wallet_stats(early_hits: int, unique_tokens: int,
+                       early_hit_rate: float, weekly_tokens: int) -> dict:
+    """
+    Hazır metriklerden seçicilik skorunu hesapla (DB sorgusu yapmaz).
+    Dönüş formatı calculate_selectivity_score ile aynı.
+    """
     result = {
         "score": 0.0,
         "early_hits": early_hits,
@@ -238,6 +340,179 @@ def calculate_selectivity_score(wallet_address: str) -> dict:
     return result
 
 
+# =========================================================================
+# 3b. ARTIMLI SKOR SAYAÇLARI + TOP-N HEAP
+# =========================================================================
+# Her aktivite yazımında cüzdanın gün-kovalı sayaçları güncellenir:
+#   günlük kova = {token sayısı, early token sayısı} (token ilk görüldüğü güne yazılır,
+#   wallet_activity'deki cüzdan+token dedup'ı ile aynı)
+# 30 günlük / 7 günlük pencereler kovaların toplamıdır; pencereden çıkan kovalar silinir.
+# Skor değişen cüzdan heap'e yeni versiyonla eklenir (O(log n)); eski girişler
+# top-N okunurken atlanır (lazy deletion). Gün dönünce tüm skorlar yeniden hesaplanır
+# (haftalık pencere kaydığı için).
+
+def _utc_day(ts: datetime = None) -> int:
+    """UTC gün indeksi (DB NOW() / CURRENT_TIMESTAMP ile aynı saat)."""
+    if ts is None:
+        return int(time.time() // 86400)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() // 86400)
+
+
+class _WalletScoreBook:
+    """Cüzdan başına kovalı sayaçlar + skor heap'i (thread-safe)."""
+
+    def __init__(self, window_days: int, weekly_days: int = 7):
+        self.window_days = window_days
+        self.weekly_days = weekly_days
+        self.tokens = {}       # wallet → {token: [day, is_early]}
+        self.buckets = {}      # wallet → {day: [tokens, early]}
+        self.scores = {}       # wallet → (score_data, version)
+        self.heap = []         # (-score, wallet, version) — eşitlikte adres sırası
+        self.version = 0
+        self.today = _utc_day()
+        self.loaded = False
+        self.lock = threading.RLock()
+
+    # --- Sayaçlar ---
+
+    def record(self, wallet: str, token: str, is_early: bool, day: int = None, rescore: bool = True):
+        day = self.today if day is None else day
+        with self.lock:
+            tokens = self.tokens.setdefault(wallet, {})
+            buckets = self.buckets.setdefault(wallet, {})
+            entry = tokens.get(token)
+            if entry is None:
+                if day <= self.today - self.window_days:
+                    return
+                tokens[token] = [day, bool(is_early)]
+                bucket = buckets.setdefault(day, [0, 0])
+                bucket[0] += 1
+                if is_early:
+                    bucket[1] += 1
+            elif is_early and not entry[1]:
+                # false → true (DB'deki UPDATE ile aynı)
+                entry[1] = True
+                buckets.setdefault(entry[0], [0, 0])[1] += 1
+            else:
+                return
+            if rescore:
+                self._rescore(wallet)
+
+    def _stats(self, wallet: str) -> tuple:
+        buckets = self.buckets.get(wallet, {})
+        unique = early = weekly = 0
+        for day, (count, early_count) in buckets.items():
+            unique += count
+            early += early_count
+            if day > self.today - self.weekly_days:
+                weekly += count
+        return early, unique, weekly
+
+    def _rescore(self, wallet: str):
+        early, unique, weekly = self._stats(wallet)
+        if early < EARLY_BUY_THRESHOLD:
+            # Aday değil: varsa eski skoru geçersiz kıl
+            self.scores.pop(wallet, None)
+            return
+        rate = round(early / unique, 3) if unique > 0 else 0.0
+        score_data = score_wallet_stats(early, unique, rate, weekly)
+        self.version += 1
+        self.scores[wallet] = (score_data, self.version)
+        if score_data["passed_filters"]:
+            heapq.heappush(self.heap, (-score_data["score"], wallet, self.version))
+
+    # --- Zaman penceresi ---
+
+    def roll(self) -> bool:
+        """Gün döndüyse eski kovaları düşür ve tüm skorları yenile. Returns: gün döndü mü?"""
+        today = _utc_day()
+        with self.lock:
+            if today == self.today:
+                return False
+            self.today = today
+            cutoff = today - self.window_days
+            for wallet in list(self.buckets):
+                buckets = self.buckets[wallet]
+                for day in [d for d in buckets if d <= cutoff]:
+                    del buckets[day]
+                tokens = self.tokens.get(wallet, {})
+                for token in [t for t, (d, _) in tokens.items() if d <= cutoff]:
+                    del tokens[token]
+                if not buckets:
+                    del self.buckets[wallet]
+                    self.tokens.pop(wallet, None)
+            self._rebuild()
+            return True
+
+    def _rebuild(self):
+        self.scores.clear()
+        self.heap = []
+        for wallet in self.buckets:
+            self._rescore(wallet)
+
+    # --- Sıralama ---
+
+    def top(self, n: int) -> list:
+        """En yüksek skorlu n cüzdan (lazy deletion: eski versiyonlar atlanır)."""
+        with self.lock:
+            # Geçersiz girişler çok birikirse heap'i yeniden kur
+            if len(self.heap) > 4 * max(len(self.scores), 64):
+                self.heap = [(-sd["score"], w, v) for w, (sd, v) in self.scores.items() if sd["passed_filters"]]
+                heapq.heapify(self.heap)
+            result = []
+            popped = []
+            while self.heap and len(result) < n:
+                item = heapq.heappop(self.heap)
+                current = self.scores.get(item[1])
+                if current is None or current[1] != item[2]:
+                    continue  # Eski versiyon → kalıcı olarak at
+                popped.append(item)
+                result.append((item[1], current[0]))
+            for item in popped:
+                heapq.heappush(self.heap, item)
+            return result
+
+    def candidate_count(self) -> int:
+        with self.lock:
+            return len(self.scores)
+
+
+_score_book = _WalletScoreBook(WALLET_SCORING_WINDOW_DAYS)
+_last_saved_wallets = None  # Son kaydedilen top-N (değişmediyse tekrar yazılmaz)
+
+
+def load_score_book(force: bool = False) -> bool:
+    """
+    Sayaçları wallet_activity'den (son WALLET_SCORING_WINDOW_DAYS gün) tek stream ile kur.
+    Monitor başlangıcında ve günlük yenilemede (force=True) çağrılır.
+    """
+    if not is_db_available():
+        return False
+    with _score_book.lock:
+        if _score_book.loaded and not force:
+            return True
+        fresh = _WalletScoreBook(WALLET_SCORING_WINDOW_DAYS)
+        rows = 0
+        for row in iter_wallet_alert_participation(
+            columns=["wallet_address", "token_address", "is_early", "created_at"],
+            days=WALLET_SCORING_WINDOW_DAYS,
+        ):
+            created = row.get("created_at")
+            day = _utc_day(datetime.fromisoformat(created)) if created else None
+            fresh.record(row["wallet_address"], row["token_address"], bool(row.get("is_early")),
+                         day=day, rescore=False)
+            rows += 1
+        fresh._rebuild()
+        _score_book.tokens, _score_book.buckets = fresh.tokens, fresh.buckets
+        _score_book.scores, _score_book.heap = fresh.scores, fresh.heap
+        _score_book.version, _score_book.today = fresh.version, fresh.today
+        _score_book.loaded = True
+    print(f"  🧮 Skor sayaçları yüklendi: {rows} aktivite, {_score_book.candidate_count()} aday")
+    return True
+
+
 # =========================================================================
 # 4. ALERT İŞLEME (process_alert_v2)
 # =========================================================================
@@ -249,9 +524,10 @@ def process_alert_v2(
     smart_money_wallets: set,
     current_block: int,
     alert_mcap: int = 0,
+    progress: dict = None,
 ):
     """
-    Alert tetiklendiğinde çağrılır.
+    Alert tetiklendiğinde çağrılır (submit_early_detection ile arka planda).
     1. İlk SM alımının bloğunu bul
     2. O bloktan geriye tara → early buyer'ları bul
     3. Early buyer'ları kaydet
@@ -265,7 +541,11 @@ def process_alert_v2(
         smart_money_wallets: Tüm SM cüzdan seti
         current_block: Şu anki blok
         alert_mcap: Alert anındaki MCap
+        progress: İş durumu dict'i (stage + tarama ilerlemesi)
     """
+    if progress is None:
+        progress = {}
+
     print(f"\n🔎 Early detection v2 başlatılıyor: {token_symbol}")
 
     if not is_db_available():
@@ -281,15 +561,26 @@ def process_alert_v2(
     print(f"  🔍 {EARLY_LOOKBACK_BLOCKS} blok geriye taranıyor (~{EARLY_LOOKBACK_BLOCKS * 2 // 3600} saat)")
 
     # Early buyer'ları bul
-    early_buyers = find_early_buyers_time_based(
-        token_address=token_address,
-        first_sm_block=first_sm_block,
-        smart_money_wallets=smart_money_wallets,
-    )
+    progress["stage"] = "scanning"
+    scan_error = None
+    try:
+        early_buyers = find_early_buyers_time_based(
+            token_address=token_address,
+            first_sm_block=first_sm_block,
+            smart_money_wallets=smart_money_wallets,
+            progress=progress,
+        )
+    except LogRangeError as e:
+        # Eksik tarama kaydedilmez; snapshot yine de yazılır, iş hata olarak işaretlenir
+        print(f"  ❌ Early buyer taraması eksik kaldı: {e}")
+        scan_error = e
+        early_buyers = []
 
     print(f"  👥 {len(early_buyers)} early buyer bulundu")
+    progress["early_buyers"] = len(early_buyers)
 
     # Early buyer'ları DB'ye kaydet
+    progress["stage"] = "recording"
     for buyer in early_buyers:
         record_wallet_activity(
             wallet_address=buyer["wallet"],
@@ -316,57 +607,185 @@ def process_alert_v2(
 
     # Smartest wallets güncelle
     if early_buyers:
+        progress["stage"] = "scoring"
         evaluate_and_update_smartest_wallets()
 
+    if scan_error is not None:
+        raise scan_error
+
+
+# =========================================================================
+# 4b. ARKA PLAN EARLY DETECTION KUYRUĞU
+# =========================================================================
+# process_alert_v2 ~3600 blok log tarar + receipt çeker + yeniden puanlar;
+# monitor loop'u bloklamaması için işler sınırlı bir kuyruğa eklenir ve
+# EARLY_DETECTION_WORKERS thread'i tarafından işlenir. Aynı token için
+# kuyrukta/çalışmakta olan iş varsa yenisi eklenmez.
+
+_job_queue = queue.Queue(maxsize=EARLY_DETECTION_QUEUE_SIZE)
+_jobs = {}                          # token_address → aktif iş (queued / running)
+_finished_jobs = deque(maxlen=20)   # Son tamamlanan işler (durum raporu için)
+_jobs_lock = threading.Lock()
+_workers = []
+
+
+def _ensure_workers():
+    """Worker thread'lerini ilk iş geldiğinde başlat."""
+    with _jobs_lock:
+        alive = [t for t in _workers if t.is_alive()]
+        _workers[:] = alive
+        for i in range(len(alive), max(1, EARLY_DETECTION_WORKERS)):
+            t = threading.Thread(target=_worker_loop, name=f"early-detect-{i + 1}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def _worker_loop():
+    while True:
+        job = _job_queue.get()
+        try:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            process_alert_v2(progress=job["progress"], **job["kwargs"])
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            print(f"⚠️ Early detection işi hatası ({job['token_symbol']}): {e}")
+        finally:
+            job["finished_at"] = time.time()
+            with _jobs_lock:
+                _jobs.pop(job["token_address"], None)
+                _finished_jobs.append(job)
+            _job_queue.task_done()
+
+
+def submit_early_detection(
+    token_address: str,
+    token_symbol: str,
+    smart_money_purchases: list,
+    smart_money_wallets: set,
+    current_block: int,
+    alert_mcap: int = 0,
+) -> bool:
+    """
+    process_alert_v2'yi arka plan kuyruğuna ekle (bloklamaz).
+    Returns: True = kuyruğa eklendi, False = aynı token için iş var veya kuyruk dolu.
+    """
+    token_key = token_address.lower()
+    job = {
+        "token_address": token_key,
+        "token_symbol": token_symbol,
+        "status": "queued",
+        "queued_at": time.time(),
+        "progress": {"stage": "queued"},
+        "kwargs": {
+            "token_address": token_address,
+            "token_symbol": token_symbol,
+            "smart_money_purchases": list(smart_money_purchases),
+            "smart_money_wallets": frozenset(smart_money_wallets),
+            "current_block": current_block,
+            "alert_mcap": alert_mcap,
+        },
+    }
+
+    with _jobs_lock:
+        if token_key in _jobs:
+            print(f"⏭️ Early detection zaten sırada: {token_symbol}")
+            return False
+        try:
+            _job_queue.put_nowait(job)
+        except queue.Full:
+            print(f"⚠️ Early detection kuyruğu dolu ({EARLY_DETECTION_QUEUE_SIZE}), {token_symbol} atlandı")
+            return False
+        _jobs[token_key] = job
+
+    _ensure_workers()
+    print(f"📥 Early detection kuyruğa eklendi: {token_symbol} ({_job_queue.qsize()} sırada)")
+    return True
+
+
+def get_early_detection_status() -> dict:
+    """Kuyruk / çalışan iş / son tamamlananlar (watchdog ve sağlık raporu için)."""
+    now = time.time()
+    with _jobs_lock:
+        active = [dict(j, progress=dict(j["progress"])) for j in _jobs.values()]
+        finished = [dict(j, progress=dict(j["progress"])) for j in _finished_jobs]
+
+    def _summary(j):
+        p = j["progress"]
+        ref = j.get("started_at") or j["queued_at"]
+        return {
+            "token_symbol": j["token_symbol"],
+            "status": j["status"],
+            "stage": p.get("stage"),
+            "blocks": f"{p.get('blocks_done', 0)}/{p.get('blocks_total', 0)}",
+            "candidates": p.get("candidates", 0),
+            "early_buyers": p.get("early_buyers"),
+            "elapsed_sec": round((j.get("finished_at") or now) - ref, 1),
+        }
+
+    return {
+        "queued": sum(1 for j in active if j["status"] == "queued"),
+        "running": [_summary(j) for j in active if j["status"] == "running"],
+        "recent": [_summary(j) for j in finished[-5:]],
+        "failed_recent": sum(1 for j in finished if j["status"] == "failed"),
+        "workers_alive": sum(1 for t in _workers if t.is_alive()),
+    }
+
 
 # =========================================================================
 # 5. SMARTEST WALLETS DEĞERLENDİRME
 # =========================================================================
 
-def evaluate_and_update_smartest_wallets():
+def evaluate_and_update_smartest_wallets(full: bool = False):
     """
-    Tüm aday cüzdanları değerlendir ve smartest_wallets tablosunu güncelle.
-    Günlük yenilemede veya yeni early buyer bulunduğunda çağrılır.
+    Aday cüzdanları değerlendir ve smartest_wallets tablosunu güncelle.
+    Yeni early buyer bulunduğunda: sayaç heap'inden top-N (DB taraması yok).
+    full=True (günlük yenileme): sayaçlar wallet_activity'den yeniden kurulur.
+    Liste değişmediyse DB'ye yazılmaz.
     """
+    global _last_saved_wallets
     if not is_db_available():
         return
 
-    # Minimum early hit sayısını geçen tüm cüzdanları al
-    candidates = get_all_early_wallets(
-        min_early_count=EARLY_BUY_THRESHOLD,
-        days=WALLET_SCORING_WINDOW_DAYS,
-    )
+    if not load_score_book(force=full):
+        return
+    _score_book.roll()
 
+    candidates = _score_book.candidate_count()
     if not candidates:
         print("  ℹ️ Henüz yeterli early buyer adayı yok")
         return
 
-    print(f"  📊 {len(candidates)} aday cüzdan değerlendiriliyor...")
-
-    # Her adayı skorla
-    scored = []
-    for c in candidates:
-        score_data = calculate_selectivity_score(c["wallet"])
-
-        if score_data["passed_filters"]:
-            scored.append({
-                "address": c["wallet"],
-                "score": score_data["score"],
-                "early_hits": score_data["early_hits"],
-                "unique_tokens": score_data["unique_tokens"],
-                "early_hit_rate": score_data["early_hit_rate"],
-                "weekly_tokens": score_data["weekly_tokens"],
-                "qualified_at": datetime.now().isoformat(),
-            })
-            print(f"  ✅ {c['wallet'][:10]}... | Skor: {score_data['score']:.3f} | "
-                  f"Early: {score_data['early_hits']}/{score_data['unique_tokens']} "
-                  f"({score_data['early_hit_rate']:.0%})")
-        else:
-            print(f"  ❌ {c['wallet'][:10]}... | Red: {score_data['reject_reason']}")
-
-    # Skora göre sırala ve en iyileri al
-    scored.sort(key=lambda x: x["score"], reverse=True)
-    top_wallets = scored[:SMARTEST_WALLET_TARGET]
+    ranked = _score_book.top(SMARTEST_WALLET_TARGET)
+    previous = {w["address"]: w for w in (_last_saved_wallets or [])}
+    now_iso = datetime.now().isoformat()
+
+    top_wallets = []
+    for wallet, score_data in ranked:
+        top_wallets.append({
+            "address": wallet,
+            "score": score_data["score"],
+            "early_hits": score_data["early_hits"],
+            "unique_tokens": score_data["unique_tokens"],
+            "early_hit_rate": score_data["early_hit_rate"],
+            "weekly_tokens": score_data["weekly_tokens"],
+            "qualified_at": previous.get(wallet, {}).get("qualified_at", now_iso),
+        })
+
+    def _key(wallets):
+        return [(w["address"], w["score"], w["early_hits"], w["unique_tokens"], w["weekly_tokens"])
+                for w in wallets]
+
+    if not full and _last_saved_wallets is not None and _key(top_wallets) == _key(_last_saved_wallets):
+        return top_wallets
+
+    if full:
+        print(f"  📊 {candidates} aday cüzdan değerlendirildi")
+        for w in top_wallets:
+            print(f"  ✅ {w['address'][:10]}... | Skor: {w['score']:.3f} | "
+                  f"Early: {w['early_hits']}/{w['unique_tokens']} ({w['early_hit_rate']:.0%})")
 
     # DB'ye kaydet
     smartest_data = {
@@ -374,11 +793,12 @@ def evaluate_and_update_smartest_wallets():
         "target": SMARTEST_WALLET_TARGET,
         "current_count": len(top_wallets),
         "completed": len(top_wallets) >= SMARTEST_WALLET_TARGET,
-        "last_evaluation": datetime.now().isoformat(),
+        "last_evaluation": now_iso,
     }
 
     save_smartest_wallets_db(smartest_data)
-    print(f"  🧠 Smartest wallets: {len(top_wallets)}/{SMARTEST_WALLET_TARGET}")
+    _last_saved_wallets = top_wallets
+    print(f"  🧠 Smartest wallets: {len(top_wallets)}/{SMARTEST_WALLET_TARGET} ({candidates} aday)")
 
     return top_wallets
 
@@ -391,13 +811,18 @@ def daily_refresh():
     """
     print("\n🔄 Smartest wallet günlük yenileme başlatılıyor...")
 
-    # Eski verileri temizle
+    # Önümüzdeki günlerin partition'larını hazırla
+    ensure_partitions()
+
+    # Eski verileri temizle (partition drop)
     cleaned = cleanup_old_wallet_activity(WALLET_SCORING_WINDOW_DAYS)
     if cleaned > 0:
         print(f"  🗑️ {cleaned} eski kayıt temizlendi")
+    cleanup_old_alert_snapshots(ALERT_SNAPSHOT_RETENTION_DAYS)
+    cleanup_old_mcap_checks()
 
-    # Tekrar değerlendir
-    result = evaluate_and_update_smartest_wallets()
+    # Tekrar değerlendir (sayaçlar DB'den yeniden kurulur)
+    result = evaluate_and_update_smartest_wallets(full=True)
 
     if result:
         print(f"  ✅ Yenileme tamamlandı: {len(result)} smartest wallet")